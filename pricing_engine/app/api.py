@@ -1,19 +1,48 @@
-from flask import Flask, jsonify, request
+import os
+import time
+
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 
 from app.config import Config
+from app.db import DatabaseUnavailable, db_degraded, use_serving_timeouts
 from app.utils.logging_utils import get_logger
-from app.optimizer.price_optimizer import (
-    optimize_price_for_sku,
-    persist_optimization_result,
-    log_prediction,
+from app.utils.memory_utils import memory_breakdown
+from app.utils.metrics import registry
+from app.utils.profiling import init_app_profiling
+from app.optimizer.precomputed import SUGGESTIONS_SERVED, precomputed_index
+from app.optimizer.simulation import ndjson_lines, simulate, validate_simulation_request
+from app.optimizer.suggestions import etag, etag_matches, live_suggestion
+from app.utils.singleflight import SingleFlightTimeout
+from app.feedback.feedback_handler import (
+    get_feedback_summary,
+    save_feedback,
+    save_or_spool_feedback,
+    validate_feedback,
+    validate_feedback_batch,
 )
-from app.feedback.feedback_handler import save_feedback
 from app.models.demand_model import load_demand_model
 from app.models.elasticity import get_elasticity_for_sku
 
 logger = get_logger(__name__)
 
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_seconds",
+    "HTTP request latency by route and status",
+    labelnames=("route", "method", "status"),
+)
+
+# Per worker: with pre-forked workers, pss and shared show what the fork saves
+registry.gauge_callback(
+    "process_memory_bytes",
+    "Memory of this worker process by kind (rss, pss, shared, private)",
+    lambda: {(str(os.getpid()), kind): v for kind, v in memory_breakdown().items()},
+    labelnames=("pid", "kind"),
+)
+
+_DB_RETRY_AFTER = str(int(Config.DB_BREAKER_RESET_SEC))
+
 def create_app() -> Flask:
+    use_serving_timeouts()
     app = Flask(__name__)
 
     # Load models at startup
@@ -24,15 +53,36 @@ def create_app() -> Flask:
         except Exception as e:
             logger.error(f"Failed to load demand model: {e}")
 
+    init_app_profiling(app)
+
+    if Config.SERVE_PRECOMPUTED:
+        precomputed_index.start()
+
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _record_latency(response):
+        start = g.pop("request_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            HTTP_REQUEST_SECONDS.labels(route, request.method, str(response.status_code)).observe(
+                time.perf_counter() - start
+            )
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
     @app.route("/health", methods=["GET"])
     def health():
-        return jsonify({"status": "ok"}), 200
+        return jsonify({"status": "ok", "degraded": db_degraded()}), 200
 
     @app.route("/models/status", methods=["GET"])
     def models_status():
         # Simplified: check if demand model file exists
-        import os
-
         demand_exists = os.path.exists(Config.DEMAND_MODEL_PATH)
         return jsonify(
             {
@@ -51,60 +101,73 @@ def create_app() -> Flask:
         if not sku:
             return jsonify({"error": "sku is required"}), 400
 
-        result = optimize_price_for_sku(sku, vendor_id)
-        if not result:
-            return jsonify({"error": "No suggestion available"}), 404
-
-        suggestion_id = persist_optimization_result(result)
-
-        # For logging, we log only key features
-        input_features = {
-            "sku": result.sku,
-            "vendor_id": result.vendor_id,
-            "current_price": result.current_price,
-        }
-        output = {
-            "optimal_price": result.optimal_price,
-            "expected_revenue": result.expected_revenue,
-            "expected_profit": result.expected_profit,
-        }
-        log_prediction(
-            sku=result.sku,
-            vendor_id=result.vendor_id,
-            suggestion_id=suggestion_id,
-            model_type="optimizer",
-            input_features=input_features,
-            output=output,
+        precomputed = precomputed_index.lookup(sku, vendor_id)
+        if precomputed is not None:
+            fingerprint = precomputed.fingerprint
+        else:
+            try:
+                fingerprint, body = live_suggestion(sku, vendor_id)
+            except SingleFlightTimeout:
+                return jsonify({"error": "Suggestion is still being computed"}), 503, {"Retry-After": "1"}
+            except DatabaseUnavailable:
+                # Only when nothing about this SKU was ever cached
+                return jsonify({"error": "Database unavailable"}), 503, {"Retry-After": _DB_RETRY_AFTER}
+            if fingerprint is None:
+                return jsonify({"error": "No suggestion available"}), 404
+        if etag_matches(request.headers.get("If-None-Match"), fingerprint):
+            return Response(status=304, headers={"ETag": etag(fingerprint)})
+
+        if precomputed is not None:
+            body, source = precomputed.response(), "precomputed"
+        else:
+            source = "degraded" if body and body.get("degraded") else "live"
+            if not body:
+                return jsonify({"error": "No suggestion available"}), 404
+        SUGGESTIONS_SERVED.labels(source).inc()
+
+        response = jsonify({**body, "source": source})
+        response.headers["ETag"] = etag(fingerprint)
+        return response, 200
+
+    @app.route("/price-simulations", methods=["POST"])
+    def price_simulations():
+        targets, scenario, error = validate_simulation_request(request.get_json(force=True))
+        if error:
+            return jsonify(error), 400
+
+        # One JSON line per SKU, then a summary line; nothing is buffered
+        return Response(
+            stream_with_context(ndjson_lines(simulate(targets, scenario))),
+            mimetype="application/x-ndjson",
         )
 
-        response = {
-            "sku": result.sku,
-            "current_price": result.current_price,
-            "suggested_price": result.optimal_price,
-            "expected_revenue": result.expected_revenue,
-            "expected_profit": result.expected_profit,
-            "elasticity": result.elasticity,
-            "confidence": result.confidence,
-            "reason": result.reason,
-            "actions": ["accept", "reject", "custom_price"],
-        }
-        return jsonify(response), 200
-
     @app.route("/price-feedback", methods=["POST"])
     def price_feedback():
         data = request.get_json(force=True)
-        required = ["vendor_id", "sku", "suggested_price", "action", "timestamp"]
-        missing = [f for f in required if f not in data]
-        if missing:
-            return jsonify({"error": f"Missing fields: {','.join(missing)}"}), 400
+        error = validate_feedback(data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        degraded = save_feedback(data)
+        return jsonify({"status": "ok", "degraded": degraded}), 200
 
-        if data["action"] not in ("accept", "reject", "custom_price"):
-            return jsonify({"error": "Invalid action"}), 400
+    @app.route("/price-feedback/batch", methods=["POST"])
+    def price_feedback_batch():
+        data = request.get_json(force=True)
+        events, error = validate_feedback_batch(data)
+        if error:
+            return jsonify(error), 400
 
-        if data["action"] == "custom_price" and not data.get("custom_price"):
-            return jsonify({"error": "custom_price required for action=custom_price"}), 400
+        counts = save_or_spool_feedback(events)
+        return jsonify({"status": "ok", **counts}), 200
 
-        save_feedback(data)
-        return jsonify({"status": "ok"}), 200
+    @app.route("/price-feedback/summary", methods=["GET"])
+    def price_feedback_summary():
+        summary = get_feedback_summary(
+            vendor_id=request.args.get("vendor_id"), day=request.args.get("date")
+        )
+        if not summary:
+            return jsonify({"error": "No feedback recorded"}), 404
+        return jsonify(summary), 200
 
     return app
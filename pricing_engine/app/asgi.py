@@ -0,0 +1,215 @@
+"""ASGI serving mode: the Flask routes on Starlette with async DB reads.
+
+    uvicorn --factory app.asgi:create_asgi_app --workers 2
+
+/price-suggestions uses the async pool (app.db_async); the feedback routes
+call the same sync handlers as the Flask app on Starlette's thread pool.
+Request profiling hooks are Flask-only.
+"""
+import os
+import time
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app import db_async
+from app.api import HTTP_REQUEST_SECONDS
+from app.config import Config
+from app.db import DatabaseUnavailable, db_degraded, use_serving_timeouts
+from app.feedback.feedback_handler import (
+    get_feedback_summary,
+    save_feedback,
+    save_or_spool_feedback,
+    validate_feedback,
+    validate_feedback_batch,
+)
+from app.models.demand_model import load_demand_model
+from app.optimizer.async_optimizer import (
+    get_pricing_inputs_async,
+    live_suggestion_async,
+    shutdown_predict_executor,
+)
+from app.optimizer.precomputed import SUGGESTIONS_SERVED, precomputed_index
+from app.optimizer.simulation import ndjson_lines, simulate, validate_simulation_request
+from app.optimizer.suggestions import etag, etag_matches
+from app.utils.logging_utils import get_logger
+from app.utils.metrics import registry
+from app.utils.singleflight import SingleFlightTimeout
+
+logger = get_logger(__name__)
+
+class _BadJSON(Exception):
+    pass
+
+async def _json_body(request: Request):
+    # Flask's get_json(force=True) ignores the content type; so do we
+    try:
+        return await request.json()
+    except ValueError:
+        raise _BadJSON()
+
+async def _bad_json(request: Request, exc: _BadJSON):
+    return JSONResponse({"error": "Request body must be valid JSON"}, status_code=400)
+
+async def metrics(request: Request):
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
+
+async def health(request: Request):
+    return JSONResponse({"status": "ok", "degraded": db_degraded()})
+
+async def models_status(request: Request):
+    return JSONResponse(
+        {
+            "demand_model": {
+                "loaded": os.path.exists(Config.DEMAND_MODEL_PATH),
+                "path": Config.DEMAND_MODEL_PATH,
+            }
+        }
+    )
+
+async def price_suggestions(request: Request):
+    sku = request.query_params.get("sku")
+    vendor_id = request.query_params.get("vendor_id", "default_vendor")
+
+    if not sku:
+        return JSONResponse({"error": "sku is required"}, status_code=400)
+
+    precomputed = precomputed_index.get(sku, vendor_id)
+    if precomputed is not None:
+        try:
+            inputs = await get_pricing_inputs_async(sku, vendor_id)
+        except DatabaseUnavailable:
+            pass  # nothing cached to compare with; the batch price beats no price
+        else:
+            precomputed = precomputed_index.validate(precomputed, vendor_id, inputs)
+    if precomputed is not None:
+        fingerprint = precomputed.fingerprint
+    else:
+        try:
+            fingerprint, body = await live_suggestion_async(sku, vendor_id)
+        except SingleFlightTimeout:
+            return JSONResponse(
+                {"error": "Suggestion is still being computed"}, status_code=503, headers={"Retry-After": "1"}
+            )
+        except DatabaseUnavailable:
+            return JSONResponse(
+                {"error": "Database unavailable"},
+                status_code=503,
+                headers={"Retry-After": str(int(Config.DB_BREAKER_RESET_SEC))},
+            )
+        if fingerprint is None:
+            return JSONResponse({"error": "No suggestion available"}, status_code=404)
+    if etag_matches(request.headers.get("if-none-match"), fingerprint):
+        return Response(status_code=304, headers={"ETag": etag(fingerprint)})
+
+    if precomputed is not None:
+        body, source = precomputed.response(), "precomputed"
+    else:
+        source = "degraded" if body and body.get("degraded") else "live"
+        if not body:
+            return JSONResponse({"error": "No suggestion available"}, status_code=404)
+    SUGGESTIONS_SERVED.labels(source).inc()
+    return JSONResponse({**body, "source": source}, headers={"ETag": etag(fingerprint)})
+
+async def price_simulations(request: Request):
+    data = await _json_body(request)
+    targets, scenario, error = await run_in_threadpool(validate_simulation_request, data)
+    if error:
+        return JSONResponse(error, status_code=400)
+
+    # Chunks are simulated on the thread pool as the client reads them
+    return StreamingResponse(
+        iterate_in_threadpool(ndjson_lines(simulate(targets, scenario))),
+        media_type="application/x-ndjson",
+    )
+
+async def price_feedback(request: Request):
+    data = await _json_body(request)
+    error = validate_feedback(data)
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+
+    degraded = await run_in_threadpool(save_feedback, data)
+    return JSONResponse({"status": "ok", "degraded": degraded})
+
+async def price_feedback_batch(request: Request):
+    events, error = validate_feedback_batch(await _json_body(request))
+    if error:
+        return JSONResponse(error, status_code=400)
+
+    counts = await run_in_threadpool(save_or_spool_feedback, events)
+    return JSONResponse({"status": "ok", **counts})
+
+async def price_feedback_summary(request: Request):
+    summary = await run_in_threadpool(
+        get_feedback_summary,
+        vendor_id=request.query_params.get("vendor_id"),
+        day=request.query_params.get("date"),
+    )
+    if not summary:
+        return JSONResponse({"error": "No feedback recorded"}, status_code=404)
+    return JSONResponse(summary)
+
+class RequestLatencyMiddleware:
+    """Feeds http_request_seconds like the Flask after_request hook."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Every route is a static path, so the matched path is the route
+            HTTP_REQUEST_SECONDS.labels(
+                scope["path"] if "endpoint" in scope else "unmatched",
+                scope["method"],
+                str(status["code"]),
+            ).observe(time.perf_counter() - start)
+
+@asynccontextmanager
+async def _lifespan(app):
+    try:
+        load_demand_model()
+        logger.info("Demand model loaded at startup.")
+    except Exception as e:
+        logger.error("Failed to load demand model: %s", e)
+    if Config.SERVE_PRECOMPUTED:
+        await run_in_threadpool(precomputed_index.start)
+    yield
+    if Config.SERVE_PRECOMPUTED:
+        precomputed_index.stop()
+    await db_async.pool.close()
+    shutdown_predict_executor()
+
+def create_asgi_app() -> Starlette:
+    use_serving_timeouts()
+    routes = [
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/health", health, methods=["GET"]),
+        Route("/models/status", models_status, methods=["GET"]),
+        Route("/price-suggestions", price_suggestions, methods=["GET"]),
+        Route("/price-simulations", price_simulations, methods=["POST"]),
+        Route("/price-feedback", price_feedback, methods=["POST"]),
+        Route("/price-feedback/batch", price_feedback_batch, methods=["POST"]),
+        Route("/price-feedback/summary", price_feedback_summary, methods=["GET"]),
+    ]
+    app = Starlette(
+        routes=routes, lifespan=_lifespan, exception_handlers={_BadJSON: _bad_json}
+    )
+    app.add_middleware(RequestLatencyMiddleware)
+    return app
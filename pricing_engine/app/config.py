@@ -9,8 +9,27 @@ class Config:
     DB_USER = os.getenv("DB_USER", "pricing_user")
     DB_PASSWORD = os.getenv("DB_PASSWORD", "pricing_password")
     DB_NAME = os.getenv("DB_NAME", "pricing_db")
+    # Read replica for fetch_all/fetch_one; empty keeps every read on DB_HOST
+    DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST", "")
+    DB_REPLICA_PORT = int(os.getenv("DB_REPLICA_PORT", str(DB_PORT)))
+    # Reads fall back to the primary while replica lag exceeds this (or is unknown)
+    DB_REPLICA_MAX_LAG_SEC = float(os.getenv("DB_REPLICA_MAX_LAG_SEC", "5"))
+    DB_REPLICA_LAG_CHECK_SEC = float(os.getenv("DB_REPLICA_LAG_CHECK_SEC", "5"))
+    DB_CONNECT_TIMEOUT_SEC = int(os.getenv("DB_CONNECT_TIMEOUT_SEC", "5"))
+    # Per-statement socket deadlines; 0 means none, which long batch queries need.
+    # The API apps default both to SERVING_DB_TIMEOUT_SEC instead (see
+    # app.db.use_serving_timeouts) so a slow DB can't hang requests.
+    DB_READ_TIMEOUT_SEC = float(os.getenv("DB_READ_TIMEOUT_SEC", "0"))
+    DB_WRITE_TIMEOUT_SEC = float(os.getenv("DB_WRITE_TIMEOUT_SEC", "0"))
+    SERVING_DB_TIMEOUT_SEC = float(os.getenv("SERVING_DB_TIMEOUT_SEC", "2"))
+    # Consecutive failures that open the DB breaker, and how long it stays open
+    DB_BREAKER_FAILURES = int(os.getenv("DB_BREAKER_FAILURES", "5"))
+    DB_BREAKER_RESET_SEC = float(os.getenv("DB_BREAKER_RESET_SEC", "10"))
 
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json
+    LOG_RATE_LIMIT_PER_KEY = int(os.getenv("LOG_RATE_LIMIT_PER_KEY", "20"))  # 0 disables
+    LOG_RATE_LIMIT_WINDOW_SEC = float(os.getenv("LOG_RATE_LIMIT_WINDOW_SEC", "60"))
 
     ELASTICITY_ARTIFACT_DIR = os.getenv(
         "ELASTICITY_ARTIFACT_DIR", "./models_artifacts/elasticity"
@@ -18,8 +37,99 @@ class Config:
     DEMAND_MODEL_PATH = os.getenv(
         "DEMAND_MODEL_PATH", "./models_artifacts/demand/demand_model.pkl"
     )
+    # Flat tree-array export of the demand model, mapped read-only when enabled
+    DEMAND_MODEL_ARRAYS_DIR = os.getenv(
+        "DEMAND_MODEL_ARRAYS_DIR", "./models_artifacts/demand/tree_arrays"
+    )
+    DEMAND_MODEL_USE_ARRAYS = os.getenv("DEMAND_MODEL_USE_ARRAYS", "0") == "1"
+    # Micro-batching of concurrent predict calls: the window is the most a
+    # request waits for company (0 disables); a batch closes early at max rows
+    DEMAND_BATCH_WINDOW_MS = float(os.getenv("DEMAND_BATCH_WINDOW_MS", "0"))
+    DEMAND_BATCH_MAX_ROWS = int(os.getenv("DEMAND_BATCH_MAX_ROWS", "2048"))
 
     PRICE_RANGE_LOWER = float(os.getenv("PRICE_RANGE_LOWER", "0.7"))
     PRICE_RANGE_UPPER = float(os.getenv("PRICE_RANGE_UPPER", "1.3"))
     PRICE_GRID_STEPS = int(os.getenv("PRICE_GRID_STEPS", "21"))
     DEFAULT_ELASTICITY = float(os.getenv("DEFAULT_ELASTICITY", "-1.5"))
+
+    DRIFT_WINDOW_DAYS = int(os.getenv("DRIFT_WINDOW_DAYS", "30"))
+    DRIFT_WORKERS = int(os.getenv("DRIFT_WORKERS", "1"))
+
+    METRICS_FLUSH_SIZE = int(os.getenv("METRICS_FLUSH_SIZE", "500"))
+    METRICS_FLUSH_INTERVAL_SEC = float(os.getenv("METRICS_FLUSH_INTERVAL_SEC", "5"))
+    METRICS_SPOOL_PATH = os.getenv("METRICS_SPOOL_PATH", "")
+
+    # prediction_logs / monitoring_metrics storage (app/monitoring/retention.py):
+    # RANGE partition size (day | month | none), partitions created ahead of time,
+    # and days of raw rows kept; older partitions are dropped once rolled up
+    LOG_PARTITION_GRANULARITY = os.getenv("LOG_PARTITION_GRANULARITY", "day")
+    LOG_PARTITIONS_AHEAD = int(os.getenv("LOG_PARTITIONS_AHEAD", "7"))
+    PREDICTION_LOG_RETENTION_DAYS = int(os.getenv("PREDICTION_LOG_RETENTION_DAYS", "30"))
+    MONITORING_METRICS_RETENTION_DAYS = int(os.getenv("MONITORING_METRICS_RETENTION_DAYS", "400"))
+
+    PRICE_BAND_EDGES = tuple(
+        float(x) for x in os.getenv("PRICE_BAND_EDGES", "0,10,25,50,100,250,500,1000").split(",")
+    )
+    ALERT_MAPE_MAX = float(os.getenv("ALERT_MAPE_MAX", "0.5"))
+    ALERT_R2_MIN = float(os.getenv("ALERT_R2_MIN", "0.0"))
+
+    SUGGESTION_INDEX_SIZE = int(os.getenv("SUGGESTION_INDEX_SIZE", "100000"))
+    FEEDBACK_BATCH_MAX_EVENTS = int(os.getenv("FEEDBACK_BATCH_MAX_EVENTS", "1000"))
+
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+    PROFILE_MAX_SAMPLE_SECONDS = float(os.getenv("PROFILE_MAX_SAMPLE_SECONDS", "60"))
+
+    ASYNC_DB_POOL_MIN = int(os.getenv("ASYNC_DB_POOL_MIN", "1"))
+    ASYNC_DB_POOL_MAX = int(os.getenv("ASYNC_DB_POOL_MAX", "20"))
+    PREDICT_WORKERS = int(os.getenv("PREDICT_WORKERS", "4"))
+
+    INPUT_CACHE_SIZE = int(os.getenv("INPUT_CACHE_SIZE", "50000"))
+    FEATURE_CACHE_TTL_SEC = float(os.getenv("FEATURE_CACHE_TTL_SEC", "300"))
+    RULES_CACHE_TTL_SEC = float(os.getenv("RULES_CACHE_TTL_SEC", "600"))
+    ELASTICITY_CACHE_TTL_SEC = float(os.getenv("ELASTICITY_CACHE_TTL_SEC", "3600"))
+    INPUT_PREFETCH_CHUNK = int(os.getenv("INPUT_PREFETCH_CHUNK", "500"))
+
+    SUGGESTION_CACHE_SIZE = int(os.getenv("SUGGESTION_CACHE_SIZE", "100000"))
+    SUGGESTION_CACHE_TTL_SEC = float(os.getenv("SUGGESTION_CACHE_TTL_SEC", "3600"))
+
+    # How long a request waits on an identical in-flight suggestion computation
+    SINGLEFLIGHT_TIMEOUT_SEC = float(os.getenv("SINGLEFLIGHT_TIMEOUT_SEC", "10"))
+
+    # Degraded mode: suggestions computed while the DB is unavailable are
+    # appended here for replay, and cached only briefly
+    SUGGESTION_SPOOL_PATH = os.getenv("SUGGESTION_SPOOL_PATH", "./spool/suggestions.jsonl")
+    DEGRADED_SUGGESTION_TTL_SEC = float(os.getenv("DEGRADED_SUGGESTION_TTL_SEC", "30"))
+
+    SERVE_PRECOMPUTED = os.getenv("SERVE_PRECOMPUTED", "0") == "1"
+    PRECOMPUTED_REFRESH_SEC = float(os.getenv("PRECOMPUTED_REFRESH_SEC", "60"))
+    PRECOMPUTED_MAX_AGE_SEC = float(os.getenv("PRECOMPUTED_MAX_AGE_SEC", "93600"))
+
+    # Pre-fork serving: warm the input caches in the master so workers share them
+    PRELOAD_INPUTS = os.getenv("PRELOAD_INPUTS", "0") == "1"
+
+    # Nightly pipeline (scripts/run_nightly_pipeline.py): SKU hash partitions,
+    # concurrent tasks, and retries per partition task
+    PIPELINE_PARTITIONS = int(os.getenv("PIPELINE_PARTITIONS", "8"))
+    PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+    PIPELINE_RETRIES = int(os.getenv("PIPELINE_RETRIES", "2"))
+    PIPELINE_RETRY_BACKOFF_SEC = float(os.getenv("PIPELINE_RETRY_BACKOFF_SEC", "5"))
+    # Price with the previous demand model instead of waiting for tonight's
+    PIPELINE_OVERLAP_DEMAND_TRAINING = os.getenv("PIPELINE_OVERLAP_DEMAND_TRAINING", "0") == "1"
+
+    # Delta repricing: batch runs copy a SKU's last suggestion forward while
+    # its inputs are unchanged and the suggestion is younger than the max age
+    BATCH_DELTA_REPRICING = os.getenv("BATCH_DELTA_REPRICING", "0") == "1"
+    BATCH_DELTA_MAX_AGE_SEC = float(os.getenv("BATCH_DELTA_MAX_AGE_SEC", "604800"))
+
+    # Distributed batch pricing (app/optimizer/batch_queue.py): partitions
+    # per batch, lease length (renewed every third of it) and claims per partition
+    BATCH_QUEUE_PARTITIONS = int(os.getenv("BATCH_QUEUE_PARTITIONS", "64"))
+    BATCH_LEASE_SEC = float(os.getenv("BATCH_LEASE_SEC", "120"))
+    BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "3"))
+    BATCH_WORKER_POLL_SEC = float(os.getenv("BATCH_WORKER_POLL_SEC", "5"))
+
+    SIMULATION_CHUNK = int(os.getenv("SIMULATION_CHUNK", "500"))
+    SIMULATION_MAX_POINTS = int(os.getenv("SIMULATION_MAX_POINTS", "101"))
+    SIMULATION_MAX_SKUS = int(os.getenv("SIMULATION_MAX_SKUS", "200000"))
@@ -1,72 +1,394 @@
+import os
+import threading
+import time
 import pymysql
-from queue import Queue, Empty
+from collections import OrderedDict
+from queue import Queue, Empty, Full
 from contextlib import contextmanager
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
 
 from .config import Config
+from .utils.circuit_breaker import CircuitBreaker
 from .utils.logging_utils import get_logger
+from .utils.metrics import DB_QUERY_ERRORS, DB_QUERY_SECONDS, registry, sql_fingerprint
 
 logger = get_logger(__name__)
 
+ConnectionFactory = Callable[[], Any]
+
+# Client-side (CR_*) errnos meaning the server did not answer: can't connect
+# (2003), server gone away (2006), lost connection, incl. socket timeouts
+# (2013), out of sync (2055). pymysql raises OperationalError for server
+# errors too (deadlock 1213, lock wait timeout 1205, no partition 1526...);
+# those are answers from a healthy server and must not trip the breaker.
+DISCONNECT_ERRNOS = frozenset({2003, 2006, 2013, 2055})
+
+def is_disconnect(exc: BaseException) -> bool:
+    """True if `exc` means the server is unreachable or timed out, not that it rejected the statement."""
+    if isinstance(exc, (pymysql.err.InterfaceError, OSError)):
+        return True
+    if isinstance(exc, pymysql.err.OperationalError):
+        return bool(exc.args) and exc.args[0] in DISCONNECT_ERRNOS
+    return False
+
+def use_serving_timeouts():
+    """Bound statements by SERVING_DB_TIMEOUT_SEC unless the environment sets its own deadlines.
+
+    Called by the API app factories; batch scripts keep the unbounded default.
+    """
+    for name in ("DB_READ_TIMEOUT_SEC", "DB_WRITE_TIMEOUT_SEC"):
+        if name not in os.environ:
+            setattr(Config, name, Config.SERVING_DB_TIMEOUT_SEC)
+
+class DatabaseUnavailable(RuntimeError):
+    """The database timed out or refused us, or the breaker is open after repeated failures."""
+
+def mysql_connection(host: Optional[str] = None, port: Optional[int] = None) -> pymysql.connections.Connection:
+    return pymysql.connect(
+        host=host or Config.DB_HOST,
+        port=port or Config.DB_PORT,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        database=Config.DB_NAME,
+        autocommit=True,
+        cursorclass=pymysql.cursors.DictCursor,
+        connect_timeout=Config.DB_CONNECT_TIMEOUT_SEC,
+        # Socket deadlines per read/write; None (the batch default) waits forever
+        read_timeout=Config.DB_READ_TIMEOUT_SEC or None,
+        write_timeout=Config.DB_WRITE_TIMEOUT_SEC or None,
+    )
+
+def replica_connection() -> pymysql.connections.Connection:
+    return mysql_connection(Config.DB_REPLICA_HOST, Config.DB_REPLICA_PORT)
+
 class ConnectionPool:
-    def __init__(self, minconn: int = 1, maxconn: int = 5):
+    def __init__(
+        self,
+        minconn: int = 1,
+        maxconn: int = 5,
+        connection_factory: Optional[ConnectionFactory] = None,
+    ):
         self.minconn = minconn
         self.maxconn = maxconn
+        self.connection_factory = connection_factory or mysql_connection
         self.pool: "Queue[pymysql.connections.Connection]" = Queue(maxconn)
-        for _ in range(minconn):
-            self.pool.put(self._create_connection())
+        self.created = 0
+        self.in_use = 0
+        self._stats_lock = threading.Lock()
+        self._warm = False
 
     def _create_connection(self) -> pymysql.connections.Connection:
-        conn = pymysql.connect(
-            host=Config.DB_HOST,
-            port=Config.DB_PORT,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD,
-            database=Config.DB_NAME,
-            autocommit=True,
-            cursorclass=pymysql.cursors.DictCursor,
-        )
+        conn = self.connection_factory()
+        with self._stats_lock:
+            self.created += 1
         return conn
 
+    def _warm_up(self):
+        # minconn connections are opened on first use rather than at import,
+        # so importing app modules never requires a reachable database
+        with self._stats_lock:
+            if self._warm:
+                return
+            self._warm = True
+        for _ in range(self.minconn):
+            try:
+                self.pool.put_nowait(self._create_connection())
+            except Full:
+                break
+
+    def set_connection_factory(self, factory: ConnectionFactory):
+        """Swap the connection source (e.g. a local stand-in DB) and drop idle connections."""
+        self.close_all()
+        self.connection_factory = factory
+        self._warm = False
+
     @contextmanager
     def get_connection(self):
+        if not self._warm:
+            self._warm_up()
         try:
             conn = self.pool.get_nowait()
         except Empty:
             conn = self._create_connection()
+        with self._stats_lock:
+            self.in_use += 1
+        broken = False
         try:
             yield conn
+        except Exception as e:
+            # A timed-out or dropped connection must not go back to the pool
+            broken = is_disconnect(e)
+            raise
         finally:
-            try:
-                self.pool.put_nowait(conn)
-            except:
-                conn.close()
+            with self._stats_lock:
+                self.in_use -= 1
+            if broken:
+                _close_quietly(conn)
+            else:
+                try:
+                    self.pool.put_nowait(conn)
+                except:
+                    conn.close()
+
+    def discard_after_fork(self):
+        """Forget connections inherited from the parent process without closing them.
+
+        Closing would send COM_QUIT on a socket the parent still uses.
+        """
+        self.pool = Queue(self.maxconn)
+        with self._stats_lock:
+            self.created = 0
+            self.in_use = 0
+        self._warm = False
 
     def close_all(self):
         while not self.pool.empty():
             conn = self.pool.get()
             conn.close()
 
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
 pool = ConnectionPool(minconn=1, maxconn=10)
 
+# Shared with app.db_async: both talk to the same server
+breaker = CircuitBreaker("db", Config.DB_BREAKER_FAILURES, Config.DB_BREAKER_RESET_SEC)
+
+def db_degraded() -> bool:
+    """True while the breaker is refusing calls, i.e. callers should use fallbacks."""
+    return breaker.is_open
+
+def set_connection_factory(factory: ConnectionFactory):
+    pool.set_connection_factory(factory)
+
+registry.gauge_callback("db_pool_idle_connections", "Idle connections in the pool", lambda: pool.pool.qsize())
+registry.gauge_callback("db_pool_in_use_connections", "Connections checked out", lambda: pool.in_use)
+registry.gauge_callback("db_pool_created_connections", "Connections opened since start", lambda: pool.created)
+
+# Read replica. fetch_all/fetch_one go to it when one is configured, it is
+# reachable and its lag is within DB_REPLICA_MAX_LAG_SEC; everything else,
+# including every execute_*, goes to the primary above.
+read_pool = ConnectionPool(minconn=1, maxconn=10, connection_factory=replica_connection)
+_replica_enabled = bool(Config.DB_REPLICA_HOST)
+
+def set_read_connection_factory(factory: Optional[ConnectionFactory]):
+    """Point reads at `factory` (e.g. a local stand-in replica); None sends them to the primary."""
+    global _replica_enabled
+    read_pool.set_connection_factory(factory or replica_connection)
+    _replica_enabled = factory is not None
+    replica_guard.reset()
+
+def replica_enabled() -> bool:
+    return _replica_enabled
+
+DB_READS = registry.counter(
+    "db_reads_total", "fetch_all/fetch_one calls by the server that answered", labelnames=("target",)
+)
+_READS_REPLICA = DB_READS.labels("replica")
+_READS_PRIMARY = DB_READS.labels("primary")
+
+# Managed replicas may not grant SHOW REPLICA STATUS to the app user; lag is
+# then unknown and reads stay on the primary (a warning says why)
+REPLICA_LAG_SQL = "SHOW REPLICA STATUS"
+
+class ReplicaGuard:
+    """Decides whether the replica may serve a read.
+
+    Lag is measured at most every `check_interval` seconds, by whichever
+    reader finds it due (no background thread, so this survives fork).
+    Unknown lag (replication stopped, replica unreachable) counts as too much.
+
+    Read-your-writes: `note_write(scope)` records a write; reads under
+    `primary_reads(scope)` within `max_lag` seconds of it go to the primary.
+    Older writes are on the replica, since it only serves reads while its
+    lag is under `max_lag`. Recorded per process.
+    """
+
+    def __init__(
+        self,
+        max_lag: float,
+        check_interval: float,
+        measure: Callable[[], Optional[float]],
+        max_scopes: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.max_scopes = max_scopes
+        self._measure = measure
+        self._clock = clock
+        self._check_lock = threading.Lock()
+        self._writes_lock = threading.Lock()
+        self._recent_writes: "OrderedDict[Hashable, float]" = OrderedDict()
+        self.reset()
+
+    def reset(self):
+        self.lag: Optional[float] = None
+        self._checked_at = float("-inf")
+        with self._writes_lock:
+            self._recent_writes.clear()
+
+    def replica_ok(self) -> bool:
+        if self._clock() - self._checked_at >= self.check_interval and self._check_lock.acquire(blocking=False):
+            try:
+                self._checked_at = self._clock()
+                self.lag = self._measure()
+            finally:
+                self._check_lock.release()
+        return self.lag is not None and self.lag <= self.max_lag
+
+    def mark_unhealthy(self):
+        """The replica failed a read: use the primary until the next lag check."""
+        self.lag = None
+        self._checked_at = self._clock()
+
+    def note_write(self, scope: Hashable):
+        with self._writes_lock:
+            self._recent_writes[scope] = self._clock()
+            self._recent_writes.move_to_end(scope)
+            while len(self._recent_writes) > self.max_scopes:
+                self._recent_writes.popitem(last=False)
+
+    def recently_written(self, scope: Hashable) -> bool:
+        written_at = self._recent_writes.get(scope)
+        return written_at is not None and self._clock() - written_at < self.max_lag
+
+def _measure_replica_lag() -> Optional[float]:
+    try:
+        with _observe(REPLICA_LAG_SQL), read_pool.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(REPLICA_LAG_SQL)
+                row = cur.fetchone()
+    except Exception as e:
+        logger.warning("Replica lag check failed, reading from the primary: %s", e)
+        return None
+    if not row:
+        return 0.0  # not replicating: the read endpoint is a primary or a proxy to one
+    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+    return None if lag is None else float(lag)
+
+replica_guard = ReplicaGuard(Config.DB_REPLICA_MAX_LAG_SEC, Config.DB_REPLICA_LAG_CHECK_SEC, _measure_replica_lag)
+
+registry.gauge_callback(
+    "db_replica_lag_seconds",
+    "Last measured replica lag; -1 when unknown or no replica",
+    lambda: replica_guard.lag if replica_guard.lag is not None else -1,
+)
+registry.gauge_callback(
+    "db_read_pool_in_use_connections", "Replica connections checked out", lambda: read_pool.in_use
+)
+
+_pinned = threading.local()
+
+@contextmanager
+def primary_reads(scope: Optional[Hashable] = None):
+    """Send fetch_all/fetch_one in this block (this thread) to the primary.
+
+    With `scope`, only if this process wrote to it recently (see note_write),
+    i.e. read-your-writes without giving up the replica for older data.
+    """
+    pin = scope is None or replica_guard.recently_written(scope)
+    if pin:
+        _pinned.depth = getattr(_pinned, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        if pin:
+            _pinned.depth -= 1
+
+def note_write(scope: Hashable):
+    """Record a write to `scope` for primary_reads(scope)."""
+    replica_guard.note_write(scope)
+
+@contextmanager
+def _observe(sql: str):
+    fingerprint = sql_fingerprint(sql)
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        DB_QUERY_ERRORS.labels(fingerprint).inc()
+        raise
+    finally:
+        DB_QUERY_SECONDS.labels(fingerprint).observe(time.perf_counter() - t0)
+
+@contextmanager
+def _guarded(sql: str):
+    """_observe plus the breaker: fail fast while open, count disconnects and timeouts."""
+    if not breaker.allow():
+        raise DatabaseUnavailable("Database circuit breaker is open")
+    try:
+        with _observe(sql):
+            yield
+    except BaseException as e:
+        if is_disconnect(e):
+            breaker.record_failure()
+            raise DatabaseUnavailable(str(e)) from e
+        # The server answered; a bad statement or a deadlock says nothing about its health
+        breaker.record_success()
+        raise
+    breaker.record_success()
+
 def execute_query(
     sql: str,
     params: Optional[Tuple[Any, ...]] = None,
     fetch: str = "none",
 ) -> Optional[List[Dict[str, Any]]]:
-    logger.debug(f"Executing SQL: {sql} | params={params}")
-    with pool.get_connection() as conn:
+    logger.debug("Executing SQL: %s | params=%s", sql, params)
+    with _guarded(sql), pool.get_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(sql, params or ())
             if fetch == "one":
                 return cur.fetchone()
             elif fetch == "all":
                 return cur.fetchall()
+            elif fetch == "rowcount":
+                return cur.rowcount
     return None
 
+def execute_insert(sql: str, params: Optional[Tuple[Any, ...]] = None) -> int:
+    """Run an INSERT and return the id it generated on the same connection."""
+    logger.debug("Executing SQL: %s | params=%s", sql, params)
+    with _guarded(sql), pool.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params or ())
+            return int(cur.lastrowid or 0)
+
+def execute_many(sql: str, seq_params: Sequence[Tuple[Any, ...]]) -> int:
+    if not seq_params:
+        return 0
+    logger.debug("Executing SQL batch: %s | rows=%d", sql, len(seq_params))
+    with _guarded(sql), pool.get_connection() as conn:
+        with conn.cursor() as cur:
+            return cur.executemany(sql, seq_params) or 0
+
+def _read(sql: str, params: Optional[Tuple[Any, ...]], fetch: str):
+    if not _replica_enabled or getattr(_pinned, "depth", 0) or not replica_guard.replica_ok():
+        _READS_PRIMARY.inc()
+        return execute_query(sql, params, fetch=fetch)
+    logger.debug("Executing SQL on replica: %s | params=%s", sql, params)
+    try:
+        # Not _guarded: the breaker tracks the primary, which is our fallback
+        with _observe(sql), read_pool.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params or ())
+                result = cur.fetchone() if fetch == "one" else cur.fetchall()
+    except Exception as e:
+        if not is_disconnect(e):
+            raise
+        logger.warning("Replica read failed, retrying on the primary: %s", e)
+        replica_guard.mark_unhealthy()
+        _READS_PRIMARY.inc()
+        return execute_query(sql, params, fetch=fetch)
+    _READS_REPLICA.inc()
+    return result
+
 def fetch_one(sql: str, params: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
-    return execute_query(sql, params, fetch="one")
+    return _read(sql, params, "one")
 
 def fetch_all(sql: str, params: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
-    result = execute_query(sql, params, fetch="all")
+    result = _read(sql, params, "all")
     return result or []
@@ -0,0 +1,123 @@
+"""Async counterpart of app.db for the ASGI app, backed by an aiomysql pool.
+
+aiomysql is only needed when serving through app.asgi; it is imported when
+the pool is first used. Statements share app.db's circuit breaker and are
+bounded by DB_READ_TIMEOUT_SEC.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .config import Config
+from .db import _guarded, is_disconnect
+from .utils.logging_utils import get_logger
+from .utils.metrics import registry
+
+logger = get_logger(__name__)
+
+PoolFactory = Callable[[], Awaitable[Any]]
+
+async def mysql_pool():
+    import aiomysql
+
+    return await aiomysql.create_pool(
+        host=Config.DB_HOST,
+        port=Config.DB_PORT,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        db=Config.DB_NAME,
+        autocommit=True,
+        cursorclass=aiomysql.DictCursor,
+        connect_timeout=Config.DB_CONNECT_TIMEOUT_SEC,
+        minsize=Config.ASYNC_DB_POOL_MIN,
+        maxsize=Config.ASYNC_DB_POOL_MAX,
+    )
+
+class AsyncConnectionPool:
+    def __init__(self, pool_factory: Optional[PoolFactory] = None):
+        self.pool_factory = pool_factory or mysql_pool
+        self._pool = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _get_pool(self):
+        if self._pool is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._pool is None:
+                    self._pool = await self.pool_factory()
+        return self._pool
+
+    @asynccontextmanager
+    async def get_connection(self):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            try:
+                yield conn
+            except BaseException as e:
+                # Cancelled by a deadline mid-statement, or dropped: never hand it out again
+                if isinstance(e, asyncio.CancelledError) or is_disconnect(e):
+                    conn.close()
+                raise
+
+    def set_pool_factory(self, factory: PoolFactory):
+        """Swap the pool source; call close() first if a pool is open."""
+        self.pool_factory = factory
+        self._pool = None
+        self._lock = None
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+        self._lock = None
+
+    def in_use(self) -> int:
+        if self._pool is None:
+            return 0
+        return self._pool.size - self._pool.freesize
+
+pool = AsyncConnectionPool()
+
+registry.gauge_callback("async_db_pool_in_use_connections", "Async connections checked out", pool.in_use)
+
+async def _with_deadline(coro):
+    """Bound a statement by DB_READ_TIMEOUT_SEC; aiomysql has no socket read timeout."""
+    if Config.DB_READ_TIMEOUT_SEC > 0:
+        return await asyncio.wait_for(coro, Config.DB_READ_TIMEOUT_SEC)
+    return await coro
+
+async def _run(sql: str, params: Optional[Tuple[Any, ...]], fetch: str):
+    async with pool.get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params or ())
+            if fetch == "one":
+                return await cur.fetchone()
+            elif fetch == "all":
+                return await cur.fetchall()
+            elif fetch == "lastrowid":
+                return int(cur.lastrowid or 0)
+    return None
+
+async def execute_query(
+    sql: str,
+    params: Optional[Tuple[Any, ...]] = None,
+    fetch: str = "none",
+) -> Optional[List[Dict[str, Any]]]:
+    logger.debug("Executing SQL: %s | params=%s", sql, params)
+    with _guarded(sql):
+        return await _with_deadline(_run(sql, params, fetch))
+
+async def execute_insert(sql: str, params: Optional[Tuple[Any, ...]] = None) -> int:
+    """Run an INSERT and return the id it generated on the same connection."""
+    logger.debug("Executing SQL: %s | params=%s", sql, params)
+    with _guarded(sql):
+        return await _with_deadline(_run(sql, params, "lastrowid"))
+
+async def fetch_one(sql: str, params: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
+    return await execute_query(sql, params, fetch="one")
+
+async def fetch_all(sql: str, params: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
+    result = await execute_query(sql, params, fetch="all")
+    return list(result or [])
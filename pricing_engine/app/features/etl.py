@@ -1,162 +1,236 @@
 from datetime import date, timedelta
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 from app.db import fetch_all
 from app.features.store import insert_features
+from app.pipeline.partitions import Partition, partition_filter
 from app.utils.logging_utils import get_logger
+from app.utils.memory_utils import StageProfiler, stage_or_noop
 
 logger = get_logger(__name__)
 
-def _load_orders(start_date: date, end_date: date) -> pd.DataFrame:
-    sql = """
+def _load_orders(start_date: date, end_date: date, partition: Optional[Partition] = None) -> pd.DataFrame:
+    in_partition, params = partition_filter(partition)
+    sql = f"""
         SELECT DATE(order_ts) AS date, sku, vendor_id,
                price_paid, units, promo_flag
         FROM orders
-        WHERE order_ts >= %s AND order_ts < %s
+        WHERE order_ts >= %s AND order_ts < %s{in_partition}
     """
-    rows = fetch_all(sql, (start_date, end_date))
+    rows = fetch_all(sql, (start_date, end_date) + params)
     return pd.DataFrame(rows)
 
-def _load_inventory(as_of_date: date) -> pd.DataFrame:
-    sql = """
+def _load_inventory(as_of_date: date, partition: Optional[Partition] = None) -> pd.DataFrame:
+    in_partition, params = partition_filter(partition, "s.sku")
+    sql = f"""
         SELECT s.sku, s.snapshot_date AS date, s.stock_qty AS inventory,
                s.ageing_days, s.restock_eta_date
         FROM inventory_snapshots s
-        WHERE s.snapshot_date = %s
+        WHERE s.snapshot_date = %s{in_partition}
     """
-    rows = fetch_all(sql, (as_of_date,))
+    rows = fetch_all(sql, (as_of_date,) + params)
     return pd.DataFrame(rows)
 
-def _load_product_analytics(start_date: date, end_date: date) -> pd.DataFrame:
-    sql = """
+def _load_product_analytics(
+    start_date: date, end_date: date, partition: Optional[Partition] = None
+) -> pd.DataFrame:
+    in_partition, params = partition_filter(partition)
+    sql = f"""
         SELECT sku, date, views, add_to_cart, conversions, conv_rate
         FROM product_analytics
-        WHERE date >= %s AND date < %s
+        WHERE date >= %s AND date < %s{in_partition}
     """
-    rows = fetch_all(sql, (start_date, end_date))
+    rows = fetch_all(sql, (start_date, end_date) + params)
     return pd.DataFrame(rows)
 
-def run_daily_feature_etl(target_date: date | None = None):
+def _compact_orders(orders: pd.DataFrame) -> pd.DataFrame:
+    orders["sku"] = orders["sku"].astype("category")
+    orders["vendor_id"] = orders["vendor_id"].astype("category")
+    orders["date"] = pd.to_datetime(orders["date"])
+    orders["units"] = pd.to_numeric(orders["units"]).fillna(0).astype("int32")
+    orders["price_paid"] = pd.to_numeric(orders["price_paid"]).astype("float32")
+    return orders.drop(columns=["promo_flag"], errors="ignore")
+
+def _compact_inventory(inv: pd.DataFrame, skus: pd.Index) -> pd.DataFrame:
+    # Share the orders' sku categories so the merge keeps categorical keys;
+    # SKUs without sales can never match the left join and are dropped here.
+    inv["sku"] = pd.Categorical(inv["sku"], categories=skus)
+    inv["date"] = pd.to_datetime(inv["date"])
+    inv["restock_eta_date"] = pd.to_datetime(inv["restock_eta_date"])
+    inv["inventory"] = pd.to_numeric(inv["inventory"]).astype("float32")
+    inv["ageing_days"] = pd.to_numeric(inv["ageing_days"]).astype("float32")
+    return inv[inv["sku"].notna()]
+
+def _compact_product_analytics(pa: pd.DataFrame, skus: pd.Index) -> pd.DataFrame:
+    pa["sku"] = pd.Categorical(pa["sku"], categories=skus)
+    pa["date"] = pd.to_datetime(pa["date"])
+    pa["views"] = pd.to_numeric(pa["views"]).fillna(0).astype("int32")
+    pa["add_to_cart"] = pd.to_numeric(pa["add_to_cart"]).fillna(0).astype("int32")
+    pa["conv_rate"] = pd.to_numeric(pa["conv_rate"]).astype("float32")
+    pa = pa.drop(columns=["conversions"], errors="ignore")
+    return pa[pa["sku"].notna()]
+
+def run_daily_feature_etl(
+    target_date: date | None = None,
+    profiler: Optional[StageProfiler] = None,
+    partition: Optional[Partition] = None,
+) -> int:
+    """Build and upsert target_date's feature rows; returns how many.
+
+    With `partition`, only SKUs in that hash range are read and written.
+    """
     if target_date is None:
         target_date = date.today()
 
-    logger.info(f"Running feature ETL for date={target_date}")
+    logger.info("Running feature ETL for date=%s partition=%s", target_date, partition or "all")
     start_30d = target_date - timedelta(days=30)
     start_7d = target_date - timedelta(days=7)
     end_next = target_date + timedelta(days=1)
+    target_ts = pd.Timestamp(target_date)
+
+    with stage_or_noop(profiler, "load_orders"):
+        orders = _load_orders(start_30d, end_next, partition)
+        if orders.empty:
+            logger.warning("No orders data for ETL")
+            return 0
+        orders = _compact_orders(orders)
+    skus = orders["sku"].cat.categories
+
+    with stage_or_noop(profiler, "load_inventory"):
+        inv = _load_inventory(target_date, partition)
+        if inv.empty:
+            logger.warning("No inventory data for ETL")
+            inv = pd.DataFrame(
+                columns=["sku", "date", "inventory", "ageing_days", "restock_eta_date"]
+            )
+        inv = _compact_inventory(inv, skus)
 
-    orders = _load_orders(start_30d, end_next)
-    inv = _load_inventory(target_date)
-    pa = _load_product_analytics(start_30d, end_next)
-
-    if orders.empty:
-        logger.warning("No orders data for ETL")
-    if inv.empty:
-        logger.warning("No inventory data for ETL")
+    with stage_or_noop(profiler, "load_product_analytics"):
+        pa = _load_product_analytics(start_30d, end_next, partition)
+        if not pa.empty:
+            pa = _compact_product_analytics(pa, skus)
 
     # Aggregate sales
-    sales_daily = (
-        orders.groupby(["sku", "vendor_id", "date"])
-        .agg(units=("units", "sum"), price=("price_paid", "mean"))
-        .reset_index()
-    )
-
-    # Rolling windows for each sku+vendor
-    sales_daily = sales_daily.sort_values(["sku", "vendor_id", "date"])
-    sales_daily["avg_daily_sales_7d"] = (
-        sales_daily.groupby(["sku", "vendor_id"])["units"]
-        .rolling(window=7, min_periods=1)
-        .mean()
-        .reset_index(level=[0, 1], drop=True)
-    )
-    sales_daily["avg_daily_sales_30d"] = (
-        sales_daily.groupby(["sku", "vendor_id"])["units"]
-        .rolling(window=30, min_periods=1)
-        .mean()
-        .reset_index(level=[0, 1], drop=True)
-    )
-
-    # Filter to target_date
-    sales_td = sales_daily[sales_daily["date"] == target_date].copy()
-
-    # Product analytics rolling (simplified: just sum last 7/30 days)
-    if not pa.empty:
-        pa_7 = (
-            pa[pa["date"] >= start_7d]
-            .groupby("sku")
-            .agg(
-                views_7d=("views", "sum"),
-                add_to_cart_7d=("add_to_cart", "sum"),
-                conv_rate_7d=("conv_rate", "mean"),
-            )
+    with stage_or_noop(profiler, "aggregate_sales"):
+        sales_daily = (
+            orders.groupby(["sku", "vendor_id", "date"], observed=True)
+            .agg(units=("units", "sum"), price=("price_paid", "mean"))
             .reset_index()
         )
-        pa_30 = (
-            pa[pa["date"] >= start_30d]
-            .groupby("sku")
-            .agg(views_30d=("views", "sum"))
-            .reset_index()
+        del orders
+
+        # Rolling windows for each sku+vendor
+        sales_daily = sales_daily.sort_values(["sku", "vendor_id", "date"])
+        by_key = sales_daily.groupby(["sku", "vendor_id"], observed=True)["units"]
+        sales_daily["avg_daily_sales_7d"] = (
+            by_key.rolling(window=7, min_periods=1)
+            .mean()
+            .reset_index(level=[0, 1], drop=True)
+            .astype("float32")
         )
-        pa_merged = pa_7.merge(pa_30, on="sku", how="left")
-    else:
-        pa_merged = pd.DataFrame(columns=["sku", "views_7d", "add_to_cart_7d", "conv_rate_7d", "views_30d"])
-
-    # Merge with inventory
-    df = sales_td.merge(inv, on=["sku", "date"], how="left")
-    df = df.merge(pa_merged, on="sku", how="left")
-
-    # Simple placeholders
-    df["promo_flag"] = 0  # could be enriched from promotions_calendar
-    df["restock_eta_days"] = (df["restock_eta_date"] - df["date"]).dt.days.fillna(0)
-    df["cost_price"] = df["price"] * 0.7  # placeholder cost assumption
-    df["base_price"] = df["price"]
-    df["last_price"] = df["price"]
-    df["current_price"] = df["price"]
-
-    df["views_7d"] = df["views_7d"].fillna(0)
-    df["views_30d"] = df["views_30d"].fillna(0)
-    df["add_to_cart_7d"] = df["add_to_cart_7d"].fillna(0)
-    df["conv_rate_7d"] = df["conv_rate_7d"].fillna(0)
-    df["inventory"] = df["inventory"].fillna(0)
-    df["ageing_days"] = df["ageing_days"].fillna(0)
-    df["restock_eta_days"] = df["restock_eta_days"].fillna(0)
-
-    df["other_features_json"] = None
-
-    # Rename units columns
-    df.rename(
-        columns={
-            "units": "avg_daily_sales_7d",  # note: ETL could be more nuanced, but keep aligned
-        },
-        inplace=True,
-    )
-
-    # Ensure required columns exist
-    required_cols = [
-        "sku",
-        "date",
-        "vendor_id",
-        "avg_daily_sales_7d",
-        "avg_daily_sales_30d",
-        "last_price",
-        "current_price",
-        "inventory",
-        "views_7d",
-        "views_30d",
-        "add_to_cart_7d",
-        "conv_rate_7d",
-        "promo_flag",
-        "ageing_days",
-        "restock_eta_days",
-        "cost_price",
-        "base_price",
-        "other_features_json",
-    ]
-    for c in required_cols:
-        if c not in df.columns:
-            df[c] = 0
-
-    features = df[required_cols].copy()
-    insert_features(features)
+        sales_daily["avg_daily_sales_30d"] = (
+            by_key.rolling(window=30, min_periods=1)
+            .mean()
+            .reset_index(level=[0, 1], drop=True)
+            .astype("float32")
+        )
+        del by_key
+
+        # Filter to target_date
+        sales_td = sales_daily[sales_daily["date"] == target_ts].drop(columns=["units"])
+        del sales_daily
+
+    # Product analytics rolling (simplified: just sum last 7/30 days)
+    with stage_or_noop(profiler, "aggregate_product_analytics"):
+        if not pa.empty:
+            pa_7 = (
+                pa[pa["date"] >= pd.Timestamp(start_7d)]
+                .groupby("sku", observed=True)
+                .agg(
+                    views_7d=("views", "sum"),
+                    add_to_cart_7d=("add_to_cart", "sum"),
+                    conv_rate_7d=("conv_rate", "mean"),
+                )
+                .reset_index()
+            )
+            pa_30 = (
+                pa[pa["date"] >= pd.Timestamp(start_30d)]
+                .groupby("sku", observed=True)
+                .agg(views_30d=("views", "sum"))
+                .reset_index()
+            )
+            pa_merged = pa_7.merge(pa_30, on="sku", how="left")
+            del pa_7, pa_30
+        else:
+            pa_merged = pd.DataFrame(
+                {
+                    "sku": pd.Categorical([], categories=skus),
+                    "views_7d": pd.Series(dtype="int64"),
+                    "add_to_cart_7d": pd.Series(dtype="int64"),
+                    "conv_rate_7d": pd.Series(dtype="float32"),
+                    "views_30d": pd.Series(dtype="int64"),
+                }
+            )
+        del pa
+
+    with stage_or_noop(profiler, "build_features"):
+        # Merge with inventory
+        df = sales_td.merge(inv, on=["sku", "date"], how="left")
+        del sales_td, inv
+        df = df.merge(pa_merged, on="sku", how="left")
+        del pa_merged
+
+        # Simple placeholders
+        df["promo_flag"] = np.int8(0)  # could be enriched from promotions_calendar
+        df["restock_eta_days"] = (df["restock_eta_date"] - df["date"]).dt.days
+        df["cost_price"] = df["price"] * np.float32(0.7)  # placeholder cost assumption
+        df["base_price"] = df["price"]
+        df["last_price"] = df["price"]
+        df["current_price"] = df["price"]
+
+        df["views_7d"] = df["views_7d"].fillna(0).astype("int32")
+        df["views_30d"] = df["views_30d"].fillna(0).astype("int32")
+        df["add_to_cart_7d"] = df["add_to_cart_7d"].fillna(0).astype("int32")
+        df["conv_rate_7d"] = df["conv_rate_7d"].fillna(0).astype("float32")
+        df["inventory"] = df["inventory"].fillna(0).astype("float32")
+        df["ageing_days"] = df["ageing_days"].fillna(0).astype("float32")
+        df["restock_eta_days"] = df["restock_eta_days"].fillna(0).astype("int32")
+
+        df["other_features_json"] = None
+        df["date"] = target_date
+
+        # Ensure required columns exist
+        required_cols = [
+            "sku",
+            "date",
+            "vendor_id",
+            "avg_daily_sales_7d",
+            "avg_daily_sales_30d",
+            "last_price",
+            "current_price",
+            "inventory",
+            "views_7d",
+            "views_30d",
+            "add_to_cart_7d",
+            "conv_rate_7d",
+            "promo_flag",
+            "ageing_days",
+            "restock_eta_days",
+            "cost_price",
+            "base_price",
+            "other_features_json",
+        ]
+        for c in required_cols:
+            if c not in df.columns:
+                df[c] = 0
+
+        features = df[required_cols]
+        del df
+
+    with stage_or_noop(profiler, "insert_features"):
+        insert_features(features)
     logger.info(f"Inserted {len(features)} feature rows for {target_date}")
+    return len(features)
@@ -7,15 +7,16 @@ from app.utils.logging_utils import get_logger
 
 logger = get_logger(__name__)
 
+LATEST_FEATURES_SQL = """
+    SELECT *
+    FROM sku_features_daily
+    WHERE sku = %s AND vendor_id = %s
+    ORDER BY date DESC
+    LIMIT 1
+"""
+
 def get_latest_features_for_sku(sku: str, vendor_id: str) -> Optional[Dict[str, Any]]:
-    sql = """
-        SELECT *
-        FROM sku_features_daily
-        WHERE sku = %s AND vendor_id = %s
-        ORDER BY date DESC
-        LIMIT 1
-    """
-    rows = fetch_all(sql, (sku, vendor_id))
+    rows = fetch_all(LATEST_FEATURES_SQL, (sku, vendor_id))
     if not rows:
         return None
     return rows[0]
@@ -51,7 +52,9 @@ def insert_features(df: pd.DataFrame):
             base_price = VALUES(base_price),
             other_features_json = VALUES(other_features_json)
     """
-    for _, row in df.iterrows():
+    # to_dict boxes compact numpy dtypes (int32/float32/category) as native
+    # Python values the driver can escape, without iterrows' per-row Series
+    for row in df.to_dict("records"):
         execute_query(
             sql,
             (
@@ -0,0 +1,129 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.db import execute_query, execute_many, fetch_one, note_write, primary_reads
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+GLOBAL_KEY = "_global_"
+
+# action -> counter column
+_ACTION_COLUMNS = {
+    "accept": "accept_cnt",
+    "reject": "reject_cnt",
+    "custom_price": "custom_cnt",
+}
+
+def feedback_date(timestamp: Any) -> Optional[date]:
+    """The calendar date of a feedback timestamp, None if it does not parse.
+
+    Matches DATE(timestamp) in rebuild_feedback_counters: the date as written,
+    in the timestamp's own offset.
+    """
+    if isinstance(timestamp, datetime):
+        return timestamp.date()
+    if isinstance(timestamp, date):
+        return timestamp
+    try:
+        return datetime.fromisoformat(str(timestamp).replace("Z", "+00:00")).date()
+    except ValueError:
+        return None
+
+def _feedback_day(timestamp: Any) -> str:
+    day = feedback_date(timestamp)
+    if day is None:
+        # validate_feedback rejects these; counting one under some other day would skew it
+        raise ValueError(f"Unparsable feedback timestamp: {timestamp!r}")
+    return day.isoformat()
+
+def increment_feedback_counters(payloads: List[Dict[str, Any]]):
+    """Add a batch of feedback events to the global, vendor and day counters."""
+    deltas: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(
+        lambda: {c: 0 for c in _ACTION_COLUMNS.values()}
+    )
+    for p in payloads:
+        col = _ACTION_COLUMNS[p["action"]]
+        deltas[("global", GLOBAL_KEY)][col] += 1
+        deltas[("vendor", str(p["vendor_id"]))][col] += 1
+        deltas[("day", _feedback_day(p["timestamp"]))][col] += 1
+
+    sql = """
+        INSERT INTO feedback_counters
+            (scope, scope_key, accept_cnt, reject_cnt, custom_cnt, updated_at)
+        VALUES (%s, %s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+            accept_cnt = accept_cnt + VALUES(accept_cnt),
+            reject_cnt = reject_cnt + VALUES(reject_cnt),
+            custom_cnt = custom_cnt + VALUES(custom_cnt),
+            updated_at = NOW()
+    """
+    execute_many(
+        sql,
+        [
+            (scope, key, d["accept_cnt"], d["reject_cnt"], d["custom_cnt"])
+            for (scope, key), d in deltas.items()
+        ],
+    )
+    for scope, key in deltas:
+        note_write(("feedback_counters", scope, key))
+
+def get_feedback_counts(scope: str = "global", scope_key: str = GLOBAL_KEY) -> Optional[Dict[str, Any]]:
+    """Counts and acceptance rate for one scope, read by primary key.
+
+    Read from the primary right after this process updated the scope, so a
+    summary fetched after posting feedback includes it.
+    """
+    with primary_reads(("feedback_counters", scope, scope_key)):
+        row = fetch_one(
+            """
+            SELECT accept_cnt, reject_cnt, custom_cnt
+            FROM feedback_counters
+            WHERE scope = %s AND scope_key = %s
+            """,
+            (scope, scope_key),
+        )
+    if not row:
+        return None
+    counts = {action: int(row[col]) for action, col in _ACTION_COLUMNS.items()}
+    total = sum(counts.values())
+    return {
+        **counts,
+        "total": total,
+        "acceptance_rate": counts["accept"] / total if total else 0.0,
+    }
+
+def rebuild_feedback_counters():
+    """Recompute every counter from price_feedback (reconciliation).
+
+    Feedback written while the rebuild runs can be counted twice or missed,
+    so run it when feedback ingestion is quiet.
+    """
+    execute_query("DELETE FROM feedback_counters")
+    key_exprs = {
+        "global": "%s",
+        "vendor": "vendor_id",
+        "day": "CAST(DATE(timestamp) AS CHAR)",
+    }
+    for scope, key_expr in key_exprs.items():
+        params = (scope, GLOBAL_KEY) if scope == "global" else (scope,)
+        group_by = "" if scope == "global" else f"GROUP BY {key_expr}"
+        execute_query(
+            f"""
+            INSERT INTO feedback_counters
+                (scope, scope_key, accept_cnt, reject_cnt, custom_cnt, updated_at)
+            SELECT
+                %s,
+                {key_expr},
+                SUM(action = 'accept'),
+                SUM(action = 'reject'),
+                SUM(action = 'custom_price'),
+                NOW()
+            FROM price_feedback
+            {group_by}
+            HAVING COUNT(*) > 0
+            """,
+            params,
+        )
+    logger.info("Rebuilt feedback counters")
@@ -1,63 +1,217 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
-from app.db import execute_query, fetch_all
+from app.config import Config
+from app.db import DatabaseUnavailable, execute_query, execute_many, fetch_all, primary_reads
+from app.feedback.counters import feedback_date, get_feedback_counts, increment_feedback_counters
+from app.feedback.suggestion_index import recent_suggestions, suggestion_key
+from app.optimizer.suggestion_spool import suggestion_spool
 from app.utils.logging_utils import get_logger
 
 logger = get_logger(__name__)
 
-def save_feedback(payload: Dict[str, Any]) -> None:
+REQUIRED_FEEDBACK_FIELDS = ["vendor_id", "sku", "suggested_price", "action", "timestamp"]
+
+_ACTION_STATUS = {
+    "accept": "ACCEPTED",
+    "reject": "REJECTED",
+    "custom_price": "CUSTOM",
+}
+
+def validate_feedback(payload: Any) -> Optional[str]:
+    """Return an error message for an invalid feedback event, None if valid."""
+    if not isinstance(payload, dict):
+        return "Feedback event must be an object"
+    missing = [f for f in REQUIRED_FEEDBACK_FIELDS if f not in payload]
+    if missing:
+        return f"Missing fields: {','.join(missing)}"
+
+    if payload["action"] not in _ACTION_STATUS:
+        return "Invalid action"
+
+    if feedback_date(payload["timestamp"]) is None:
+        return "timestamp must be an ISO 8601 date-time"
+
+    if payload["action"] == "custom_price" and not payload.get("custom_price"):
+        return "custom_price required for action=custom_price"
+
+    if payload.get("suggestion_id") is not None:
+        try:
+            int(payload["suggestion_id"])
+        except (TypeError, ValueError):
+            return "suggestion_id must be an integer"
+    return None
+
+def validate_feedback_batch(data: Any) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Unpack a batch body (a list or {"events": [...]}).
+
+    Returns (events, None) when every event is valid, otherwise ([], error body).
+    """
+    events = data.get("events") if isinstance(data, dict) else data
+    if not isinstance(events, list) or not events:
+        return [], {"error": "events must be a non-empty list"}
+    if len(events) > Config.FEEDBACK_BATCH_MAX_EVENTS:
+        return [], {"error": f"At most {Config.FEEDBACK_BATCH_MAX_EVENTS} events per batch"}
+
+    errors = []
+    for i, event in enumerate(events):
+        error = validate_feedback(event)
+        if error:
+            errors.append({"index": i, "error": error})
+    if errors:
+        return [], {"error": "Invalid feedback events", "details": errors}
+    return events, None
+
+def resolve_suggestion_ids(payloads: List[Dict[str, Any]]) -> List[Optional[int]]:
+    """Find the suggestion each feedback event refers to.
+
+    An explicit `suggestion_id` is used if it belongs to the event's sku and
+    vendor (otherwise the event is left unresolved); other events go to the
+    in-process index of recently persisted suggestions. Explicit ids and
+    whatever the index does not have are checked and resolved with a single
+    lookup on price_suggestions.
+    """
+    ids: List[Optional[int]] = []
+    unresolved = {}
+    explicit: Dict[int, int] = {}
+    for i, p in enumerate(payloads):
+        sid = p.get("suggestion_id")
+        if sid is not None:
+            explicit[i] = int(sid)
+            ids.append(None)
+            continue
+        sid = recent_suggestions.lookup(p["sku"], p["vendor_id"], p["suggested_price"])
+        if sid is None:
+            unresolved.setdefault(
+                suggestion_key(p["sku"], p["vendor_id"], p["suggested_price"]), []
+            ).append(i)
+        ids.append(int(sid) if sid is not None else None)
+
+    if not unresolved and not explicit:
+        return ids
+    parts, params = [], []
+    if unresolved:
+        placeholders = ", ".join(["(%s, %s, %s)"] * len(unresolved))
+        parts.append(f"""
+            SELECT 'key' AS matched_by, sku, vendor_id, suggested_price, MAX(id) AS id
+            FROM price_suggestions
+            WHERE (sku, vendor_id, suggested_price) IN ({placeholders})
+            GROUP BY sku, vendor_id, suggested_price
+        """)
+        params.extend(v for key in unresolved for v in key)
+    if explicit:
+        in_list = ", ".join(["%s"] * len(explicit))
+        parts.append(f"""
+            SELECT 'id' AS matched_by, sku, vendor_id, suggested_price, id
+            FROM price_suggestions
+            WHERE id IN ({in_list})
+        """)
+        params.extend(sorted(set(explicit.values())))
+    # Feedback often follows its suggestion by less than the replica lag
+    with primary_reads():
+        rows = fetch_all(" UNION ALL ".join(parts), tuple(params))
+
+    owners = {}
+    for r in rows:
+        if r["matched_by"] == "id":
+            owners[int(r["id"])] = (r["sku"], r["vendor_id"])
+            continue
+        key = suggestion_key(r["sku"], r["vendor_id"], r["suggested_price"])
+        for i in unresolved.get(key, []):
+            ids[i] = int(r["id"])
+    mismatched = 0
+    for i, sid in explicit.items():
+        if owners.get(sid) == (payloads[i]["sku"], payloads[i]["vendor_id"]):
+            ids[i] = sid
+        else:
+            mismatched += 1
+    if mismatched:
+        logger.warning("%d feedback events named a suggestion_id of another sku/vendor; ignored", mismatched)
+    return ids
+
+def save_feedback_batch(payloads: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Insert feedback events and update suggestion statuses in bulk.
+
+    Raises DatabaseUnavailable only if no event was inserted.
+    """
+    if not payloads:
+        return {"saved": 0, "resolved": 0}
+
+    suggestion_ids = resolve_suggestion_ids(payloads)
+
     sql = """
         INSERT INTO price_feedback
             (vendor_id, sku, suggested_price, action,
              custom_price, timestamp, suggestion_id)
-        VALUES (%s, %s, %s, %s, %s, %s,
-                (SELECT id FROM price_suggestions
-                 WHERE sku = %s AND vendor_id = %s AND suggested_price = %s
-                 ORDER BY created_at DESC LIMIT 1))
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
     """
-    execute_query(
+    execute_many(
         sql,
-        (
-            payload["vendor_id"],
-            payload["sku"],
-            payload["suggested_price"],
-            payload["action"],
-            payload.get("custom_price"),
-            payload["timestamp"],
-            payload["sku"],
-            payload["vendor_id"],
-            payload["suggested_price"],
-        ),
+        [
+            (
+                p["vendor_id"],
+                p["sku"],
+                p["suggested_price"],
+                p["action"],
+                p.get("custom_price"),
+                p["timestamp"],
+                sid,
+            )
+            for p, sid in zip(payloads, suggestion_ids)
+        ],
     )
 
-    # Update suggestion status
-    status = "PENDING"
-    if payload["action"] == "accept":
-        status = "ACCEPTED"
-    elif payload["action"] == "reject":
-        status = "REJECTED"
-    elif payload["action"] == "custom_price":
-        status = "CUSTOM"
-
-    sql_status = """
-        UPDATE price_suggestions
-        SET status = %s
-        WHERE sku = %s AND vendor_id = %s
-        ORDER BY created_at DESC
-        LIMIT 1
-    """
-    execute_query(
-        sql_status,
-        (status, payload["sku"], payload["vendor_id"]),
-    )
+    # Update suggestion status; the last event for a suggestion wins
+    statuses: Dict[int, str] = {}
+    for p, sid in zip(payloads, suggestion_ids):
+        if sid is not None:
+            statuses[sid] = _ACTION_STATUS[p["action"]]
+    if statuses:
+        cases = " ".join(["WHEN %s THEN %s"] * len(statuses))
+        in_list = ", ".join(["%s"] * len(statuses))
+        sql_status = f"""
+            UPDATE price_suggestions
+            SET status = CASE id {cases} END
+            WHERE id IN ({in_list})
+        """
+        params = tuple(v for sid, status in statuses.items() for v in (sid, status))
+        try:
+            execute_query(sql_status, params + tuple(statuses))
+        except DatabaseUnavailable:
+            # The events are saved; spooling them would insert them twice
+            logger.warning("Could not update the status of %d suggestions: database unavailable", len(statuses))
 
-def get_feedback_summary() -> Optional[Dict[str, Any]]:
-    sql = """
-        SELECT action, COUNT(*) AS cnt
-        FROM price_feedback
-        GROUP BY action
-    """
-    rows = fetch_all(sql)
-    if not rows:
-        return None
-    return {r["action"]: r["cnt"] for r in rows}
+    try:
+        increment_feedback_counters(payloads)
+    except Exception as e:
+        # Failing the request would get the inserted events retried and saved twice;
+        # scripts/rebuild_feedback_counters.py recomputes the counters from price_feedback
+        logger.warning("Could not update feedback counters for %d events: %s", len(payloads), e)
+
+    unresolved = sum(1 for sid in suggestion_ids if sid is None)
+    if unresolved:
+        logger.warning("%d feedback events did not match a suggestion", unresolved)
+    return {"saved": len(payloads), "resolved": len(payloads) - unresolved}
+
+def save_or_spool_feedback(payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """save_feedback_batch, or spool the events for replay while the database is unavailable."""
+    try:
+        return {**save_feedback_batch(payloads), "degraded": False}
+    except DatabaseUnavailable:
+        for p in payloads:
+            suggestion_spool.add_feedback(p)
+        logger.warning("Database unavailable; spooled %d feedback events", len(payloads))
+        return {"saved": 0, "resolved": 0, "spooled": len(payloads), "degraded": True}
+
+def save_feedback(payload: Dict[str, Any]) -> bool:
+    """Save one feedback event; True if it was spooled instead (degraded)."""
+    return save_or_spool_feedback([payload])["degraded"]
+
+def get_feedback_summary(
+    vendor_id: Optional[str] = None, day: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Feedback counts and acceptance rate, overall or for one vendor or day."""
+    if vendor_id is not None:
+        return get_feedback_counts("vendor", vendor_id)
+    if day is not None:
+        return get_feedback_counts("day", day)
+    return get_feedback_counts()
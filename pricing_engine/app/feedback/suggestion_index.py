@@ -0,0 +1,42 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.config import Config
+
+SuggestionKey = Tuple[str, str, float]
+
+def suggestion_key(sku: str, vendor_id: str, suggested_price: float) -> SuggestionKey:
+    return (str(sku), str(vendor_id), round(float(suggested_price), 2))
+
+class RecentSuggestionIndex:
+    """Bounded LRU of (sku, vendor_id, suggested_price) -> price_suggestions.id.
+
+    Filled as suggestions are persisted, so feedback on a suggestion this
+    process served recently resolves without touching the DB.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._ids: "OrderedDict[SuggestionKey, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, sku: str, vendor_id: str, suggested_price: float, suggestion_id: int):
+        if not suggestion_id:
+            return
+        key = suggestion_key(sku, vendor_id, suggested_price)
+        with self._lock:
+            self._ids[key] = int(suggestion_id)
+            self._ids.move_to_end(key)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def lookup(self, sku: str, vendor_id: str, suggested_price: float) -> Optional[int]:
+        key = suggestion_key(sku, vendor_id, suggested_price)
+        with self._lock:
+            return self._ids.get(key)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+recent_suggestions = RecentSuggestionIndex(Config.SUGGESTION_INDEX_SIZE)
@@ -1,19 +1,28 @@
-from typing import Tuple, Dict, Any
+from datetime import date
+from typing import TYPE_CHECKING, Tuple, Dict, Any, List, Optional
+import hashlib
 import os
+import threading
+import time
 
 import numpy as np
 import pandas as pd
 from joblib import dump, load
-from lightgbm import LGBMRegressor
-from sklearn.metrics import mean_absolute_percentage_error, mean_squared_error, r2_score
 
-from app.db import fetch_all, execute_query
+from app.db import fetch_all
+from app.models.tree_arrays import TreeArrayModel, export_tree_arrays
+from app.monitoring.metrics_sink import MetricsSink
 from app.utils.logging_utils import get_logger
+from app.utils.metrics import registry
 from app.config import Config
 
+if TYPE_CHECKING:
+    from lightgbm import LGBMRegressor
+
 logger = get_logger(__name__)
 
-_global_model: LGBMRegressor | None = None
+_global_model: "LGBMRegressor | TreeArrayModel | None" = None
+_global_model_version: str | None = None
 
 def build_training_data() -> Tuple[pd.DataFrame, pd.Series]:
     sql = """
@@ -50,7 +59,11 @@ def build_training_data() -> Tuple[pd.DataFrame, pd.Series]:
     X = df[feature_cols].astype(float).fillna(0.0)
     return X, y
 
-def train_demand_model(X: pd.DataFrame, y: pd.Series) -> Tuple[LGBMRegressor, Dict[str, float]]:
+def train_demand_model(X: pd.DataFrame, y: pd.Series) -> Tuple["LGBMRegressor", Dict[str, float]]:
+    # Training only; serving gets lightgbm through unpickling the artifact
+    from lightgbm import LGBMRegressor
+    from sklearn.metrics import mean_absolute_percentage_error, mean_squared_error, r2_score
+
     model = LGBMRegressor(
         n_estimators=200,
         learning_rate=0.05,
@@ -70,30 +83,162 @@ def train_demand_model(X: pd.DataFrame, y: pd.Series) -> Tuple[LGBMRegressor, Di
     logger.info(f"Demand model metrics: {metrics}")
     return model, metrics
 
-def save_demand_model(model: LGBMRegressor):
+def save_demand_model(model: "LGBMRegressor"):
     os.makedirs(os.path.dirname(Config.DEMAND_MODEL_PATH), exist_ok=True)
     dump(model, Config.DEMAND_MODEL_PATH)
     logger.info(f"Saved demand model to {Config.DEMAND_MODEL_PATH}")
+    export_demand_model_arrays(model)
+
+def export_demand_model_arrays(model: "LGBMRegressor"):
+    """Write the tree-array form next to the pickle, stamped with the pickle's version."""
+    export_tree_arrays(
+        model, Config.DEMAND_MODEL_ARRAYS_DIR, source_version=_artifact_version(Config.DEMAND_MODEL_PATH)
+    )
+    logger.info("Exported demand model tree arrays to %s", Config.DEMAND_MODEL_ARRAYS_DIR)
+
+def _artifact_version(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
 
-def load_demand_model() -> LGBMRegressor:
-    global _global_model
+def load_demand_model() -> "LGBMRegressor | TreeArrayModel":
+    global _global_model, _global_model_version
     if _global_model is None:
-        logger.info("Loading demand model artifact...")
-        _global_model = load(Config.DEMAND_MODEL_PATH)
+        if Config.DEMAND_MODEL_USE_ARRAYS:
+            logger.info("Mapping demand model tree arrays...")
+            model = TreeArrayModel.load(Config.DEMAND_MODEL_ARRAYS_DIR)
+            # Same version as the pickle it came from, so fingerprints agree
+            _global_model_version = model.source_version
+            _global_model = model
+        else:
+            logger.info("Loading demand model artifact...")
+            _global_model = load(Config.DEMAND_MODEL_PATH)
+            _global_model_version = _artifact_version(Config.DEMAND_MODEL_PATH)
     return _global_model
 
-def predict_demand(features_df: pd.DataFrame) -> np.ndarray:
+def unload_demand_model():
+    """Drop the loaded model so the next use loads the artifact saved since."""
+    global _global_model, _global_model_version
+    _global_model = None
+    _global_model_version = None
+
+def get_demand_model_version() -> str:
+    """Content hash of the loaded demand model artifact."""
+    load_demand_model()
+    return _global_model_version
+
+def _predict_direct(features_df: pd.DataFrame) -> np.ndarray:
     model = load_demand_model()
     preds = model.predict(features_df)
     # Ensure non-negative
     preds = np.maximum(preds, 0.0)
     return preds
 
-def log_demand_metrics_to_db(metrics: Dict[str, float]):
-    sql = """
-        INSERT INTO monitoring_metrics
-            (date, sku, vendor_id, model_type, metric_name, metric_value, created_at)
-        VALUES (CURDATE(), '_global_', '_global_', 'demand', %s, %s, NOW())
+BATCH_ROWS = registry.histogram(
+    "demand_batch_rows",
+    "Rows per micro-batched demand model predict call",
+    buckets=(21, 42, 84, 168, 336, 672, 1344, 2688, 5376),
+)
+BATCH_REQUESTS = registry.histogram(
+    "demand_batch_requests",
+    "Callers served by one micro-batched demand model predict call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+BATCH_QUEUE_WAIT_SECONDS = registry.histogram(
+    "demand_batch_queue_wait_seconds",
+    "Time a caller's rows waited before their predict call started",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05),
+)
+
+class _Slot:
+    __slots__ = ("frame", "enqueued", "done", "result", "error")
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+
+class DemandBatcher:
+    """Gathers concurrent predict_demand calls into one model call.
+
+    The first caller of a batch becomes its leader: it waits up to `window`
+    seconds (the latency budget) for other callers, or until `max_rows` rows
+    are queued, then predicts the concatenated frame and hands each caller
+    its slice. There is no background thread, so the batcher survives fork.
     """
-    for name, value in metrics.items():
-        execute_query(sql, (name, value))
+
+    def __init__(self, window: float, max_rows: int, predict=None):
+        self.window = window
+        self.max_rows = max_rows
+        self._predict = predict or _predict_direct
+        self._cond = threading.Condition()
+        self._pending: List[_Slot] = []
+        self._rows = 0
+        self._leader_waiting = False
+
+    def predict(self, features_df: pd.DataFrame) -> np.ndarray:
+        slot = _Slot(features_df)
+        with self._cond:
+            self._pending.append(slot)
+            self._rows += len(features_df)
+            leader = not self._leader_waiting
+            if leader:
+                self._leader_waiting = True
+                deadline = slot.enqueued + self.window
+                while self._rows < self.max_rows:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending, self._rows = self._pending, [], 0
+                self._leader_waiting = False
+            elif self._rows >= self.max_rows:
+                self._cond.notify()
+
+        if leader:
+            self._run(batch)
+        else:
+            slot.done.wait()
+        if slot.error is not None:
+            raise slot.error
+        return slot.result
+
+    def _run(self, batch: List[_Slot]):
+        started = time.perf_counter()
+        for s in batch:
+            BATCH_QUEUE_WAIT_SECONDS.observe(started - s.enqueued)
+        try:
+            frame = batch[0].frame if len(batch) == 1 else pd.concat([s.frame for s in batch], ignore_index=True)
+            BATCH_ROWS.observe(len(frame))
+            BATCH_REQUESTS.observe(len(batch))
+            preds = self._predict(frame)
+            offset = 0
+            for s in batch:
+                s.result = preds[offset:offset + len(s.frame)]
+                offset += len(s.frame)
+        except BaseException as e:
+            for s in batch:
+                s.error = e
+        finally:
+            for s in batch:
+                s.done.set()
+
+demand_batcher = DemandBatcher(
+    window=Config.DEMAND_BATCH_WINDOW_MS / 1000.0, max_rows=Config.DEMAND_BATCH_MAX_ROWS
+)
+
+def predict_demand(features_df: pd.DataFrame) -> np.ndarray:
+    # Request-sized frames share model calls when batching is on; bulk
+    # callers (batch job, simulation) are already big enough to go direct.
+    if Config.DEMAND_BATCH_WINDOW_MS > 0 and len(features_df) < Config.DEMAND_BATCH_MAX_ROWS:
+        return demand_batcher.predict(features_df)
+    return _predict_direct(features_df)
+
+def log_demand_metrics_to_db(metrics: Dict[str, float]):
+    with MetricsSink() as sink:
+        for name, value in metrics.items():
+            sink.add_global(date.today(), "demand", name, value)
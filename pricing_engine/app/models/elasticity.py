@@ -1,10 +1,10 @@
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, List
 
 import numpy as np
 import pandas as pd
-import statsmodels.api as sm
 
-from app.db import fetch_all, execute_query
+from app.db import fetch_all, execute_query, execute_many
+from app.pipeline.partitions import Partition, partition_filter
 from app.utils.logging_utils import get_logger
 from app.config import Config
 
@@ -29,9 +29,11 @@ def prepare_elasticity_data(sku: str, vendor_id: str) -> pd.DataFrame:
     df = pd.DataFrame(rows)
     return df
 
-def fit_elasticity_model(df: pd.DataFrame) -> Tuple[Optional[sm.regression.linear_model.RegressionResultsWrapper],
-                                                    Optional[float],
-                                                    Dict[str, Any]]:
+def fit_elasticity_model(df: pd.DataFrame) -> Tuple[Optional[Any], Optional[float], Dict[str, Any]]:
+    """OLS log-log fit; returns (statsmodels results, elasticity, metrics)."""
+    # Training only: keeps statsmodels out of API workers that read coefficients
+    import statsmodels.api as sm
+
     if df.empty:
         return None, None, {"reason": "no_data"}
 
@@ -60,6 +62,101 @@ def fit_elasticity_model(df: pd.DataFrame) -> Tuple[Optional[sm.regression.linea
     }
     return model, float(elasticity_coef), metrics
 
+def fit_elasticity_batch(df: pd.DataFrame) -> pd.DataFrame:
+    """Fit the same log-log model as `fit_elasticity_model` for many SKUs at once.
+
+    `df` holds (sku, vendor_id, price, units, promo_flag) rows for any number of
+    sku/vendor pairs. Each pair's 3x3 normal equations are built from grouped
+    sums and solved together, so there is no per-SKU statsmodels fit. Pairs
+    failing the same data checks as the single-SKU fit are left out.
+    """
+    from scipy import stats
+
+    out_cols = ["sku", "vendor_id", "elasticity", "r2", "p_value_price", "n_obs"]
+    if df.empty:
+        return pd.DataFrame(columns=out_cols)
+
+    eps = 1e-6
+    price = pd.to_numeric(df["price"]).astype(float)
+    units = pd.to_numeric(df["units"]).astype(float)
+    promo = (
+        pd.to_numeric(df["promo_flag"]).fillna(0).astype(float)
+        if "promo_flag" in df.columns
+        else pd.Series(0.0, index=df.index)
+    )
+    keep = ((price > 0) & (units > 0)).values
+    df = pd.DataFrame(
+        {
+            "sku": df["sku"].values[keep],
+            "vendor_id": df["vendor_id"].values[keep],
+            "price": price.values[keep],
+            "x1": np.log(price.values[keep] + eps),
+            "x2": promo.values[keep],
+            "y": np.log(units.values[keep] + eps),
+        }
+    )
+    if df.empty:
+        return pd.DataFrame(columns=out_cols)
+
+    grouped = df.groupby(["sku", "vendor_id"], sort=False)
+    checks = grouped["price"].agg(n_obs="size", n_prices="nunique")
+    eligible = checks[(checks["n_obs"] >= 10) & (checks["n_prices"] >= 3)]
+    if eligible.empty:
+        return pd.DataFrame(columns=out_cols)
+
+    df = df.set_index(["sku", "vendor_id"]).loc[eligible.index].reset_index()
+    grouped = df.groupby(["sku", "vendor_id"], sort=False)
+    code = grouped.ngroup().values
+    keys = grouped.size().index
+    n_groups = len(keys)
+
+    x1, x2, y = df["x1"].values, df["x2"].values, df["y"].values
+
+    def gsum(v):
+        return np.bincount(code, weights=v, minlength=n_groups)
+
+    n = np.bincount(code, minlength=n_groups).astype(float)
+    s1, s2, sy = gsum(x1), gsum(x2), gsum(y)
+    s11, s22, s12 = gsum(x1 * x1), gsum(x2 * x2), gsum(x1 * x2)
+    s1y, s2y, syy = gsum(x1 * y), gsum(x2 * y), gsum(y * y)
+
+    xtx = np.stack(
+        [
+            np.stack([n, s1, s2], axis=-1),
+            np.stack([s1, s11, s12], axis=-1),
+            np.stack([s2, s12, s22], axis=-1),
+        ],
+        axis=1,
+    )
+    xty = np.stack([sy, s1y, s2y], axis=-1)
+
+    # pinv matches statsmodels' handling of a constant promo_flag column
+    xtx_inv = np.linalg.pinv(xtx, hermitian=True)
+    beta = np.einsum("gij,gj->gi", xtx_inv, xty)
+    rank = np.linalg.matrix_rank(xtx, hermitian=True)
+
+    sse = syy - 2 * np.einsum("gi,gi->g", beta, xty) + np.einsum("gi,gij,gj->g", beta, xtx, beta)
+    sse = np.maximum(sse, 0.0)
+    sst = syy - sy * sy / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = 1.0 - sse / sst
+        df_resid = n - rank
+        sigma2 = sse / df_resid
+        se_price = np.sqrt(sigma2 * xtx_inv[:, 1, 1])
+        t_price = beta[:, 1] / se_price
+    p_value = 2.0 * stats.t.sf(np.abs(t_price), df_resid)
+
+    return pd.DataFrame(
+        {
+            "sku": keys.get_level_values(0),
+            "vendor_id": keys.get_level_values(1),
+            "elasticity": beta[:, 1],
+            "r2": r2,
+            "p_value_price": p_value,
+            "n_obs": n.astype(int),
+        }
+    )
+
 def save_elasticity_to_db(
     sku: str,
     vendor_id: str,
@@ -89,17 +186,65 @@ def save_elasticity_to_db(
         ),
     )
 
-def get_elasticity_for_sku(sku: str, vendor_id: str) -> Tuple[float, Dict[str, Any]]:
-    row = fetch_all(
-        """
-        SELECT elasticity, r2, p_value_price, n_obs
-        FROM elasticity_coeffs
-        WHERE sku = %s AND vendor_id = %s
-        """,
-        (sku, vendor_id),
+def save_elasticities_to_db(coeffs: pd.DataFrame):
+    """Bulk upsert of `fit_elasticity_batch` output into elasticity_coeffs."""
+    if coeffs.empty:
+        return
+    sql = """
+        INSERT INTO elasticity_coeffs
+          (sku, vendor_id, elasticity, r2, p_value_price, n_obs, last_trained_at)
+        VALUES (%s, %s, %s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+          elasticity = VALUES(elasticity),
+          r2 = VALUES(r2),
+          p_value_price = VALUES(p_value_price),
+          n_obs = VALUES(n_obs),
+          last_trained_at = NOW()
+    """
+    execute_many(
+        sql,
+        [
+            (
+                r["sku"],
+                r["vendor_id"],
+                float(r["elasticity"]),
+                float(r["r2"]),
+                float(r["p_value_price"]),
+                int(r["n_obs"]),
+            )
+            for r in coeffs.to_dict("records")
+        ],
     )
-    if row:
-        r = row[0]
+
+def load_elasticity_training_data(partition: Optional[Partition] = None) -> pd.DataFrame:
+    """Daily price points of every sku/vendor (or one partition's), shaped for fit_elasticity_batch."""
+    in_partition, params = partition_filter(partition)
+    sql = f"""
+        SELECT sku, vendor_id, DATE(order_ts) AS date, price_paid AS price,
+               SUM(units) AS units, MAX(promo_flag) AS promo_flag
+        FROM orders
+        WHERE 1 = 1{in_partition}
+        GROUP BY sku, vendor_id, DATE(order_ts), price_paid
+        HAVING SUM(units) > 0
+    """
+    return pd.DataFrame(fetch_all(sql, params))
+
+def train_elasticities(partition: Optional[Partition] = None) -> int:
+    """Fit and save elasticities for all SKUs (or one partition) in one batch; returns models saved."""
+    coeffs = fit_elasticity_batch(load_elasticity_training_data(partition))
+    save_elasticities_to_db(coeffs)
+    logger.info("Trained %d elasticity models for partition=%s", len(coeffs), partition or "all")
+    return len(coeffs)
+
+ELASTICITY_SQL = """
+    SELECT elasticity, r2, p_value_price, n_obs
+    FROM elasticity_coeffs
+    WHERE sku = %s AND vendor_id = %s
+"""
+
+def elasticity_from_rows(sku: str, vendor_id: str, rows: List[Dict[str, Any]]) -> Tuple[float, Dict[str, Any]]:
+    if rows:
+        r = rows[0]
         return float(r["elasticity"]), {
             "r2": float(r["r2"] or 0.0),
             "p_value_price": float(r["p_value_price"] or 1.0),
@@ -107,5 +252,8 @@ def get_elasticity_for_sku(sku: str, vendor_id: str) -> Tuple[float, Dict[str, A
         }
 
     # Fallback: use default global elasticity
-    logger.warning(f"No elasticity found for sku={sku}, vendor_id={vendor_id}, using default")
+    logger.warning("No elasticity found for sku=%s, vendor_id=%s, using default", sku, vendor_id)
     return Config.DEFAULT_ELASTICITY, {"r2": 0.0, "p_value_price": 1.0, "n_obs": 0}
+
+def get_elasticity_for_sku(sku: str, vendor_id: str) -> Tuple[float, Dict[str, Any]]:
+    return elasticity_from_rows(sku, vendor_id, fetch_all(ELASTICITY_SQL, (sku, vendor_id)))
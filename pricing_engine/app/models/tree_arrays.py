@@ -0,0 +1,161 @@
+"""LightGBM regression model as flat, memory-mapped tree arrays.
+
+`export_tree_arrays` walks the booster's JSON dump into one set of node and
+leaf arrays shared by all trees and writes each as an .npy file in a
+directory. `TreeArrayModel.load` maps them read-only, so pre-forked workers
+(or any processes on the host) share one copy of the model through the page
+cache instead of each unpickling its own booster.
+
+Each export goes into a fresh sibling directory and `path` is switched to
+it by atomically replacing a symlink, so files a running process has mapped
+are never rewritten underneath it.
+
+Internal nodes are numbered globally; a child index < 0 is the leaf ~index.
+Only numerical splits are supported, which is all the demand model uses.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+_ARRAYS = ("feature", "threshold", "left", "right", "default_left", "missing", "leaf_value", "roots")
+_MISSING_TYPES = {"None": 0, "Zero": 1, "NaN": 2}
+META_FILE = "meta.json"
+# Exports kept around (current included) for processes still loading an older one
+KEEP_VERSIONS = 2
+
+class _Builder:
+    def __init__(self):
+        self.nodes: Dict[str, List[Any]] = {k: [] for k in _ARRAYS[:6]}
+        self.leaf_value: List[float] = []
+
+    def add(self, node: Dict[str, Any]) -> int:
+        if "leaf_value" in node:
+            self.leaf_value.append(float(node["leaf_value"]))
+            return ~(len(self.leaf_value) - 1)
+        if node.get("decision_type", "<=") != "<=":
+            raise ValueError(f"Unsupported split {node['decision_type']!r}; only numerical splits export")
+        idx = len(self.nodes["feature"])
+        self.nodes["feature"].append(int(node["split_feature"]))
+        self.nodes["threshold"].append(float(node["threshold"]))
+        self.nodes["default_left"].append(bool(node["default_left"]))
+        self.nodes["missing"].append(_MISSING_TYPES[node["missing_type"]])
+        self.nodes["left"].append(0)
+        self.nodes["right"].append(0)
+        self.nodes["left"][idx] = self.add(node["left_child"])
+        self.nodes["right"][idx] = self.add(node["right_child"])
+        return idx
+
+def _depth(node: Dict[str, Any]) -> int:
+    if "leaf_value" in node:
+        return 0
+    return 1 + max(_depth(node["left_child"]), _depth(node["right_child"]))
+
+def export_tree_arrays(model: Any, path: str, source_version: str = ""):
+    """Write `model` (LGBMRegressor or Booster) as .npy arrays under `path`."""
+    booster = getattr(model, "booster_", model)
+    dump = booster.dump_model()
+    if dump["num_tree_per_iteration"] != 1 or dump["objective"].split()[0] != "regression":
+        raise ValueError("Only single-output regression models can be exported")
+
+    builder = _Builder()
+    roots = [builder.add(t["tree_structure"]) for t in dump["tree_info"]]
+    arrays = {
+        "feature": np.asarray(builder.nodes["feature"], dtype=np.int32),
+        "threshold": np.asarray(builder.nodes["threshold"], dtype=np.float64),
+        "left": np.asarray(builder.nodes["left"], dtype=np.int32),
+        "right": np.asarray(builder.nodes["right"], dtype=np.int32),
+        "default_left": np.asarray(builder.nodes["default_left"], dtype=np.bool_),
+        "missing": np.asarray(builder.nodes["missing"], dtype=np.int8),
+        "leaf_value": np.asarray(builder.leaf_value, dtype=np.float64),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+    meta = {
+        "feature_names": dump["feature_names"],
+        "max_depth": max(_depth(t["tree_structure"]) for t in dump["tree_info"]),
+        "num_trees": len(roots),
+        "source_version": source_version,
+    }
+
+    path = os.path.abspath(path)
+    parent, base = os.path.split(path)
+    os.makedirs(parent, exist_ok=True)
+    stamp = time.strftime("%Y%m%d%H%M%S")
+    version_dir = tempfile.mkdtemp(prefix=f"{base}.{stamp}.", dir=parent)
+    for name, arr in arrays.items():
+        np.save(os.path.join(version_dir, f"{name}.npy"), arr)
+    with open(os.path.join(version_dir, META_FILE), "w") as f:
+        json.dump(meta, f)
+    os.chmod(version_dir, 0o755)
+
+    if os.path.isdir(path) and not os.path.islink(path):
+        # An export from before versioned directories; mappings of it stay valid
+        os.rename(path, f"{path}.legacy-{stamp}")
+    link = f"{path}.link-{os.getpid()}"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version_dir), link)
+    os.replace(link, path)
+    _prune_versions(parent, base, keep=KEEP_VERSIONS)
+
+def _prune_versions(parent: str, base: str, keep: int):
+    current = os.path.realpath(os.path.join(parent, base))
+    versions = []
+    for entry in os.listdir(parent):
+        full = os.path.join(parent, entry)
+        if entry.startswith(f"{base}.") and os.path.isdir(full) and not os.path.islink(full):
+            versions.append((os.path.getmtime(full), full))
+    versions.sort()
+    old = [full for _, full in versions if full != current][: max(0, len(versions) - keep)]
+    for full in old:
+        # Unlinked files stay readable through existing mappings
+        shutil.rmtree(full, ignore_errors=True)
+
+class TreeArrayModel:
+    """Read-only predictor over exported tree arrays; mirrors LGBMRegressor.predict."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.feature_names: List[str] = meta["feature_names"]
+        self.max_depth: int = meta["max_depth"]
+        self.source_version: str = meta.get("source_version", "")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "TreeArrayModel":
+        # Resolve the symlink once, so every file comes from the same export
+        path = os.path.realpath(path)
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in _ARRAYS}
+        return cls(arrays, meta)
+
+    def predict(self, X: Any) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_names].to_numpy(dtype=np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        n_rows = X.shape[0]
+        # One (row, tree) cursor per pair, all trees advanced together level by level
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        row = np.broadcast_to(np.arange(n_rows)[:, np.newaxis], node.shape)
+        for _ in range(self.max_depth):
+            active = node >= 0
+            if not active.any():
+                break
+            at = node[active]
+            x = X[row[active], self.feature[at]]
+            missing_type = self.missing[at]
+            nan = np.isnan(x)
+            # LightGBM: NaN counts as 0 unless the split has a NaN branch;
+            # with missing_type Zero, 0 and NaN both take the default branch
+            is_missing = ((missing_type == 2) & nan) | ((missing_type == 1) & (nan | (x == 0)))
+            go_left = np.where(nan, 0.0, x) <= self.threshold[at]
+            go_left = np.where(is_missing, self.default_left[at], go_left)
+            node[active] = np.where(go_left, self.left[at], self.right[at])
+        return self.leaf_value[~node].sum(axis=1)
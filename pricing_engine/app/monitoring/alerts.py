@@ -0,0 +1,19 @@
+from typing import Dict, List
+
+from app.config import Config
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+def check_and_alert(metrics: Dict[str, float]) -> List[str]:
+    """Log a warning for each global demand metric outside its threshold."""
+    alerts = []
+    mape = metrics.get("MAPE")
+    if mape is not None and mape > Config.ALERT_MAPE_MAX:
+        alerts.append(f"Demand MAPE {mape:.3f} above {Config.ALERT_MAPE_MAX:.3f}")
+    r2 = metrics.get("R2")
+    if r2 is not None and r2 < Config.ALERT_R2_MIN:
+        alerts.append(f"Demand R2 {r2:.3f} below {Config.ALERT_R2_MIN:.3f}")
+    for a in alerts:
+        logger.warning("ALERT: %s", a)
+    return alerts
@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from datetime import date
+from typing import List, Optional
+
+from app.config import Config
+from app.db import execute_query
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+GLOBAL_KEY = "_global_"
+
+@dataclass
+class MetricPoint:
+    date: date
+    sku: str
+    vendor_id: str
+    model_type: str
+    metric_name: str
+    metric_value: float
+
+class MetricsSink:
+    """Buffers monitoring_metrics rows and writes them as multi-row INSERTs.
+
+    The buffer is flushed when it reaches `flush_size` points, when
+    `flush_interval` seconds have passed since the last flush (checked on
+    `add`), and when the sink is used as a context manager and exits. If a
+    flush fails and `spool_path` is set, the points not yet written are
+    appended to that JSON-lines file instead of being lost; `replay_spool`
+    re-sends them. monitoring_metrics has no unique key, so only points
+    whose INSERT failed are ever spooled or kept in the spool.
+    """
+
+    _INSERT_PREFIX = """
+        INSERT INTO monitoring_metrics
+            (date, sku, vendor_id, model_type, metric_name, metric_value, created_at)
+        VALUES
+    """
+    _ROW_PLACEHOLDER = "(%s, %s, %s, %s, %s, %s, NOW())"
+
+    def __init__(
+        self,
+        flush_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        spool_path: Optional[str] = None,
+    ):
+        self.flush_size = flush_size or Config.METRICS_FLUSH_SIZE
+        self.flush_interval = (
+            Config.METRICS_FLUSH_INTERVAL_SEC if flush_interval is None else flush_interval
+        )
+        self.spool_path = Config.METRICS_SPOOL_PATH if spool_path is None else spool_path
+        self._buffer: List[MetricPoint] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def __enter__(self) -> "MetricsSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+    def add(
+        self,
+        metric_date: date,
+        sku: str,
+        vendor_id: str,
+        model_type: str,
+        metric_name: str,
+        metric_value: float,
+    ):
+        point = MetricPoint(metric_date, sku, vendor_id, model_type, metric_name, float(metric_value))
+        with self._lock:
+            self._buffer.append(point)
+            due = (
+                len(self._buffer) >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def add_global(self, metric_date: date, model_type: str, metric_name: str, metric_value: float):
+        self.add(metric_date, GLOBAL_KEY, GLOBAL_KEY, model_type, metric_name, metric_value)
+
+    def flush(self) -> int:
+        with self._lock:
+            points, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        if not points:
+            return 0
+        count = len(points)
+        try:
+            self._write(points)
+        except Exception as e:
+            if not self.spool_path:
+                raise
+            logger.warning("Metrics write failed (%s); spooling %d points to %s", e, len(points), self.spool_path)
+            self._spool(points)
+        return count
+
+    def _write(self, points: List[MetricPoint]):
+        """INSERT `points` chunk by chunk, removing each written chunk from the list.
+
+        If a chunk fails, `points` is left holding exactly the unwritten points.
+        """
+        while points:
+            chunk = points[: self.flush_size]
+            sql = self._INSERT_PREFIX + ", ".join([self._ROW_PLACEHOLDER] * len(chunk))
+            params: List = []
+            for p in chunk:
+                params.extend(
+                    (p.date, p.sku, p.vendor_id, p.model_type, p.metric_name, p.metric_value)
+                )
+            execute_query(sql, tuple(params))
+            del points[: len(chunk)]
+
+    def _spool(self, points: List[MetricPoint], mode: str = "a"):
+        spool_dir = os.path.dirname(self.spool_path)
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+        with open(self.spool_path, mode) as f:
+            for p in points:
+                row = asdict(p)
+                row["date"] = p.date.isoformat()
+                f.write(json.dumps(row) + "\n")
+
+    def replay_spool(self) -> int:
+        """Write spooled points to the DB and remove the spool on success.
+
+        If a chunk fails, the spool is rewritten with only the points not
+        written and the error re-raised.
+        """
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return 0
+        with open(self.spool_path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        if not rows:
+            return 0
+        points = []
+        for r in rows:
+            r["date"] = date.fromisoformat(r["date"])
+            points.append(MetricPoint(**r))
+        count = len(points)
+        try:
+            self._write(points)
+        except Exception:
+            self._spool(points, mode="w")
+            raise
+        os.remove(self.spool_path)
+        logger.info("Replayed %d spooled metric points", count)
+        return count
@@ -1,107 +1,209 @@
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 import numpy as np
 import pandas as pd
 
-from app.db import fetch_all, execute_query
-from app.models.elasticity import prepare_elasticity_data, fit_elasticity_model, save_elasticity_to_db
+from app.config import Config
+from app.db import fetch_all
+from app.models.elasticity import fit_elasticity_batch, save_elasticities_to_db
 from app.monitoring.alerts import check_and_alert
+from app.monitoring.metrics_sink import GLOBAL_KEY, MetricsSink
+from app.monitoring.rollups import (
+    daily_prediction_volume,
+    refresh_monitoring_metrics_rollup,
+    refresh_prediction_logs_rollup,
+)
 from app.utils.logging_utils import get_logger
 
 logger = get_logger(__name__)
 
-def _compute_demand_errors(target_date: date) -> Dict[str, float]:
-    # Simplified: join suggestions with orders to approximate actual
+def _load_demand_outcomes(target_date: date) -> pd.DataFrame:
+    # Orders are pre-aggregated per sku/vendor for the day with a range
+    # predicate on order_ts, so an index on order_ts bounds the scan to one day
     sql = """
         SELECT
             ps.sku,
             ps.vendor_id,
             ps.expected_revenue,
             ps.suggested_price,
-            SUM(o.units) AS actual_units,
-            SUM(o.price_paid * o.units) AS actual_revenue
+            AVG(ps.confidence) AS confidence,
+            MAX(d.actual_units) AS actual_units,
+            MAX(d.actual_revenue) AS actual_revenue
         FROM price_suggestions ps
-        LEFT JOIN orders o
-          ON ps.sku = o.sku
-         AND ps.vendor_id = o.vendor_id
-         AND DATE(o.order_ts) = %s
+        LEFT JOIN (
+            SELECT
+                sku,
+                vendor_id,
+                SUM(units) AS actual_units,
+                SUM(price_paid * units) AS actual_revenue
+            FROM orders
+            WHERE order_ts >= %s AND order_ts < %s
+            GROUP BY sku, vendor_id
+        ) d
+          ON d.sku = ps.sku
+         AND d.vendor_id = ps.vendor_id
         WHERE ps.suggestion_date = %s
         GROUP BY ps.sku, ps.vendor_id, ps.expected_revenue, ps.suggested_price
     """
-    rows = fetch_all(sql, (target_date, target_date))
-    if not rows:
-        return {}
+    rows = fetch_all(sql, (target_date, target_date + timedelta(days=1), target_date))
+    return pd.DataFrame(rows)
 
-    df = pd.DataFrame(rows)
-    df["pred_units"] = df["expected_revenue"] / df["suggested_price"]
-    df["actual_units"] = df["actual_units"].fillna(0.0)
-
-    y_true = df["actual_units"].values
-    y_pred = df["pred_units"].values
+def _price_band_labels(prices: pd.Series) -> pd.Series:
+    edges = Config.PRICE_BAND_EDGES
+    labels = [f"{lo:g}-{hi:g}" for lo, hi in zip(edges[:-1], edges[1:])] + [f"{edges[-1]:g}+"]
+    return pd.cut(prices, bins=list(edges) + [np.inf], labels=labels, right=False).astype(str)
 
+def _segment_error_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """MAPE/RMSE/R2 for every segment of every grain from one grouped pass."""
     eps = 1e-6
-    mape = float(np.mean(np.abs((y_true - y_pred) / (y_true + eps))))
-    rmse = float(np.sqrt(np.mean((y_true - y_pred) ** 2)))
-    r2 = 1.0 - float(np.sum((y_true - y_pred) ** 2)) / float(
-        np.sum((y_true - np.mean(y_true)) ** 2) + eps
+    y_true = pd.to_numeric(df["actual_units"]).fillna(0.0).astype(float).values
+    price = pd.to_numeric(df["suggested_price"]).astype(float).values
+    y_pred = pd.to_numeric(df["expected_revenue"]).astype(float).values / price
+    err = y_true - y_pred
+
+    terms = pd.DataFrame(
+        {
+            "ape": np.abs(err / (y_true + eps)),
+            "se": err**2,
+            "y": y_true,
+            "y2": y_true**2,
+        }
     )
+    confidence = pd.to_numeric(df["confidence"]).fillna(0.0).astype(float)
+    grains = {
+        "global": pd.Series("_global_", index=df.index),
+        "vendor": df["vendor_id"].astype(str),
+        "price_band": _price_band_labels(pd.Series(price, index=df.index)),
+        "confidence_decile": "d" + np.clip(np.floor(confidence * 10), 0, 9).astype(int).astype(str),
+    }
+    stacked = pd.concat(
+        [terms.assign(grain=g, segment=keys.values) for g, keys in grains.items()],
+        ignore_index=True,
+    )
+    sums = stacked.groupby(["grain", "segment"], sort=False).agg(
+        n=("se", "size"), ape=("ape", "sum"), se=("se", "sum"), y=("y", "sum"), y2=("y2", "sum")
+    )
+    sst = sums["y2"] - sums["y"] ** 2 / sums["n"]
+    return pd.DataFrame(
+        {
+            "n": sums["n"],
+            "MAPE": sums["ape"] / sums["n"],
+            "RMSE": np.sqrt(sums["se"] / sums["n"]),
+            "R2": 1.0 - sums["se"] / (sst + eps),
+        }
+    ).reset_index()
+
+def _compute_demand_errors(target_date: date, sink: MetricsSink) -> Dict[str, float]:
+    df = _load_demand_outcomes(target_date)
+    if df.empty:
+        return {}
 
-    metrics = {"MAPE": mape, "RMSE": rmse, "R2": r2}
-
-    sql_ins = """
-        INSERT INTO monitoring_metrics
-            (date, sku, vendor_id, model_type, metric_name, metric_value, created_at)
-        VALUES (%s, '_global_', '_global_', 'demand', %s, %s, NOW())
+    seg = _segment_error_metrics(df)
+    metric_names = ["MAPE", "RMSE", "R2"]
+    for r in seg.to_dict("records"):
+        for name in metric_names:
+            if r["grain"] == "global":
+                sink.add_global(target_date, "demand", name, r[name])
+            elif r["grain"] == "vendor":
+                sink.add(target_date, GLOBAL_KEY, r["segment"], "demand", name, r[name])
+            else:
+                sink.add_global(target_date, "demand", f"{name}:{r['grain']}={r['segment']}", r[name])
+
+    glob = seg[seg["grain"] == "global"].iloc[0]
+    return {name: float(glob[name]) for name in metric_names}
+
+def _load_recent_elasticity_data(recent_start: date, target_date: date) -> pd.DataFrame:
+    # One aggregated read for every sku/vendor suggested in the window
+    sql = """
+        SELECT
+            o.sku,
+            o.vendor_id,
+            DATE(o.order_ts) AS date,
+            o.price_paid AS price,
+            SUM(o.units) AS units,
+            MAX(o.promo_flag) AS promo_flag
+        FROM orders o
+        JOIN (
+            SELECT DISTINCT sku, vendor_id
+            FROM price_suggestions
+            WHERE suggestion_date >= %s AND suggestion_date <= %s
+        ) s ON s.sku = o.sku AND s.vendor_id = o.vendor_id
+        WHERE o.order_ts >= %s AND o.order_ts < %s
+        GROUP BY o.sku, o.vendor_id, DATE(o.order_ts), o.price_paid
+        HAVING SUM(o.units) > 0
     """
-    for k, v in metrics.items():
-        execute_query(sql_ins, (target_date, k, v))
-
-    return metrics
+    rows = fetch_all(
+        sql, (recent_start, target_date, recent_start, target_date + timedelta(days=1))
+    )
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    df["price"] = pd.to_numeric(df["price"]).astype(float)
+    df["units"] = pd.to_numeric(df["units"]).astype(float)
+    df["promo_flag"] = pd.to_numeric(df["promo_flag"]).fillna(0).astype(float)
+    return df
 
-def _compute_elasticity_drift(target_date: date):
+def _load_current_elasticities(recent_start: date, target_date: date) -> pd.DataFrame:
+    sql = """
+        SELECT ec.sku, ec.vendor_id, ec.elasticity AS old_elasticity
+        FROM elasticity_coeffs ec
+        JOIN (
+            SELECT DISTINCT sku, vendor_id
+            FROM price_suggestions
+            WHERE suggestion_date >= %s AND suggestion_date <= %s
+        ) s ON s.sku = ec.sku AND s.vendor_id = ec.vendor_id
+    """
+    rows = fetch_all(sql, (recent_start, target_date))
+    if not rows:
+        return pd.DataFrame(columns=["sku", "vendor_id", "old_elasticity"])
+    df = pd.DataFrame(rows)
+    df["old_elasticity"] = pd.to_numeric(df["old_elasticity"]).astype(float)
+    return df
+
+def _fit_elasticities(df: pd.DataFrame, workers: int) -> pd.DataFrame:
+    if workers <= 1 or df.empty:
+        return fit_elasticity_batch(df)
+
+    # Partition whole sku/vendor groups across processes
+    part = df.groupby(["sku", "vendor_id"], sort=False).ngroup() % workers
+    parts = [g for _, g in df.groupby(part)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(parts))) as ex:
+        fitted = list(ex.map(fit_elasticity_batch, parts))
+    return pd.concat(fitted, ignore_index=True)
+
+def _compute_elasticity_drift(
+    target_date: date, sink: MetricsSink, workers: Optional[int] = None
+):
     # Re-estimate elasticity on recent window and compare
-    recent_start = target_date - timedelta(days=30)
+    recent_start = target_date - timedelta(days=Config.DRIFT_WINDOW_DAYS)
+    workers = Config.DRIFT_WORKERS if workers is None else workers
+
+    data = _load_recent_elasticity_data(recent_start, target_date)
+    if data.empty:
+        return
+    new = _fit_elasticities(data, workers)
+    del data
+    if new.empty:
+        return
+
+    old = _load_current_elasticities(recent_start, target_date)
+    merged = new.merge(old, on=["sku", "vendor_id"], how="inner")
+    if merged.empty:
+        return
+    merged["drift"] = (merged["elasticity"] - merged["old_elasticity"]).abs()
+
+    for r in merged[["sku", "vendor_id", "drift"]].to_dict("records"):
+        sink.add(target_date, r["sku"], r["vendor_id"], "elasticity", "elasticity_drift", r["drift"])
+
+    save_elasticities_to_db(merged)
+    logger.info(
+        "Elasticity drift computed for %d sku/vendor pairs (mean drift=%.3f)",
+        len(merged), merged["drift"].mean(),
+    )
 
-    sql_skus = """
-        SELECT DISTINCT sku, vendor_id
-        FROM price_suggestions
-        WHERE suggestion_date >= %s AND suggestion_date <= %s
-    """
-    skus = fetch_all(sql_skus, (recent_start, target_date))
-    for r in skus:
-        sku = r["sku"]
-        vendor_id = r["vendor_id"]
-        df = prepare_elasticity_data(sku, vendor_id)
-        if df.empty:
-            continue
-        _, new_elasticity, metrics = fit_elasticity_model(df)
-        if new_elasticity is None:
-            continue
-
-        # Get old from DB
-        old_sql = """
-            SELECT elasticity FROM elasticity_coeffs
-            WHERE sku = %s AND vendor_id = %s
-        """
-        old_rows = fetch_all(old_sql, (sku, vendor_id))
-        if not old_rows:
-            continue
-        old_el = float(old_rows[0]["elasticity"])
-
-        drift = float(abs(new_elasticity - old_el))
-        execute_query(
-            """
-            INSERT INTO monitoring_metrics
-                (date, sku, vendor_id, model_type, metric_name, metric_value, created_at)
-            VALUES (%s, %s, %s, 'elasticity', 'elasticity_drift', %s, NOW())
-            """,
-            (target_date, sku, vendor_id, drift),
-        )
-
-        save_elasticity_to_db(sku, vendor_id, new_elasticity, metrics)
-
-def _compute_coverage(target_date: date):
+def _compute_coverage(target_date: date, sink: MetricsSink):
     sql_total_skus = "SELECT COUNT(DISTINCT sku) AS cnt FROM sku_features_daily WHERE date = %s"
     total = fetch_all(sql_total_skus, (target_date,))
     total_cnt = int(total[0]["cnt"]) if total else 0
@@ -114,28 +216,31 @@ def _compute_coverage(target_date: date):
     ps = fetch_all(sql_suggestions, (target_date,))
     ps_cnt = int(ps[0]["cnt"]) if ps else 0
 
-    def ins(name, value):
-        execute_query(
-            """
-            INSERT INTO monitoring_metrics
-                (date, sku, vendor_id, model_type, metric_name, metric_value, created_at)
-            VALUES (%s, '_global_', '_global_', 'coverage', %s, %s, NOW())
-            """,
-            (target_date, name, value),
-        )
+    # From the daily rollup; prediction_logs itself only keeps the retention window
+    volume = daily_prediction_volume(target_date, target_date)
+    sink.add_global(target_date, "coverage", "predictions", sum(int(r["predictions"]) for r in volume))
 
     if total_cnt > 0:
-        ins("total_skus", total_cnt)
-        ins("elasticity_coverage_pct", el_cnt * 100.0 / total_cnt)
-        ins("suggestion_coverage_pct", ps_cnt * 100.0 / total_cnt)
+        sink.add_global(target_date, "coverage", "total_skus", total_cnt)
+        sink.add_global(target_date, "coverage", "elasticity_coverage_pct", el_cnt * 100.0 / total_cnt)
+        sink.add_global(target_date, "coverage", "suggestion_coverage_pct", ps_cnt * 100.0 / total_cnt)
 
 def run_daily_monitoring(target_date: date | None = None):
     if target_date is None:
         target_date = date.today() - timedelta(days=1)
 
-    logger.info(f"Running monitoring for date={target_date}")
-    metrics = _compute_demand_errors(target_date)
-    check_and_alert(metrics)
-    _compute_elasticity_drift(target_date)
-    _compute_coverage(target_date)
+    logger.info("Running monitoring for date=%s", target_date)
+    refresh_prediction_logs_rollup(target_date)
+    with MetricsSink() as sink:
+        try:
+            sink.replay_spool()
+        except Exception:
+            # Whatever was not replayed stays spooled for the next run
+            logger.exception("Replaying spooled metric points failed")
+        metrics = _compute_demand_errors(target_date, sink)
+        check_and_alert(metrics)
+        _compute_elasticity_drift(target_date, sink)
+        _compute_coverage(target_date, sink)
+    # After the sink has flushed, so the rollup includes this run's points
+    refresh_monitoring_metrics_rollup(target_date)
     logger.info("Monitoring run completed.")
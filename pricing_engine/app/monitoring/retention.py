@@ -0,0 +1,150 @@
+"""Partition maintenance for prediction_logs and monitoring_metrics.
+
+Both tables are RANGE COLUMNS partitioned (migrations/0007) into periods
+of Config.LOG_PARTITION_GRANULARITY, named after the period start
+(p20250101 or p202501), in front of a p_future catch-all. Maintenance:
+
+- splits the next LOG_PARTITIONS_AHEAD periods off p_future, so inserts
+  never land in p_future and splitting it stays a metadata-only change;
+- drops partitions that ended before the table's retention cutoff, which
+  frees their rows at once instead of DELETE-ing them row by row. A
+  partition is only dropped once every day in it that has raw rows is in
+  the daily rollups; one missed day (a failed monitoring run) holds it back.
+
+MySQL only; set LOG_PARTITION_GRANULARITY=none where the tables are not
+partitioned (e.g. the SQLite stand-in).
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from app.config import Config
+from app.db import execute_query, fetch_all, primary_reads
+from app.monitoring.rollups import earliest_raw_day, missing_rollup_days
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+FUTURE_PARTITION = "p_future"
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    name: str
+    retention_days: int
+
+def partitioned_tables() -> List[PartitionedTable]:
+    return [
+        PartitionedTable("prediction_logs", Config.PREDICTION_LOG_RETENTION_DAYS),
+        PartitionedTable("monitoring_metrics", Config.MONITORING_METRICS_RETENTION_DAYS),
+    ]
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == "day":
+        return day
+    if granularity == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown partition granularity {granularity!r}")
+
+def next_period(start: date, granularity: str) -> date:
+    if granularity == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def partition_name(start: date, granularity: str) -> str:
+    return "p" + start.strftime("%Y%m%d" if granularity == "day" else "%Y%m")
+
+def existing_partitions(table: str) -> Dict[str, Optional[date]]:
+    """Partition name -> exclusive upper bound (None for MAXVALUE); empty if not partitioned."""
+    sql = """
+        SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+    """
+    with primary_reads():
+        rows = fetch_all(sql, (table,))
+    out = {}
+    for r in rows:
+        bound = str(r["bound"]).strip("'")
+        out[r["name"]] = None if bound == "MAXVALUE" else date.fromisoformat(bound[:10])
+    return out
+
+def plan_new_partitions(
+    existing: Dict[str, Optional[date]], today: date, ahead: int, granularity: str
+) -> List[tuple]:
+    """(name, upper bound) of the partitions to split off p_future, in order."""
+    dated = [b for b in existing.values() if b is not None]
+    start = max(dated) if dated else period_start(today, granularity)
+    last = period_start(today, granularity)
+    for _ in range(ahead):
+        last = next_period(last, granularity)
+    planned = []
+    while start <= last:
+        end = next_period(start, granularity)
+        planned.append((partition_name(start, granularity), end))
+        start = end
+    return planned
+
+def plan_expired_partitions(existing: Dict[str, Optional[date]], keep_from: date) -> List[str]:
+    """Partitions whose rows all predate keep_from."""
+    return sorted(name for name, bound in existing.items() if bound is not None and bound <= keep_from)
+
+def partition_ranges(existing: Dict[str, Optional[date]]) -> Dict[str, tuple]:
+    """Name -> [lower, upper) bounds of each dated partition; the first one's lower is None."""
+    dated = sorted((bound, name) for name, bound in existing.items() if bound is not None)
+    ranges, lower = {}, None
+    for bound, name in dated:
+        ranges[name] = (lower, bound)
+        lower = bound
+    return ranges
+
+def fully_rolled_up(table: PartitionedTable, lower: Optional[date], upper: date) -> bool:
+    if lower is None:
+        # The first partition also holds every older row
+        lower = earliest_raw_day(table.name, upper)
+        if lower is None:
+            return True
+    missing = missing_rollup_days(table.name, lower, upper)
+    if missing:
+        logger.warning(
+            "Keeping %s rows for %s: not in the daily rollups yet", table.name, ", ".join(map(str, missing))
+        )
+    return not missing
+
+def add_partitions(table: PartitionedTable, planned: List[tuple]):
+    parts = ", ".join(f"PARTITION {name} VALUES LESS THAN ('{end.isoformat()}')" for name, end in planned)
+    execute_query(
+        f"ALTER TABLE {table.name} REORGANIZE PARTITION {FUTURE_PARTITION} INTO "
+        f"({parts}, PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE))"
+    )
+
+def drop_partitions(table: PartitionedTable, names: List[str]):
+    execute_query(f"ALTER TABLE {table.name} DROP PARTITION {', '.join(names)}")
+
+def maintain_table(table: PartitionedTable, today: date) -> Dict[str, List[str]]:
+    existing = existing_partitions(table.name)
+    if FUTURE_PARTITION not in existing:
+        logger.warning("%s is not partitioned (migration 0007 not applied?); skipping", table.name)
+        return {"added": [], "dropped": []}
+
+    granularity = Config.LOG_PARTITION_GRANULARITY
+    planned = plan_new_partitions(existing, today, Config.LOG_PARTITIONS_AHEAD, granularity)
+    if planned:
+        add_partitions(table, planned)
+
+    keep_from = today - timedelta(days=table.retention_days)
+    ranges = partition_ranges(existing)
+    # Never drop days the rollups do not have
+    expired = [name for name in plan_expired_partitions(existing, keep_from) if fully_rolled_up(table, *ranges[name])]
+    if expired:
+        drop_partitions(table, expired)
+
+    result = {"added": [name for name, _ in planned], "dropped": expired}
+    logger.info("Partition maintenance for %s: %s", table.name, result)
+    return result
+
+def maintain_partitions(today: Optional[date] = None) -> Dict[str, Dict[str, List[str]]]:
+    if Config.LOG_PARTITION_GRANULARITY == "none":
+        logger.info("Log partitioning disabled; skipping partition maintenance")
+        return {}
+    today = today or date.today()
+    return {t.name: maintain_table(t, today) for t in partitioned_tables()}
@@ -0,0 +1,134 @@
+"""Daily rollups of prediction_logs and monitoring_metrics.
+
+Raw rows are kept only for the retention window (see retention.py); these
+per-day aggregates are kept indefinitely and are what monitoring and
+dashboards query. Refreshing a day recomputes it from the raw rows, so it
+can be re-run until that day's partition is dropped.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.db import execute_query, fetch_all, fetch_one, primary_reads
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+PREDICTION_LOGS_ROLLUP_SQL = """
+    INSERT INTO prediction_logs_daily
+        (date, vendor_id, model_type, predictions, skus, expected_revenue, expected_profit, updated_at)
+    SELECT %s, COALESCE(vendor_id, ''), COALESCE(model_type, ''), COUNT(*), COUNT(DISTINCT sku),
+           SUM(CAST(JSON_EXTRACT(output_json, '$.expected_revenue') AS DECIMAL(18, 4))),
+           SUM(CAST(JSON_EXTRACT(output_json, '$.expected_profit') AS DECIMAL(18, 4))),
+           NOW()
+    FROM prediction_logs
+    WHERE created_at >= %s AND created_at < %s
+    GROUP BY vendor_id, model_type
+    ON DUPLICATE KEY UPDATE
+        predictions = VALUES(predictions),
+        skus = VALUES(skus),
+        expected_revenue = VALUES(expected_revenue),
+        expected_profit = VALUES(expected_profit),
+        updated_at = VALUES(updated_at)
+"""
+
+MONITORING_METRICS_ROLLUP_SQL = """
+    INSERT INTO monitoring_metrics_daily
+        (date, model_type, metric_name, points, value_avg, value_min, value_max, updated_at)
+    SELECT date, model_type, metric_name, COUNT(*), AVG(metric_value), MIN(metric_value),
+           MAX(metric_value), NOW()
+    FROM monitoring_metrics
+    WHERE date = %s
+    GROUP BY date, model_type, metric_name
+    ON DUPLICATE KEY UPDATE
+        points = VALUES(points),
+        value_avg = VALUES(value_avg),
+        value_min = VALUES(value_min),
+        value_max = VALUES(value_max),
+        updated_at = VALUES(updated_at)
+"""
+
+# Raw table -> its daily rollup
+ROLLUP_TABLES = {
+    "prediction_logs": "prediction_logs_daily",
+    "monitoring_metrics": "monitoring_metrics_daily",
+}
+
+# Raw table -> the column its rows are rolled up (and partitioned) by
+RAW_DATE_COLUMNS = {
+    "prediction_logs": "created_at",
+    "monitoring_metrics": "date",
+}
+
+def refresh_prediction_logs_rollup(day: date):
+    execute_query(PREDICTION_LOGS_ROLLUP_SQL, (day, day, day + timedelta(days=1)))
+
+def refresh_monitoring_metrics_rollup(day: date):
+    execute_query(MONITORING_METRICS_ROLLUP_SQL, (day,))
+
+def refresh_daily_rollups(day: date):
+    """Recompute both rollups for one day from the raw rows."""
+    refresh_prediction_logs_rollup(day)
+    refresh_monitoring_metrics_rollup(day)
+    logger.info("Refreshed daily rollups for %s", day)
+
+def rolled_up_through(table: str) -> Optional[date]:
+    """Latest day of `table` (a raw table) with rollup rows; None if none."""
+    with primary_reads():
+        row = fetch_one(f"SELECT MAX(date) AS d FROM {ROLLUP_TABLES[table]}", ())
+    value = row["d"] if row else None
+    return None if value is None else _as_date(value)
+
+def _as_date(value: Any) -> date:
+    return value if type(value) is date else date.fromisoformat(str(value)[:10])
+
+def earliest_raw_day(table: str, before: date) -> Optional[date]:
+    """First day with rows in `table` (a raw table) before `before`; None if none."""
+    column = RAW_DATE_COLUMNS[table]
+    with primary_reads():
+        row = fetch_one(f"SELECT MIN({column}) AS d FROM {table} WHERE {column} < %s", (before,))
+    value = row["d"] if row else None
+    return None if value is None else _as_date(value)
+
+def missing_rollup_days(table: str, start: date, end: date) -> List[date]:
+    """Days in [start, end) that have rows in `table` (a raw table) but none in its rollup.
+
+    A day without raw rows has nothing to roll up, so it is not missing.
+    """
+    column = RAW_DATE_COLUMNS[table]
+    with primary_reads():
+        rows = fetch_all(
+            f"SELECT DISTINCT date FROM {ROLLUP_TABLES[table]} WHERE date >= %s AND date < %s", (start, end)
+        )
+        rolled_up = {_as_date(r["date"]) for r in rows}
+        missing = []
+        day = start
+        while day < end:
+            if day not in rolled_up and fetch_one(
+                f"SELECT 1 AS x FROM {table} WHERE {column} >= %s AND {column} < %s LIMIT 1",
+                (day, day + timedelta(days=1)),
+            ):
+                missing.append(day)
+            day += timedelta(days=1)
+    return missing
+
+def daily_prediction_volume(start: date, end: date) -> List[Dict[str, Any]]:
+    """Predictions and distinct SKUs per day in [start, end], summed over vendors."""
+    sql = """
+        SELECT date, model_type, SUM(predictions) AS predictions, SUM(skus) AS vendor_skus,
+               SUM(expected_revenue) AS expected_revenue
+        FROM prediction_logs_daily
+        WHERE date >= %s AND date <= %s
+        GROUP BY date, model_type
+        ORDER BY date
+    """
+    return fetch_all(sql, (start, end))
+
+def metric_history(model_type: str, metric_name: str, start: date, end: date) -> List[Dict[str, Any]]:
+    """Daily avg/min/max of one metric over its skus/vendors, from the rollup."""
+    sql = """
+        SELECT date, points, value_avg, value_min, value_max
+        FROM monitoring_metrics_daily
+        WHERE model_type = %s AND metric_name = %s AND date >= %s AND date <= %s
+        ORDER BY date
+    """
+    return fetch_all(sql, (model_type, metric_name, start, end))
@@ -0,0 +1,199 @@
+"""Async variant of optimize_price_for_sku for the ASGI app.
+
+Inputs come from the shared input caches, or on a miss from the joined
+inputs query on the async pool; demand prediction is CPU-bound and runs on a
+bounded thread pool so it never blocks the event loop. Pricing logic is
+shared with price_optimizer. Spool appends (flock plus file I/O) run on the
+loop's default executor.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from app import db_async
+from app.config import Config
+from app.db import DatabaseUnavailable
+from app.feedback.suggestion_index import recent_suggestions
+from app.models.demand_model import predict_demand
+from app.models.elasticity import elasticity_from_rows
+from app.optimizer.inputs import (
+    PRICING_INPUTS_SQL,
+    PricingInputs,
+    cache_pricing_inputs,
+    cached_pricing_inputs,
+    last_known_pricing_inputs,
+    split_joined_row,
+)
+from app.optimizer.price_optimizer import (
+    PREDICTION_LOG_SQL,
+    SUGGESTION_INSERT_SQL,
+    OptimizationResult,
+    build_candidates,
+    choose_price,
+    has_stock,
+    prediction_log_params,
+    prediction_log_payload,
+    suggestion_params,
+    suggestion_response,
+)
+from app.optimizer.suggestion_spool import suggestion_spool
+from app.optimizer.suggestions import (
+    SUGGESTION_BY_FINGERPRINT_SQL,
+    cached_degraded_suggestion,
+    content_fingerprint,
+    degraded_response,
+    fingerprint_for_inputs,
+    response_from_row,
+    suggestion_cache,
+)
+from app.utils.cache import MISSING
+from app.utils.metrics import stage_timer
+from app.utils.singleflight import AsyncSingleFlight
+
+suggestion_flight_async = AsyncSingleFlight("suggestions_async", Config.SINGLEFLIGHT_TIMEOUT_SEC)
+
+_predict_executor: Optional[ThreadPoolExecutor] = None
+
+def _get_predict_executor() -> ThreadPoolExecutor:
+    global _predict_executor
+    if _predict_executor is None:
+        _predict_executor = ThreadPoolExecutor(
+            max_workers=Config.PREDICT_WORKERS, thread_name_prefix="predict"
+        )
+    return _predict_executor
+
+def shutdown_predict_executor():
+    global _predict_executor
+    if _predict_executor is not None:
+        _predict_executor.shutdown(wait=True)
+        _predict_executor = None
+
+async def get_pricing_inputs_async(sku: str, vendor_id: str) -> PricingInputs:
+    key = (sku, vendor_id)
+    inputs = cached_pricing_inputs(key)
+    if inputs is None:
+        try:
+            rows = await db_async.fetch_all(PRICING_INPUTS_SQL, key)
+        except DatabaseUnavailable:
+            inputs = last_known_pricing_inputs(key)
+            if inputs is None:
+                raise
+            return inputs
+        inputs = split_joined_row(rows[0]) if rows else PricingInputs(None)
+        cache_pricing_inputs(key, inputs)
+    return inputs
+
+async def optimize_price_for_sku_async(sku: str, vendor_id: str) -> Optional[OptimizationResult]:
+    with stage_timer("inputs"):
+        inputs = await get_pricing_inputs_async(sku, vendor_id)
+    return await optimize_price_for_inputs_async(sku, vendor_id, inputs)
+
+async def optimize_price_for_inputs_async(
+    sku: str, vendor_id: str, inputs: PricingInputs
+) -> Optional[OptimizationResult]:
+    feat = inputs.features
+    if not has_stock(sku, vendor_id, feat):
+        return None
+
+    candidates = build_candidates(sku, vendor_id, feat, inputs.vendor_rules)
+    if candidates is None:
+        return None
+
+    loop = asyncio.get_running_loop()
+    with stage_timer("predict_demand"):
+        q_pred = await loop.run_in_executor(_get_predict_executor(), predict_demand, candidates.frame)
+
+    elasticity, el_metrics = elasticity_from_rows(sku, vendor_id, inputs.elasticity_rows)
+    return choose_price(candidates, q_pred, elasticity, el_metrics)
+
+async def persist_optimization_result_async(
+    result: OptimizationResult,
+    input_fingerprint: Optional[str] = None,
+    content_fingerprint: Optional[str] = None,
+) -> int:
+    suggestion_id = await db_async.execute_insert(
+        SUGGESTION_INSERT_SQL, suggestion_params(result, input_fingerprint) + (content_fingerprint,)
+    )
+    recent_suggestions.record(result.sku, result.vendor_id, result.optimal_price, suggestion_id)
+    return suggestion_id
+
+async def log_optimizer_prediction_async(result: OptimizationResult, suggestion_id: int):
+    input_features, output = prediction_log_payload(result)
+    await db_async.execute_query(
+        PREDICTION_LOG_SQL,
+        prediction_log_params(
+            result.sku, result.vendor_id, suggestion_id, "optimizer", input_features, output
+        ),
+    )
+
+async def lookup_suggestion_async(sku: str, vendor_id: str, fingerprint: str) -> Any:
+    body = suggestion_cache.get(fingerprint)
+    if body is not MISSING:
+        return body
+    rows = await db_async.fetch_all(SUGGESTION_BY_FINGERPRINT_SQL, (sku, vendor_id, fingerprint))
+    if not rows:
+        return MISSING
+    body = response_from_row(rows[0])
+    suggestion_cache.set(fingerprint, body)
+    return body
+
+async def create_suggestion_async(
+    sku: str, vendor_id: str, inputs: PricingInputs, fingerprint: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    result = await optimize_price_for_inputs_async(sku, vendor_id, inputs)
+    if not result:
+        if fingerprint:
+            suggestion_cache.set(fingerprint, None)
+        return None
+
+    with stage_timer("persist"):
+        suggestion_id = await persist_optimization_result_async(
+            result, fingerprint, content_fingerprint(inputs)
+        )
+    with stage_timer("log_prediction"):
+        try:
+            await log_optimizer_prediction_async(result, suggestion_id)
+        except DatabaseUnavailable:
+            # Already persisted: serve it, and let only the log row wait for the DB
+            await asyncio.get_running_loop().run_in_executor(
+                None, suggestion_spool.add_prediction_log, result, suggestion_id
+            )
+    body = suggestion_response(result, suggestion_id)
+    if fingerprint:
+        suggestion_cache.set(fingerprint, body)
+    return body
+
+async def get_or_create_suggestion_async(
+    sku: str, vendor_id: str, fingerprint: str, inputs: PricingInputs
+) -> Optional[Dict[str, Any]]:
+    body = await lookup_suggestion_async(sku, vendor_id, fingerprint)
+    if body is MISSING:
+        body = await create_suggestion_async(sku, vendor_id, inputs, fingerprint)
+    return body
+
+async def _live_suggestion_async(
+    sku: str, vendor_id: str
+) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    inputs = await get_pricing_inputs_async(sku, vendor_id)
+    fingerprint = fingerprint_for_inputs(sku, vendor_id, inputs)
+    if fingerprint is None:
+        return None, None
+    if not inputs.stale:
+        try:
+            return fingerprint, await get_or_create_suggestion_async(sku, vendor_id, fingerprint, inputs)
+        except DatabaseUnavailable:
+            pass
+    body = cached_degraded_suggestion(fingerprint, inputs)
+    if body is MISSING:
+        result = await optimize_price_for_inputs_async(sku, vendor_id, inputs)
+        if result:
+            body = await asyncio.get_running_loop().run_in_executor(None, degraded_response, result, fingerprint)
+        else:
+            body = None
+    return fingerprint, body
+
+async def live_suggestion_async(
+    sku: str, vendor_id: str
+) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Async live_suggestion; coalesced across the tasks of this event loop."""
+    return await suggestion_flight_async.do((sku, vendor_id), _live_suggestion_async, sku, vendor_id)
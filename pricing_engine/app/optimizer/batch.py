@@ -0,0 +1,212 @@
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.config import Config
+from app.db import execute_insert, execute_many, execute_query, fetch_all, primary_reads
+from app.feedback.suggestion_index import recent_suggestions
+from app.models.demand_model import get_demand_model_version
+from app.optimizer.inputs import get_pricing_inputs, prefetch_pricing_inputs
+from app.optimizer.price_optimizer import (
+    PREDICTION_LOG_SQL,
+    OptimizationResult,
+    prediction_log_params,
+    prediction_log_payload,
+)
+from app.optimizer.suggestions import content_fingerprint, create_suggestion, fingerprint_for_inputs
+from app.pipeline.partitions import Partition, partition_filter
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+def load_batch_targets(partition: Optional[Partition] = None) -> List[Dict[str, Any]]:
+    """sku/vendor pairs present in the latest sku_features_daily date."""
+    in_partition, params = partition_filter(partition)
+    sql = f"""
+        SELECT DISTINCT sku, vendor_id
+        FROM sku_features_daily
+        WHERE date = (SELECT MAX(date) FROM sku_features_daily){in_partition}
+    """
+    return fetch_all(sql, params)
+
+def chunked(rows: Iterable[Dict[str, Any]], size: int):
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def start_batch_run() -> int:
+    """Open a batch_runs row; suggestions persisted under its id form one batch."""
+    sql = """
+        INSERT INTO batch_runs (status, model_version, started_at)
+        VALUES ('RUNNING', %s, %s)
+    """
+    return execute_insert(sql, (get_demand_model_version(), datetime.now()))
+
+def finish_batch_run(run_id: int, counts: Dict[str, int], status: str = "COMPLETE"):
+    sql = """
+        UPDATE batch_runs
+        SET status = %s, priced = %s, skipped = %s, unchanged = %s, finished_at = %s
+        WHERE id = %s
+    """
+    execute_query(
+        sql,
+        (
+            status,
+            counts.get("priced", 0),
+            counts.get("skipped", 0),
+            counts.get("unchanged", 0),
+            datetime.now(),
+            run_id,
+        ),
+    )
+
+def previous_fingerprints_sql(n_keys: int) -> str:
+    placeholders = ", ".join(["(%s, %s)"] * n_keys)
+    return f"""
+        SELECT sku, vendor_id, content_fingerprint, suggestion_id, computed_at
+        FROM suggestion_input_fingerprints
+        WHERE (sku, vendor_id) IN ({placeholders})
+    """
+
+RECORD_FINGERPRINT_SQL = """
+    INSERT INTO suggestion_input_fingerprints
+        (sku, vendor_id, content_fingerprint, suggestion_id, computed_at)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        content_fingerprint = VALUES(content_fingerprint),
+        suggestion_id = VALUES(suggestion_id),
+        computed_at = VALUES(computed_at)
+"""
+
+# A new row in this batch with the old suggestion's values and today's fingerprints
+CARRY_FORWARD_SQL = """
+    INSERT INTO price_suggestions
+        (sku, vendor_id, suggestion_date, current_price, suggested_price,
+         expected_revenue, expected_profit, elasticity, confidence, reason,
+         status, input_fingerprint, batch_run_id, content_fingerprint, created_at)
+    SELECT sku, vendor_id, CURDATE(), current_price, suggested_price,
+           expected_revenue, expected_profit, elasticity, confidence, reason,
+           'PENDING', %s, %s, %s, NOW()
+    FROM price_suggestions
+    WHERE id = %s
+"""
+
+def carried_suggestions_sql(n_keys: int) -> str:
+    placeholders = ", ".join(["(%s, %s, %s)"] * n_keys)
+    return f"""
+        SELECT id, sku, vendor_id, current_price, suggested_price, expected_revenue,
+               expected_profit, elasticity, confidence, reason
+        FROM price_suggestions
+        WHERE (sku, vendor_id, input_fingerprint) IN ({placeholders})
+        ORDER BY id
+    """
+
+def price_skus(
+    rows: Iterable[Dict[str, Any]],
+    batch_run_id: Optional[int] = None,
+    delta: Optional[bool] = None,
+    max_age_sec: Optional[float] = None,
+) -> Dict[str, int]:
+    """Optimize, persist and log a fingerprinted suggestion for each sku/vendor row.
+
+    Inputs for each chunk of rows are prefetched with one joined query, so
+    the per-SKU optimizer calls are served from the input caches.
+
+    In delta mode (Config.BATCH_DELTA_REPRICING) a SKU whose content
+    fingerprint matches its last computed suggestion, computed less than
+    max_age_sec ago, is not re-optimized: that suggestion is copied into
+    this batch, with its own prediction log row, and counted as `unchanged`.
+    """
+    delta = Config.BATCH_DELTA_REPRICING if delta is None else delta
+    max_age = timedelta(seconds=Config.BATCH_DELTA_MAX_AGE_SEC if max_age_sec is None else max_age_sec)
+    counts = {"priced": 0, "skipped": 0, "unchanged": 0}
+    for chunk in chunked(rows, Config.INPUT_PREFETCH_CHUNK):
+        keys = [(r["sku"], r["vendor_id"]) for r in chunk]
+        prefetch_pricing_inputs(keys)
+        content = {k: content_fingerprint(get_pricing_inputs(*k)) for k in keys}
+        if delta:
+            keys = _carry_forward_unchanged(keys, content, counts, batch_run_id, max_age)
+        computed = []
+        for sku, vendor_id in keys:
+            suggestion_id = _price_one(sku, vendor_id, counts, batch_run_id)
+            if suggestion_id is not None:
+                computed.append((sku, vendor_id, content[(sku, vendor_id)], suggestion_id, datetime.now()))
+        # Recorded on every run, so the first delta run already has a baseline
+        execute_many(RECORD_FINGERPRINT_SQL, computed)
+    if delta:
+        logger.info(
+            "Delta repricing: recomputed=%d unchanged=%d skipped=%d",
+            counts["priced"], counts["unchanged"], counts["skipped"],
+        )
+    return counts
+
+def _carry_forward_unchanged(
+    keys: List[Tuple[str, str]],
+    content: Dict[Tuple[str, str], str],
+    counts: Dict[str, int],
+    batch_run_id: Optional[int],
+    max_age: timedelta,
+) -> List[Tuple[str, str]]:
+    """Copy still-valid suggestions into this batch; returns the keys left to optimize."""
+    params = tuple(v for k in keys for v in k)
+    previous = {(r["sku"], r["vendor_id"]): r for r in fetch_all(previous_fingerprints_sql(len(keys)), params)}
+    oldest = datetime.now() - max_age
+    todo, carried, fingerprinted = [], [], []
+    for key in keys:
+        prev = previous.get(key)
+        if prev is None or prev["content_fingerprint"] != content[key] or prev["computed_at"] < oldest:
+            todo.append(key)
+            continue
+        # Stamp today's suggestion fingerprint so API polls reuse the copy
+        fingerprint = fingerprint_for_inputs(key[0], key[1], get_pricing_inputs(*key))
+        carried.append((fingerprint, batch_run_id, content[key], prev["suggestion_id"]))
+        fingerprinted.append((key, fingerprint))
+    execute_many(CARRY_FORWARD_SQL, carried)
+    _log_carried(fingerprinted)
+    counts["unchanged"] += len(carried)
+    return todo
+
+def _log_carried(fingerprinted: List[Tuple[Tuple[str, str], str]]):
+    """Log and index the copies like computed suggestions; the log payload is all in the row."""
+    if not fingerprinted:
+        return
+    params = tuple(v for key, fingerprint in fingerprinted for v in (*key, fingerprint))
+    # The copies were just written; the newest row per key is this batch's
+    with primary_reads():
+        rows = fetch_all(carried_suggestions_sql(len(fingerprinted)), params)
+    latest = {(r["sku"], r["vendor_id"]): r for r in rows}
+    logs = []
+    for r in latest.values():
+        result = OptimizationResult(
+            sku=r["sku"],
+            vendor_id=r["vendor_id"],
+            current_price=float(r["current_price"]),
+            optimal_price=float(r["suggested_price"]),
+            expected_revenue=float(r["expected_revenue"]),
+            expected_profit=float(r["expected_profit"]),
+            elasticity=float(r["elasticity"]),
+            confidence=float(r["confidence"]),
+            reason=r["reason"],
+        )
+        input_features, output = prediction_log_payload(result)
+        suggestion_id = int(r["id"])
+        logs.append(
+            prediction_log_params(result.sku, result.vendor_id, suggestion_id, "optimizer", input_features, output)
+        )
+        recent_suggestions.record(result.sku, result.vendor_id, result.optimal_price, suggestion_id)
+    execute_many(PREDICTION_LOG_SQL, logs)
+
+def _price_one(sku: str, vendor_id: str, counts: Dict[str, int], batch_run_id: Optional[int]) -> Optional[int]:
+    # Stamp the fingerprint so API polls for this SKU reuse the batch suggestion
+    inputs = get_pricing_inputs(sku, vendor_id)
+    fingerprint = fingerprint_for_inputs(sku, vendor_id, inputs)
+    body = create_suggestion(sku, vendor_id, inputs, fingerprint, batch_run_id)
+    if not body:
+        counts["skipped"] += 1
+        return None
+    counts["priced"] += 1
+    logger.info("Suggested price %s for sku=%s, vendor=%s", body["suggested_price"], sku, vendor_id)
+    return body["suggestion_id"]
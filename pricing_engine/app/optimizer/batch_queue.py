@@ -0,0 +1,315 @@
+"""Distributed batch pricing over a lease-based job_partitions queue.
+
+The coordinator opens a batch run and inserts one PENDING row per SKU hash
+partition. Workers on any host claim a row with a compare-and-set UPDATE
+on its lease_version, so exactly one claimant wins; while pricing they
+renew the lease, and a lease that is not renewed in time (a dead or stuck
+worker) expires and the partition is claimed again, up to
+BATCH_MAX_ATTEMPTS. The coordinator marks the batch run COMPLETE once
+every partition is DONE.
+
+Lease times come from each worker's clock, so hosts need NTP-level clock
+agreement; BATCH_LEASE_SEC should be far larger than any skew.
+"""
+import os
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from app.config import Config
+from app.db import execute_many, execute_query, fetch_all, fetch_one, primary_reads
+from app.models.demand_model import get_demand_model_version
+from app.optimizer.batch import finish_batch_run, load_batch_targets, price_skus, start_batch_run
+from app.pipeline.partitions import Partition
+from app.utils.logging_utils import get_logger
+from app.utils.metrics import registry
+
+logger = get_logger(__name__)
+
+PENDING = "PENDING"
+LEASED = "LEASED"
+DONE = "DONE"
+FAILED = "FAILED"
+
+CLAIMS = registry.counter(
+    "batch_partition_claims_total", "job_partitions claim attempts by outcome", labelnames=("outcome",)
+)
+LOST_LEASES = registry.counter(
+    "batch_partition_leases_lost_total", "Partition leases that expired or were taken over while working"
+)
+
+# How many claimable rows to read per claim; one is picked at random so
+# concurrent workers rarely race for the same row
+CLAIM_CANDIDATES = 8
+
+@dataclass
+class Lease:
+    batch_run_id: int
+    partition: Partition
+    owner: str
+    version: int
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class PartitionQueue:
+    def __init__(
+        self,
+        batch_run_id: int,
+        owner: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        clock: Callable[[], datetime] = datetime.now,
+    ):
+        self.batch_run_id = batch_run_id
+        self.owner = owner or default_owner()
+        self.lease_seconds = lease_seconds if lease_seconds is not None else Config.BATCH_LEASE_SEC
+        self.max_attempts = max_attempts if max_attempts is not None else Config.BATCH_MAX_ATTEMPTS
+        self._clock = clock
+
+    def _expiry(self) -> datetime:
+        return self._clock() + timedelta(seconds=self.lease_seconds)
+
+    def enqueue(self, partition_count: int):
+        sql = """
+            INSERT INTO job_partitions (batch_run_id, partition_no, partition_count, status)
+            VALUES (%s, %s, %s, 'PENDING')
+        """
+        execute_many(sql, [(self.batch_run_id, i, partition_count) for i in range(partition_count)])
+
+    def fail_exhausted_leases(self, now: Optional[datetime] = None):
+        """Expired leases that have used up their attempts will not be retried."""
+        execute_query(
+            """
+            UPDATE job_partitions
+            SET status = 'FAILED', error = 'lease expired', lease_version = lease_version + 1
+            WHERE batch_run_id = %s AND status = 'LEASED' AND lease_expires_at < %s AND attempts >= %s
+            """,
+            (self.batch_run_id, now or self._clock(), self.max_attempts),
+        )
+
+    def claim(self) -> Optional[Lease]:
+        """Lease a pending or expired partition; None if there is nothing to claim."""
+        now = self._clock()
+        self.fail_exhausted_leases(now)
+        with primary_reads():
+            candidates = fetch_all(
+                """
+                SELECT partition_no, partition_count, lease_version
+                FROM job_partitions
+                WHERE batch_run_id = %s
+                  AND (status = 'PENDING' OR (status = 'LEASED' AND lease_expires_at < %s))
+                ORDER BY partition_no
+                LIMIT %s
+                """,
+                (self.batch_run_id, now, CLAIM_CANDIDATES),
+            )
+        random.shuffle(candidates)
+        for c in candidates:
+            won = execute_query(
+                """
+                UPDATE job_partitions
+                SET status = 'LEASED', lease_owner = %s, lease_version = lease_version + 1,
+                    lease_expires_at = %s, heartbeat_at = %s, attempts = attempts + 1
+                WHERE batch_run_id = %s AND partition_no = %s AND lease_version = %s
+                """,
+                (self.owner, self._expiry(), now, self.batch_run_id, c["partition_no"], c["lease_version"]),
+                fetch="rowcount",
+            )
+            if won == 1:
+                CLAIMS.labels("won").inc()
+                return Lease(
+                    self.batch_run_id,
+                    Partition(int(c["partition_no"]), int(c["partition_count"])),
+                    self.owner,
+                    int(c["lease_version"]) + 1,
+                )
+            CLAIMS.labels("lost_race").inc()
+        if not candidates:
+            CLAIMS.labels("empty").inc()
+        return None
+
+    def _update_leased(self, lease: Lease, assignments: str, params: tuple) -> bool:
+        # Only the current holder's version matches; a reclaimed lease has moved on
+        sql = f"""
+            UPDATE job_partitions SET {assignments}
+            WHERE batch_run_id = %s AND partition_no = %s AND lease_version = %s AND status = 'LEASED'
+        """
+        params = params + (lease.batch_run_id, lease.partition.index, lease.version)
+        return execute_query(sql, params, fetch="rowcount") == 1
+
+    def heartbeat(self, lease: Lease) -> bool:
+        """Extend the lease; False if it has been lost."""
+        return self._update_leased(lease, "lease_expires_at = %s, heartbeat_at = %s", (self._expiry(), self._clock()))
+
+    def complete(self, lease: Lease, counts: Dict[str, int]) -> bool:
+        return self._update_leased(
+            lease,
+            "status = 'DONE', priced = %s, skipped = %s, unchanged = %s, error = NULL, finished_at = %s",
+            (counts.get("priced", 0), counts.get("skipped", 0), counts.get("unchanged", 0), self._clock()),
+        )
+
+    def release(self, lease: Lease, error: str) -> bool:
+        """Give a failed partition back for another attempt, or fail it for good."""
+        return self._update_leased(
+            lease,
+            "status = CASE WHEN attempts >= %s THEN 'FAILED' ELSE 'PENDING' END, "
+            "lease_owner = NULL, lease_expires_at = NULL, lease_version = lease_version + 1, error = %s",
+            (self.max_attempts, error[:2000]),
+        )
+
+    def progress(self) -> Dict[str, int]:
+        """Partitions per status plus priced/skipped/unchanged totals of the DONE ones."""
+        with primary_reads():
+            rows = fetch_all(
+                """
+                SELECT status, COUNT(*) AS n, SUM(priced) AS priced, SUM(skipped) AS skipped,
+                       SUM(unchanged) AS unchanged
+                FROM job_partitions WHERE batch_run_id = %s GROUP BY status
+                """,
+                (self.batch_run_id,),
+            )
+        out = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0, "priced": 0, "skipped": 0, "unchanged": 0}
+        for r in rows:
+            out[r["status"]] = int(r["n"])
+            if r["status"] == DONE:
+                for k in ("priced", "skipped", "unchanged"):
+                    out[k] = int(r[k] or 0)
+        return out
+
+    def finished(self) -> bool:
+        p = self.progress()
+        return p[PENDING] == 0 and p[LEASED] == 0
+
+class _Heartbeat:
+    """Renews a lease from a background thread while the partition is priced."""
+
+    def __init__(self, queue: PartitionQueue, lease: Lease, interval: float):
+        self.queue = queue
+        self.lease = lease
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="batch-lease-heartbeat", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.lease):
+                    LOST_LEASES.inc()
+                    logger.warning("Lost lease on partition %s of batch %s", self.lease.partition, self.lease.batch_run_id)
+                    self.lost.set()
+                    return
+            except Exception as e:
+                # The lease survives until it expires; keep trying
+                logger.warning("Lease heartbeat failed: %r", e)
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+def find_open_batch() -> Optional[int]:
+    """Latest batch run that still has partitions to price."""
+    with primary_reads():
+        row = fetch_one(
+            """
+            SELECT MAX(batch_run_id) AS batch_run_id FROM job_partitions
+            WHERE status IN ('PENDING', 'LEASED')
+            """,
+            (),
+        )
+    return int(row["batch_run_id"]) if row and row["batch_run_id"] is not None else None
+
+def _check_model_version(batch_run_id: int):
+    # Every worker must price with the model the batch was opened with
+    with primary_reads():
+        row = fetch_one("SELECT model_version FROM batch_runs WHERE id = %s", (batch_run_id,))
+    expected = row["model_version"] if row else None
+    if expected and expected != get_demand_model_version():
+        raise RuntimeError(
+            f"Batch {batch_run_id} uses demand model {expected}, this worker has {get_demand_model_version()}"
+        )
+
+def run_worker(
+    batch_run_id: int,
+    queue: Optional[PartitionQueue] = None,
+    work: Optional[Callable[[Partition], Dict[str, int]]] = None,
+    poll_interval: Optional[float] = None,
+    delta: Optional[bool] = None,
+) -> Dict[str, int]:
+    """Claim and price partitions of a batch until none are left; returns this worker's counts."""
+    queue = queue or PartitionQueue(batch_run_id)
+    if work is None:
+        _check_model_version(batch_run_id)
+
+        def work(partition: Partition) -> Dict[str, int]:
+            return price_skus(load_batch_targets(partition), batch_run_id=batch_run_id, delta=delta)
+
+    poll_interval = poll_interval if poll_interval is not None else Config.BATCH_WORKER_POLL_SEC
+    totals = {"priced": 0, "skipped": 0, "unchanged": 0, "partitions": 0}
+
+    while True:
+        lease = queue.claim()
+        if lease is None:
+            if queue.finished():
+                break
+            # Others hold the remaining leases; wait in case one expires
+            time.sleep(poll_interval)
+            continue
+        logger.info("Worker %s pricing partition %s of batch %s", queue.owner, lease.partition, batch_run_id)
+        with _Heartbeat(queue, lease, interval=queue.lease_seconds / 3) as hb:
+            try:
+                counts = work(lease.partition)
+            except Exception as e:
+                logger.exception("Partition %s of batch %s failed", lease.partition, batch_run_id)
+                queue.release(lease, repr(e))
+                continue
+        if hb.lost.is_set() or not queue.complete(lease, counts):
+            # Another worker has it now; its counts are the ones recorded
+            logger.warning("Partition %s of batch %s finished after losing its lease", lease.partition, batch_run_id)
+            continue
+        totals["priced"] += counts.get("priced", 0)
+        totals["skipped"] += counts.get("skipped", 0)
+        totals["unchanged"] += counts.get("unchanged", 0)
+        totals["partitions"] += 1
+
+    logger.info("Worker %s done with batch %s: %s", queue.owner, batch_run_id, totals)
+    return totals
+
+def open_distributed_batch(partition_count: Optional[int] = None) -> int:
+    """Open a batch run and queue its partitions; returns the batch run id."""
+    partition_count = partition_count or Config.BATCH_QUEUE_PARTITIONS
+    run_id = start_batch_run()
+    try:
+        PartitionQueue(run_id).enqueue(partition_count)
+    except Exception:
+        finish_batch_run(run_id, {}, status="FAILED")
+        raise
+    logger.info("Queued %d partitions for batch run %s", partition_count, run_id)
+    return run_id
+
+def wait_for_batch(batch_run_id: int, poll_interval: Optional[float] = None) -> Dict[str, int]:
+    """Block until every partition is DONE or FAILED, then close the batch run."""
+    queue = PartitionQueue(batch_run_id)
+    poll_interval = poll_interval if poll_interval is not None else Config.BATCH_WORKER_POLL_SEC
+    while True:
+        queue.fail_exhausted_leases()
+        progress = queue.progress()
+        if progress[PENDING] == 0 and progress[LEASED] == 0:
+            break
+        logger.info("Batch %s progress: %s", batch_run_id, progress)
+        time.sleep(poll_interval)
+    status = "COMPLETE" if progress[FAILED] == 0 else "FAILED"
+    # Marking the run COMPLETE is what lets API workers pick it up
+    finish_batch_run(batch_run_id, progress, status=status)
+    logger.info("Distributed batch %s %s: %s", batch_run_id, status, progress)
+    return progress
@@ -0,0 +1,165 @@
+"""Optimizer inputs: latest features, vendor rules and elasticity per SKU.
+
+Each input has its own TTL cache. On a miss the three are read together in
+one round trip: the latest feature row LEFT JOINed with vendor_rules and
+elasticity_coeffs, for one sku/vendor or a list of them. If that read fails
+with DatabaseUnavailable, the last known (expired) entries are served
+instead, flagged `stale`.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.config import Config
+from app.db import DatabaseUnavailable, fetch_all
+from app.utils.cache import MISSING, TTLCache
+
+SkuKey = Tuple[str, str]
+
+_RULE_COLS = ("min_margin_pct", "max_discount_pct", "max_daily_price_move_pct")
+_ELASTICITY_COLS = ("elasticity", "r2", "p_value_price", "n_obs")
+
+_JOINED_COLS = """
+    f.*,
+    vr.sku AS vr_sku,
+    vr.min_margin_pct AS vr_min_margin_pct,
+    vr.max_discount_pct AS vr_max_discount_pct,
+    vr.max_daily_price_move_pct AS vr_max_daily_price_move_pct,
+    ec.sku AS ec_sku,
+    ec.elasticity AS ec_elasticity,
+    ec.r2 AS ec_r2,
+    ec.p_value_price AS ec_p_value_price,
+    ec.n_obs AS ec_n_obs
+"""
+
+_JOINS = """
+    LEFT JOIN vendor_rules vr ON vr.sku = f.sku AND vr.vendor_id = f.vendor_id
+    LEFT JOIN elasticity_coeffs ec ON ec.sku = f.sku AND ec.vendor_id = f.vendor_id
+"""
+
+PRICING_INPUTS_SQL = f"""
+    SELECT {_JOINED_COLS}
+    FROM sku_features_daily f
+    {_JOINS}
+    WHERE f.sku = %s AND f.vendor_id = %s
+    ORDER BY f.date DESC
+    LIMIT 1
+"""
+
+def pricing_inputs_many_sql(n_keys: int) -> str:
+    placeholders = ", ".join(["(%s, %s)"] * n_keys)
+    return f"""
+        SELECT {_JOINED_COLS}
+        FROM (
+            SELECT sku, vendor_id, MAX(date) AS max_date
+            FROM sku_features_daily
+            WHERE (sku, vendor_id) IN ({placeholders})
+            GROUP BY sku, vendor_id
+        ) latest
+        JOIN sku_features_daily f
+            ON f.sku = latest.sku AND f.vendor_id = latest.vendor_id AND f.date = latest.max_date
+        {_JOINS}
+    """
+
+@dataclass
+class PricingInputs:
+    features: Optional[Dict[str, Any]]
+    vendor_rules: Optional[Dict[str, Any]] = None
+    # Rows in the shape ELASTICITY_SQL returns; empty means "use the default"
+    elasticity_rows: List[Dict[str, Any]] = field(default_factory=list)
+    # Served from expired cache entries because the database was unavailable
+    stale: bool = False
+
+feature_cache = TTLCache("features", Config.INPUT_CACHE_SIZE, Config.FEATURE_CACHE_TTL_SEC)
+rules_cache = TTLCache("vendor_rules", Config.INPUT_CACHE_SIZE, Config.RULES_CACHE_TTL_SEC)
+elasticity_cache = TTLCache("elasticity", Config.INPUT_CACHE_SIZE, Config.ELASTICITY_CACHE_TTL_SEC)
+
+def split_joined_row(row: Dict[str, Any]) -> PricingInputs:
+    """Split a row of the joined query back into its three inputs."""
+    features = {k: v for k, v in row.items() if not k.startswith(("vr_", "ec_"))}
+    rules = None
+    if row.get("vr_sku") is not None:
+        rules = {"sku": features["sku"], "vendor_id": features["vendor_id"]}
+        rules.update({c: row[f"vr_{c}"] for c in _RULE_COLS})
+    elasticity_rows = []
+    if row.get("ec_sku") is not None:
+        elasticity_rows = [{c: row[f"ec_{c}"] for c in _ELASTICITY_COLS}]
+    return PricingInputs(features, rules, elasticity_rows)
+
+def cache_pricing_inputs(key: SkuKey, inputs: PricingInputs):
+    feature_cache.set(key, inputs.features)
+    if inputs.features is not None:
+        # Without a feature row the joined query says nothing about the others
+        rules_cache.set(key, inputs.vendor_rules)
+        elasticity_cache.set(key, inputs.elasticity_rows)
+
+def cached_pricing_inputs(key: SkuKey) -> Optional[PricingInputs]:
+    """All three inputs from cache, or None if any of them misses."""
+    features = feature_cache.get(key)
+    if features is MISSING:
+        return None
+    if features is None:
+        return PricingInputs(None)
+    rules = rules_cache.get(key)
+    elasticity_rows = elasticity_cache.get(key)
+    if rules is MISSING or elasticity_rows is MISSING:
+        return None
+    return PricingInputs(features, rules, elasticity_rows)
+
+def last_known_pricing_inputs(key: SkuKey) -> Optional[PricingInputs]:
+    """Cached inputs for `key` ignoring expiry, flagged stale; None if any was never cached."""
+    features = feature_cache.get_stale(key)
+    if features is MISSING:
+        return None
+    if features is None:
+        return PricingInputs(None, stale=True)
+    rules = rules_cache.get_stale(key)
+    elasticity_rows = elasticity_cache.get_stale(key)
+    if rules is MISSING or elasticity_rows is MISSING:
+        return None
+    return PricingInputs(features, rules, elasticity_rows, stale=True)
+
+def fetch_pricing_inputs(sku: str, vendor_id: str) -> PricingInputs:
+    rows = fetch_all(PRICING_INPUTS_SQL, (sku, vendor_id))
+    return split_joined_row(rows[0]) if rows else PricingInputs(None)
+
+def fetch_pricing_inputs_many(keys: Sequence[SkuKey]) -> Dict[SkuKey, PricingInputs]:
+    """Joined inputs for many sku/vendor pairs; pairs without features map to empty inputs."""
+    out: Dict[SkuKey, PricingInputs] = {}
+    if not keys:
+        return out
+    params: List[Any] = []
+    for sku, vendor_id in keys:
+        params.extend((sku, vendor_id))
+    for row in fetch_all(pricing_inputs_many_sql(len(keys)), tuple(params)):
+        out[(row["sku"], row["vendor_id"])] = split_joined_row(row)
+    for key in keys:
+        out.setdefault(key, PricingInputs(None))
+    return out
+
+def get_pricing_inputs(sku: str, vendor_id: str) -> PricingInputs:
+    key = (sku, vendor_id)
+    inputs = cached_pricing_inputs(key)
+    if inputs is None:
+        try:
+            inputs = fetch_pricing_inputs(sku, vendor_id)
+        except DatabaseUnavailable:
+            inputs = last_known_pricing_inputs(key)
+            if inputs is None:
+                raise
+            return inputs
+        cache_pricing_inputs(key, inputs)
+    return inputs
+
+def prefetch_pricing_inputs(keys: Iterable[SkuKey], chunk_size: Optional[int] = None):
+    """Fill the caches for every key that misses, one joined query per chunk."""
+    chunk_size = chunk_size or Config.INPUT_PREFETCH_CHUNK
+    missing = [k for k in dict.fromkeys(keys) if cached_pricing_inputs(k) is None]
+    for i in range(0, len(missing), chunk_size):
+        chunk = missing[i : i + chunk_size]
+        for key, inputs in fetch_pricing_inputs_many(chunk).items():
+            cache_pricing_inputs(key, inputs)
+
+def clear_input_caches():
+    feature_cache.clear()
+    rules_cache.clear()
+    elasticity_cache.clear()
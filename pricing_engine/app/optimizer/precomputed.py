@@ -0,0 +1,238 @@
+"""In-memory index of the latest batch run's suggestions.
+
+When Config.SERVE_PRECOMPUTED is set, API workers load every suggestion of
+the newest COMPLETE batch_runs row into a dict keyed by (sku, vendor_id),
+at startup and whenever a newer run appears. A lookup is one dict access
+plus a check that the SKU's inputs (served from the input caches) still
+have the content fingerprint the batch priced them with. SKUs missing from
+the batch or whose features, vendor rules or elasticity changed since, and
+a whole index that is too old or was built with a different demand model,
+fall back to live optimization.
+
+The per-hit input read is deliberate. Vendor rules and elasticity change
+between batch runs without a new feature date, so invalidating on
+batch_runs or the feature date alone would keep serving prices the rules
+no longer allow. A hit costs an input-cache read (the caches are warmed
+before fork), or on a miss the one joined inputs query a live suggestion
+would make anyway; what it saves is the optimization and the writes.
+"""
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import Config
+from app.db import DatabaseUnavailable, fetch_all
+from app.models.demand_model import get_demand_model_version
+from app.optimizer.inputs import PricingInputs, get_pricing_inputs
+from app.optimizer.suggestions import content_fingerprint, fingerprint_for_inputs
+from app.utils.logging_utils import get_logger
+from app.utils.metrics import registry
+
+logger = get_logger(__name__)
+
+LATEST_BATCH_RUN_SQL = """
+    SELECT id, model_version, finished_at
+    FROM batch_runs
+    WHERE status = 'COMPLETE'
+    ORDER BY id DESC
+    LIMIT 1
+"""
+
+BATCH_SUGGESTIONS_SQL = """
+    SELECT ps.id, ps.sku, ps.vendor_id, ps.current_price, ps.suggested_price, ps.expected_revenue,
+           ps.expected_profit, ps.elasticity, ps.confidence, ps.reason, ps.input_fingerprint,
+           ps.content_fingerprint
+    FROM price_suggestions ps
+    WHERE ps.batch_run_id = %s AND ps.input_fingerprint IS NOT NULL
+"""
+
+SUGGESTIONS_SERVED = registry.counter(
+    "price_suggestions_served_total",
+    "Suggestions served by source (precomputed batch index or live optimization)",
+    labelnames=("source",),
+)
+STALE_ENTRIES = registry.counter(
+    "precomputed_stale_entries_total", "Precomputed suggestions skipped because the SKU's inputs changed"
+)
+
+@dataclass(frozen=True)
+class PrecomputedSuggestion:
+    # Kept as a flat record rather than the response dict: ~100k of these live per worker
+    suggestion_id: int
+    sku: str
+    current_price: float
+    suggested_price: float
+    expected_revenue: float
+    expected_profit: float
+    elasticity: float
+    confidence: float
+    reason: str
+    fingerprint: str
+    # Of the inputs the batch priced with; None for rows recorded before it was tracked
+    content_fingerprint: Optional[str] = None
+
+    def matches(self, vendor_id: str, inputs: PricingInputs) -> bool:
+        """Whether `inputs` (the SKU's current ones) are what the batch priced."""
+        if self.content_fingerprint is None:
+            return fingerprint_for_inputs(self.sku, vendor_id, inputs) == self.fingerprint
+        return content_fingerprint(inputs) == self.content_fingerprint
+
+    def response(self) -> Dict[str, Any]:
+        return {
+            "suggestion_id": self.suggestion_id,
+            "sku": self.sku,
+            "current_price": self.current_price,
+            "suggested_price": self.suggested_price,
+            "expected_revenue": self.expected_revenue,
+            "expected_profit": self.expected_profit,
+            "elasticity": self.elasticity,
+            "confidence": self.confidence,
+            "reason": self.reason,
+            "actions": ["accept", "reject", "custom_price"],
+        }
+
+class PrecomputedIndex:
+    def __init__(self, max_age_sec: float):
+        self.max_age_sec = max_age_sec
+        self.run_id: Optional[int] = None
+        self.finished_at: Optional[datetime] = None
+        self.usable = False
+        self._entries: Dict[Tuple[str, str], PrecomputedSuggestion] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def age_seconds(self) -> float:
+        if self.finished_at is None:
+            return float("inf")
+        return (datetime.now() - self.finished_at).total_seconds()
+
+    def lookup_enabled(self) -> bool:
+        return self.usable and self.age_seconds() <= self.max_age_sec
+
+    def get(self, sku: str, vendor_id: str) -> Optional[PrecomputedSuggestion]:
+        """The batch suggestion, unchecked against current inputs; None if missing or the index is stale."""
+        if not self.lookup_enabled():
+            return None
+        return self._entries.get((sku, vendor_id))
+
+    def validate(
+        self, entry: PrecomputedSuggestion, vendor_id: str, inputs: PricingInputs
+    ) -> Optional[PrecomputedSuggestion]:
+        """`entry` if it was priced from `inputs`, None if they have changed since."""
+        if entry.matches(vendor_id, inputs):
+            return entry
+        STALE_ENTRIES.inc()
+        return None
+
+    def lookup(self, sku: str, vendor_id: str) -> Optional[PrecomputedSuggestion]:
+        """The batch suggestion, or None if missing, its inputs changed or the index is stale.
+
+        Reads the SKU's current inputs on every hit (see the module docstring).
+        """
+        entry = self.get(sku, vendor_id)
+        if entry is None:
+            return None
+        try:
+            inputs = get_pricing_inputs(sku, vendor_id)
+        except DatabaseUnavailable:
+            # Nothing cached to compare with; the batch price beats no price
+            return entry
+        return self.validate(entry, vendor_id, inputs)
+
+    def refresh(self) -> bool:
+        """Load the latest complete batch run if it is newer than the one held."""
+        rows = fetch_all(LATEST_BATCH_RUN_SQL)
+        if not rows or rows[0]["id"] == self.run_id:
+            return False
+        run = rows[0]
+        reasons: Dict[str, str] = {}
+        entries = {}
+        for r in fetch_all(BATCH_SUGGESTIONS_SQL, (run["id"],)):
+            reason = reasons.setdefault(r["reason"], r["reason"])
+            entries[(r["sku"], r["vendor_id"])] = PrecomputedSuggestion(
+                suggestion_id=int(r["id"]),
+                sku=r["sku"],
+                current_price=float(r["current_price"]),
+                suggested_price=float(r["suggested_price"]),
+                expected_revenue=float(r["expected_revenue"]),
+                expected_profit=float(r["expected_profit"]),
+                elasticity=float(r["elasticity"]),
+                confidence=float(r["confidence"]),
+                reason=reason,
+                fingerprint=r["input_fingerprint"],
+                content_fingerprint=r["content_fingerprint"],
+            )
+        try:
+            usable = run["model_version"] == get_demand_model_version()
+        except Exception as e:
+            logger.error("Cannot compare batch model version: %s", e)
+            usable = False
+        if not usable:
+            logger.warning(
+                "Batch run %s used model %s, serving live instead", run["id"], run["model_version"]
+            )
+        # Swap in one assignment each; lookups never see a half-built index
+        self._entries = entries
+        self.run_id = run["id"]
+        self.finished_at = run["finished_at"]
+        self.usable = usable
+        logger.info("Loaded %d precomputed suggestions from batch run %s", len(entries), self.run_id)
+        return True
+
+    def _refresh_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Precomputed index refresh failed: %s", e)
+
+    def start(self, interval: Optional[float] = None):
+        """Load now, then poll for newer batch runs in a daemon thread."""
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error("Initial precomputed index load failed: %s", e)
+        if self._thread is None:
+            self._stop.clear()
+            self._start_thread(interval)
+
+    def restart_after_fork(self, interval: Optional[float] = None):
+        """Restart polling in a forked worker; the index itself is inherited."""
+        self._thread = None
+        self._stop = threading.Event()
+        self._start_thread(interval)
+
+    def _start_thread(self, interval: Optional[float]):
+        self._thread = threading.Thread(
+            target=self._refresh_loop,
+            args=(interval or Config.PRECOMPUTED_REFRESH_SEC,),
+            name="precomputed-refresh",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+precomputed_index = PrecomputedIndex(Config.PRECOMPUTED_MAX_AGE_SEC)
+
+registry.gauge_callback("precomputed_index_size", "Suggestions held in the precomputed index", precomputed_index.__len__)
+registry.gauge_callback(
+    "precomputed_index_age_seconds",
+    "Seconds since the indexed batch run finished",
+    lambda: precomputed_index.age_seconds() if precomputed_index.finished_at else -1,
+)
+registry.gauge_callback(
+    "precomputed_index_usable", "1 if the index is fresh and matches the loaded model",
+    lambda: 1 if precomputed_index.lookup_enabled() else 0,
+)
+registry.gauge_callback(
+    "precomputed_index_batch_run_id", "batch_runs.id currently indexed", lambda: precomputed_index.run_id or 0
+)
@@ -1,3 +1,4 @@
+import json
 from dataclasses import dataclass
 from typing import Dict, Any, Optional, Tuple, List
 
@@ -5,11 +6,13 @@ import numpy as np
 import pandas as pd
 
 from app.config import Config
-from app.db import fetch_all, execute_query
-from app.features.store import get_latest_features_for_sku
-from app.models.elasticity import get_elasticity_for_sku
+from app.db import execute_query, execute_insert
+from app.feedback.suggestion_index import recent_suggestions
+from app.models.elasticity import elasticity_from_rows
 from app.models.demand_model import predict_demand
+from app.optimizer.inputs import PricingInputs, get_pricing_inputs
 from app.utils.logging_utils import get_logger
+from app.utils.metrics import stage_timer
 
 logger = get_logger(__name__)
 
@@ -25,15 +28,37 @@ class OptimizationResult:
     confidence: float
     reason: str
 
-def _get_vendor_rules(sku: str, vendor_id: str) -> Optional[Dict[str, Any]]:
-    sql = """
-        SELECT *
-        FROM vendor_rules
-        WHERE sku = %s AND vendor_id = %s
-        LIMIT 1
-    """
-    rows = fetch_all(sql, (sku, vendor_id))
-    return rows[0] if rows else None
+DEFAULT_VENDOR_RULES = {
+    "min_margin_pct": 10.0,
+    "max_discount_pct": 50.0,
+    "max_daily_price_move_pct": 20.0,
+}
+
+FEATURE_COLS = [
+    "avg_daily_sales_30d",
+    "last_price",
+    "current_price",
+    "inventory",
+    "views_7d",
+    "views_30d",
+    "add_to_cart_7d",
+    "conv_rate_7d",
+    "promo_flag",
+    "ageing_days",
+    "restock_eta_days",
+    "cost_price",
+    "base_price",
+]
+
+@dataclass
+class CandidateSet:
+    """Feasible price points for one SKU, ready for demand prediction."""
+    sku: str
+    vendor_id: str
+    current_price: float
+    cost_price: float
+    stock: int
+    frame: pd.DataFrame
 
 def _confidence_from_metrics(elasticity_metrics: Dict[str, Any], demand_metrics: Optional[Dict[str, Any]] = None) -> float:
     r2 = elasticity_metrics.get("r2", 0.0)
@@ -41,30 +66,29 @@ def _confidence_from_metrics(elasticity_metrics: Dict[str, Any], demand_metrics:
     base_conf = min(1.0, max(0.1, r2 + min(0.5, n_obs / 1000.0)))
     return float(base_conf)
 
-def optimize_price_for_sku(sku: str, vendor_id: str) -> Optional[OptimizationResult]:
-    feat = get_latest_features_for_sku(sku, vendor_id)
+def has_stock(sku: str, vendor_id: str, feat: Optional[Dict[str, Any]]) -> bool:
     if not feat:
-        logger.warning(f"No features for sku={sku}, vendor_id={vendor_id}")
-        return None
+        logger.warning("No features for sku=%s, vendor_id=%s", sku, vendor_id)
+        return False
+    if int(feat.get("inventory", 0) or 0) <= 0:
+        logger.info("Zero stock for sku=%s, vendor_id=%s, skipping", sku, vendor_id)
+        return False
+    return True
 
-    stock = int(feat.get("inventory", 0) or 0)
-    if stock <= 0:
-        logger.info(f"Zero stock for sku={sku}, vendor_id={vendor_id}, skipping")
-        return None
+_PRICE_COL = FEATURE_COLS.index("current_price")
+_INVENTORY_COL = FEATURE_COLS.index("inventory")
+_PROMO_COL = FEATURE_COLS.index("promo_flag")
+_SALES_30D_COL = FEATURE_COLS.index("avg_daily_sales_30d")
+
+def feature_vector(feat: Dict[str, Any]) -> np.ndarray:
+    return np.array([float(feat.get(c, 0) or 0) for c in FEATURE_COLS])
 
+def price_limits(feat: Dict[str, Any], vendor_rules: Dict[str, Any]) -> Tuple[float, float, float]:
+    """(lowest, highest) price the optimizer searches and the minimum margin fraction."""
     current_price = float(feat["current_price"])
     cost_price = float(feat.get("cost_price", 0) or 0)
     base_price = float(feat.get("base_price", current_price) or current_price)
 
-    vendor_rules = _get_vendor_rules(sku, vendor_id)
-    if not vendor_rules:
-        logger.warning(f"No vendor rules for sku={sku}, vendor_id={vendor_id}, using defaults")
-        vendor_rules = {
-            "min_margin_pct": 10.0,
-            "max_discount_pct": 50.0,
-            "max_daily_price_move_pct": 20.0,
-        }
-
     min_margin_pct = float(vendor_rules["min_margin_pct"]) / 100.0
     max_discount_pct = float(vendor_rules["max_discount_pct"]) / 100.0
     max_daily_move_pct = float(vendor_rules["max_daily_price_move_pct"]) / 100.0
@@ -76,71 +100,81 @@ def optimize_price_for_sku(sku: str, vendor_id: str) -> Optional[OptimizationRes
     )
     upper = current_price * (1 + max_daily_move_pct)
     lower = max(lower, 0.01)
+    return lower * Config.PRICE_RANGE_LOWER, upper * Config.PRICE_RANGE_UPPER, min_margin_pct
 
-    price_grid = np.linspace(
-        lower * Config.PRICE_RANGE_LOWER,
-        upper * Config.PRICE_RANGE_UPPER,
-        Config.PRICE_GRID_STEPS,
-    )
+def candidate_frame(base: np.ndarray, prices: np.ndarray) -> pd.DataFrame:
+    """Demand model rows for every (SKU, price) pair.
+
+    `base` holds one feature_vector per SKU, `prices` one row of candidate
+    prices per SKU; rows come out SKU-major, so predictions reshape back to
+    `prices.shape`.
+    """
+    n_prices = prices.shape[1]
+    X = np.repeat(np.atleast_2d(base), n_prices, axis=0)
+    X[:, _PRICE_COL] = prices.ravel()
+    stock = np.trunc(X[:, _INVENTORY_COL])
+    X[:, _INVENTORY_COL] = stock
+    # Stock heuristics: no promo when almost out of stock, promo to clear slow overstock
+    X[stock < 5, _PROMO_COL] = 0
+    X[(stock > 100) & (X[:, _SALES_30D_COL] < 1), _PROMO_COL] = 1
+    return pd.DataFrame(X, columns=FEATURE_COLS)
+
+def build_candidates(
+    sku: str,
+    vendor_id: str,
+    feat: Dict[str, Any],
+    vendor_rules: Optional[Dict[str, Any]],
+) -> Optional[CandidateSet]:
+    """Price grid within vendor rules and margin limits; no I/O."""
+    stock = int(feat.get("inventory", 0) or 0)
+    current_price = float(feat["current_price"])
+    cost_price = float(feat.get("cost_price", 0) or 0)
+
+    if not vendor_rules:
+        logger.warning("No vendor rules for sku=%s, vendor_id=%s, using defaults", sku, vendor_id)
+        vendor_rules = DEFAULT_VENDOR_RULES
+
+    lower, upper, min_margin_pct = price_limits(feat, vendor_rules)
+    price_grid = np.linspace(lower, upper, Config.PRICE_GRID_STEPS)
     price_grid = np.unique(np.round(price_grid, 2))
 
-    # Base feature vector
-    feature_cols = [
-        "avg_daily_sales_30d",
-        "last_price",
-        "current_price",
-        "inventory",
-        "views_7d",
-        "views_30d",
-        "add_to_cart_7d",
-        "conv_rate_7d",
-        "promo_flag",
-        "ageing_days",
-        "restock_eta_days",
-        "cost_price",
-        "base_price",
-    ]
-    base_vec = {c: float(feat.get(c, 0) or 0) for c in feature_cols}
-
-    candidate_rows: List[Dict[str, Any]] = []
-    for p in price_grid:
-        # Margin constraint: (p - cost_price)/p >= min_margin_pct
-        if p <= cost_price:
-            continue
-        margin_pct = (p - cost_price) / p
-        if margin_pct < min_margin_pct:
-            continue
-
-        row = base_vec.copy()
-        row["current_price"] = p
-
-        # Stock-based heuristics
-        if stock < 5:
-            row["promo_flag"] = 0  # avoid super low prices when almost out-of-stock
-        elif stock > 100 and base_vec.get("avg_daily_sales_30d", 0) < 1:
-            row["promo_flag"] = 1  # encourage clearance
-
-        row["inventory"] = stock
-        candidate_rows.append(row)
-
-    if not candidate_rows:
-        logger.warning(f"No valid candidates for sku={sku}, vendor_id={vendor_id}")
+    # Margin constraint: (p - cost_price)/p >= min_margin_pct
+    price_grid = price_grid[price_grid > cost_price]
+    price_grid = price_grid[(price_grid - cost_price) / price_grid >= min_margin_pct]
+
+    if not len(price_grid):
+        logger.warning("No valid candidates for sku=%s, vendor_id=%s", sku, vendor_id)
         return None
 
-    df_candidates = pd.DataFrame(candidate_rows)
-    q_pred = predict_demand(df_candidates)
-    prices = df_candidates["current_price"].values
+    return CandidateSet(
+        sku=sku,
+        vendor_id=vendor_id,
+        current_price=current_price,
+        cost_price=cost_price,
+        stock=stock,
+        frame=candidate_frame(feature_vector(feat), price_grid[np.newaxis, :]),
+    )
+
+def choose_price(
+    candidates: CandidateSet,
+    q_pred: np.ndarray,
+    elasticity: float,
+    el_metrics: Dict[str, Any],
+) -> OptimizationResult:
+    """Pick the profit-maximizing candidate given predicted demand."""
+    prices = candidates.frame["current_price"].values
     revenue = prices * q_pred
-    profit = (prices - cost_price) * q_pred
+    profit = (prices - candidates.cost_price) * q_pred
 
     best_idx = int(np.argmax(profit))
     optimal_price = float(prices[best_idx])
     expected_revenue = float(revenue[best_idx])
     expected_profit = float(profit[best_idx])
 
-    elasticity, el_metrics = get_elasticity_for_sku(sku, vendor_id)
     confidence = _confidence_from_metrics(el_metrics)
 
+    stock = candidates.stock
+    current_price = candidates.current_price
     reason = "Optimized for profit given inventory and vendor rules."
     if stock > 100 and expected_profit > 0 and optimal_price < current_price:
         reason = "High stock + low demand: lowering price to stimulate sales."
@@ -148,8 +182,8 @@ def optimize_price_for_sku(sku: str, vendor_id: str) -> Optional[OptimizationRes
         reason = "Low stock: increasing price slightly to throttle demand."
 
     return OptimizationResult(
-        sku=sku,
-        vendor_id=vendor_id,
+        sku=candidates.sku,
+        vendor_id=candidates.vendor_id,
         current_price=current_price,
         optimal_price=optimal_price,
         expected_revenue=expected_revenue,
@@ -159,31 +193,118 @@ def optimize_price_for_sku(sku: str, vendor_id: str) -> Optional[OptimizationRes
         reason=reason,
     )
 
-def persist_optimization_result(result: OptimizationResult) -> int:
-    sql = """
-        INSERT INTO price_suggestions
-            (sku, vendor_id, suggestion_date, current_price, suggested_price,
-             expected_revenue, expected_profit, elasticity, confidence, reason,
-             status, created_at)
-        VALUES (%s, %s, CURDATE(), %s, %s, %s, %s, %s, %s, %s, 'PENDING', NOW())
-    """
-    execute_query(
-        sql,
-        (
-            result.sku,
-            result.vendor_id,
-            result.current_price,
-            result.optimal_price,
-            result.expected_revenue,
-            result.expected_profit,
-            result.elasticity,
-            result.confidence,
-            result.reason,
-        ),
+def optimize_price_for_sku(sku: str, vendor_id: str) -> Optional[OptimizationResult]:
+    with stage_timer("inputs"):
+        inputs = get_pricing_inputs(sku, vendor_id)
+    return optimize_price_for_inputs(sku, vendor_id, inputs)
+
+def optimize_price_for_inputs(sku: str, vendor_id: str, inputs: PricingInputs) -> Optional[OptimizationResult]:
+    feat = inputs.features
+    if not has_stock(sku, vendor_id, feat):
+        return None
+
+    candidates = build_candidates(sku, vendor_id, feat, inputs.vendor_rules)
+    if candidates is None:
+        return None
+
+    with stage_timer("predict_demand"):
+        q_pred = predict_demand(candidates.frame)
+
+    elasticity, el_metrics = elasticity_from_rows(sku, vendor_id, inputs.elasticity_rows)
+    return choose_price(candidates, q_pred, elasticity, el_metrics)
+
+SUGGESTION_INSERT_SQL = """
+    INSERT INTO price_suggestions
+        (sku, vendor_id, suggestion_date, current_price, suggested_price,
+         expected_revenue, expected_profit, elasticity, confidence, reason,
+         status, input_fingerprint, batch_run_id, content_fingerprint, created_at)
+    VALUES (%s, %s, CURDATE(), %s, %s, %s, %s, %s, %s, %s, 'PENDING', %s, %s, %s, NOW())
+"""
+
+# MySQL JSON_OBJECT with parameters is messy, just stringify
+PREDICTION_LOG_SQL = """
+    INSERT INTO prediction_logs
+        (sku, vendor_id, suggestion_id, model_type,
+         input_features_json, output_json, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, NOW())
+"""
+
+def suggestion_params(
+    result: OptimizationResult,
+    input_fingerprint: Optional[str] = None,
+    batch_run_id: Optional[int] = None,
+) -> Tuple[Any, ...]:
+    return (
+        result.sku,
+        result.vendor_id,
+        result.current_price,
+        result.optimal_price,
+        result.expected_revenue,
+        result.expected_profit,
+        result.elasticity,
+        result.confidence,
+        result.reason,
+        input_fingerprint,
+        batch_run_id,
     )
-    # get last insert id
-    row = fetch_all("SELECT LAST_INSERT_ID() AS id", ())
-    return int(row[0]["id"]) if row else 0
+
+def prediction_log_payload(result: OptimizationResult) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(input_features, output) logged for an optimizer suggestion; only key features."""
+    input_features = {
+        "sku": result.sku,
+        "vendor_id": result.vendor_id,
+        "current_price": result.current_price,
+    }
+    output = {
+        "optimal_price": result.optimal_price,
+        "expected_revenue": result.expected_revenue,
+        "expected_profit": result.expected_profit,
+    }
+    return input_features, output
+
+def prediction_log_params(
+    sku: str,
+    vendor_id: str,
+    suggestion_id: int,
+    model_type: str,
+    input_features: Dict[str, Any],
+    output: Dict[str, Any],
+) -> Tuple[Any, ...]:
+    return (
+        sku,
+        vendor_id,
+        suggestion_id,
+        model_type,
+        json.dumps(input_features),
+        json.dumps(output),
+    )
+
+def suggestion_response(result: OptimizationResult, suggestion_id: int) -> Dict[str, Any]:
+    return {
+        "suggestion_id": suggestion_id,
+        "sku": result.sku,
+        "current_price": result.current_price,
+        "suggested_price": result.optimal_price,
+        "expected_revenue": result.expected_revenue,
+        "expected_profit": result.expected_profit,
+        "elasticity": result.elasticity,
+        "confidence": result.confidence,
+        "reason": result.reason,
+        "actions": ["accept", "reject", "custom_price"],
+    }
+
+def persist_optimization_result(
+    result: OptimizationResult,
+    input_fingerprint: Optional[str] = None,
+    batch_run_id: Optional[int] = None,
+    content_fingerprint: Optional[str] = None,
+) -> int:
+    suggestion_id = execute_insert(
+        SUGGESTION_INSERT_SQL,
+        suggestion_params(result, input_fingerprint, batch_run_id) + (content_fingerprint,),
+    )
+    recent_suggestions.record(result.sku, result.vendor_id, result.optimal_price, suggestion_id)
+    return suggestion_id
 
 def log_prediction(
     sku: str,
@@ -193,28 +314,7 @@ def log_prediction(
     input_features: Dict[str, Any],
     output: Dict[str, Any],
 ):
-    sql = """
-        INSERT INTO prediction_logs
-            (sku, vendor_id, suggestion_id, model_type,
-             input_features_json, output_json, created_at)
-        VALUES (%s, %s, %s, %s, JSON_OBJECT(), JSON_OBJECT(), NOW())
-    """
-    # MySQL JSON_OBJECT with parameters is messy, just stringify
-    import json
-    sql = """
-        INSERT INTO prediction_logs
-            (sku, vendor_id, suggestion_id, model_type,
-             input_features_json, output_json, created_at)
-        VALUES (%s, %s, %s, %s, %s, %s, NOW())
-    """
     execute_query(
-        sql,
-        (
-            sku,
-            vendor_id,
-            suggestion_id,
-            model_type,
-            json.dumps(input_features),
-            json.dumps(output),
-        ),
+        PREDICTION_LOG_SQL,
+        prediction_log_params(sku, vendor_id, suggestion_id, model_type, input_features, output),
     )
@@ -0,0 +1,194 @@
+"""What-if price simulation: demand, revenue and profit curves per SKU.
+
+A scenario is a list of price moves in percent of each SKU's current price
+(0 is always included as the baseline). Targets are processed in chunks of
+Config.SIMULATION_CHUNK: inputs are prefetched with one joined query, the
+candidate rows of the whole chunk go through predict_demand in one call, and
+results are yielded per SKU, so memory is bounded by the chunk, not the
+catalog. A final summary line carries per-move totals across all SKUs.
+"""
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import Config
+from app.db import fetch_all
+from app.models.demand_model import predict_demand
+from app.optimizer.batch import chunked
+from app.optimizer.inputs import get_pricing_inputs, prefetch_pricing_inputs
+from app.optimizer.price_optimizer import (
+    DEFAULT_VENDOR_RULES,
+    candidate_frame,
+    feature_vector,
+    price_limits,
+)
+from app.utils.metrics import stage_timer
+
+@dataclass
+class Scenario:
+    moves_pct: List[float]
+
+    @property
+    def multipliers(self) -> np.ndarray:
+        return 1.0 + np.asarray(self.moves_pct) / 100.0
+
+def load_vendor_targets(vendor_id: str) -> List[Dict[str, Any]]:
+    """sku/vendor pairs of one vendor in the latest sku_features_daily date."""
+    sql = """
+        SELECT DISTINCT sku, vendor_id
+        FROM sku_features_daily
+        WHERE vendor_id = %s AND date = (SELECT MAX(date) FROM sku_features_daily)
+    """
+    return fetch_all(sql, (vendor_id,))
+
+def parse_scenario(data: Any) -> Tuple[Optional[Scenario], Optional[str]]:
+    """Scenario from `moves_pct: [...]` or `range_pct: {from, to, steps}`."""
+    if "moves_pct" in data:
+        moves = data["moves_pct"]
+        if not isinstance(moves, list) or not moves:
+            return None, "moves_pct must be a non-empty list"
+        try:
+            moves = [float(m) for m in moves]
+        except (TypeError, ValueError):
+            return None, "moves_pct must contain numbers"
+    elif "range_pct" in data:
+        r = data["range_pct"]
+        try:
+            lo, hi, steps = float(r["from"]), float(r["to"]), int(r.get("steps", 21))
+        except (KeyError, TypeError, ValueError):
+            return None, "range_pct needs numeric from, to and steps"
+        if steps < 2 or lo >= hi:
+            return None, "range_pct needs from < to and steps >= 2"
+        if steps > Config.SIMULATION_MAX_POINTS:
+            return None, f"At most {Config.SIMULATION_MAX_POINTS} price points per SKU"
+        moves = np.linspace(lo, hi, steps).tolist()
+    else:
+        return None, "moves_pct or range_pct is required"
+
+    moves = sorted({round(m, 4) for m in moves} | {0.0})
+    if len(moves) > Config.SIMULATION_MAX_POINTS:
+        return None, f"At most {Config.SIMULATION_MAX_POINTS} price points per SKU"
+    if moves[0] <= -100:
+        return None, "Price moves must be above -100%"
+    return Scenario(moves), None
+
+def validate_simulation_request(
+    data: Any,
+) -> Tuple[List[Dict[str, Any]], Optional[Scenario], Optional[Dict[str, Any]]]:
+    """Unpack a simulation body into (targets, scenario, None) or ([], None, error body).
+
+    Targets are either `targets: [{"sku", "vendor_id"}, ...]` or every SKU
+    of `vendor_id`.
+    """
+    if not isinstance(data, dict):
+        return [], None, {"error": "Body must be an object"}
+    scenario, error = parse_scenario(data)
+    if error:
+        return [], None, {"error": error}
+
+    if "targets" in data:
+        targets = data["targets"]
+        if not isinstance(targets, list) or not targets:
+            return [], None, {"error": "targets must be a non-empty list"}
+        bad = [
+            i for i, t in enumerate(targets)
+            if not isinstance(t, dict) or not t.get("sku") or not t.get("vendor_id")
+        ]
+        if bad:
+            return [], None, {"error": "Each target needs sku and vendor_id", "details": bad[:20]}
+    elif data.get("vendor_id"):
+        targets = load_vendor_targets(data["vendor_id"])
+    else:
+        return [], None, {"error": "targets or vendor_id is required"}
+
+    if len(targets) > Config.SIMULATION_MAX_SKUS:
+        return [], None, {"error": f"At most {Config.SIMULATION_MAX_SKUS} SKUs per simulation"}
+    return targets, scenario, None
+
+def _simulate_chunk(chunk: List[Dict[str, Any]], scenario: Scenario) -> Iterator[Dict[str, Any]]:
+    keys = [(t["sku"], t["vendor_id"]) for t in chunk]
+    prefetch_pricing_inputs(keys)
+
+    priced_keys, feats, rules = [], [], []
+    for sku, vendor_id in keys:
+        inputs = get_pricing_inputs(sku, vendor_id)
+        feat = inputs.features
+        if not feat:
+            yield {"sku": sku, "vendor_id": vendor_id, "skipped": "no_features"}
+            continue
+        if int(feat.get("inventory", 0) or 0) <= 0:
+            yield {"sku": sku, "vendor_id": vendor_id, "skipped": "no_stock"}
+            continue
+        priced_keys.append((sku, vendor_id))
+        feats.append(feat)
+        rules.append(inputs.vendor_rules or DEFAULT_VENDOR_RULES)
+    if not feats:
+        return
+
+    current = np.array([float(f["current_price"]) for f in feats])
+    cost = np.array([float(f.get("cost_price", 0) or 0) for f in feats])
+    limits = np.array([price_limits(f, r) for f, r in zip(feats, rules)])
+    prices = np.round(current[:, np.newaxis] * scenario.multipliers, 2)
+
+    with stage_timer("predict_demand"):
+        demand = predict_demand(
+            candidate_frame(np.vstack([feature_vector(f) for f in feats]), prices)
+        ).reshape(prices.shape)
+    revenue = prices * demand
+    profit = (prices - cost[:, np.newaxis]) * demand
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = (prices - cost[:, np.newaxis]) / prices
+    # Same search range and margin floor the optimizer applies
+    feasible = (
+        (prices >= limits[:, [0]]) & (prices <= limits[:, [1]])
+        & (prices > cost[:, np.newaxis]) & (margin >= limits[:, [2]])
+    )
+
+    for i, (sku, vendor_id) in enumerate(priced_keys):
+        yield {
+            "sku": sku,
+            "vendor_id": vendor_id,
+            "current_price": float(current[i]),
+            "cost_price": float(cost[i]),
+            "curve": [
+                {
+                    "move_pct": move,
+                    "price": float(prices[i, j]),
+                    "demand": float(demand[i, j]),
+                    "revenue": float(revenue[i, j]),
+                    "profit": float(profit[i, j]),
+                    "feasible": bool(feasible[i, j]),
+                }
+                for j, move in enumerate(scenario.moves_pct)
+            ],
+        }
+
+def simulate(targets: Iterable[Dict[str, Any]], scenario: Scenario) -> Iterator[Dict[str, Any]]:
+    """Yield one result per target, then {"summary": ...} with per-move totals."""
+    n_moves = len(scenario.moves_pct)
+    totals = {k: np.zeros(n_moves) for k in ("demand", "revenue", "profit")}
+    counts = {"simulated": 0, "skipped": 0}
+    for chunk in chunked(targets, Config.SIMULATION_CHUNK):
+        for result in _simulate_chunk(chunk, scenario):
+            if "skipped" in result:
+                counts["skipped"] += 1
+            else:
+                counts["simulated"] += 1
+                for k, acc in totals.items():
+                    acc += [p[k] for p in result["curve"]]
+            yield result
+    yield {
+        "summary": {
+            **counts,
+            "totals": [
+                {"move_pct": move, **{k: float(acc[j]) for k, acc in totals.items()}}
+                for j, move in enumerate(scenario.moves_pct)
+            ],
+        }
+    }
+
+def ndjson_lines(results: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for r in results:
+        yield json.dumps(r) + "\n"
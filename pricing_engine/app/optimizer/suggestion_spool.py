@@ -0,0 +1,213 @@
+"""Spool for suggestions computed while the database was unavailable.
+
+Degraded serving skips the synchronous INSERTs into price_suggestions and
+prediction_logs and appends one JSON line per suggestion here instead; a
+suggestion that was persisted just before the database went away spools
+only its prediction log. Feedback events received meanwhile are spooled
+here too. `replay` writes them once the database is back
+(see scripts/replay_suggestion_spool.py), skipping fingerprints that were
+persisted in the meantime. Rows are written with the time the suggestion
+was served, not the time of the replay. A record the database rejects
+(or that no longer parses) is moved to `<path>.dead` for inspection instead
+of blocking the records behind it.
+
+The spool is shared by every API worker process and the replay script, so
+appends and the replay's move-aside take an flock on a sibling lock file.
+"""
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+from app.config import Config
+from app.db import DatabaseUnavailable, execute_insert, execute_query, fetch_all, primary_reads
+from app.optimizer.price_optimizer import (
+    OptimizationResult,
+    prediction_log_params,
+    prediction_log_payload,
+    suggestion_params,
+)
+from app.utils.logging_utils import get_logger
+from app.utils.metrics import registry
+
+logger = get_logger(__name__)
+
+SPOOLED_SUGGESTIONS = registry.counter(
+    "suggestions_spooled_total", "Suggestions spooled instead of persisted while the DB was unavailable"
+)
+
+SPOOLED_FEEDBACK = registry.counter(
+    "feedback_spooled_total", "Feedback events spooled instead of saved while the DB was unavailable"
+)
+
+SPOOL_DEAD_LETTERS = registry.counter(
+    "spool_dead_letters_total", "Spooled records the database rejected on replay, moved to the dead-letter file"
+)
+
+FINGERPRINT_EXISTS_SQL = """
+    SELECT id FROM price_suggestions
+    WHERE sku = %s AND vendor_id = %s AND input_fingerprint = %s
+    LIMIT 1
+"""
+
+# SUGGESTION_INSERT_SQL and PREDICTION_LOG_SQL with the served-at time as a parameter
+SPOOLED_SUGGESTION_INSERT_SQL = """
+    INSERT INTO price_suggestions
+        (sku, vendor_id, current_price, suggested_price,
+         expected_revenue, expected_profit, elasticity, confidence, reason,
+         status, input_fingerprint, batch_run_id, suggestion_date, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'PENDING', %s, %s, %s, %s)
+"""
+
+SPOOLED_PREDICTION_LOG_SQL = """
+    INSERT INTO prediction_logs
+        (sku, vendor_id, suggestion_id, model_type,
+         input_features_json, output_json, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True) -> Iterator[bool]:
+    """Exclusive flock on `path`; yields False if not blocking and it is held elsewhere."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        os.close(fd)  # releases the lock
+
+class SuggestionSpool:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or Config.SUGGESTION_SPOOL_PATH
+        self.dead_letter_path = self.path + ".dead"
+
+    @contextmanager
+    def _append_lock(self) -> Iterator[bool]:
+        spool_dir = os.path.dirname(self.path)
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+        with file_lock(self.path + ".lock") as held:
+            yield held
+
+    def add(self, result: OptimizationResult, fingerprint: Optional[str]):
+        input_features, output = prediction_log_payload(result)
+        self._append({
+            "suggestion": list(suggestion_params(result, fingerprint)),
+            "created_at": datetime.now().isoformat(),
+            "input_features": input_features,
+            "output": output,
+        })
+        SPOOLED_SUGGESTIONS.inc()
+
+    def add_prediction_log(self, result: OptimizationResult, suggestion_id: int):
+        """Spool only the prediction log of an already persisted suggestion."""
+        input_features, output = prediction_log_payload(result)
+        self._append({
+            "sku": result.sku,
+            "vendor_id": result.vendor_id,
+            "suggestion_id": suggestion_id,
+            "created_at": datetime.now().isoformat(),
+            "input_features": input_features,
+            "output": output,
+        })
+
+    def add_feedback(self, payload: Dict[str, Any]):
+        self._append({"feedback": payload})
+        SPOOLED_FEEDBACK.inc()
+
+    def _append(self, record):
+        self._append_lines([json.dumps(record) + "\n"])
+
+    def _append_lines(self, lines):
+        with self._append_lock(), open(self.path, "a") as f:
+            f.writelines(lines)
+
+    def replay(self) -> int:
+        """Persist spooled suggestions and feedback; returns how many were written.
+
+        The spool is moved aside first so serving can keep appending. If the
+        database becomes unavailable the unwritten records are put back and
+        the error re-raised; any other failure dead-letters the record and
+        the replay continues. Only one replay runs at a time; a concurrent
+        one returns 0.
+        """
+        replaying = self.path + ".replay"
+        if not os.path.exists(self.path) and not os.path.exists(replaying):
+            return 0
+        with file_lock(self.path + ".replay.lock", blocking=False) as held:
+            if not held:
+                logger.info("Suggestion spool %s is already being replayed", self.path)
+                return 0
+            # A file left by an interrupted replay goes first; it is never overwritten
+            if not os.path.exists(replaying):
+                with self._append_lock():
+                    if not os.path.exists(self.path):
+                        return 0
+                    os.replace(self.path, replaying)
+            with open(replaying) as f:
+                lines = [line for line in f if line.strip()]
+
+            written = dead = 0
+            for i, line in enumerate(lines):
+                record = None
+                try:
+                    record = json.loads(line)
+                    written += self._write(record)
+                except DatabaseUnavailable:
+                    # _write may have narrowed the record to what is still unwritten
+                    self._append_lines([self._line(record, line)] + lines[i + 1:])
+                    os.remove(replaying)
+                    raise
+                except Exception:
+                    logger.exception("Dead-lettering spooled record to %s", self.dead_letter_path)
+                    with open(self.dead_letter_path, "a") as f:
+                        f.write(self._line(record, line))
+                    SPOOL_DEAD_LETTERS.inc()
+                    dead += 1
+            os.remove(replaying)
+        logger.info("Replayed %d of %d spooled records (%d dead-lettered)", written, len(lines), dead)
+        return written
+
+    @staticmethod
+    def _line(record, line: str) -> str:
+        return line if record is None else json.dumps(record) + "\n"
+
+    def _write(self, record) -> int:
+        if "feedback" in record:
+            # Imported here: the feedback handler spools through this module
+            from app.feedback.feedback_handler import save_feedback_batch
+
+            save_feedback_batch([record["feedback"]])
+            return 1
+        # Records spooled before created_at was stored fall back to the replay time
+        created_at = datetime.fromisoformat(record["created_at"]) if "created_at" in record else datetime.now()
+        if "suggestion" not in record:
+            self._write_log(record["sku"], record["vendor_id"], record["suggestion_id"], record, created_at)
+            return 0
+        params = tuple(record["suggestion"])
+        sku, vendor_id, fingerprint = params[0], params[1], params[9]
+        if fingerprint:
+            with primary_reads():
+                if fetch_all(FINGERPRINT_EXISTS_SQL, (sku, vendor_id, fingerprint)):
+                    return 0
+        suggestion_id = execute_insert(SPOOLED_SUGGESTION_INSERT_SQL, params + (created_at.date(), created_at))
+        # The suggestion is in: from here the record only owes its log row. Retrying
+        # the whole record would skip the suggestion by fingerprint and lose the log.
+        del record["suggestion"]
+        record.update(sku=sku, vendor_id=vendor_id, suggestion_id=suggestion_id)
+        self._write_log(sku, vendor_id, suggestion_id, record, created_at)
+        return 1
+
+    def _write_log(self, sku: str, vendor_id: str, suggestion_id: int, record, created_at: datetime):
+        params = prediction_log_params(
+            sku, vendor_id, suggestion_id, "optimizer", record["input_features"], record["output"]
+        )
+        execute_query(SPOOLED_PREDICTION_LOG_SQL, params + (created_at,))
+
+suggestion_spool = SuggestionSpool()
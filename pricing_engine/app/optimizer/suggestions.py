@@ -0,0 +1,206 @@
+"""Idempotent price suggestions.
+
+A suggestion is identified by its input fingerprint: (sku, vendor_id, date
+of the feature row, demand model version). Serving looks the fingerprint up
+in an in-process cache, then in price_suggestions, and only optimizes and
+persists when neither has it. The fingerprint doubles as the HTTP ETag.
+
+When the database is unavailable, live serving degrades instead of failing:
+it uses the last known inputs, optimizes without persisting (the write goes
+to the suggestion spool), and flags the response `degraded`.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import Config
+from app.db import DatabaseUnavailable, fetch_all, primary_reads
+from app.models.demand_model import get_demand_model_version
+from app.optimizer.inputs import PricingInputs, get_pricing_inputs
+from app.optimizer.price_optimizer import (
+    OptimizationResult,
+    log_prediction,
+    optimize_price_for_inputs,
+    persist_optimization_result,
+    prediction_log_payload,
+    suggestion_response,
+)
+from app.optimizer.suggestion_spool import suggestion_spool
+from app.utils.cache import MISSING, TTLCache
+from app.utils.metrics import stage_timer
+from app.utils.singleflight import SingleFlight
+
+SUGGESTION_BY_FINGERPRINT_SQL = """
+    SELECT id, sku, current_price, suggested_price, expected_revenue,
+           expected_profit, elasticity, confidence, reason
+    FROM price_suggestions
+    WHERE sku = %s AND vendor_id = %s AND input_fingerprint = %s
+    ORDER BY id DESC
+    LIMIT 1
+"""
+
+# fingerprint -> response body, or None when the inputs yield no suggestion
+suggestion_cache = TTLCache("suggestions", Config.SUGGESTION_CACHE_SIZE, Config.SUGGESTION_CACHE_TTL_SEC)
+
+# Concurrent live requests for one sku/vendor share a single inputs read and optimization
+suggestion_flight = SingleFlight("suggestions", Config.SINGLEFLIGHT_TIMEOUT_SEC)
+
+def suggestion_fingerprint(sku: str, vendor_id: str, feature_date: Any, model_version: str) -> str:
+    raw = f"{sku}|{vendor_id}|{feature_date}|{model_version}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+def fingerprint_for_inputs(sku: str, vendor_id: str, inputs: PricingInputs) -> Optional[str]:
+    """None when there is no feature row, i.e. nothing to suggest."""
+    if not inputs.features:
+        return None
+    return suggestion_fingerprint(
+        sku, vendor_id, inputs.features.get("date"), get_demand_model_version()
+    )
+
+# Feature columns that change every night without changing the optimization
+_CONTENT_EXCLUDED_FEATURES = ("date",)
+
+def content_fingerprint(inputs: PricingInputs) -> str:
+    """Fingerprint of the values the optimizer uses, not of when they were computed.
+
+    Unlike the suggestion fingerprint it survives a new feature date as long
+    as the feature values, vendor rules, elasticity and model are unchanged;
+    batch delta repricing keys on it.
+    """
+    features = {k: v for k, v in (inputs.features or {}).items() if k not in _CONTENT_EXCLUDED_FEATURES}
+    raw = json.dumps(
+        [features, inputs.vendor_rules, inputs.elasticity_rows, get_demand_model_version()],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+def etag(fingerprint: str) -> str:
+    return f'"{fingerprint}"'
+
+def etag_matches(if_none_match: Optional[str], fingerprint: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag(fingerprint) for t in tags)
+
+def response_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "suggestion_id": int(row["id"]),
+        "sku": row["sku"],
+        "current_price": float(row["current_price"]),
+        "suggested_price": float(row["suggested_price"]),
+        "expected_revenue": float(row["expected_revenue"]),
+        "expected_profit": float(row["expected_profit"]),
+        "elasticity": float(row["elasticity"]),
+        "confidence": float(row["confidence"]),
+        "reason": row["reason"],
+        "actions": ["accept", "reject", "custom_price"],
+    }
+
+def lookup_suggestion(sku: str, vendor_id: str, fingerprint: str) -> Any:
+    """Cached or persisted response for the fingerprint; MISSING if neither has it."""
+    body = suggestion_cache.get(fingerprint)
+    if body is not MISSING:
+        return body
+    # The primary: a replica lagging behind another worker's INSERT would mean a duplicate
+    with primary_reads():
+        rows = fetch_all(SUGGESTION_BY_FINGERPRINT_SQL, (sku, vendor_id, fingerprint))
+    if not rows:
+        return MISSING
+    body = response_from_row(rows[0])
+    suggestion_cache.set(fingerprint, body)
+    return body
+
+def create_suggestion(
+    sku: str,
+    vendor_id: str,
+    inputs: PricingInputs,
+    fingerprint: Optional[str],
+    batch_run_id: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """Optimize `inputs`, then persist and log the suggestion stamped with `fingerprint`.
+
+    `fingerprint` must be the one computed from these same inputs; re-reading
+    them here could stamp it on a suggestion for newer inputs.
+    """
+    result = optimize_price_for_inputs(sku, vendor_id, inputs)
+    if not result:
+        if fingerprint:
+            suggestion_cache.set(fingerprint, None)
+        return None
+
+    with stage_timer("persist"):
+        suggestion_id = persist_optimization_result(
+            result, fingerprint, batch_run_id, content_fingerprint(inputs)
+        )
+    input_features, output = prediction_log_payload(result)
+    with stage_timer("log_prediction"):
+        try:
+            log_prediction(
+                sku=result.sku,
+                vendor_id=result.vendor_id,
+                suggestion_id=suggestion_id,
+                model_type="optimizer",
+                input_features=input_features,
+                output=output,
+            )
+        except DatabaseUnavailable:
+            # Already persisted: serve it, and let only the log row wait for the DB
+            suggestion_spool.add_prediction_log(result, suggestion_id)
+    body = suggestion_response(result, suggestion_id)
+    if fingerprint:
+        suggestion_cache.set(fingerprint, body)
+    return body
+
+def get_or_create_suggestion(
+    sku: str, vendor_id: str, fingerprint: str, inputs: PricingInputs
+) -> Optional[Dict[str, Any]]:
+    body = lookup_suggestion(sku, vendor_id, fingerprint)
+    if body is MISSING:
+        body = create_suggestion(sku, vendor_id, inputs, fingerprint)
+    return body
+
+def cached_degraded_suggestion(fingerprint: str, inputs: PricingInputs) -> Any:
+    """Cached body for a degraded request, flagged if it came from stale inputs; MISSING on a miss."""
+    body = suggestion_cache.get(fingerprint)
+    if body and inputs.stale:
+        return {**body, "degraded": True}
+    return body
+
+def degraded_response(result: OptimizationResult, fingerprint: str) -> Dict[str, Any]:
+    """Spool the suggestion instead of persisting it; the body has no suggestion_id."""
+    suggestion_spool.add(result, fingerprint)
+    body = {**suggestion_response(result, None), "degraded": True}
+    # Short TTL so the persisted suggestion takes over soon after recovery
+    suggestion_cache.set(fingerprint, body, ttl=Config.DEGRADED_SUGGESTION_TTL_SEC)
+    return body
+
+def degraded_suggestion(
+    sku: str, vendor_id: str, fingerprint: str, inputs: PricingInputs
+) -> Optional[Dict[str, Any]]:
+    body = cached_degraded_suggestion(fingerprint, inputs)
+    if body is MISSING:
+        result = optimize_price_for_inputs(sku, vendor_id, inputs)
+        body = degraded_response(result, fingerprint) if result else None
+    return body
+
+def _live_suggestion(sku: str, vendor_id: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    inputs = get_pricing_inputs(sku, vendor_id)
+    fingerprint = fingerprint_for_inputs(sku, vendor_id, inputs)
+    if fingerprint is None:
+        return None, None
+    if not inputs.stale:
+        try:
+            return fingerprint, get_or_create_suggestion(sku, vendor_id, fingerprint, inputs)
+        except DatabaseUnavailable:
+            pass
+    return fingerprint, degraded_suggestion(sku, vendor_id, fingerprint, inputs)
+
+def live_suggestion(sku: str, vendor_id: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """(fingerprint, body) for the current inputs; fingerprint is None without features.
+
+    Raises SingleFlightTimeout if an identical in-flight request takes too long,
+    and DatabaseUnavailable if the DB is down and the inputs were never cached.
+    """
+    return suggestion_flight.do((sku, vendor_id), _live_suggestion, sku, vendor_id)
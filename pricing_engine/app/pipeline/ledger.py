@@ -0,0 +1,50 @@
+"""Run ledger for the nightly pipeline (tables from migrations/0004)."""
+from datetime import date, datetime
+
+from app.db import execute_insert, execute_query
+from app.pipeline.runner import TaskResult
+
+class RunLedger:
+    def start_run(self, target_date: date, partition_count: int) -> int:
+        sql = """
+            INSERT INTO pipeline_runs (target_date, status, partitions, started_at)
+            VALUES (%s, 'RUNNING', %s, %s)
+        """
+        return execute_insert(sql, (target_date, partition_count, datetime.now()))
+
+    def record_task(self, run_id: int, result: TaskResult):
+        sql = """
+            INSERT INTO pipeline_tasks
+                (run_id, stage, partition_no, status, attempts, row_count,
+                 started_at, finished_at, seconds, error)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                status = VALUES(status),
+                attempts = VALUES(attempts),
+                row_count = VALUES(row_count),
+                started_at = VALUES(started_at),
+                finished_at = VALUES(finished_at),
+                seconds = VALUES(seconds),
+                error = VALUES(error)
+        """
+        execute_query(
+            sql,
+            (
+                run_id,
+                result.stage,
+                result.partition_no,
+                result.status,
+                result.attempts,
+                result.rows,
+                result.started_at,
+                result.finished_at,
+                result.seconds,
+                result.error[:2000] if result.error else None,
+            ),
+        )
+
+    def finish_run(self, run_id: int, status: str):
+        execute_query(
+            "UPDATE pipeline_runs SET status = %s, finished_at = %s WHERE id = %s",
+            (status, datetime.now(), run_id),
+        )
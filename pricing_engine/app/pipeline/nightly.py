@@ -0,0 +1,121 @@
+"""The nightly jobs as one pipeline.
+
+    etl         per partition
+    elasticity  per partition
+    demand      global, after all of etl
+    price       per partition, after etl and elasticity of that partition
+                and demand (unless overlapped)
+    monitoring  global, after price: its drift refit rewrites
+                elasticity_coeffs, which every price partition must read
+                as the elasticity stage left it
+    storage     global, after monitoring: log partition maintenance
+
+With PIPELINE_OVERLAP_DEMAND_TRAINING the batch prices with the model
+already on disk while the new one trains, so pricing no longer waits for
+all of ETL; tonight's model is then used from the next batch on.
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from app.config import Config
+from app.features.etl import run_daily_feature_etl
+from app.models.demand_model import (
+    build_training_data,
+    load_demand_model,
+    log_demand_metrics_to_db,
+    save_demand_model,
+    train_demand_model,
+    unload_demand_model,
+)
+from app.models.elasticity import train_elasticities
+from app.monitoring.monitor import run_daily_monitoring
+from app.monitoring.retention import maintain_partitions
+from app.optimizer.batch import finish_batch_run, load_batch_targets, price_skus, start_batch_run
+from app.pipeline.ledger import RunLedger
+from app.pipeline.partitions import Partition
+from app.pipeline.runner import PipelineResult, PipelineRunner, RunContext, Stage
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+def _etl(ctx: RunContext, partition: Optional[Partition]) -> int:
+    return run_daily_feature_etl(ctx.target_date, partition=partition)
+
+def _elasticity(ctx: RunContext, partition: Optional[Partition]) -> int:
+    return train_elasticities(partition)
+
+def _demand(ctx: RunContext, partition: Optional[Partition]) -> int:
+    X, y = build_training_data()
+    logger.info("Training demand model on %d rows", len(X))
+    model, metrics = train_demand_model(X, y)
+    save_demand_model(model)
+    log_demand_metrics_to_db(metrics)
+    if not ctx.state.get("overlap_demand"):
+        # Price with the model just trained
+        unload_demand_model()
+    return len(X)
+
+def _start_pricing(ctx: RunContext):
+    ctx.state["batch_run_id"] = start_batch_run()
+    ctx.state["batch_counts"] = {"priced": 0, "skipped": 0, "unchanged": 0}
+
+def _price(ctx: RunContext, partition: Optional[Partition]) -> int:
+    counts = price_skus(load_batch_targets(partition), batch_run_id=ctx.state["batch_run_id"])
+    with ctx.lock:
+        for k, v in counts.items():
+            ctx.state["batch_counts"][k] += v
+    return counts["priced"]
+
+def _finish_pricing(ctx: RunContext, ok: bool):
+    # Marking the run COMPLETE is what lets API workers pick it up
+    counts: Dict[str, int] = ctx.state["batch_counts"]
+    finish_batch_run(ctx.state["batch_run_id"], counts, status="COMPLETE" if ok else "FAILED")
+    logger.info("Batch pricing job %s finished: %s", ctx.state["batch_run_id"], counts)
+
+def _monitoring(ctx: RunContext, partition: Optional[Partition]) -> None:
+    run_daily_monitoring(ctx.target_date - timedelta(days=1))
+
+def _storage(ctx: RunContext, partition: Optional[Partition]) -> None:
+    # Monitoring has just rolled up yesterday, so its partition can go once expired
+    maintain_partitions(ctx.target_date)
+
+def nightly_stages(overlap_demand: bool = False) -> List[Stage]:
+    price_deps = ("etl", "elasticity") if overlap_demand else ("etl", "elasticity", "demand")
+    return [
+        Stage("etl", _etl),
+        Stage("elasticity", _elasticity),
+        Stage("demand", _demand, deps=("etl",), partitioned=False),
+        Stage("price", _price, deps=price_deps, setup=_start_pricing, teardown=_finish_pricing),
+        # Drift refits upsert elasticity_coeffs, so wait until the whole batch has priced
+        Stage("monitoring", _monitoring, deps=("price",), partitioned=False),
+        Stage("storage", _storage, deps=("monitoring",), partitioned=False),
+    ]
+
+def run_nightly_pipeline(
+    target_date: Optional[date] = None,
+    partition_count: Optional[int] = None,
+    workers: Optional[int] = None,
+    overlap_demand: Optional[bool] = None,
+    ledger: Optional[RunLedger] = None,
+) -> PipelineResult:
+    if target_date is None:
+        target_date = date.today()
+    if overlap_demand is None:
+        overlap_demand = Config.PIPELINE_OVERLAP_DEMAND_TRAINING
+    if overlap_demand:
+        try:
+            # Pinned for the whole batch, whatever training saves meanwhile
+            load_demand_model()
+        except OSError:
+            logger.warning("No demand model on disk yet; pricing will wait for training")
+            overlap_demand = False
+
+    runner = PipelineRunner(
+        nightly_stages(overlap_demand),
+        partition_count=partition_count or Config.PIPELINE_PARTITIONS,
+        workers=workers or Config.PIPELINE_WORKERS,
+        retries=Config.PIPELINE_RETRIES,
+        retry_backoff=Config.PIPELINE_RETRY_BACKOFF_SEC,
+        ledger=ledger if ledger is not None else RunLedger(),
+    )
+    return runner.run(target_date, state={"overlap_demand": overlap_demand})
@@ -0,0 +1,41 @@
+"""SKU hash-range partitions.
+
+CRC32 of the SKU (MySQL's CRC32(), zlib.crc32 in Python; both give the same
+value for the same UTF-8 bytes) is split into `count` contiguous ranges.
+Everything keyed by SKU (orders, inventory, analytics, features,
+elasticities, suggestions) falls in the same partition, so a stage can
+process partition p as soon as its upstream stages have finished p.
+"""
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+HASH_SPACE = 1 << 32
+
+@dataclass(frozen=True)
+class Partition:
+    index: int
+    count: int
+
+    @property
+    def lo(self) -> int:
+        return self.index * HASH_SPACE // self.count
+
+    @property
+    def hi(self) -> int:
+        return (self.index + 1) * HASH_SPACE // self.count
+
+    def contains(self, sku: str) -> bool:
+        return self.lo <= zlib.crc32(str(sku).encode()) < self.hi
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+def partitions(count: int) -> List[Partition]:
+    return [Partition(i, count) for i in range(count)]
+
+def partition_filter(partition: Optional[Partition], column: str = "sku") -> Tuple[str, Tuple[int, ...]]:
+    """(" AND <range predicate>", params) to append to a WHERE clause; empty for None."""
+    if partition is None or partition.count == 1:
+        return "", ()
+    return f" AND CRC32({column}) >= %s AND CRC32({column}) < %s", (partition.lo, partition.hi)
@@ -0,0 +1,275 @@
+"""Dependency-graph runner for partitioned batch stages.
+
+Each stage runs once per SKU partition (or once, if not partitioned). A
+task becomes ready as soon as the tasks it depends on have finished:
+
+- a partitioned stage's partition p waits for partition p of each
+  partitioned dependency, so downstream work starts before upstream has
+  finished the whole catalog;
+- a global stage (or any stage depending on one) waits for all of it.
+
+Independent tasks run concurrently on a thread pool. A failing task is
+retried with exponential backoff; once out of attempts it is FAILED and
+everything depending on it is SKIPPED, while unrelated partitions carry on.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.db import primary_reads
+from app.pipeline.partitions import Partition, partitions
+from app.utils.logging_utils import get_logger
+from app.utils.metrics import registry
+
+logger = get_logger(__name__)
+
+DONE = "DONE"
+FAILED = "FAILED"
+SKIPPED = "SKIPPED"
+
+TASK_SECONDS = registry.histogram(
+    "pipeline_task_seconds",
+    "Pipeline task run time, including retries",
+    labelnames=("stage",),
+    buckets=(1, 5, 15, 60, 300, 900, 1800, 3600, 7200),
+)
+TASK_OUTCOMES = registry.counter(
+    "pipeline_tasks_total", "Pipeline tasks by stage and outcome", labelnames=("stage", "status")
+)
+
+@dataclass
+class RunContext:
+    """Shared by the tasks of one run; `state` holds per-run values set by stage setup."""
+    target_date: date
+    run_id: Optional[int] = None
+    state: Dict[str, Any] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+@dataclass
+class Stage:
+    name: str
+    # (ctx, partition) -> rows produced; partition is None for global stages
+    fn: Callable[[RunContext, Optional[Partition]], Optional[int]]
+    deps: Tuple[str, ...] = ()
+    partitioned: bool = True
+    # Called before the stage's first task and after its last (with whether all succeeded)
+    setup: Optional[Callable[[RunContext], None]] = None
+    teardown: Optional[Callable[[RunContext, bool], None]] = None
+
+@dataclass
+class TaskResult:
+    stage: str
+    partition: Optional[Partition]
+    status: str
+    attempts: int = 0
+    rows: Optional[int] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def partition_no(self) -> int:
+        return -1 if self.partition is None else self.partition.index
+
+@dataclass
+class PipelineResult:
+    run_id: Optional[int]
+    tasks: List[TaskResult]
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return all(t.status == DONE for t in self.tasks)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per stage: task outcomes, rows, summed task seconds and wall-clock span."""
+        out: Dict[str, Dict[str, Any]] = {}
+        for t in self.tasks:
+            s = out.setdefault(t.stage, {DONE: 0, FAILED: 0, SKIPPED: 0, "rows": 0, "task_seconds": 0.0})
+            s[t.status] += 1
+            s["rows"] += t.rows or 0
+            s["task_seconds"] += t.seconds
+        for name, s in out.items():
+            ran = [t for t in self.tasks if t.stage == name and t.started_at]
+            s["span_seconds"] = (
+                (max(t.finished_at for t in ran) - min(t.started_at for t in ran)).total_seconds() if ran else 0.0
+            )
+        return out
+
+TaskKey = Tuple[str, Optional[int]]
+
+class PipelineRunner:
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        partition_count: int,
+        workers: int,
+        retries: int = 0,
+        retry_backoff: float = 0.0,
+        ledger=None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.stages = {s.name: s for s in stages}
+        self.order = self._topological_order(stages)
+        self.partitions = partitions(max(1, partition_count))
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.ledger = ledger
+        self._sleep = sleep
+        # Prefer tasks further down the graph, so partitions drain through
+        # to the end instead of every stage being half-done at once
+        self._depth: Dict[str, int] = {}
+        for name in self.order:
+            self._depth[name] = max((self._depth[d] + 1 for d in self.stages[name].deps), default=0)
+
+    @staticmethod
+    def _topological_order(stages: Sequence[Stage]) -> List[str]:
+        by_name = {s.name: s for s in stages}
+        order: List[str] = []
+        visiting = set()
+
+        def visit(name: str):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline stages form a cycle through {name!r}")
+            if name not in by_name:
+                raise ValueError(f"Unknown pipeline stage {name!r}")
+            visiting.add(name)
+            for dep in by_name[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for s in stages:
+            visit(s.name)
+        return order
+
+    def _tasks(self, stage: Stage) -> List[TaskKey]:
+        if stage.partitioned:
+            return [(stage.name, p.index) for p in self.partitions]
+        return [(stage.name, None)]
+
+    def _upstream(self, key: TaskKey) -> List[TaskKey]:
+        name, index = key
+        keys: List[TaskKey] = []
+        for dep in self.stages[name].deps:
+            if self.stages[dep].partitioned and index is not None:
+                keys.append((dep, index))
+            else:
+                keys.extend(self._tasks(self.stages[dep]))
+        return keys
+
+    def _partition(self, index: Optional[int]) -> Optional[Partition]:
+        return None if index is None else self.partitions[index]
+
+    def run(self, target_date: date, state: Optional[Dict[str, Any]] = None) -> PipelineResult:
+        """Run every stage for target_date; `state` seeds RunContext.state."""
+        t0 = time.perf_counter()
+        run_id = self.ledger.start_run(target_date, len(self.partitions)) if self.ledger else None
+        ctx = RunContext(target_date, run_id, dict(state or {}))
+        logger.info(
+            "Pipeline run %s for %s: %d stages x %d partitions on %d workers",
+            run_id, target_date, len(self.order), len(self.partitions), self.workers,
+        )
+
+        keys = [k for name in self.order for k in self._tasks(self.stages[name])]
+        upstream = {k: self._upstream(k) for k in keys}
+        status: Dict[TaskKey, str] = {}
+        results: Dict[TaskKey, TaskResult] = {}
+        started_stages, closed_stages = set(), set()
+        pending = list(keys)
+        running = {}
+
+        def finish(key: TaskKey, result: TaskResult):
+            status[key] = result.status
+            results[key] = result
+            TASK_OUTCOMES.labels(result.stage, result.status).inc()
+            if self.ledger:
+                self.ledger.record_task(run_id, result)
+            stage = self.stages[key[0]]
+            if stage.name in closed_stages or not all(k in status for k in self._tasks(stage)):
+                return
+            closed_stages.add(stage.name)
+            if stage.teardown and stage.name in started_stages:
+                ok = all(status[k] == DONE for k in self._tasks(stage))
+                try:
+                    stage.teardown(ctx, ok)
+                except Exception:
+                    logger.exception("Teardown of pipeline stage %s failed", stage.name)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pipeline") as pool:
+            while pending or running:
+                ready = []
+                # keys are in topological order, so skips propagate in one pass
+                for key in list(pending):
+                    ups = [status.get(u) for u in upstream[key]]
+                    if any(s in (FAILED, SKIPPED) for s in ups):
+                        pending.remove(key)
+                        finish(key, TaskResult(key[0], self._partition(key[1]), SKIPPED, error="upstream failed"))
+                    elif all(s == DONE for s in ups):
+                        ready.append(key)
+                ready.sort(key=lambda k: (-self._depth[k[0]], k[1] if k[1] is not None else -1))
+
+                for key in ready[: self.workers - len(running)]:
+                    pending.remove(key)
+                    stage = self.stages[key[0]]
+                    if stage.name not in started_stages:
+                        started_stages.add(stage.name)
+                        if stage.setup:
+                            try:
+                                stage.setup(ctx)
+                            except Exception as e:
+                                logger.exception("Setup of pipeline stage %s failed", stage.name)
+                                for k in [key] + [k for k in pending if k[0] == stage.name]:
+                                    if k != key:
+                                        pending.remove(k)
+                                    finish(k, TaskResult(k[0], self._partition(k[1]), FAILED, error=repr(e)))
+                                break
+                    running[pool.submit(self._execute, ctx, stage, self._partition(key[1]), bool(upstream[key]))] = key
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(running.pop(future), future.result())
+
+        ordered = [results[k] for k in keys]
+        result = PipelineResult(run_id, ordered, time.perf_counter() - t0)
+        if self.ledger:
+            self.ledger.finish_run(run_id, DONE if result.ok else FAILED)
+        logger.info("Pipeline run %s finished in %.1fs: %s", run_id, result.seconds, result.summary())
+        return result
+
+    def _execute(self, ctx: RunContext, stage: Stage, partition: Optional[Partition], has_upstream: bool) -> TaskResult:
+        result = TaskResult(stage.name, partition, FAILED, started_at=datetime.now())
+        t0 = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            result.attempts = attempt + 1
+            try:
+                if has_upstream:
+                    # Upstream output was just written; don't read it from a lagging replica
+                    with primary_reads():
+                        result.rows = stage.fn(ctx, partition)
+                else:
+                    result.rows = stage.fn(ctx, partition)
+                result.status = DONE
+                result.error = None
+                break
+            except Exception as e:
+                result.error = repr(e)
+                logger.warning(
+                    "Pipeline task %s[%s] failed (attempt %d/%d): %r",
+                    stage.name, partition or "all", attempt + 1, self.retries + 1, e,
+                )
+                if attempt < self.retries:
+                    self._sleep(self.retry_backoff * 2 ** attempt)
+        result.finished_at = datetime.now()
+        result.seconds = time.perf_counter() - t0
+        TASK_SECONDS.labels(stage.name).observe(result.seconds)
+        return result
@@ -0,0 +1,45 @@
+"""Pre-fork serving: load once in the master, share copy-on-write with workers.
+
+With gunicorn's preload_app (see gunicorn.conf.py), create_app() runs in the
+master, so the demand model and the precomputed index are loaded once and
+inherited by every worker. `preload` optionally warms the input caches too.
+The master calls gc.freeze() before forking so the collector never writes
+to the inherited objects' headers, which would un-share their pages.
+
+Forked workers must not reuse the master's DB sockets or rely on its
+threads; `after_fork_in_worker` resets both. The logging pipeline restarts
+itself through os.register_at_fork.
+"""
+import gc
+import os
+
+from app import db
+from app.config import Config
+from app.optimizer.batch import load_batch_targets
+from app.optimizer.inputs import prefetch_pricing_inputs
+from app.optimizer.precomputed import precomputed_index
+from app.utils.logging_utils import get_logger
+from app.utils.memory_utils import memory_breakdown
+
+logger = get_logger(__name__)
+
+def preload():
+    """Master-side warm-up after create_app(); runs once before any fork."""
+    if Config.PRELOAD_INPUTS:
+        targets = load_batch_targets()
+        prefetch_pricing_inputs((r["sku"], r["vendor_id"]) for r in targets)
+        logger.info("Preloaded pricing inputs for %d SKUs", len(targets))
+    # Connections opened in the master must not leak into workers
+    db.pool.close_all()
+    db.read_pool.close_all()
+    gc.collect()
+
+def before_fork():
+    gc.freeze()
+
+def after_fork_in_worker():
+    db.pool.discard_after_fork()
+    db.read_pool.discard_after_fork()
+    if Config.SERVE_PRECOMPUTED:
+        precomputed_index.restart_after_fork()
+    logger.info("Worker %d started: %s", os.getpid(), memory_breakdown())
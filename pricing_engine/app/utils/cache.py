@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from app.utils.metrics import registry
+
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total",
+    "In-process cache lookups by cache and result",
+    labelnames=("cache", "result"),
+)
+
+MISSING = object()
+
+class TTLCache:
+    """Bounded LRU whose entries expire `ttl` seconds after being set.
+
+    None is a valid cached value (e.g. "no row"); `get` returns MISSING on a
+    miss or an expired entry. Expired entries stay until overwritten or
+    evicted, so `get_stale` can still return the last known value when the
+    source is down.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = CACHE_REQUESTS.labels(name, "hit")
+        self._misses = CACHE_REQUESTS.labels(name, "miss")
+        self._stale_hits = CACHE_REQUESTS.labels(name, "stale")
+        registry.gauge_callback(f"cache_{name}_entries", f"Entries in the {name} cache", self.__len__)
+
+    def get(self, key: Hashable) -> Any:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._hits.inc()
+                return entry[1]
+        self._misses.inc()
+        return MISSING
+
+    def get_stale(self, key: Hashable) -> Any:
+        """Value for `key` even if expired; MISSING only if it was never set or was evicted."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        self._stale_hits.inc()
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,102 @@
+"""Consecutive-failure circuit breaker.
+
+Closed: calls go through; `failure_threshold` failures in a row open it.
+Open: calls are refused at once (`allow()` is False) for `reset_timeout`
+seconds. Half-open: one trial call is let through; its success closes the
+breaker, its failure opens it for another `reset_timeout`.
+"""
+import threading
+import time
+from typing import Callable
+
+from app.utils.metrics import registry
+
+BREAKER_TRANSITIONS = registry.counter(
+    "circuit_breaker_transitions_total",
+    "State changes by breaker and new state",
+    labelnames=("breaker", "state"),
+)
+BREAKER_REJECTED = registry.counter(
+    "circuit_breaker_rejected_total",
+    "Calls refused while the breaker was open",
+    labelnames=("breaker",),
+)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._rejected = BREAKER_REJECTED.labels(name)
+        registry.gauge_callback(
+            f"circuit_breaker_{name}_state",
+            f"{name} breaker state: 0 closed, 1 half-open, 2 open",
+            lambda: _STATE_VALUES[self.state],
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being refused or only a trial is allowed."""
+        return self.state != CLOSED
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+        self._rejected.inc()
+        return False
+
+    def record_success(self):
+        if self._state == CLOSED and not self._failures:
+            return  # the common case needs no lock
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                if self._state != OPEN:
+                    self._transition(OPEN)
+
+    def reset(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._state = CLOSED
+
+    def _transition(self, state: str):
+        self._state = state
+        BREAKER_TRANSITIONS.labels(self.name, state).inc()
@@ -1,26 +1,226 @@
+"""Process-wide logging pipeline.
+
+Every logger from get_logger shares one QueueHandler: the calling thread
+only builds the LogRecord and puts it on an in-memory queue, while a single
+QueueListener thread formats it and writes to stdout. Messages should use
+%-style arguments (logger.info("sku=%s", sku)) so formatting happens on the
+listener thread, and only for records that pass the level check.
+
+Records below ERROR are rate limited per message template: at most
+LOG_RATE_LIMIT_PER_KEY records of one template per LOG_RATE_LIMIT_WINDOW_SEC,
+with a single "suppressed N" summary once the window rolls over. Set
+LOG_FORMAT=json for one JSON object per line.
+"""
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Hashable, List, Optional
+
 from .time_utils import utcnow_str
 from app.config import Config
 
-def get_logger(name: str) -> logging.Logger:
+_TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; `extra` fields such as `app` are included."""
+
+    _RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": self.formatTime(record, _DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self._RESERVED and not key.startswith("_"):
+                out[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """Let at most `limit` records per message key through each `window` seconds.
+
+    The key is (logger name, level, unformatted msg), so every per-SKU line
+    built from the same template shares one budget. When a key's window rolls
+    over after dropping records, `emit_summary` receives one WARNING record
+    saying how many were dropped. Records at `exempt_level` and above always
+    pass.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        window: float,
+        emit_summary: Callable[[logging.LogRecord], None],
+        exempt_level: int = logging.ERROR,
+        max_keys: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.exempt_level = exempt_level
+        self.max_keys = max_keys
+        self._emit_summary = emit_summary
+        self._clock = clock
+        # key -> [window_start, passed, suppressed]
+        self._windows: Dict[Hashable, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0 or record.levelno >= self.exempt_level:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = self._clock()
+        summary = None
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                if state is not None and state[2]:
+                    summary = self._summary(key, int(state[2]), now - state[0])
+                elif state is None and len(self._windows) >= self.max_keys:
+                    # Unbounded keys mean f-string messages; forget quiet ones
+                    self._evict(now)
+                self._windows[key] = [now, 1, 0]
+                allowed = True
+            elif state[1] < self.limit:
+                state[1] += 1
+                allowed = True
+            else:
+                state[2] += 1
+                allowed = False
+        if summary is not None:
+            self._emit_summary(summary)
+        return allowed
+
+    def flush(self):
+        """Emit summaries for every key with suppressed records and reset them."""
+        now = self._clock()
+        with self._lock:
+            pending = [
+                self._summary(key, int(state[2]), now - state[0])
+                for key, state in self._windows.items()
+                if state[2]
+            ]
+            self._windows.clear()
+        for summary in pending:
+            self._emit_summary(summary)
+
+    def _evict(self, now: float):
+        for key in [k for k, s in self._windows.items() if now - s[0] >= self.window and not s[2]]:
+            del self._windows[key]
+        if len(self._windows) >= self.max_keys:
+            self._windows.clear()
+
+    @staticmethod
+    def _summary(key, suppressed: int, elapsed: float) -> logging.LogRecord:
+        name, levelno, msg = key
+        return logging.makeLogRecord({
+            "name": name,
+            "levelno": logging.WARNING,
+            "levelname": "WARNING",
+            "msg": "Suppressed %d %s messages like %r in the last %.0fs",
+            "args": (suppressed, logging.getLevelName(levelno), str(msg), elapsed),
+            "suppressed": suppressed,
+        })
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock prepare() renders the message on the caller's thread; here the
+    record goes onto the queue as is, apart from tracebacks, which are
+    rendered now because they reference live frames.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue_summary(self, record: logging.LogRecord):
+        self.enqueue(record)
+
+class _Pipeline:
+    def __init__(self):
+        self.queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self.handler = _DeferredQueueHandler(self.queue)
+        self.rate_limit = RateLimitFilter(
+            Config.LOG_RATE_LIMIT_PER_KEY,
+            Config.LOG_RATE_LIMIT_WINDOW_SEC,
+            self.handler.enqueue_summary,
+        )
+        self.handler.addFilter(self.rate_limit)
+        self.listener = QueueListener(self.queue, build_output_handler(), respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        if self.listener._thread is None:
+            return
+        self.rate_limit.flush()
+        self.listener.stop()
+
+    def restart_in_child(self):
+        # The listener thread does not survive fork(); records the parent had
+        # queued are its to write, so the child starts on a fresh queue
+        self.queue = queue.SimpleQueue()
+        self.handler.queue = self.queue
+        self.listener.queue = self.queue
+        self.listener._thread = None
+        self.listener.start()
+
+_pipeline: Optional[_Pipeline] = None
+_pipeline_lock = threading.Lock()
+
+def build_output_handler(stream=None, fmt: Optional[str] = None) -> logging.Handler:
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if (fmt or Config.LOG_FORMAT).lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(fmt=_TEXT_FORMAT, datefmt=_DATE_FORMAT))
+    return handler
+
+def _get_pipeline() -> _Pipeline:
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = _Pipeline()
+        return _pipeline
+
+def _after_fork_in_child():
+    if _pipeline is not None and _pipeline.listener._thread is not None:
+        _pipeline.restart_in_child()
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def shutdown_logging():
+    """Flush pending summaries and drain the queue; later records are not written."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.stop()
+
+def get_logger(name: str) -> logging.LoggerAdapter:
     logger = logging.getLogger(name)
-    if logger.handlers:
-        return logger
-
-    level = getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO)
-    logger.setLevel(level)
-
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter(
-        fmt="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%dT%H:%M:%SZ",
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-
-    logger = logging.LoggerAdapter(logger, extra={"app": "pricing_engine"})
-    return logger
+    pipeline = _get_pipeline()
+    if pipeline.handler not in logger.handlers:
+        level = getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO)
+        logger.setLevel(level)
+        logger.addHandler(pipeline.handler)
+    return logging.LoggerAdapter(logger, extra={"app": "pricing_engine"})
 
 def log_with_ts(logger: logging.Logger, level: str, message: str, **kwargs):
     ts = utcnow_str()
@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, 0 if the platform doesn't expose it."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+def memory_breakdown(pid: str = "self") -> Dict[str, int]:
+    """rss, pss, shared and private bytes of a process from /proc/<pid>/smaps_rollup.
+
+    pss charges each shared page 1/N to the N processes mapping it, so summing
+    pss over pre-forked workers gives their real footprint. Empty off Linux.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        return {}
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+def peak_rss_bytes() -> int:
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+def _mb(n_bytes: int) -> float:
+    return n_bytes / (1024 * 1024)
+
+@dataclass
+class StageStats:
+    name: str
+    seconds: float
+    rss_before: int
+    rss_after: int
+    alloc_peak: int
+
+    @property
+    def rss_delta(self) -> int:
+        return self.rss_after - self.rss_before
+
+@dataclass
+class StageProfiler:
+    """Records wall time, RSS and allocation peak for named pipeline stages."""
+
+    trace_allocations: bool = True
+    stages: List[StageStats] = field(default_factory=list)
+    _started_tracing: bool = False
+
+    def start(self):
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        rss_before = current_rss_bytes()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            alloc_peak = tracemalloc.get_traced_memory()[1] if tracing else 0
+            self.stages.append(
+                StageStats(
+                    name=name,
+                    seconds=elapsed,
+                    rss_before=rss_before,
+                    rss_after=current_rss_bytes(),
+                    alloc_peak=alloc_peak,
+                )
+            )
+
+    def report(self) -> str:
+        lines = [
+            f"{'stage':<28} {'time_s':>9} {'rss_mb':>9} {'delta_mb':>9} {'alloc_peak_mb':>14}"
+        ]
+        for s in self.stages:
+            lines.append(
+                f"{s.name:<28} {s.seconds:>9.3f} {_mb(s.rss_after):>9.1f} "
+                f"{_mb(s.rss_delta):>+9.1f} {_mb(s.alloc_peak):>14.1f}"
+            )
+        total = sum(s.seconds for s in self.stages)
+        lines.append(f"total time: {total:.3f}s | peak RSS: {_mb(peak_rss_bytes()):.1f} MB")
+        return "\n".join(lines)
+
+def stage_or_noop(profiler: Optional[StageProfiler], name: str):
+    """`profiler.stage(name)` when profiling, otherwise a no-op context."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
@@ -0,0 +1,252 @@
+"""In-process metrics with Prometheus text exposition.
+
+Deliberately small: counters, gauges (including callback gauges evaluated at
+scrape time) and fixed-bucket histograms. An observation is a dict lookup, a
+bisect and a locked increment, cheap enough to leave on in production.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, Union
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    self._children[values] = child
+        return child
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for values, child in list(self._children.items()):
+            lines.append(f"{self.name}{_label_str(self.labelnames, values)} {_fmt(child.value)}")
+        return lines
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+class CallbackGauge(_Metric):
+    """Gauge whose value(s) are computed by `fn` at scrape time.
+
+    `fn` returns a number, or a dict mapping label-value tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, fn: Callable[[], Union[float, Dict]], labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        try:
+            value = self.fn()
+        except Exception:
+            return lines
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for values, v in items:
+            lines.append(f"{self.name}{_label_str(self.labelnames, values)} {_fmt(v)}")
+        return lines
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                labels = _label_str(self.labelnames, values, f'le="{_fmt(le)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_str(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_fmt(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def gauge_callback(self, name: str, documentation: str, fn, labelnames: Sequence[str] = ()) -> CallbackGauge:
+        return self._register(CallbackGauge(name, documentation, fn, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "pricing_stage_seconds",
+    "Latency of price-suggestion pipeline stages",
+    labelnames=("stage",),
+)
+DB_QUERY_SECONDS = registry.histogram(
+    "db_query_seconds",
+    "Latency of DB statements by SQL fingerprint",
+    labelnames=("fingerprint",),
+)
+DB_QUERY_ERRORS = registry.counter(
+    "db_query_errors_total",
+    "Failed DB statements by SQL fingerprint",
+    labelnames=("fingerprint",),
+)
+
+def stage_timer(stage: str):
+    """Context manager recording the block's latency under `stage`."""
+    return STAGE_SECONDS.labels(stage).time()
+
+_WS_RE = re.compile(r"\s+")
+_IN_LIST_RE = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+_VALUES_LIST_RE = re.compile(r"(\(\s*(?:%s|NOW\(\))(?:\s*,\s*(?:%s|NOW\(\)))*\s*\))(?:\s*,\s*\1)+")
+_CASE_RE = re.compile(r"(?:WHEN %s THEN %s ?)+")
+
+@lru_cache(maxsize=1024)
+def sql_fingerprint(sql: str, max_len: int = 120) -> str:
+    """Normalize a statement so batches of different sizes share one label."""
+    s = _WS_RE.sub(" ", sql).strip()
+    s = _VALUES_LIST_RE.sub(r"\1, ...", s)
+    s = _IN_LIST_RE.sub("(?+)", s)
+    s = _CASE_RE.sub("WHEN ... ", s)
+    return s[:max_len]
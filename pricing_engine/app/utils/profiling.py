@@ -0,0 +1,191 @@
+"""Opt-in profiling: cProfile captures and a sampling profiler.
+
+cProfile output (.prof) opens in snakeviz or `python -m pstats`. The sampling
+profiler writes collapsed stacks (`frame;frame;frame count` per line), the
+input format of flamegraph.pl, speedscope and inferno. The sampling endpoint
+runs in the background and answers with the path the stacks will be
+written to, so it never holds a worker for the sampling window.
+"""
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+
+from app.config import Config
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Only one cProfile can be active per interpreter on recent Pythons
+_cprofile_lock = threading.Lock()
+# One background sampling run at a time per process
+_sampling_lock = threading.Lock()
+
+def _profile_path(name: str, suffix: str) -> str:
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    return os.path.join(Config.PROFILE_DIR, f"{name}-{time.time_ns()}-{os.getpid()}{suffix}")
+
+@contextmanager
+def cprofile_to_file(name: str):
+    """Profile the block with cProfile and dump stats under Config.PROFILE_DIR.
+
+    Yields a dict whose "path" is filled in once the profile is written, or
+    left None if another profile was already running.
+    """
+    result = {"path": None}
+    if not _cprofile_lock.acquire(blocking=False):
+        logger.warning("Profiler busy, not profiling %s", name)
+        yield result
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            result["path"] = _profile_path(name, ".prof")
+            profiler.dump_stats(result["path"])
+            logger.info("Wrote profile %s", result["path"])
+    finally:
+        _cprofile_lock.release()
+
+def maybe_profile(name: str, enabled: bool):
+    """`cprofile_to_file(name)` when enabled, otherwise a no-op context."""
+    return cprofile_to_file(name) if enabled else nullcontext({"path": None})
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """Samples the stacks of all threads except its own and the one that
+    started it, at a fixed interval."""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or Config.PROFILE_SAMPLE_INTERVAL_MS / 1000.0
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._caller: Optional[int] = None
+
+    def _run(self):
+        skip = {threading.get_ident(), self._caller}
+        while not self._stop.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in skip:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._stop.clear()
+        self._caller = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {n}" for stack, n in self.stacks.most_common()) + "\n"
+
+    def dump(self, name: str, path: Optional[str] = None) -> str:
+        path = path or _profile_path(name, ".folded")
+        # Written aside and renamed: a client polling for the path never reads half a file
+        with open(path + ".tmp", "w") as f:
+            f.write(self.collapsed())
+        os.replace(path + ".tmp", path)
+        logger.info("Wrote sampled stacks %s", path)
+        return path
+
+def sample_in_background(seconds: float) -> Optional[str]:
+    """Sample all threads for `seconds` without blocking the caller.
+
+    Returns the path the collapsed stacks will be written to once sampling
+    ends, or None if a sampling run is already in progress.
+    """
+    if not _sampling_lock.acquire(blocking=False):
+        return None
+    try:
+        path = _profile_path("sampling", ".folded")
+        profiler = SamplingProfiler()
+        profiler.start()
+    except BaseException:
+        _sampling_lock.release()
+        raise
+
+    def finish():
+        try:
+            profiler.stop()
+            profiler.dump("sampling", path)
+        finally:
+            _sampling_lock.release()
+
+    timer = threading.Timer(seconds, finish)
+    timer.daemon = True
+    timer.start()
+    return path
+
+def _wants_profile(request) -> bool:
+    return request.headers.get("X-Profile") == "1" or request.args.get("profile") == "1"
+
+def init_app_profiling(app):
+    """Register per-request cProfile capture and the sampling endpoint.
+
+    Does nothing unless Config.PROFILING_ENABLED is set.
+    """
+    if not Config.PROFILING_ENABLED:
+        return
+
+    from flask import g, jsonify, request
+
+    @app.before_request
+    def _start_request_profile():
+        if _wants_profile(request):
+            name = "request-" + request.path.strip("/").replace("/", "_")
+            ctx = cprofile_to_file(name)
+            g.profile_result = ctx.__enter__()
+            g.profile_ctx = ctx
+
+    @app.after_request
+    def _finish_request_profile(response):
+        ctx = g.pop("profile_ctx", None)
+        if ctx is not None:
+            ctx.__exit__(None, None, None)
+            path = g.pop("profile_result")["path"]
+            response.headers["X-Profile-Path"] = path or "busy"
+        return response
+
+    @app.teardown_request
+    def _abort_request_profile(exc):
+        # after_request is skipped on unhandled errors; release the profiler
+        ctx = g.pop("profile_ctx", None)
+        if ctx is not None:
+            ctx.__exit__(None, None, None)
+
+    @app.route("/debug/sampling-profile", methods=["GET"])
+    def sampling_profile():
+        max_seconds = Config.PROFILE_MAX_SAMPLE_SECONDS
+        try:
+            seconds = float(request.args.get("seconds", "10"))
+        except ValueError:
+            seconds = float("nan")
+        # Written so that nan fails it too
+        if not 0 < seconds <= max_seconds:
+            return jsonify({"error": f"seconds must be a number in (0, {max_seconds}]"}), 400
+        path = sample_in_background(seconds)
+        if path is None:
+            return jsonify({"error": "a sampling profile is already running"}), 409
+        return jsonify({"status": "sampling", "seconds": seconds, "path": path}), 202
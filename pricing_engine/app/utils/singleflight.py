@@ -0,0 +1,132 @@
+"""Single-flight coalescing: concurrent calls for one key share one execution.
+
+The first caller for a key (the leader) runs the function; callers arriving
+while it is in flight wait for its result, or get its exception, instead of
+running it again. Waiting is bounded by `timeout`; a follower that times out
+gets SingleFlightTimeout while the leader carries on. Nothing is cached
+once the leader finishes; that is the suggestion cache's job.
+
+An async leader cancelled mid-call (its client disconnected, or a deadline)
+does not take its followers down with it: the first of them to wake takes
+over as leader and the rest wait on it, within their original timeout.
+
+Coalescing is per process: threads of one worker (SingleFlight) or tasks of
+one event loop (AsyncSingleFlight).
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.utils.metrics import registry
+
+SINGLEFLIGHT_CALLS = registry.counter(
+    "singleflight_calls_total",
+    "Calls by group and role: leader ran the work, coalesced waited for a leader",
+    labelnames=("group", "role"),
+)
+SINGLEFLIGHT_TIMEOUTS = registry.counter(
+    "singleflight_timeouts_total",
+    "Coalesced calls that gave up waiting for the leader",
+    labelnames=("group",),
+)
+
+class SingleFlightTimeout(TimeoutError):
+    pass
+
+class _LeaderCancelled(Exception):
+    """Set on an async call whose leader was cancelled; followers retry instead of failing."""
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class _Group:
+    def __init__(self, name: str, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self._calls: Dict[Hashable, Any] = {}
+        self._leaders = SINGLEFLIGHT_CALLS.labels(name, "leader")
+        self._coalesced = SINGLEFLIGHT_CALLS.labels(name, "coalesced")
+        self._timeouts = SINGLEFLIGHT_TIMEOUTS.labels(name)
+        registry.gauge_callback(
+            f"singleflight_{name}_in_flight", f"Keys with a {name} call in flight", self.__len__
+        )
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def _timed_out(self, key: Hashable) -> SingleFlightTimeout:
+        self._timeouts.inc()
+        return SingleFlightTimeout(f"{self.name}: gave up after {self.timeout}s waiting for {key!r}")
+
+class SingleFlight(_Group):
+    """Thread-based single flight for sync code."""
+
+    def __init__(self, name: str, timeout: float):
+        super().__init__(name, timeout)
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self._coalesced.inc()
+            if not call.done.wait(self.timeout):
+                raise self._timed_out(key)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self._leaders.inc()
+        try:
+            call.result = fn(*args)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+class AsyncSingleFlight(_Group):
+    """asyncio single flight; keys are shared by tasks of one event loop."""
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        loop = asyncio.get_running_loop()
+        deadline = None
+        while key in self._calls:
+            fut = self._calls[key]
+            if deadline is None:
+                self._coalesced.inc()
+                deadline = loop.time() + self.timeout
+            try:
+                # shield: a follower timing out must not cancel the leader's work
+                return await asyncio.wait_for(asyncio.shield(fut), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                raise self._timed_out(key) from None
+            except _LeaderCancelled:
+                continue  # the key is free again: lead, or follow whoever did first
+
+        fut = self._calls[key] = loop.create_future()
+        self._leaders.inc()
+        try:
+            result = await fn(*args)
+        except BaseException as e:
+            fut.set_exception(_LeaderCancelled() if isinstance(e, asyncio.CancelledError) else e)
+            # Mark retrieved so a leader without followers doesn't log "never retrieved"
+            fut.exception()
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
@@ -0,0 +1,111 @@
+"""Per-worker memory of the gunicorn API with and without pre-fork sharing.
+
+Starts gunicorn once per mode, waits for every worker to answer /health,
+and reads rss/pss/shared/private from /proc/<pid>/smaps_rollup of each
+worker. Sum of pss is the real footprint of the pool; rss counts shared
+pages once per worker. Linux only.
+
+    python -m benchmarks.bench_prefork --model ./models_artifacts/demand/demand_model.pkl --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Dict, List
+
+from app.utils.memory_utils import memory_breakdown
+
+MODES = {
+    # name: (extra gunicorn args, extra env)
+    # gunicorn reads ./gunicorn.conf.py by default; an empty config turns preload off
+    "per_worker": (["-c", os.devnull, "app.api:create_app()"], {}),
+    "preload": (["-c", "gunicorn.conf.py"], {}),
+    "preload_arrays": (["-c", "gunicorn.conf.py"], {"DEMAND_MODEL_USE_ARRAYS": "1"}),
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark per-worker memory of pre-forked serving")
+    parser.add_argument("--model", required=True, help="Demand model pickle")
+    parser.add_argument("--arrays", default=None, help="Tree-array dir (default: <model>_arrays)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=18231)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--output", default="prefork_results.json")
+    return parser.parse_args()
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+def _wait_ready(port: int, master: subprocess.Popen, workers: int, timeout: float = 60) -> List[int]:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if master.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        pids = _children(master.pid)
+        if len(pids) == workers:
+            try:
+                # Several hits so each worker is likely to have served a request
+                for _ in range(workers * 4):
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=2).read()
+                return pids
+            except OSError:
+                pass
+        time.sleep(0.2)
+    raise RuntimeError("Workers did not become ready")
+
+def run_mode(name: str, args) -> Dict[str, Any]:
+    gunicorn_args, extra_env = MODES[name]
+    env = {
+        **os.environ,
+        **extra_env,
+        "LOG_LEVEL": "ERROR",
+        "DEMAND_MODEL_PATH": args.model,
+        "DEMAND_MODEL_ARRAYS_DIR": args.arrays or f"{os.path.splitext(args.model)[0]}_arrays",
+        "GUNICORN_BIND": f"127.0.0.1:{args.port}",
+        "GUNICORN_WORKERS": str(args.workers),
+    }
+    cmd = [sys.executable, "-m", "gunicorn", "-b", env["GUNICORN_BIND"], "-w", str(args.workers), *gunicorn_args]
+    master = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        pids = _wait_ready(args.port, master, args.workers)
+        workers = [{"pid": pid, **memory_breakdown(str(pid))} for pid in pids]
+        master_mem = memory_breakdown(str(master.pid))
+    finally:
+        master.terminate()
+        master.wait(timeout=30)
+    mb = 1024 * 1024
+    return {
+        "mode": name,
+        "workers": workers,
+        "master": master_mem,
+        "total_worker_pss_mb": round(sum(w["pss"] for w in workers) / mb, 1),
+        "total_worker_rss_mb": round(sum(w["rss"] for w in workers) / mb, 1),
+    }
+
+def main():
+    args = parse_args()
+    results = []
+    for name in [m for m in args.modes.split(",") if m]:
+        r = run_mode(name, args)
+        results.append(r)
+        print(f"{name}:", file=sys.stderr)
+        for w in r["workers"]:
+            print(
+                f"  worker {w['pid']:>7} rss={w['rss'] / 2**20:7.1f} MB pss={w['pss'] / 2**20:7.1f} MB "
+                f"shared={w['shared'] / 2**20:7.1f} MB private={w['private'] / 2**20:7.1f} MB",
+                file=sys.stderr,
+            )
+        print(f"  total worker pss {r['total_worker_pss_mb']} MB", file=sys.stderr)
+    with open(args.output, "w") as f:
+        json.dump({"workers": args.workers, "runs": results}, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Startup cost of an API worker: import time, create_app() time and RSS.
+
+Each repeat runs in a fresh interpreter so nothing is already imported; RSS
+is read from /proc, so this is Linux only. The medians are written in the
+run_benchmarks result layout (one run with skus=0), so
+`python -m benchmarks.compare` can track them across commits.
+
+    python -m benchmarks.bench_startup --repeats 5 --output startup.json
+    python -m benchmarks.bench_startup --app asgi --model ./models_artifacts/demand/demand_model.pkl
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from benchmarks.run_benchmarks import _git_sha
+
+# Modules that only training and monitoring need; a serving worker should not load them
+TRAINING_ONLY_MODULES = ("statsmodels", "sklearn", "scipy")
+
+# Must not import anything under app before timing: app/__init__ imports the API
+_PROBE = """
+import json, os, sys, time
+def current_rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+rss0 = current_rss_bytes()
+t0 = time.perf_counter()
+if {app!r} == "asgi":
+    from app.asgi import create_asgi_app as factory
+else:
+    from app.api import create_app as factory
+t1 = time.perf_counter()
+rss1 = current_rss_bytes()
+factory()
+t2 = time.perf_counter()
+print(json.dumps({{
+    "import_seconds": t1 - t0,
+    "create_app_seconds": t2 - t1,
+    "rss_baseline": rss0,
+    "rss_after_import": rss1,
+    "rss_after_create_app": current_rss_bytes(),
+    "training_modules": sorted(m for m in {modules!r} if m in sys.modules),
+}}))
+"""
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark API worker startup")
+    parser.add_argument("--app", choices=("flask", "asgi"), default="flask")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--model", default=None, help="Demand model artifact to load at startup")
+    parser.add_argument("--output", default="startup_results.json")
+    return parser.parse_args()
+
+def probe(app: str, model_path: str = None) -> Dict[str, Any]:
+    """Start one fresh interpreter and measure it."""
+    env = {**os.environ, "LOG_LEVEL": "ERROR"}
+    if model_path:
+        env["DEMAND_MODEL_PATH"] = model_path
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(app=app, modules=TRAINING_ONLY_MODULES)],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def med(key):
+        return statistics.median(s[key] for s in samples)
+
+    mb = 1024 * 1024
+    return {
+        "skus": 0,
+        "stages": {
+            "import_app": {
+                "seconds": round(med("import_seconds"), 4),
+                "rss_mb": round(med("rss_after_import") / mb, 1),
+            },
+            "create_app": {
+                "seconds": round(med("create_app_seconds"), 4),
+                "rss_mb": round(med("rss_after_create_app") / mb, 1),
+            },
+        },
+        "rss_baseline_mb": round(med("rss_baseline") / mb, 1),
+        "training_modules": samples[-1]["training_modules"],
+    }
+
+def main():
+    args = parse_args()
+    samples = [probe(args.app, args.model) for _ in range(args.repeats)]
+    run = summarize(samples)
+    results = {
+        "git_sha": _git_sha(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"app": args.app, "repeats": args.repeats, "model": args.model},
+        "runs": [run],
+    }
+    for name, stage in run["stages"].items():
+        print(f"  {name:<28} {stage['seconds']:>10.3f}s {stage['rss_mb']:>8.1f} MB", file=sys.stderr)
+    if run["training_modules"]:
+        print(f"  training-only modules loaded: {', '.join(run['training_modules'])}", file=sys.stderr)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compare two benchmark result files stage by stage.
+
+    python -m benchmarks.compare base.json head.json --threshold 1.2
+
+Exits non-zero when any stage present in both files got slower than
+`threshold` times its base time.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Tuple
+
+# Stages shorter than this are too noisy to flag
+MIN_SECONDS = 0.05
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Max allowed head/base ratio")
+    return parser.parse_args()
+
+def _stage_seconds(results: Dict[str, Any]) -> Dict[Tuple[int, str], float]:
+    out = {}
+    for run in results["runs"]:
+        for name, stage in run["stages"].items():
+            out[(run["skus"], name)] = float(stage.get("projected_seconds", stage["seconds"]))
+    return out
+
+def main():
+    args = parse_args()
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    base_s = _stage_seconds(base)
+    head_s = _stage_seconds(head)
+
+    print(f"base={base.get('git_sha')} head={head.get('git_sha')}")
+    print(f"{'skus':>8} {'stage':<28} {'base s':>10} {'head s':>10} {'ratio':>7}")
+    regressions = []
+    for key in sorted(base_s.keys() & head_s.keys()):
+        b, h = base_s[key], head_s[key]
+        ratio = h / b if b > 0 else float("inf")
+        flag = ""
+        if ratio > args.threshold and max(b, h) >= MIN_SECONDS:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key[0]:>8} {key[1]:<28} {b:>10.3f} {h:>10.3f} {ratio:>7.2f}{flag}")
+    if regressions:
+        print(f"{len(regressions)} stage(s) slower than {args.threshold}x base")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
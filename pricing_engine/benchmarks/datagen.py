@@ -0,0 +1,104 @@
+"""Synthetic catalog and order history for offline benchmarks."""
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict
+
+import numpy as np
+
+@dataclass
+class CatalogSpec:
+    n_skus: int = 1000
+    n_vendors: int = 50
+    days: int = 30
+    price_variation: float = 0.15  # +/- fraction around each SKU's base price
+    vendor_rules_share: float = 0.8
+    seed: int = 42
+
+def generate(conn: sqlite3.Connection, spec: CatalogSpec, target_date: date) -> Dict[str, int]:
+    """Fill orders, inventory, product analytics and vendor rules.
+
+    Each SKU gets a log-normal base price, a constant elasticity in [-2.5, -0.5]
+    and one aggregated order row per day whose price varies uniformly within
+    `price_variation`, so both the ETL and the elasticity fits see real signal.
+    """
+    rng = np.random.default_rng(spec.seed)
+    n = spec.n_skus
+    skus = np.array([f"SKU{i:07d}" for i in range(n)])
+    vendors = np.array([f"V{i % spec.n_vendors:04d}" for i in range(n)])
+    base_price = np.round(np.exp(rng.normal(3.5, 0.8, n)), 2) + 1.0
+    elasticity = rng.uniform(-2.5, -0.5, n)
+    base_units = rng.gamma(2.0, 3.0, n) + 0.5
+    base_views = rng.gamma(2.0, 50.0, n)
+
+    counts = {"orders": 0, "product_analytics": 0}
+    conn.execute("BEGIN")
+    start = target_date - timedelta(days=spec.days - 1)
+    for d in range(spec.days):
+        day = start + timedelta(days=d)
+        moves = rng.uniform(-spec.price_variation, spec.price_variation, n)
+        price = np.round(base_price * (1 + moves), 2)
+        promo = (rng.random(n) < 0.05).astype(int)
+        lam = base_units * np.power(price / base_price, elasticity) * (1 + 0.3 * promo)
+        units = rng.poisson(lam)
+        sold = units > 0
+        secs = rng.integers(0, 86400, n)
+        day_start = datetime.combine(day, datetime.min.time())
+        order_rows = [
+            (
+                (day_start + timedelta(seconds=int(secs[i]))).isoformat(" "),
+                skus[i],
+                vendors[i],
+                float(price[i]),
+                int(units[i]),
+                int(promo[i]),
+            )
+            for i in np.flatnonzero(sold)
+        ]
+        conn.executemany(
+            "INSERT INTO orders (order_ts, sku, vendor_id, price_paid, units, promo_flag) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            order_rows,
+        )
+        counts["orders"] += len(order_rows)
+
+        views = rng.poisson(base_views)
+        atc = rng.binomial(views, 0.1)
+        conversions = np.minimum(atc, units)
+        conv_rate = np.where(views > 0, conversions / np.maximum(views, 1), 0.0)
+        conn.executemany(
+            "INSERT INTO product_analytics (sku, date, views, add_to_cart, conversions, conv_rate) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            zip(
+                skus.tolist(),
+                [day.isoformat()] * n,
+                views.tolist(),
+                atc.tolist(),
+                conversions.tolist(),
+                conv_rate.tolist(),
+            ),
+        )
+        counts["product_analytics"] += n
+
+    stock = rng.integers(0, 300, n)
+    ageing = rng.integers(0, 120, n)
+    restock = [(target_date + timedelta(days=int(x))).isoformat() for x in rng.integers(1, 30, n)]
+    conn.executemany(
+        "INSERT INTO inventory_snapshots (sku, snapshot_date, stock_qty, ageing_days, restock_eta_date) "
+        "VALUES (?, ?, ?, ?, ?)",
+        zip(skus.tolist(), [target_date.isoformat()] * n, stock.tolist(), ageing.tolist(), restock),
+    )
+
+    with_rules = np.flatnonzero(rng.random(n) < spec.vendor_rules_share)
+    conn.executemany(
+        "INSERT INTO vendor_rules (sku, vendor_id, min_margin_pct, max_discount_pct, max_daily_price_move_pct) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            (skus[i], vendors[i], float(rng.uniform(5, 25)), float(rng.uniform(20, 60)), float(rng.uniform(5, 25)))
+            for i in with_rules
+        ],
+    )
+    conn.execute("COMMIT")
+    counts["inventory_snapshots"] = n
+    counts["vendor_rules"] = len(with_rules)
+    return counts
@@ -0,0 +1,219 @@
+"""Offline benchmark of the pricing pipeline on synthetic data.
+
+For each catalog size a fresh SQLite database is generated and installed
+behind app.db, then the ETL, elasticity training, demand training, single-SKU
+optimization, the batch pricing job and monitoring are timed in pipeline
+order. Results are written as JSON; compare two runs with
+`python -m benchmarks.compare base.json head.json`.
+
+    python -m benchmarks.run_benchmarks --sizes 1000,10000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List
+
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from app import db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.features.etl import run_daily_feature_etl  # noqa: E402
+from app.models import demand_model  # noqa: E402
+from app.models.elasticity import (  # noqa: E402
+    fit_elasticity_batch,
+    fit_elasticity_model,
+    prepare_elasticity_data,
+    save_elasticities_to_db,
+)
+from app.monitoring.monitor import run_daily_monitoring  # noqa: E402
+from app.optimizer.batch import load_batch_targets, price_skus  # noqa: E402
+from app.optimizer.inputs import clear_input_caches  # noqa: E402
+from app.optimizer.price_optimizer import optimize_price_for_sku  # noqa: E402
+from app.utils.memory_utils import peak_rss_bytes  # noqa: E402
+from benchmarks.datagen import CatalogSpec, generate  # noqa: E402
+from benchmarks.sqlite_backend import SQLiteConnection, create_schema, sqlite_connection_factory  # noqa: E402
+
+DEFAULT_SIZES = "1000,10000,100000"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the offline pricing benchmarks")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma separated SKU counts")
+    parser.add_argument("--days", type=int, default=30, help="Days of order history per SKU")
+    parser.add_argument("--vendors", type=int, default=50)
+    parser.add_argument("--price-variation", type=float, default=0.15)
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=2000,
+        help="SKUs timed in the per-SKU stages; totals are projected to the full catalog",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", default=None, help="Keep generated databases here")
+    parser.add_argument("--output", default="benchmark_results.json")
+    return parser.parse_args()
+
+def _git_sha() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+@contextmanager
+def _timed(results: Dict[str, Any], name: str, **extra):
+    start = time.perf_counter()
+    yield
+    results[name] = {"seconds": round(time.perf_counter() - start, 4), **extra}
+
+def _latency_summary(fn: Callable[[Dict[str, Any]], Any], rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = []
+    for r in rows:
+        start = time.perf_counter()
+        fn(r)
+        latencies.append(time.perf_counter() - start)
+    arr = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "calls": len(latencies),
+        "seconds": round(float(arr.sum()), 4),
+        "p50_ms": round(float(np.percentile(arr, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(arr, 95)) * 1000, 3),
+        "max_ms": round(float(arr.max()) * 1000, 3),
+    }
+
+def _sample(rows: List[Dict[str, Any]], n: int, seed: int) -> List[Dict[str, Any]]:
+    if len(rows) <= n:
+        return rows
+    idx = np.random.default_rng(seed).choice(len(rows), size=n, replace=False)
+    return [rows[i] for i in sorted(idx)]
+
+def run_size(n_skus: int, args, workdir: str) -> Dict[str, Any]:
+    db_path = os.path.join(workdir, f"bench_{n_skus}.sqlite")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    create_schema(db_path)
+    target_date = date.today()
+    spec = CatalogSpec(
+        n_skus=n_skus,
+        n_vendors=args.vendors,
+        days=args.days,
+        price_variation=args.price_variation,
+        seed=args.seed,
+    )
+    stages: Dict[str, Any] = {}
+
+    raw = SQLiteConnection(db_path)
+    try:
+        with _timed(stages, "datagen"):
+            row_counts = generate(raw.raw, spec, target_date)
+    finally:
+        raw.close()
+    stages["datagen"]["rows"] = row_counts
+
+    db.set_connection_factory(sqlite_connection_factory(db_path))
+    Config.DEMAND_MODEL_PATH = os.path.join(workdir, f"demand_{n_skus}.pkl")
+    Config.DEMAND_MODEL_ARRAYS_DIR = os.path.join(workdir, f"demand_{n_skus}_arrays")
+    demand_model._global_model = None
+
+    with _timed(stages, "feature_etl"):
+        run_daily_feature_etl(target_date)
+
+    pairs = db.fetch_all("SELECT DISTINCT sku, vendor_id FROM orders")
+    sampled_pairs = _sample(pairs, args.sample, args.seed)
+
+    def _fit_one(r):
+        fit_elasticity_model(prepare_elasticity_data(r["sku"], r["vendor_id"]))
+
+    per_sku = _latency_summary(_fit_one, sampled_pairs)
+    per_sku["projected_seconds"] = round(per_sku["seconds"] * len(pairs) / max(len(sampled_pairs), 1), 4)
+    stages["elasticity_train_per_sku"] = per_sku
+
+    with _timed(stages, "elasticity_train_batch"):
+        orders = pd.DataFrame(
+            db.fetch_all(
+                "SELECT sku, vendor_id, DATE(order_ts) AS date, price_paid AS price, "
+                "SUM(units) AS units, MAX(promo_flag) AS promo_flag FROM orders "
+                "GROUP BY sku, vendor_id, DATE(order_ts), price_paid HAVING SUM(units) > 0"
+            )
+        )
+        coeffs = fit_elasticity_batch(orders)
+        save_elasticities_to_db(coeffs)
+    stages["elasticity_train_batch"]["models"] = int(len(coeffs))
+
+    with _timed(stages, "demand_train"):
+        X, y = demand_model.build_training_data()
+        model, _ = demand_model.train_demand_model(X, y)
+        demand_model.save_demand_model(model)
+    stages["demand_train"]["rows"] = int(len(X))
+
+    targets = load_batch_targets()
+    sampled_targets = _sample(targets, args.sample, args.seed)
+    # First call loads the model artifact; keep it out of the latency numbers
+    if sampled_targets:
+        optimize_price_for_sku(sampled_targets[0]["sku"], sampled_targets[0]["vendor_id"])
+    # Time cold input reads; the batch job below starts cold as well
+    clear_input_caches()
+    stages["optimize_price_for_sku"] = _latency_summary(
+        lambda r: optimize_price_for_sku(r["sku"], r["vendor_id"]), sampled_targets
+    )
+
+    clear_input_caches()
+    with _timed(stages, "batch_job"):
+        counts = price_skus(sampled_targets)
+    batch = stages["batch_job"]
+    batch.update(counts)
+    batch["projected_seconds"] = round(batch["seconds"] * len(targets) / max(len(sampled_targets), 1), 4)
+
+    with _timed(stages, "monitoring"):
+        run_daily_monitoring(target_date)
+
+    return {
+        "skus": n_skus,
+        "sample": len(sampled_targets),
+        "stages": stages,
+        "peak_rss_mb": round(peak_rss_bytes() / 2**20, 1),
+    }
+
+def main():
+    args = parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = {
+        "git_sha": _git_sha(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "days": args.days,
+            "vendors": args.vendors,
+            "price_variation": args.price_variation,
+            "sample": args.sample,
+            "seed": args.seed,
+        },
+        "runs": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="pricing-bench-") as tmp:
+        workdir = args.workdir or tmp
+        os.makedirs(workdir, exist_ok=True)
+        for n in sizes:
+            print(f"Benchmarking {n} SKUs...", file=sys.stderr)
+            run = run_size(n, args, workdir)
+            results["runs"].append(run)
+            for name, stage in run["stages"].items():
+                print(f"  {name:<28} {stage['seconds']:>10.3f}s", file=sys.stderr)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
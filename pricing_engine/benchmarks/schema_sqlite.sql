@@ -0,0 +1,228 @@
+-- SQLite version of the tables the pricing engine reads and writes, used by
+-- the offline benchmark stand-in. Keep in sync with migrations/.
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_ts TIMESTAMP NOT NULL,
+    sku TEXT NOT NULL,
+    vendor_id TEXT NOT NULL,
+    price_paid REAL NOT NULL,
+    units INTEGER NOT NULL,
+    promo_flag INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_orders_ts ON orders (order_ts);
+CREATE INDEX IF NOT EXISTS idx_orders_sku ON orders (sku, vendor_id);
+
+CREATE TABLE IF NOT EXISTS inventory_snapshots (
+    sku TEXT NOT NULL,
+    snapshot_date DATE NOT NULL,
+    stock_qty INTEGER NOT NULL,
+    ageing_days INTEGER,
+    restock_eta_date DATE,
+    PRIMARY KEY (sku, snapshot_date)
+);
+
+CREATE TABLE IF NOT EXISTS product_analytics (
+    sku TEXT NOT NULL,
+    date DATE NOT NULL,
+    views INTEGER,
+    add_to_cart INTEGER,
+    conversions INTEGER,
+    conv_rate REAL,
+    PRIMARY KEY (sku, date)
+);
+
+CREATE TABLE IF NOT EXISTS sku_features_daily (
+    sku TEXT NOT NULL,
+    date DATE NOT NULL,
+    vendor_id TEXT NOT NULL,
+    avg_daily_sales_7d REAL,
+    avg_daily_sales_30d REAL,
+    last_price REAL,
+    current_price REAL,
+    inventory REAL,
+    views_7d INTEGER,
+    views_30d INTEGER,
+    add_to_cart_7d INTEGER,
+    conv_rate_7d REAL,
+    promo_flag INTEGER,
+    ageing_days REAL,
+    restock_eta_days INTEGER,
+    cost_price REAL,
+    base_price REAL,
+    other_features_json TEXT,
+    PRIMARY KEY (sku, date, vendor_id)
+);
+CREATE INDEX IF NOT EXISTS idx_features_date ON sku_features_daily (date);
+
+CREATE TABLE IF NOT EXISTS vendor_rules (
+    sku TEXT NOT NULL,
+    vendor_id TEXT NOT NULL,
+    min_margin_pct REAL NOT NULL,
+    max_discount_pct REAL NOT NULL,
+    max_daily_price_move_pct REAL NOT NULL,
+    PRIMARY KEY (sku, vendor_id)
+);
+
+CREATE TABLE IF NOT EXISTS elasticity_coeffs (
+    sku TEXT NOT NULL,
+    vendor_id TEXT NOT NULL,
+    elasticity REAL,
+    r2 REAL,
+    p_value_price REAL,
+    n_obs INTEGER,
+    last_trained_at TIMESTAMP,
+    PRIMARY KEY (sku, vendor_id)
+);
+
+CREATE TABLE IF NOT EXISTS price_suggestions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sku TEXT NOT NULL,
+    vendor_id TEXT NOT NULL,
+    suggestion_date DATE NOT NULL,
+    current_price REAL,
+    suggested_price REAL,
+    expected_revenue REAL,
+    expected_profit REAL,
+    elasticity REAL,
+    confidence REAL,
+    reason TEXT,
+    status TEXT,
+    input_fingerprint TEXT,
+    batch_run_id INTEGER,
+    content_fingerprint TEXT,
+    created_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_suggestions_batch_run ON price_suggestions (batch_run_id);
+CREATE INDEX IF NOT EXISTS idx_suggestions_fingerprint ON price_suggestions (sku, vendor_id, input_fingerprint);
+CREATE INDEX IF NOT EXISTS idx_suggestions_sku ON price_suggestions (sku, vendor_id, suggested_price);
+CREATE INDEX IF NOT EXISTS idx_suggestions_date ON price_suggestions (suggestion_date);
+
+CREATE TABLE IF NOT EXISTS prediction_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sku TEXT,
+    vendor_id TEXT,
+    suggestion_id INTEGER,
+    model_type TEXT,
+    input_features_json TEXT,
+    output_json TEXT,
+    created_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS price_feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    vendor_id TEXT,
+    sku TEXT,
+    suggested_price REAL,
+    action TEXT,
+    custom_price REAL,
+    timestamp TIMESTAMP,
+    suggestion_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS monitoring_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date DATE,
+    sku TEXT,
+    vendor_id TEXT,
+    model_type TEXT,
+    metric_name TEXT,
+    metric_value REAL,
+    created_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS feedback_counters (
+    scope TEXT NOT NULL,
+    scope_key TEXT NOT NULL,
+    accept_cnt INTEGER NOT NULL DEFAULT 0,
+    reject_cnt INTEGER NOT NULL DEFAULT 0,
+    custom_cnt INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (scope, scope_key)
+);
+
+CREATE TABLE IF NOT EXISTS batch_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL,
+    model_version TEXT,
+    priced INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    unchanged INTEGER NOT NULL DEFAULT 0,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_batch_runs_status ON batch_runs (status, id);
+
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target_date DATE NOT NULL,
+    status TEXT NOT NULL,
+    partitions INTEGER NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS pipeline_tasks (
+    run_id INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    partition_no INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    row_count INTEGER,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    seconds REAL,
+    error TEXT,
+    PRIMARY KEY (run_id, stage, partition_no)
+);
+
+CREATE TABLE IF NOT EXISTS job_partitions (
+    batch_run_id INTEGER NOT NULL,
+    partition_no INTEGER NOT NULL,
+    partition_count INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    lease_owner TEXT,
+    lease_version INTEGER NOT NULL DEFAULT 0,
+    lease_expires_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    priced INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    unchanged INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    finished_at TIMESTAMP,
+    PRIMARY KEY (batch_run_id, partition_no)
+);
+
+CREATE TABLE IF NOT EXISTS suggestion_input_fingerprints (
+    sku TEXT NOT NULL,
+    vendor_id TEXT NOT NULL,
+    content_fingerprint TEXT NOT NULL,
+    suggestion_id INTEGER NOT NULL,
+    computed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (sku, vendor_id)
+);
+
+-- No partitioning in the stand-in; retention only applies to MySQL
+CREATE TABLE IF NOT EXISTS prediction_logs_daily (
+    date DATE NOT NULL,
+    vendor_id TEXT NOT NULL,
+    model_type TEXT NOT NULL,
+    predictions INTEGER NOT NULL,
+    skus INTEGER NOT NULL,
+    expected_revenue REAL,
+    expected_profit REAL,
+    updated_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (date, vendor_id, model_type)
+);
+
+CREATE TABLE IF NOT EXISTS monitoring_metrics_daily (
+    date DATE NOT NULL,
+    model_type TEXT NOT NULL,
+    metric_name TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    value_avg REAL,
+    value_min REAL,
+    value_max REAL,
+    updated_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (date, model_type, metric_name)
+);
@@ -0,0 +1,157 @@
+"""SQLite stand-in for the MySQL database behind app.db.
+
+Connections created here look enough like pymysql DictCursor connections for
+the app's SQL to run unchanged: statements are translated from the MySQL
+dialect the app uses (%s placeholders, NOW(), ON DUPLICATE KEY UPDATE, row
+value IN lists, ...) and rows come back as dicts. Install it with
+`app.db.set_connection_factory(sqlite_connection_factory(path))`.
+"""
+import os
+import re
+import sqlite3
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema_sqlite.sql")
+
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(" "))
+sqlite3.register_adapter(pd.Timestamp, lambda d: d.isoformat(" "))
+sqlite3.register_adapter(Decimal, float)
+for _t in (np.float16, np.float32, np.float64):
+    sqlite3.register_adapter(_t, float)
+for _t in (np.int8, np.int16, np.int32, np.int64, np.uint8, np.uint16, np.uint32, np.uint64):
+    sqlite3.register_adapter(_t, int)
+sqlite3.register_adapter(np.bool_, bool)
+
+def _convert_date(value: bytes):
+    return date.fromisoformat(value.decode()[:10])
+
+def _convert_timestamp(value: bytes):
+    return datetime.fromisoformat(value.decode())
+
+sqlite3.register_converter("DATE", _convert_date)
+sqlite3.register_converter("TIMESTAMP", _convert_timestamp)
+sqlite3.register_converter("DATETIME", _convert_timestamp)
+
+_UPSERT_RE = re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", re.IGNORECASE)
+_VALUES_FN_RE = re.compile(r"VALUES\((\w+)\)", re.IGNORECASE)
+_ROW_IN_RE = re.compile(r"\bIN\s*\(\s*\(", re.IGNORECASE)
+_FUNCTIONS = [
+    (re.compile(r"\bNOW\(\)", re.IGNORECASE), "CURRENT_TIMESTAMP"),
+    (re.compile(r"\bCURDATE\(\)", re.IGNORECASE), "CURRENT_DATE"),
+    (re.compile(r"\bLAST_INSERT_ID\(\)", re.IGNORECASE), "last_insert_rowid()"),
+    (re.compile(r"\bGREATEST\(", re.IGNORECASE), "MAX("),
+    (re.compile(r"\bLEAST\(", re.IGNORECASE), "MIN("),
+]
+
+@lru_cache(maxsize=2048)
+def translate(sql: str) -> str:
+    """Rewrite a statement from the app's MySQL dialect to SQLite."""
+    s = sql.replace("%s", "?").replace("%%", "%")
+    for pattern, repl in _FUNCTIONS:
+        s = pattern.sub(repl, s)
+    s = _ROW_IN_RE.sub("IN (VALUES (", s)
+    parts = _UPSERT_RE.split(s, maxsplit=1)
+    if len(parts) == 2:
+        head, tail = parts
+        s = head + "ON CONFLICT DO UPDATE SET" + _VALUES_FN_RE.sub(r"excluded.\1", tail)
+    return s
+
+class SQLiteCursor:
+    def __init__(self, conn: sqlite3.Connection):
+        self._cur = conn.cursor()
+
+    def __enter__(self) -> "SQLiteCursor":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cur.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount
+
+    def execute(self, sql: str, params: Optional[Sequence[Any]] = None) -> int:
+        self._cur.execute(translate(sql), tuple(params or ()))
+        return self._cur.rowcount
+
+    def executemany(self, sql: str, seq_params: Sequence[Sequence[Any]]) -> int:
+        self._cur.executemany(translate(sql), [tuple(p) for p in seq_params])
+        return self._cur.rowcount
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        row = self._cur.fetchone()
+        return dict(row) if row is not None else None
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        return [dict(r) for r in self._cur.fetchall()]
+
+    def close(self):
+        self._cur.close()
+
+class SQLiteConnection:
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(
+            path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # MySQL's CRC32(), used by the pipeline's SKU partition filters
+        self._conn.create_function(
+            "CRC32", 1, lambda s: None if s is None else zlib.crc32(str(s).encode()), deterministic=True
+        )
+        self.open = True
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self._conn)
+
+    def ping(self, reconnect: bool = True):
+        pass
+
+    def begin(self):
+        self._conn.execute("BEGIN")
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def close(self):
+        self.open = False
+        self._conn.close()
+
+    @property
+    def raw(self) -> sqlite3.Connection:
+        return self._conn
+
+def create_schema(path: str):
+    with open(SCHEMA_PATH) as f:
+        ddl = f.read()
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(ddl)
+    finally:
+        conn.close()
+
+def sqlite_connection_factory(path: str) -> Callable[[], SQLiteConnection]:
+    return lambda: SQLiteConnection(path)
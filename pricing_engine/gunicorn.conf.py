@@ -0,0 +1,35 @@
+"""gunicorn settings for the pre-forked Flask API.
+
+    gunicorn -c gunicorn.conf.py
+
+The app is created in the master (preload_app), so the demand model, and the
+precomputed index and input caches when enabled, load once and are shared
+copy-on-write by the workers. Set DEMAND_MODEL_USE_ARRAYS=1 to map the
+exported tree arrays instead of unpickling the booster.
+
+Requests must not hang on a slow database: create_app() applies
+SERVING_DB_TIMEOUT_SEC as the per-statement deadline unless the environment
+sets DB_READ_TIMEOUT_SEC / DB_WRITE_TIMEOUT_SEC (batch jobs keep none).
+"""
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+wsgi_app = "app.api:create_app()"
+preload_app = True
+
+def when_ready(server):
+    from app.prefork import preload
+
+    preload()
+
+def pre_fork(server, worker):
+    from app.prefork import before_fork
+
+    before_fork()
+
+def post_fork(server, worker):
+    from app.prefork import after_fork_in_worker
+
+    after_fork_in_worker()
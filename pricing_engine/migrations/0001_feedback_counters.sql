@@ -0,0 +1,12 @@
+-- Incrementally maintained feedback aggregates.
+-- scope is one of 'global' (scope_key '_global_'), 'vendor' (vendor_id)
+-- or 'day' (YYYY-MM-DD of the feedback timestamp).
+CREATE TABLE IF NOT EXISTS feedback_counters (
+    scope VARCHAR(16) NOT NULL,
+    scope_key VARCHAR(64) NOT NULL,
+    accept_cnt BIGINT NOT NULL DEFAULT 0,
+    reject_cnt BIGINT NOT NULL DEFAULT 0,
+    custom_cnt BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (scope, scope_key)
+);
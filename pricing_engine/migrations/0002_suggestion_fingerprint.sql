@@ -0,0 +1,6 @@
+-- Identifies the inputs a suggestion was computed from:
+-- sha1(sku|vendor_id|feature date|demand model version), truncated.
+-- GET /price-suggestions reuses a row with a matching fingerprint instead of
+-- inserting a new one.
+ALTER TABLE price_suggestions ADD COLUMN input_fingerprint CHAR(16) NULL;
+CREATE INDEX idx_suggestions_fingerprint ON price_suggestions (sku, vendor_id, input_fingerprint);
@@ -0,0 +1,14 @@
+-- One row per batch pricing run. API workers serving precomputed
+-- suggestions load the latest COMPLETE run's rows from price_suggestions.
+CREATE TABLE IF NOT EXISTS batch_runs (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    status VARCHAR(16) NOT NULL,
+    model_version VARCHAR(64) NULL,
+    priced INT NOT NULL DEFAULT 0,
+    skipped INT NOT NULL DEFAULT 0,
+    started_at DATETIME NOT NULL,
+    finished_at DATETIME NULL,
+    KEY idx_batch_runs_status (status, id)
+);
+ALTER TABLE price_suggestions ADD COLUMN batch_run_id BIGINT NULL;
+CREATE INDEX idx_suggestions_batch_run ON price_suggestions (batch_run_id);
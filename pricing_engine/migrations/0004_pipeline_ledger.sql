@@ -0,0 +1,25 @@
+-- Ledger of nightly pipeline runs (app/pipeline). One row per run and one
+-- per stage partition (partition_no -1 for stages that are not partitioned)
+-- with its outcome, attempts, rows produced and timings.
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    target_date DATE NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    partitions INT NOT NULL,
+    started_at DATETIME NOT NULL,
+    finished_at DATETIME NULL,
+    KEY idx_pipeline_runs_date (target_date, id)
+);
+CREATE TABLE IF NOT EXISTS pipeline_tasks (
+    run_id BIGINT NOT NULL,
+    stage VARCHAR(32) NOT NULL,
+    partition_no INT NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    row_count BIGINT NULL,
+    started_at DATETIME NULL,
+    finished_at DATETIME NULL,
+    seconds DOUBLE NULL,
+    error TEXT NULL,
+    PRIMARY KEY (run_id, stage, partition_no)
+);
@@ -0,0 +1,21 @@
+-- Work queue for distributed batch pricing (app/optimizer/batch_queue.py).
+-- The coordinator inserts one PENDING row per SKU partition of a batch run;
+-- workers lease rows with compare-and-set UPDATEs on lease_version, renew
+-- lease_expires_at while working and mark them DONE with their counts.
+CREATE TABLE IF NOT EXISTS job_partitions (
+    batch_run_id BIGINT NOT NULL,
+    partition_no INT NOT NULL,
+    partition_count INT NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    lease_owner VARCHAR(128) NULL,
+    lease_version INT NOT NULL DEFAULT 0,
+    lease_expires_at DATETIME(6) NULL,
+    heartbeat_at DATETIME(6) NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    priced INT NOT NULL DEFAULT 0,
+    skipped INT NOT NULL DEFAULT 0,
+    error TEXT NULL,
+    finished_at DATETIME NULL,
+    PRIMARY KEY (batch_run_id, partition_no),
+    KEY idx_job_partitions_claim (batch_run_id, status, lease_expires_at)
+);
@@ -0,0 +1,15 @@
+-- Delta repricing (app/optimizer/batch.py). One row per sku/vendor with a
+-- fingerprint of the inputs its last computed suggestion used (feature
+-- values, vendor rules, elasticity, demand model version). Batch runs in
+-- delta mode copy that suggestion forward instead of re-optimizing while
+-- the fingerprint matches and computed_at is recent enough.
+CREATE TABLE IF NOT EXISTS suggestion_input_fingerprints (
+    sku VARCHAR(64) NOT NULL,
+    vendor_id VARCHAR(64) NOT NULL,
+    content_fingerprint CHAR(16) NOT NULL,
+    suggestion_id BIGINT NOT NULL,
+    computed_at DATETIME NOT NULL,
+    PRIMARY KEY (sku, vendor_id)
+);
+ALTER TABLE batch_runs ADD COLUMN unchanged INT NOT NULL DEFAULT 0;
+ALTER TABLE job_partitions ADD COLUMN unchanged INT NOT NULL DEFAULT 0;
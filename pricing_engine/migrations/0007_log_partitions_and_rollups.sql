@@ -0,0 +1,48 @@
+-- Date-partitioned prediction_logs and monitoring_metrics, plus daily rollups.
+--
+-- Both tables become RANGE COLUMNS partitioned on their timestamp/date with
+-- a single catch-all partition; app/monitoring/retention.py splits dated
+-- partitions off p_future ahead of time and drops expired ones (instead of
+-- DELETEs). The first dated partition also holds every older row. MySQL
+-- requires the partition column in each unique key, hence the wider keys.
+-- Rebuilding a large table here takes a full copy: run it in a quiet window.
+ALTER TABLE prediction_logs
+    MODIFY created_at DATETIME NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, created_at);
+ALTER TABLE prediction_logs
+    PARTITION BY RANGE COLUMNS (created_at) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+ALTER TABLE monitoring_metrics
+    MODIFY date DATE NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, date);
+ALTER TABLE monitoring_metrics
+    PARTITION BY RANGE COLUMNS (date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+-- Per day, vendor and model: what monitoring and dashboards read instead
+-- of scanning prediction_logs
+CREATE TABLE IF NOT EXISTS prediction_logs_daily (
+    date DATE NOT NULL,
+    vendor_id VARCHAR(64) NOT NULL,
+    model_type VARCHAR(32) NOT NULL,
+    predictions BIGINT NOT NULL,
+    skus INT NOT NULL,
+    expected_revenue DECIMAL(18, 4) NULL,
+    expected_profit DECIMAL(18, 4) NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (date, vendor_id, model_type)
+);
+
+-- Per day, model and metric across all skus/vendors
+CREATE TABLE IF NOT EXISTS monitoring_metrics_daily (
+    date DATE NOT NULL,
+    model_type VARCHAR(32) NOT NULL,
+    metric_name VARCHAR(128) NOT NULL,
+    points INT NOT NULL,
+    value_avg DOUBLE NULL,
+    value_min DOUBLE NULL,
+    value_max DOUBLE NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (date, model_type, metric_name)
+);
@@ -0,0 +1,7 @@
+-- Content fingerprint (app/optimizer/suggestions.content_fingerprint) of the
+-- inputs each suggestion was priced with, stored on the row itself so the
+-- precomputed index can tell a stale batch suggestion from a current one
+-- without joining suggestion_input_fingerprints, which only tracks a SKU's
+-- latest computation. NULL for rows written before this migration and for
+-- suggestions replayed from the degraded-mode spool.
+ALTER TABLE price_suggestions ADD COLUMN content_fingerprint CHAR(16) NULL;
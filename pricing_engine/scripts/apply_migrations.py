@@ -0,0 +1,38 @@
+import os
+
+from app.db import execute_query, fetch_all, primary_reads
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+def _statements(sql_text: str):
+    lines = [l for l in sql_text.splitlines() if not l.strip().startswith("--")]
+    for stmt in "\n".join(lines).split(";"):
+        if stmt.strip():
+            yield stmt.strip()
+
+def main():
+    execute_query(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name VARCHAR(255) NOT NULL PRIMARY KEY,
+            applied_at DATETIME NOT NULL
+        )
+        """
+    )
+    with primary_reads():
+        applied = {r["name"] for r in fetch_all("SELECT name FROM schema_migrations")}
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not name.endswith(".sql") or name in applied:
+            continue
+        logger.info(f"Applying migration {name}")
+        with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+            for stmt in _statements(f.read()):
+                execute_query(stmt)
+        execute_query("INSERT INTO schema_migrations (name, applied_at) VALUES (%s, NOW())", (name,))
+    logger.info("Migrations up to date")
+
+if __name__ == "__main__":
+    main()
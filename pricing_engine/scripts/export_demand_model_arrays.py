@@ -0,0 +1,14 @@
+from joblib import load
+
+from app.config import Config
+from app.models.demand_model import export_demand_model_arrays
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+def main():
+    logger.info(f"Exporting {Config.DEMAND_MODEL_PATH} as tree arrays")
+    export_demand_model_arrays(load(Config.DEMAND_MODEL_PATH))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import argparse
+from datetime import date, timedelta
+
+from app.monitoring.retention import maintain_partitions
+from app.monitoring.rollups import refresh_daily_rollups
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Refresh daily rollups and add/drop prediction_logs and monitoring_metrics partitions"
+    )
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Run as of this date (default: today)")
+    parser.add_argument(
+        "--rollup-days",
+        type=int,
+        default=1,
+        help="Days before --date to (re)compute rollups for; raise it to backfill",
+    )
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    today = args.date or date.today()
+    for i in range(args.rollup_days, 0, -1):
+        refresh_daily_rollups(today - timedelta(days=i))
+    result = maintain_partitions(today)
+    logger.info(f"Log storage maintenance completed: {result}")
+
+if __name__ == "__main__":
+    main()
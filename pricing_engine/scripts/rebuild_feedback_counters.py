@@ -0,0 +1,11 @@
+from app.feedback.counters import rebuild_feedback_counters
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+def main():
+    logger.info("Rebuilding feedback counters from price_feedback")
+    rebuild_feedback_counters()
+
+if __name__ == "__main__":
+    main()
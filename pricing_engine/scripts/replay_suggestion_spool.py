@@ -0,0 +1,22 @@
+import argparse
+
+from app.optimizer.suggestion_spool import SuggestionSpool
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Persist suggestions and feedback spooled while the API was serving in degraded mode"
+    )
+    parser.add_argument("--path", default=None, help="Spool file (default: Config.SUGGESTION_SPOOL_PATH)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    spool = SuggestionSpool(args.path)
+    written = spool.replay()
+    logger.info("Persisted %d spooled records from %s", written, spool.path)
+
+if __name__ == "__main__":
+    main()
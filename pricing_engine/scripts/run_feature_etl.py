@@ -1,13 +1,38 @@
+import argparse
 from datetime import date
 
 from app.features.etl import run_daily_feature_etl
 from app.utils.logging_utils import get_logger
+from app.utils.memory_utils import StageProfiler
+from app.utils.profiling import maybe_profile
 
 logger = get_logger(__name__)
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the daily feature ETL")
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Report peak RSS and per-stage memory/time after the run",
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="Write a cProfile dump to Config.PROFILE_DIR"
+    )
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     logger.info("Starting daily feature ETL script")
-    run_daily_feature_etl(date.today())
+    profiler = StageProfiler() if args.profile_memory else None
+    if profiler:
+        profiler.start()
+    try:
+        with maybe_profile("run_feature_etl", args.profile):
+            run_daily_feature_etl(date.today(), profiler=profiler)
+    finally:
+        if profiler:
+            profiler.stop()
+            logger.info("ETL memory profile:\n" + profiler.report())
     logger.info("Feature ETL completed")
 
 if __name__ == "__main__":
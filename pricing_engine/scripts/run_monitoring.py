@@ -1,14 +1,25 @@
+import argparse
 from datetime import date, timedelta
 
 from app.monitoring.monitor import run_daily_monitoring
 from app.utils.logging_utils import get_logger
+from app.utils.profiling import maybe_profile
 
 logger = get_logger(__name__)
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run daily model monitoring")
+    parser.add_argument(
+        "--profile", action="store_true", help="Write a cProfile dump to Config.PROFILE_DIR"
+    )
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     target_date = date.today() - timedelta(days=1)
     logger.info(f"Running monitoring for {target_date}")
-    run_daily_monitoring(target_date)
+    with maybe_profile("run_monitoring", args.profile):
+        run_daily_monitoring(target_date)
 
 if __name__ == "__main__":
     main()
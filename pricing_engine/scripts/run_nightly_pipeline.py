@@ -0,0 +1,44 @@
+import argparse
+import sys
+from datetime import date
+
+from app.pipeline.nightly import run_nightly_pipeline
+from app.utils.logging_utils import get_logger
+from app.utils.profiling import maybe_profile
+
+logger = get_logger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Run ETL, elasticity, demand training, batch pricing and monitoring as one pipeline"
+    )
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Target date (default: today)")
+    parser.add_argument("--partitions", type=int, default=None, help="SKU hash partitions (Config.PIPELINE_PARTITIONS)")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent tasks (Config.PIPELINE_WORKERS)")
+    parser.add_argument(
+        "--overlap-demand-training",
+        action="store_true",
+        default=None,
+        help="Price with the current demand model instead of waiting for tonight's",
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="Write a cProfile dump to Config.PROFILE_DIR"
+    )
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    with maybe_profile("run_nightly_pipeline", args.profile):
+        result = run_nightly_pipeline(
+            args.date,
+            partition_count=args.partitions,
+            workers=args.workers,
+            overlap_demand=args.overlap_demand_training,
+        )
+    for stage, s in result.summary().items():
+        logger.info(f"{stage}: {s}")
+    if not result.ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,74 @@
-from datetime import date
+import argparse
 
-from app.db import fetch_all
-from app.optimizer.price_optimizer import optimize_price_for_sku, persist_optimization_result, log_prediction
+from app.optimizer.batch import finish_batch_run, load_batch_targets, price_skus, start_batch_run
+from app.optimizer.batch_queue import find_open_batch, open_distributed_batch, run_worker, wait_for_batch
 from app.utils.logging_utils import get_logger
+from app.utils.profiling import maybe_profile
 
 logger = get_logger(__name__)
 
-def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the batch price recommendation job")
+    parser.add_argument(
+        "--profile", action="store_true", help="Write a cProfile dump to Config.PROFILE_DIR"
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        default=None,
+        help="Only re-optimize SKUs whose inputs changed or whose suggestion is too old (Config.BATCH_DELTA_REPRICING)",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--coordinator",
+        action="store_true",
+        help="Queue the batch's SKU partitions in job_partitions and wait for workers to price them",
+    )
+    mode.add_argument(
+        "--worker", action="store_true", help="Claim and price queued partitions until none are left"
+    )
+    parser.add_argument(
+        "--partitions", type=int, default=None, help="Partitions to queue (Config.BATCH_QUEUE_PARTITIONS)"
+    )
+    parser.add_argument(
+        "--batch-run-id", type=int, default=None, help="Batch to work on (default: latest with open partitions)"
+    )
+    return parser.parse_args()
+
+def run(delta=None):
     logger.info("Running batch price recommendation job")
-    sql = """
-        SELECT DISTINCT sku, vendor_id
-        FROM sku_features_daily
-        WHERE date = (SELECT MAX(date) FROM sku_features_daily)
-    """
-    rows = fetch_all(sql)
-    for r in rows:
-        sku = r["sku"]
-        vendor_id = r["vendor_id"]
-        result = optimize_price_for_sku(sku, vendor_id)
-        if not result:
-            continue
-        suggestion_id = persist_optimization_result(result)
-        input_features = {
-            "sku": result.sku,
-            "vendor_id": result.vendor_id,
-            "current_price": result.current_price,
-        }
-        output = {
-            "optimal_price": result.optimal_price,
-            "expected_revenue": result.expected_revenue,
-            "expected_profit": result.expected_profit,
-        }
-        log_prediction(
-            sku=result.sku,
-            vendor_id=result.vendor_id,
-            suggestion_id=suggestion_id,
-            model_type="optimizer",
-            input_features=input_features,
-            output=output,
-        )
-        logger.info(f"Suggested price {result.optimal_price} for sku={sku}, vendor={vendor_id}")
-    logger.info("Batch pricing job completed")
+    run_id = start_batch_run()
+    try:
+        counts = price_skus(load_batch_targets(), batch_run_id=run_id, delta=delta)
+    except Exception:
+        finish_batch_run(run_id, {}, status="FAILED")
+        raise
+    # Marking the run COMPLETE is what lets API workers pick it up
+    finish_batch_run(run_id, counts)
+    logger.info(f"Batch pricing job {run_id} completed: {counts}")
+
+def run_coordinator(partitions):
+    run_id = open_distributed_batch(partitions)
+    logger.info(f"Batch pricing job {run_id} queued; waiting for workers")
+    progress = wait_for_batch(run_id)
+    logger.info(f"Batch pricing job {run_id} finished: {progress}")
+
+def run_queue_worker(batch_run_id, delta=None):
+    batch_run_id = batch_run_id or find_open_batch()
+    if batch_run_id is None:
+        logger.info("No batch with open partitions")
+        return
+    run_worker(batch_run_id, delta=delta)
+
+def main():
+    args = parse_args()
+    with maybe_profile("run_price_batch", args.profile):
+        if args.coordinator:
+            run_coordinator(args.partitions)
+        elif args.worker:
+            run_queue_worker(args.batch_run_id, args.delta)
+        else:
+            run(args.delta)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,59 @@
+import argparse
+import csv
+import sys
+
+from app.optimizer.simulation import ndjson_lines, simulate, validate_simulation_request
+from app.utils.logging_utils import get_logger
+from app.utils.profiling import maybe_profile
+
+logger = get_logger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Simulate demand, revenue and profit over price moves; writes NDJSON"
+    )
+    targets = parser.add_mutually_exclusive_group(required=True)
+    targets.add_argument("--vendor-id", help="Simulate every SKU of this vendor")
+    targets.add_argument("--targets-file", help="CSV with sku,vendor_id columns")
+    moves = parser.add_mutually_exclusive_group(required=True)
+    moves.add_argument("--moves", help="Comma separated price moves in percent, e.g. -10,5")
+    moves.add_argument("--range", help="from,to,steps in percent, e.g. -30,30,13")
+    parser.add_argument("--output", default="-", help="Output file, - for stdout")
+    parser.add_argument(
+        "--profile", action="store_true", help="Write a cProfile dump to Config.PROFILE_DIR"
+    )
+    return parser.parse_args()
+
+def build_request(args) -> dict:
+    data = {}
+    if args.vendor_id:
+        data["vendor_id"] = args.vendor_id
+    else:
+        with open(args.targets_file, newline="") as f:
+            data["targets"] = [{"sku": r["sku"], "vendor_id": r["vendor_id"]} for r in csv.DictReader(f)]
+    if args.moves:
+        data["moves_pct"] = [m for m in args.moves.split(",") if m.strip()]
+    else:
+        lo, hi, steps = args.range.split(",")
+        data["range_pct"] = {"from": lo, "to": hi, "steps": steps}
+    return data
+
+def run(args):
+    targets, scenario, error = validate_simulation_request(build_request(args))
+    if error:
+        raise SystemExit(f"Invalid simulation: {error}")
+    logger.info(f"Simulating {len(targets)} SKUs at moves {scenario.moves_pct}")
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        out.writelines(ndjson_lines(simulate(targets, scenario)))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+def main():
+    args = parse_args()
+    with maybe_profile("run_price_simulation", args.profile):
+        run(args)
+
+if __name__ == "__main__":
+    main()
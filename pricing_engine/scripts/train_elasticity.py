@@ -1,3 +1,4 @@
+import argparse
 from datetime import date
 
 from app.db import fetch_all
@@ -7,10 +8,18 @@ from app.models.elasticity import (
     save_elasticity_to_db,
 )
 from app.utils.logging_utils import get_logger
+from app.utils.profiling import maybe_profile
 
 logger = get_logger(__name__)
 
-def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train per-SKU elasticity models")
+    parser.add_argument(
+        "--profile", action="store_true", help="Write a cProfile dump to Config.PROFILE_DIR"
+    )
+    return parser.parse_args()
+
+def run():
     logger.info("Training elasticity models per SKU")
     sql = """
         SELECT DISTINCT sku, vendor_id
@@ -23,11 +32,16 @@ def main():
         df = prepare_elasticity_data(sku, vendor_id)
         model, elasticity, metrics = fit_elasticity_model(df)
         if elasticity is None:
-            logger.info(f"Skipping sku={sku}, vendor_id={vendor_id}, reason={metrics.get('reason')}")
+            logger.info("Skipping sku=%s, vendor_id=%s, reason=%s", sku, vendor_id, metrics.get("reason"))
             continue
         save_elasticity_to_db(sku, vendor_id, elasticity, metrics)
-        logger.info(f"Trained elasticity for sku={sku}, vendor_id={vendor_id}, e={elasticity:.3f}")
+        logger.info("Trained elasticity for sku=%s, vendor_id=%s, e=%.3f", sku, vendor_id, elasticity)
     logger.info("Elasticity training completed.")
 
+def main():
+    args = parse_args()
+    with maybe_profile("train_elasticity", args.profile):
+        run()
+
 if __name__ == "__main__":
     main()
@@ -28,3 +28,78 @@ def test_price_feedback_validation(client):
     assert resp.status_code == 400
     data = resp.get_json()
     assert "custom_price required" in data["error"]
+
+def test_price_feedback_batch_validation(client):
+    events = [
+        {"vendor_id": "v1", "sku": "s1", "suggested_price": 10.0,
+         "action": "accept", "timestamp": "2025-01-01T10:00:00Z"},
+        {"vendor_id": "v1", "sku": "s2", "suggested_price": 20.0, "action": "accept"},
+    ]
+    resp = client.post("/price-feedback/batch", json={"events": events})
+    assert resp.status_code == 400
+    details = resp.get_json()["details"]
+    assert details == [{"index": 1, "error": "Missing fields: timestamp"}]
+
+def test_metrics_endpoint_exposes_request_histogram(client):
+    client.get("/health")
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    body = resp.get_data(as_text=True)
+    assert "# TYPE http_request_seconds histogram" in body
+    assert 'http_request_seconds_count{route="/health",method="GET",status="200"}' in body
+    assert "db_pool_idle_connections" in body
+
+def test_price_suggestions_reuses_persisted_suggestion(client, monkeypatch):
+    from app import api
+    from app.optimizer import suggestions
+    from app.optimizer.inputs import PricingInputs
+
+    monkeypatch.setattr(
+        suggestions, "get_pricing_inputs", lambda sku, vendor_id: PricingInputs({"sku": sku, "date": "2025-01-01"})
+    )
+    monkeypatch.setattr(suggestions, "get_demand_model_version", lambda: "m1")
+    monkeypatch.setattr(suggestions, "optimize_price_for_inputs", lambda *a: pytest.fail("recomputed"))
+    row = {"id": 42, "sku": "s1", "current_price": 10, "suggested_price": 11, "expected_revenue": 50,
+           "expected_profit": 20, "elasticity": -1.5, "confidence": 0.3, "reason": "r"}
+    monkeypatch.setattr(suggestions, "fetch_all", lambda sql, params: [row])
+    suggestions.suggestion_cache.clear()
+
+    resp = client.get("/price-suggestions?sku=s1&vendor_id=v1")
+    assert resp.status_code == 200
+    assert resp.get_json()["suggestion_id"] == 42
+    fingerprint = suggestions.suggestion_fingerprint("s1", "v1", "2025-01-01", "m1")
+    assert resp.headers["ETag"] == f'"{fingerprint}"'
+
+    resp = client.get("/price-suggestions?sku=s1&vendor_id=v1", headers={"If-None-Match": resp.headers["ETag"]})
+    assert resp.status_code == 304
+    suggestions.suggestion_cache.clear()
+
+def test_new_suggestion_is_optimized_from_the_fingerprinted_inputs(client, monkeypatch):
+    from app.optimizer import suggestions
+    from app.optimizer.inputs import PricingInputs
+    from app.optimizer.price_optimizer import OptimizationResult
+
+    # Each read returns a newer feature row, as if one landed mid-request
+    reads = iter([PricingInputs({"sku": "s1", "date": "2025-01-01"}), PricingInputs({"sku": "s1", "date": "2025-01-02"})])
+    monkeypatch.setattr(suggestions, "get_pricing_inputs", lambda sku, vendor_id: next(reads))
+    monkeypatch.setattr(suggestions, "get_demand_model_version", lambda: "m1")
+    monkeypatch.setattr(suggestions, "fetch_all", lambda sql, params: [])
+    optimized, persisted = [], []
+
+    def optimize(sku, vendor_id, inputs):
+        optimized.append(inputs.features["date"])
+        return OptimizationResult(sku, vendor_id, 10.0, 11.0, 50.0, 20.0, -1.5, 0.3, "r")
+
+    monkeypatch.setattr(suggestions, "optimize_price_for_inputs", optimize)
+    monkeypatch.setattr(
+        suggestions, "persist_optimization_result", lambda result, fingerprint, run_id, content: persisted.append(fingerprint) or 7
+    )
+    monkeypatch.setattr(suggestions, "log_prediction", lambda **kwargs: None)
+    suggestions.suggestion_cache.clear()
+
+    resp = client.get("/price-suggestions?sku=s1&vendor_id=v1")
+    assert resp.status_code == 200
+    assert optimized == ["2025-01-01"]
+    assert persisted == [suggestions.suggestion_fingerprint("s1", "v1", "2025-01-01", "m1")]
+    assert resp.headers["ETag"] == f'"{persisted[0]}"'
+    suggestions.suggestion_cache.clear()
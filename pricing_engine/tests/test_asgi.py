@@ -0,0 +1,175 @@
+import asyncio
+import json
+
+from app import db_async
+from app.asgi import create_asgi_app
+from app.optimizer import async_optimizer as ao
+from app.optimizer import suggestions
+from app.optimizer.inputs import clear_input_caches
+
+FEATURES = {
+    "sku": "s1",
+    "vendor_id": "v1",
+    "inventory": 50,
+    "current_price": 100.0,
+    "last_price": 100.0,
+    "avg_daily_sales_30d": 5.0,
+    "cost_price": 60.0,
+    "base_price": 100.0,
+}
+
+def _call(app, method, path, query=b"", body=b"", headers=()):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query,
+        "headers": [(b"content-type", b"application/json"), *headers],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    messages = []
+    sent = {"done": False}
+
+    async def receive():
+        if not sent["done"]:
+            sent["done"] = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    status = messages[0]["status"]
+    payload = b"".join(m.get("body", b"") for m in messages[1:])
+    response_headers = {k.decode(): v.decode() for k, v in messages[0]["headers"]}
+    return status, json.loads(payload) if payload else None, response_headers
+
+def test_price_suggestions_is_idempotent_with_etag(monkeypatch):
+    reads = []
+    inserts = []
+
+    async def fake_fetch_all(sql, params=()):
+        reads.append(sql)
+        await asyncio.sleep(0)
+        if "input_fingerprint" in sql:
+            return []  # nothing persisted yet
+        # no vendor rules -> defaults
+        return [{**FEATURES, "date": "2025-01-01", "vr_sku": None, "ec_sku": "s1",
+                 "ec_elasticity": -1.2, "ec_r2": 0.5, "ec_p_value_price": 0.01, "ec_n_obs": 40}]
+
+    async def fake_insert(sql, params=None):
+        inserts.append(params)
+        return 7
+
+    async def fake_query(sql, params=None, fetch="none"):
+        return None
+
+    monkeypatch.setattr(db_async, "fetch_all", fake_fetch_all)
+    monkeypatch.setattr(db_async, "execute_insert", fake_insert)
+    monkeypatch.setattr(db_async, "execute_query", fake_query)
+    monkeypatch.setattr(ao, "predict_demand", lambda df: 200 - df["current_price"].values)
+    monkeypatch.setattr(suggestions, "get_demand_model_version", lambda: "m1")
+    clear_input_caches()
+    suggestions.suggestion_cache.clear()
+
+    app = create_asgi_app()
+    status, data, headers = _call(app, "GET", "/price-suggestions", b"sku=s1&vendor_id=v1")
+    assert status == 200
+    # one joined inputs read, one fingerprint lookup, then a single insert
+    assert len(reads) == 2
+    assert len(inserts) == 1 and headers["etag"].strip('"') in inserts[0]
+    assert data["suggestion_id"] == 7 and data["source"] == "live"
+    assert data["elasticity"] == -1.2
+    assert data["suggested_price"] >= 60.0
+
+    status, again, _ = _call(app, "GET", "/price-suggestions", b"sku=s1&vendor_id=v1")
+    assert status == 200 and again == data
+    status, body, _ = _call(
+        app, "GET", "/price-suggestions", b"sku=s1&vendor_id=v1",
+        headers=[(b"if-none-match", headers["etag"].encode())],
+    )
+    assert status == 304 and body is None
+    assert len(reads) == 2 and len(inserts) == 1
+    clear_input_caches()
+    suggestions.suggestion_cache.clear()
+
+def test_asgi_feedback_batch_validation_matches_flask():
+    events = [{"vendor_id": "v1", "sku": "s2", "suggested_price": 20.0, "action": "accept"}]
+    status, data, _ = _call(
+        create_asgi_app(), "POST", "/price-feedback/batch", body=json.dumps({"events": events}).encode()
+    )
+    assert status == 400
+    assert data["details"] == [{"index": 0, "error": "Missing fields: timestamp"}]
+
+def test_asgi_skips_precomputed_suggestion_whose_inputs_changed(monkeypatch):
+    from datetime import datetime
+
+    from app import asgi
+    from app.optimizer import precomputed as pc
+    from app.optimizer.inputs import PricingInputs
+
+    row = {"id": 11, "sku": "s1", "vendor_id": "v1", "current_price": 10, "suggested_price": 12,
+           "expected_revenue": 60, "expected_profit": 20, "elasticity": -1.3, "confidence": 0.4,
+           "reason": "r", "input_fingerprint": "abc", "content_fingerprint": "c1"}
+    run = {"id": 5, "model_version": "m1", "finished_at": datetime.now()}
+    monkeypatch.setattr(pc, "fetch_all", lambda sql, params=(): [run] if "batch_runs" in sql else [row])
+    monkeypatch.setattr(pc, "get_demand_model_version", lambda: "m1")
+    index = pc.PrecomputedIndex(max_age_sec=7200)
+    index.refresh()
+    monkeypatch.setattr(asgi, "precomputed_index", index)
+
+    async def current_inputs(sku, vendor_id):
+        return PricingInputs({"sku": sku})
+
+    async def live(sku, vendor_id):
+        return "live-fp", {"suggestion_id": 12, "suggested_price": 11.0}
+
+    monkeypatch.setattr(asgi, "get_pricing_inputs_async", current_inputs)
+    monkeypatch.setattr(asgi, "live_suggestion_async", live)
+    app = create_asgi_app()
+
+    monkeypatch.setattr(pc, "content_fingerprint", lambda inputs: "c1")
+    _, body, _ = _call(app, "GET", "/price-suggestions", query=b"sku=s1&vendor_id=v1")
+    assert body["source"] == "precomputed" and body["suggestion_id"] == 11
+
+    monkeypatch.setattr(pc, "content_fingerprint", lambda inputs: "c2")
+    _, body, headers = _call(app, "GET", "/price-suggestions", query=b"sku=s1&vendor_id=v1")
+    assert body["source"] == "live" and body["suggestion_id"] == 12
+    assert headers["etag"] == '"live-fp"'
+
+def test_degraded_suggestions_spool_off_the_event_loop(monkeypatch):
+    import threading
+
+    from app.db import DatabaseUnavailable
+
+    async def fake_fetch_all(sql, params=()):
+        if "input_fingerprint" in sql:
+            raise DatabaseUnavailable("down")
+        return [{**FEATURES, "date": "2025-01-01", "vr_sku": None, "ec_sku": "s1",
+                 "ec_elasticity": -1.2, "ec_r2": 0.5, "ec_p_value_price": 0.01, "ec_n_obs": 40}]
+
+    spooled_on = []
+
+    class _Spool:
+        def add(self, result, fingerprint):
+            spooled_on.append(threading.current_thread())
+
+    monkeypatch.setattr(db_async, "fetch_all", fake_fetch_all)
+    monkeypatch.setattr(suggestions, "suggestion_spool", _Spool())
+    monkeypatch.setattr(ao, "predict_demand", lambda df: 200 - df["current_price"].values)
+    monkeypatch.setattr(suggestions, "get_demand_model_version", lambda: "m1")
+    clear_input_caches()
+    suggestions.suggestion_cache.clear()
+
+    _, body = asyncio.run(ao.live_suggestion_async("s1", "v1"))
+    assert body["degraded"] is True
+    assert len(spooled_on) == 1 and spooled_on[0] is not threading.main_thread()
+    clear_input_caches()
+    suggestions.suggestion_cache.clear()
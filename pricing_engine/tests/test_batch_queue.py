@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.optimizer import batch_queue
+from app.optimizer.batch_queue import DONE, FAILED, PENDING, PartitionQueue, run_worker
+from benchmarks.sqlite_backend import create_schema, sqlite_connection_factory
+
+@pytest.fixture
+def queue_db(tmp_path):
+    path = str(tmp_path / "queue.sqlite")
+    create_schema(path)
+    db.set_connection_factory(sqlite_connection_factory(path))
+    run_id = db.execute_insert(
+        "INSERT INTO batch_runs (status, model_version, started_at) VALUES ('RUNNING', NULL, %s)", (datetime.now(),)
+    )
+    yield path, run_id
+    db.set_connection_factory(db.mysql_connection)
+
+class _Clock:
+    def __init__(self):
+        self.now = datetime(2025, 1, 1, 2, 0, 0)
+
+    def __call__(self):
+        return self.now
+
+def test_claims_are_exclusive_and_expired_leases_are_reclaimed(queue_db):
+    _, run_id = queue_db
+    clock = _Clock()
+    a = PartitionQueue(run_id, owner="a", lease_seconds=60, max_attempts=2, clock=clock)
+    b = PartitionQueue(run_id, owner="b", lease_seconds=60, max_attempts=2, clock=clock)
+    a.enqueue(2)
+
+    lease_a, lease_b = a.claim(), b.claim()
+    assert {lease_a.partition.index, lease_b.partition.index} == {0, 1}
+    assert lease_a.partition.count == 2
+    assert a.claim() is None
+
+    # a keeps its lease alive, b stops heartbeating
+    clock.now += timedelta(seconds=50)
+    assert a.heartbeat(lease_a)
+    clock.now += timedelta(seconds=20)
+    taken = a.claim()
+    assert taken.partition == lease_b.partition and taken.owner == "a"
+
+    # b comes back: its lease is gone, so its result is not recorded
+    assert not b.heartbeat(lease_b)
+    assert not b.complete(lease_b, {"priced": 5})
+    assert a.complete(taken, {"priced": 3, "skipped": 1})
+    assert a.complete(lease_a, {"priced": 2})
+    progress = a.progress()
+    assert progress[DONE] == 2 and progress["priced"] == 5 and progress["skipped"] == 1
+    assert a.finished()
+
+def test_failed_partition_is_retried_then_failed(queue_db, monkeypatch):
+    _, run_id = queue_db
+    monkeypatch.setattr(batch_queue.time, "sleep", lambda s: None)
+    queue = PartitionQueue(run_id, owner="w", lease_seconds=60, max_attempts=2)
+    queue.enqueue(3)
+    calls = []
+
+    def work(partition):
+        calls.append(partition.index)
+        if partition.index == 1:
+            raise RuntimeError("boom")
+        return {"priced": 1, "skipped": 0}
+
+    totals = run_worker(run_id, queue=queue, work=work, poll_interval=0)
+    assert totals == {"priced": 2, "skipped": 0, "unchanged": 0, "partitions": 2}
+    assert calls.count(1) == 2
+    progress = queue.progress()
+    assert progress[DONE] == 2 and progress[FAILED] == 1 and progress[PENDING] == 0
+
+def _work(partition):
+    time.sleep(0.02)
+    return {"priced": 1, "skipped": 0}
+
+def _worker_process(path, run_id, owner, crash):
+    db.pool.discard_after_fork()
+    db.set_connection_factory(sqlite_connection_factory(path))
+    queue = PartitionQueue(run_id, owner=owner, lease_seconds=1, max_attempts=3)
+    if crash:
+        queue.claim()
+        os._exit(1)  # dies holding the lease
+    run_worker(run_id, queue=queue, work=_work, poll_interval=0.1)
+
+def test_worker_processes_share_the_queue_and_recover_a_dead_workers_partition(queue_db):
+    path, run_id = queue_db
+    PartitionQueue(run_id).enqueue(12)
+
+    ctx = multiprocessing.get_context("fork")
+    crasher = ctx.Process(target=_worker_process, args=(path, run_id, "crasher", True))
+    crasher.start()
+    crasher.join()
+    workers = [ctx.Process(target=_worker_process, args=(path, run_id, f"w{i}", False)) for i in range(3)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(60)
+        assert p.exitcode == 0
+
+    rows = db.fetch_all(
+        "SELECT partition_no, status, lease_owner, attempts, priced FROM job_partitions WHERE batch_run_id = %s",
+        (run_id,),
+    )
+    assert len(rows) == 12 and all(r["status"] == DONE for r in rows)
+    assert sum(r["priced"] for r in rows) == 12
+    assert {r["lease_owner"] for r in rows} <= {"w0", "w1", "w2"}
+    assert sorted(r["attempts"] for r in rows)[-1] == 2  # the crashed worker's partition
@@ -0,0 +1,42 @@
+from datetime import date
+
+from app import db
+from benchmarks.datagen import CatalogSpec, generate
+from benchmarks.sqlite_backend import (
+    SQLiteConnection,
+    create_schema,
+    sqlite_connection_factory,
+    translate,
+)
+
+def test_translate_mysql_upsert_and_row_in():
+    sql = translate(
+        "INSERT INTO t (a, b) VALUES (%s, %s) ON DUPLICATE KEY UPDATE b = b + VALUES(b), ts = NOW()"
+    )
+    assert "?" in sql and "%s" not in sql
+    assert "ON CONFLICT DO UPDATE SET b = b + excluded.b, ts = CURRENT_TIMESTAMP" in sql
+    assert "IN (VALUES ((" not in translate("WHERE (a, b) IN ((%s, %s))")
+    assert "IN (VALUES (?, ?))" in translate("WHERE (a, b) IN ((%s, %s))")
+
+def test_generated_catalog_is_queryable_through_app_db(tmp_path):
+    path = str(tmp_path / "bench.sqlite")
+    create_schema(path)
+    raw = SQLiteConnection(path)
+    counts = generate(raw.raw, CatalogSpec(n_skus=20, n_vendors=3, days=5), date(2025, 1, 10))
+    raw.close()
+
+    db.set_connection_factory(sqlite_connection_factory(path))
+    try:
+        row = db.fetch_one("SELECT COUNT(*) AS n FROM orders WHERE order_ts >= %s", (date(2025, 1, 6),))
+        assert row["n"] == counts["orders"]
+        row = db.fetch_one("SELECT COUNT(*) AS n FROM inventory_snapshots WHERE snapshot_date = %s", (date(2025, 1, 10),))
+        assert row["n"] == 20
+    finally:
+        db.set_connection_factory(db.mysql_connection)
+
+def test_api_worker_starts_without_training_stacks():
+    from benchmarks.bench_startup import probe
+
+    sample = probe("flask")
+    assert sample["training_modules"] == []
+    assert sample["rss_after_create_app"] > 0
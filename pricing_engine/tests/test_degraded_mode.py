@@ -0,0 +1,364 @@
+import json
+
+import pymysql
+import pytest
+
+from app import db
+from app.api import create_app
+from app.optimizer import inputs as pi
+from app.optimizer import suggestion_spool as spool_mod
+from app.optimizer import suggestions
+from app.optimizer.inputs import PricingInputs
+from app.optimizer.price_optimizer import OptimizationResult
+from app.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+def test_circuit_breaker_opens_and_recovers_through_a_trial_call():
+    now = [0.0]
+    breaker = CircuitBreaker("test_breaker", failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    now[0] = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # one trial at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+class _TimingOutCursor:
+    error = (2013, "Lost connection to MySQL server during query (timed out)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        raise pymysql.err.OperationalError(*self.error)
+
+    def executemany(self, sql, seq_params):
+        self.execute(sql, None)
+
+class _DeadlockCursor(_TimingOutCursor):
+    error = (1213, "Deadlock found when trying to get lock; try restarting transaction")
+
+class _Conn:
+    closed = False
+    cursor_class = _TimingOutCursor
+
+    def cursor(self):
+        return self.cursor_class()
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def failing_db(monkeypatch):
+    conns = []
+
+    def factory():
+        conns.append(_Conn())
+        return conns[-1]
+
+    original = db.pool.connection_factory
+    monkeypatch.setattr(db.breaker, "failure_threshold", 2)
+    db.breaker.reset()
+    db.set_connection_factory(factory)
+    yield conns
+    db.set_connection_factory(original)
+    db.breaker.reset()
+
+def test_timeouts_open_the_breaker_and_then_fail_fast(failing_db):
+    for _ in range(2):
+        with pytest.raises(db.DatabaseUnavailable):
+            db.fetch_all("SELECT 1")
+    # Timed-out connections are closed rather than returned to the pool
+    assert all(c.closed for c in failing_db)
+    assert db.db_degraded()
+
+    opened = len(failing_db)
+    with pytest.raises(db.DatabaseUnavailable, match="breaker is open"):
+        db.fetch_all("SELECT 1")
+    assert len(failing_db) == opened
+
+def test_server_errors_pass_through_without_tripping_the_breaker(failing_db, monkeypatch, tmp_path):
+    from app.feedback import feedback_handler as fh
+
+    monkeypatch.setattr(_Conn, "cursor_class", _DeadlockCursor)
+    for _ in range(3):
+        with pytest.raises(pymysql.err.OperationalError) as info:
+            db.fetch_all("SELECT 1")
+        assert not isinstance(info.value, db.DatabaseUnavailable)
+    assert not db.db_degraded()
+    # The connection answered, so it went back to the pool
+    assert len(failing_db) == 1 and not failing_db[0].closed
+
+    spool = spool_mod.SuggestionSpool(str(tmp_path / "spool.jsonl"))
+    monkeypatch.setattr(fh, "suggestion_spool", spool)
+    event = {"vendor_id": "v1", "sku": "s1", "suggested_price": 11.0, "action": "accept", "suggestion_id": 5}
+    with pytest.raises(pymysql.err.OperationalError):
+        fh.save_or_spool_feedback([event])
+    assert not (tmp_path / "spool.jsonl").exists()
+
+def test_serving_apps_bound_statements_unless_the_environment_says_otherwise(monkeypatch):
+    from app.config import Config
+
+    monkeypatch.delenv("DB_READ_TIMEOUT_SEC", raising=False)
+    monkeypatch.setenv("DB_WRITE_TIMEOUT_SEC", "0")
+    monkeypatch.setattr(Config, "DB_READ_TIMEOUT_SEC", 0.0)
+    monkeypatch.setattr(Config, "DB_WRITE_TIMEOUT_SEC", 0.0)
+    monkeypatch.setattr(Config, "SERVING_DB_TIMEOUT_SEC", 3.0)
+    create_app()
+    assert Config.DB_READ_TIMEOUT_SEC == 3.0
+    assert Config.DB_WRITE_TIMEOUT_SEC == 0.0  # set explicitly
+
+def test_get_pricing_inputs_falls_back_to_expired_entries(monkeypatch):
+    pi.clear_input_caches()
+    key = ("s1", "v1")
+    pi.cache_pricing_inputs(key, PricingInputs({"sku": "s1", "date": "2025-01-01"}, None, []))
+    for cache in (pi.feature_cache, pi.rules_cache, pi.elasticity_cache):
+        cache.set(key, cache.get(key), ttl=-1)
+
+    def unavailable(sql, params=()):
+        raise db.DatabaseUnavailable("down")
+
+    monkeypatch.setattr(pi, "fetch_all", unavailable)
+    inputs = pi.get_pricing_inputs("s1", "v1")
+    assert inputs.stale and inputs.features["date"] == "2025-01-01"
+
+    with pytest.raises(db.DatabaseUnavailable):
+        pi.get_pricing_inputs("never-cached", "v1")
+    pi.clear_input_caches()
+
+def _result(sku="s1"):
+    return OptimizationResult(sku, "v1", 10.0, 11.0, 50.0, 20.0, -1.5, 0.3, "r")
+
+def test_price_suggestions_degrade_and_spool_when_db_is_down(monkeypatch, tmp_path):
+    def unavailable(*args, **kwargs):
+        raise db.DatabaseUnavailable("down")
+
+    monkeypatch.setattr(
+        suggestions, "get_pricing_inputs", lambda sku, vendor_id: PricingInputs({"sku": sku, "date": "2025-01-01"})
+    )
+    monkeypatch.setattr(suggestions, "get_demand_model_version", lambda: "m1")
+    monkeypatch.setattr(suggestions, "fetch_all", unavailable)
+    monkeypatch.setattr(suggestions, "optimize_price_for_inputs", lambda sku, vendor_id, inputs: _result(sku))
+    monkeypatch.setattr(suggestions.suggestion_spool, "path", str(tmp_path / "spool.jsonl"))
+    suggestions.suggestion_cache.clear()
+
+    app = create_app()
+    with app.test_client() as client:
+        resp = client.get("/price-suggestions?sku=s1&vendor_id=v1")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["degraded"] is True and body["source"] == "degraded"
+    assert body["suggestion_id"] is None and body["suggested_price"] == 11.0
+
+    lines = (tmp_path / "spool.jsonl").read_text().splitlines()
+    assert len(lines) == 1
+    fingerprint = suggestions.suggestion_fingerprint("s1", "v1", "2025-01-01", "m1")
+    assert json.loads(lines[0])["suggestion"][9] == fingerprint
+    suggestions.suggestion_cache.clear()
+
+def test_replay_persists_spooled_suggestions_once(monkeypatch, tmp_path):
+    spool = spool_mod.SuggestionSpool(str(tmp_path / "spool.jsonl"))
+    spool.add(_result("s1"), "fp1")
+    spool.add(_result("s2"), "fp2")
+
+    persisted = {"fp1"}  # s1 was persisted by a live request after recovery
+    inserts, logs = [], []
+    monkeypatch.setattr(spool_mod, "fetch_all", lambda sql, params: [{"id": 1}] if params[2] in persisted else [])
+    monkeypatch.setattr(spool_mod, "execute_insert", lambda sql, params: inserts.append(params) or 7)
+    monkeypatch.setattr(spool_mod, "execute_query", lambda sql, params: logs.append(params))
+
+    assert spool.replay() == 1
+    assert [p[0] for p in inserts] == ["s2"]
+    assert logs[0][:3] == ("s2", "v1", 7)
+    assert not (tmp_path / "spool.jsonl").exists()
+    assert spool.replay() == 0
+
+def test_replay_dead_letters_rejected_records_and_continues(monkeypatch, tmp_path):
+    spool = spool_mod.SuggestionSpool(str(tmp_path / "spool.jsonl"))
+    spool.add(_result("s1"), "fp1")
+    spool._append_lines(["{not json\n"])
+    spool.add(_result("s2"), "fp2")
+
+    def insert(sql, params):
+        if params[0] == "s1":
+            raise pymysql.err.IntegrityError(1062, "Duplicate entry")
+        return 8
+
+    logs = []
+    monkeypatch.setattr(spool_mod, "fetch_all", lambda sql, params: [])
+    monkeypatch.setattr(spool_mod, "execute_insert", insert)
+    monkeypatch.setattr(spool_mod, "execute_query", lambda sql, params: logs.append(params))
+
+    assert spool.replay() == 1
+    assert [p[:3] for p in logs] == [("s2", "v1", 8)]
+    assert not (tmp_path / "spool.jsonl").exists()
+    dead = (tmp_path / "spool.jsonl.dead").read_text().splitlines()
+    assert json.loads(dead[0])["suggestion"][0] == "s1" and dead[1] == "{not json"
+
+def test_replay_keeps_the_log_of_a_suggestion_inserted_before_an_outage(monkeypatch, tmp_path):
+    spool = spool_mod.SuggestionSpool(str(tmp_path / "spool.jsonl"))
+    spool.add(_result("s1"), "fp1")
+    spool.add(_result("s2"), "fp2")
+
+    def log_down(sql, params):
+        raise db.DatabaseUnavailable("down")
+
+    inserts = []
+    monkeypatch.setattr(spool_mod, "fetch_all", lambda sql, params: [])
+    monkeypatch.setattr(spool_mod, "execute_insert", lambda sql, params: inserts.append(params) or 9)
+    monkeypatch.setattr(spool_mod, "execute_query", log_down)
+    with pytest.raises(db.DatabaseUnavailable):
+        spool.replay()
+
+    # s1 is in price_suggestions; only its log row is owed. s2 is untouched.
+    records = [json.loads(line) for line in (tmp_path / "spool.jsonl").read_text().splitlines()]
+    assert "suggestion" not in records[0] and records[0]["suggestion_id"] == 9
+    assert records[1]["suggestion"][0] == "s2"
+
+    logs = []
+    monkeypatch.setattr(spool_mod, "execute_query", lambda sql, params: logs.append(params))
+    assert spool.replay() == 1
+    assert [p[0] for p in inserts] == ["s1", "s2"]
+    assert [p[:3] for p in logs] == [("s1", "v1", 9), ("s2", "v1", 9)]
+
+def test_prediction_log_failure_after_persist_serves_the_persisted_suggestion(monkeypatch, tmp_path):
+    def unavailable(**kwargs):
+        raise db.DatabaseUnavailable("down")
+
+    monkeypatch.setattr(
+        suggestions, "get_pricing_inputs", lambda sku, vendor_id: PricingInputs({"sku": sku, "date": "2025-01-01"})
+    )
+    monkeypatch.setattr(suggestions, "get_demand_model_version", lambda: "m1")
+    monkeypatch.setattr(suggestions, "fetch_all", lambda sql, params: [])
+    optimized = []
+    monkeypatch.setattr(
+        suggestions, "optimize_price_for_inputs", lambda sku, vendor_id, inputs: optimized.append(sku) or _result(sku)
+    )
+    monkeypatch.setattr(suggestions, "persist_optimization_result", lambda result, fingerprint, run_id, content: 42)
+    monkeypatch.setattr(suggestions, "log_prediction", unavailable)
+    spool = spool_mod.SuggestionSpool(str(tmp_path / "spool.jsonl"))
+    monkeypatch.setattr(suggestions, "suggestion_spool", spool)
+    suggestions.suggestion_cache.clear()
+
+    _, body = suggestions.live_suggestion("s1", "v1")
+    assert body["suggestion_id"] == 42 and "degraded" not in body
+    assert optimized == ["s1"]
+    records = [json.loads(line) for line in (tmp_path / "spool.jsonl").read_text().splitlines()]
+    assert len(records) == 1 and "suggestion" not in records[0]
+
+    # Replay writes only the missing log row, for the persisted suggestion
+    inserts, logs = [], []
+    monkeypatch.setattr(spool_mod, "execute_insert", lambda sql, params: inserts.append(params))
+    monkeypatch.setattr(spool_mod, "execute_query", lambda sql, params: logs.append(params))
+    assert spool.replay() == 0
+    assert inserts == [] and logs[0][:3] == ("s1", "v1", 42)
+    suggestions.suggestion_cache.clear()
+
+def test_replay_keeps_the_time_suggestions_were_served(monkeypatch, tmp_path):
+    from datetime import date, datetime
+
+    from benchmarks.sqlite_backend import create_schema, sqlite_connection_factory
+
+    path = str(tmp_path / "replay.sqlite")
+    create_schema(path)
+    spool = spool_mod.SuggestionSpool(str(tmp_path / "spool.jsonl"))
+    served_at = datetime(2025, 1, 1, 23, 50)
+    monkeypatch.setattr(spool_mod, "datetime", type("_Frozen", (datetime,), {"now": classmethod(lambda cls: served_at)}))
+    spool.add(_result("s1"), "fp1")
+    monkeypatch.undo()
+
+    db.set_connection_factory(sqlite_connection_factory(path))
+    try:
+        assert spool.replay() == 1
+        row = db.fetch_one("SELECT suggestion_date, created_at FROM price_suggestions WHERE sku = 's1'", ())
+        assert str(row["suggestion_date"]) == str(date(2025, 1, 1))
+        assert str(row["created_at"]).startswith("2025-01-01 23:50")
+        log = db.fetch_one("SELECT created_at FROM prediction_logs WHERE sku = 's1'", ())
+        assert str(log["created_at"]).startswith("2025-01-01 23:50")
+    finally:
+        db.set_connection_factory(db.mysql_connection)
+
+def _spool_from_process(path, worker, n):
+    spool = spool_mod.SuggestionSpool(path)
+    for i in range(n):
+        spool.add(_result(f"w{worker}-{i}"), f"fp-{worker}-{i}")
+
+def test_replay_loses_no_lines_appended_by_other_processes(monkeypatch, tmp_path):
+    import multiprocessing
+
+    path = str(tmp_path / "spool.jsonl")
+    spool = spool_mod.SuggestionSpool(path)
+    replayed = []
+    monkeypatch.setattr(spool, "_write", lambda record: replayed.append(record["suggestion"][0]) or 1)
+
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_spool_from_process, args=(path, w, 300)) for w in range(3)]
+    for p in workers:
+        p.start()
+    while any(p.is_alive() for p in workers):
+        spool.replay()
+    for p in workers:
+        p.join()
+        assert p.exitcode == 0
+    spool.replay()
+
+    assert sorted(replayed) == sorted(f"w{w}-{i}" for w in range(3) for i in range(300))
+
+def test_feedback_is_spooled_when_db_is_down(failing_db, monkeypatch, tmp_path):
+    from app.feedback import feedback_handler as fh
+
+    spool = spool_mod.SuggestionSpool(str(tmp_path / "spool.jsonl"))
+    monkeypatch.setattr(fh, "suggestion_spool", spool)
+    monkeypatch.setattr(fh, "increment_feedback_counters", lambda payloads: None)
+    event = {
+        "vendor_id": "v1", "sku": "s1", "suggested_price": 11.0, "action": "accept",
+        "timestamp": "2025-01-01T10:00:00Z", "suggestion_id": 5,
+    }
+
+    app = create_app()
+    with app.test_client() as client:
+        resp = client.post("/price-feedback", json=event)
+        assert resp.status_code == 200 and resp.get_json()["degraded"] is True
+        resp = client.post("/price-feedback/batch", json={"events": [event, event]})
+        assert resp.status_code == 200
+        assert resp.get_json()["spooled"] == 2 and resp.get_json()["degraded"] is True
+
+    saved = []
+    monkeypatch.setattr(fh, "save_feedback_batch", lambda payloads: saved.extend(payloads))
+    assert spool.replay() == 3
+    assert saved == [event] * 3
+
+def test_counter_failure_after_insert_neither_spools_nor_duplicates(monkeypatch, tmp_path):
+    from app.feedback import feedback_handler as fh
+
+    inserted = []
+
+    def counters_down(payloads):
+        raise db.DatabaseUnavailable("down")
+
+    spool = spool_mod.SuggestionSpool(str(tmp_path / "spool.jsonl"))
+    monkeypatch.setattr(fh, "suggestion_spool", spool)
+    monkeypatch.setattr(fh, "fetch_all", lambda sql, params=(): [])
+    monkeypatch.setattr(fh, "execute_many", lambda sql, rows: inserted.extend(rows))
+    monkeypatch.setattr(fh, "increment_feedback_counters", counters_down)
+    event = {
+        "vendor_id": "v1", "sku": "s1", "suggested_price": 11.0, "action": "accept",
+        "timestamp": "2025-01-01T10:00:00Z",
+    }
+
+    counts = fh.save_or_spool_feedback([event])
+    assert counts["saved"] == 1 and counts["degraded"] is False
+    assert len(inserted) == 1
+    assert not (tmp_path / "spool.jsonl").exists()
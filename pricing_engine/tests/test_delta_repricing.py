@@ -0,0 +1,94 @@
+import json
+from datetime import date
+
+import pytest
+
+from app import db
+from app.feedback.suggestion_index import recent_suggestions
+from app.optimizer import batch, suggestions
+from app.optimizer import inputs as pi
+from app.optimizer.precomputed import BATCH_SUGGESTIONS_SQL
+from benchmarks.sqlite_backend import create_schema, sqlite_connection_factory
+
+FEATURE_SQL = """
+    INSERT INTO sku_features_daily (sku, date, vendor_id, current_price, inventory, cost_price, base_price)
+    VALUES (%s, %s, 'v1', %s, 10, 5, 12)
+"""
+
+@pytest.fixture
+def delta_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "delta.sqlite")
+    create_schema(path)
+    db.set_connection_factory(sqlite_connection_factory(path))
+    monkeypatch.setattr(suggestions, "get_demand_model_version", lambda: "m1")
+    optimized = []
+
+    def fake_create_suggestion(sku, vendor_id, inputs, fingerprint, batch_run_id=None):
+        optimized.append(sku)
+        suggestion_id = db.execute_insert(
+            """
+            INSERT INTO price_suggestions
+                (sku, vendor_id, suggestion_date, current_price, suggested_price, expected_revenue,
+                 expected_profit, elasticity, confidence, reason,
+                 status, input_fingerprint, batch_run_id, content_fingerprint, created_at)
+            VALUES (%s, %s, CURDATE(), 10, 11, 110, 60, -1.5, 0.4, 'r', 'PENDING', %s, %s, %s, NOW())
+            """,
+            (sku, vendor_id, fingerprint, batch_run_id, suggestions.content_fingerprint(inputs)),
+        )
+        return {"suggestion_id": suggestion_id, "suggested_price": 11.0}
+
+    monkeypatch.setattr(batch, "create_suggestion", fake_create_suggestion)
+    pi.clear_input_caches()
+    yield optimized
+    pi.clear_input_caches()
+    db.set_connection_factory(db.mysql_connection)
+
+def _run(batch_run_id, **kwargs):
+    pi.clear_input_caches()
+    targets = [{"sku": "a", "vendor_id": "v1"}, {"sku": "b", "vendor_id": "v1"}]
+    return batch.price_skus(targets, batch_run_id=batch_run_id, delta=True, **kwargs)
+
+def test_delta_mode_copies_unchanged_suggestions_and_recomputes_changed_ones(delta_db):
+    optimized = delta_db
+    for sku in ("a", "b"):
+        db.execute_query(FEATURE_SQL, (sku, date(2025, 1, 1), 10.0))
+    assert _run(1) == {"priced": 2, "skipped": 0, "unchanged": 0}
+
+    # A new feature date: same values for a, a price change for b
+    db.execute_query(FEATURE_SQL, ("a", date(2025, 1, 2), 10.0))
+    db.execute_query(FEATURE_SQL, ("b", date(2025, 1, 2), 9.0))
+    optimized.clear()
+    assert _run(2) == {"priced": 1, "skipped": 0, "unchanged": 1}
+    assert optimized == ["b"]
+
+    copy = db.fetch_one(
+        "SELECT suggested_price, input_fingerprint FROM price_suggestions WHERE sku = 'a' AND batch_run_id = 2", ()
+    )
+    # The copy carries today's suggestion fingerprint, so live polls reuse it
+    assert copy["suggested_price"] == 11
+    assert copy["input_fingerprint"] == suggestions.suggestion_fingerprint("a", "v1", "2025-01-02", "m1")
+
+    # Copies and recomputed rows both carry the content fingerprint the index checks
+    pi.clear_input_caches()
+    rows = {r["sku"]: r for r in db.fetch_all(BATCH_SUGGESTIONS_SQL, (2,))}
+    for sku in ("a", "b"):
+        assert rows[sku]["content_fingerprint"] == suggestions.content_fingerprint(pi.get_pricing_inputs(sku, "v1"))
+
+    # The copy is logged and indexed for feedback like a computed suggestion
+    log = db.fetch_one("SELECT output_json FROM prediction_logs WHERE suggestion_id = %s", (rows["a"]["id"],))
+    assert json.loads(log["output_json"])["optimal_price"] == 11
+    assert recent_suggestions.lookup("a", "v1", 11.0) == rows["a"]["id"]
+
+def test_delta_mode_recomputes_old_suggestions_and_new_models(delta_db, monkeypatch):
+    optimized = delta_db
+    db.execute_query(FEATURE_SQL, ("a", date(2025, 1, 1), 10.0))
+    db.execute_query(FEATURE_SQL, ("b", date(2025, 1, 1), 10.0))
+    _run(1)
+
+    optimized.clear()
+    assert _run(2, max_age_sec=0)["priced"] == 2
+
+    monkeypatch.setattr(suggestions, "get_demand_model_version", lambda: "m2")
+    optimized.clear()
+    assert _run(3)["priced"] == 2
+    assert _run(4)["unchanged"] == 2
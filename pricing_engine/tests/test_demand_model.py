@@ -27,3 +27,53 @@ def test_demand_model_predict_non_negative():
     model, metrics = train_demand_model(X, y)
     preds = model.predict(X)
     assert np.all(preds >= 0)
+
+def _run_threads(batcher, frames):
+    import threading
+
+    results = [None] * len(frames)
+
+    def call(i):
+        try:
+            results[i] = batcher.predict(frames[i])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(frames))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+def test_batcher_scatters_one_predict_call_back_to_callers():
+    from app.models.demand_model import DemandBatcher
+
+    calls = []
+
+    def fake_predict(df):
+        calls.append(len(df))
+        return df["current_price"].to_numpy() * 2
+
+    batcher = DemandBatcher(window=0.2, max_rows=10_000, predict=fake_predict)
+    frames = [pd.DataFrame({"current_price": np.arange(21) + 100 * i}) for i in range(6)]
+    results = _run_threads(batcher, frames)
+
+    assert sum(calls) == 6 * 21 and len(calls) < 6
+    for frame, preds in zip(frames, results):
+        np.testing.assert_array_equal(preds, frame["current_price"].to_numpy() * 2)
+
+def test_batcher_closes_batch_at_max_rows_and_propagates_errors():
+    import time
+
+    from app.models.demand_model import DemandBatcher
+
+    def failing_predict(df):
+        raise ValueError("bad model")
+
+    # A window this long would stall the test unless max_rows closes the batch
+    batcher = DemandBatcher(window=30, max_rows=40, predict=failing_predict)
+    started = time.monotonic()
+    results = _run_threads(batcher, [pd.DataFrame({"current_price": np.arange(21)})] * 2)
+    assert time.monotonic() - started < 5
+    assert all(isinstance(r, ValueError) for r in results)
@@ -10,3 +10,29 @@ def test_elasticity_sign_negative():
     model, elasticity, metrics = fit_elasticity_model(df)
     assert elasticity is not None
     assert elasticity < 0  # demand falls with price
+
+def test_batch_fit_matches_single_sku_fit():
+    import numpy as np
+    from app.models.elasticity import fit_elasticity_batch
+
+    rng = np.random.default_rng(7)
+    frames = []
+    for i, promo_varies in enumerate([True, False]):
+        prices = rng.uniform(8, 20, size=14).round(2)
+        promo = rng.integers(0, 2, size=14) if promo_varies else np.zeros(14, dtype=int)
+        units = np.exp(5 - 1.3 * np.log(prices) + 0.2 * promo + rng.normal(0, 0.05, 14))
+        frames.append(pd.DataFrame({"sku": f"s{i}", "vendor_id": "v1", "price": prices,
+                                    "units": units, "promo_flag": promo}))
+    # too few rows: excluded just like the single-SKU fit
+    frames.append(pd.DataFrame({"sku": "tiny", "vendor_id": "v1", "price": [10, 11, 12],
+                                "units": [5, 4, 3], "promo_flag": [0, 0, 0]}))
+    batch = fit_elasticity_batch(pd.concat(frames, ignore_index=True)).set_index("sku")
+
+    assert "tiny" not in batch.index
+    for i in range(2):
+        _, elasticity, metrics = fit_elasticity_model(frames[i].copy())
+        row = batch.loc[f"s{i}"]
+        assert np.isclose(row["elasticity"], elasticity)
+        assert np.isclose(row["r2"], metrics["r2"])
+        assert np.isclose(row["p_value_price"], metrics["p_value_price"], atol=1e-9)
+        assert row["n_obs"] == metrics["n_obs"]
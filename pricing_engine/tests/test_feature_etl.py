@@ -0,0 +1,98 @@
+import sys
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.features import etl
+
+TARGET = date(2025, 1, 10)
+
+REQUIRED_COLS = [
+    "sku", "date", "vendor_id", "avg_daily_sales_7d", "avg_daily_sales_30d", "last_price",
+    "current_price", "inventory", "views_7d", "views_30d", "add_to_cart_7d", "conv_rate_7d",
+    "promo_flag", "ageing_days", "restock_eta_days", "cost_price", "base_price", "other_features_json",
+]
+
+def _order(day, sku, vendor_id, price, units):
+    return {"date": date(2025, 1, day), "sku": sku, "vendor_id": vendor_id,
+            "price_paid": Decimal(str(price)), "units": units, "promo_flag": 0}
+
+# Rows as fetch_all returns them: DECIMAL columns come back as Decimal
+ORDERS = [
+    _order(4, "A", "v1", 10, 2),
+    _order(9, "A", "v1", 12, 4),
+    _order(10, "A", "v1", 10, 6),
+    _order(10, "A", "v1", 14, 2),
+    _order(10, "B", "v2", 20, 3),
+    _order(5, "C", "v1", 5, 1),  # no sale on the target date: no feature row
+]
+INVENTORY = [
+    {"sku": "A", "date": TARGET, "inventory": 5, "ageing_days": 3, "restock_eta_date": date(2025, 1, 15)},
+    {"sku": "Z", "date": TARGET, "inventory": 9, "ageing_days": 1, "restock_eta_date": None},
+]
+ANALYTICS = [
+    {"sku": "A", "date": date(2025, 1, 2), "views": 100, "add_to_cart": 10, "conversions": 1,
+     "conv_rate": Decimal("0.1")},
+    {"sku": "A", "date": date(2025, 1, 8), "views": 50, "add_to_cart": 5, "conversions": 1,
+     "conv_rate": Decimal("0.2")},
+]
+
+@pytest.fixture
+def etl_inputs(monkeypatch):
+    written = []
+    monkeypatch.setattr(etl, "_load_orders", lambda start, end, partition=None: pd.DataFrame(ORDERS))
+    monkeypatch.setattr(etl, "_load_inventory", lambda day, partition=None: pd.DataFrame(INVENTORY))
+    monkeypatch.setattr(etl, "_load_product_analytics", lambda start, end, partition=None: pd.DataFrame(ANALYTICS))
+    monkeypatch.setattr(etl, "insert_features", written.append)
+    return written
+
+def test_compact_etl_matches_baseline_features(etl_inputs):
+    assert etl.run_daily_feature_etl(TARGET) == 2
+    features = etl_inputs[0]
+    # One avg_daily_sales_7d column, from the rolling mean rather than a renamed units column
+    assert list(features.columns) == REQUIRED_COLS
+
+    rows = {r["sku"]: r for r in features.to_dict("records")}
+    assert set(rows) == {"A", "B"}
+    a, b = rows["A"], rows["B"]
+    assert a["date"] == TARGET and a["vendor_id"] == "v1"
+    # Rolling over A's three sales days: 2, 4 and 6 + 2 units
+    assert a["avg_daily_sales_7d"] == pytest.approx(14 / 3, rel=1e-6)
+    assert a["avg_daily_sales_30d"] == pytest.approx(14 / 3, rel=1e-6)
+    assert a["current_price"] == pytest.approx(12) and a["base_price"] == pytest.approx(12)
+    assert a["cost_price"] == pytest.approx(8.4, rel=1e-6)
+    assert (a["inventory"], a["ageing_days"], a["restock_eta_days"]) == (5, 3, 5)
+    assert (a["views_7d"], a["add_to_cart_7d"], a["views_30d"]) == (50, 5, 150)
+    assert a["conv_rate_7d"] == pytest.approx(0.2, rel=1e-6)
+    assert a["promo_flag"] == 0 and a["other_features_json"] is None
+
+    # No inventory or analytics rows: zeros, as before
+    assert b["avg_daily_sales_7d"] == pytest.approx(3) and b["current_price"] == pytest.approx(20)
+    assert b["cost_price"] == pytest.approx(14, rel=1e-6)
+    assert (b["inventory"], b["views_7d"], b["views_30d"], b["restock_eta_days"]) == (0, 0, 0, 0)
+
+def test_compact_etl_uses_narrow_dtypes(etl_inputs):
+    etl.run_daily_feature_etl(TARGET)
+    features = etl_inputs[0]
+    assert isinstance(features["sku"].dtype, pd.CategoricalDtype)
+    assert isinstance(features["vendor_id"].dtype, pd.CategoricalDtype)
+    for col in ("avg_daily_sales_7d", "avg_daily_sales_30d", "current_price", "inventory", "conv_rate_7d"):
+        assert features[col].dtype == np.float32, col
+    for col in ("views_7d", "views_30d", "add_to_cart_7d", "restock_eta_days"):
+        assert features[col].dtype == np.int32, col
+
+def test_profile_memory_flag_reports_every_stage(etl_inputs, monkeypatch):
+    from scripts import run_feature_etl
+
+    logged = []
+    monkeypatch.setattr(run_feature_etl.logger, "info", lambda msg, *args: logged.append(msg % args if args else msg))
+    monkeypatch.setattr(sys, "argv", ["run_feature_etl.py", "--profile-memory"])
+    run_feature_etl.main()
+
+    report = next(m for m in logged if m.startswith("ETL memory profile"))
+    for stage in ("load_orders", "aggregate_sales", "build_features", "insert_features"):
+        assert stage in report
+    assert "peak RSS" in report
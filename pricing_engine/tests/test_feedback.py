@@ -0,0 +1,119 @@
+from app.feedback import counters
+from app.feedback import feedback_handler as fh
+from app.feedback.suggestion_index import RecentSuggestionIndex
+
+def _event(sku, price, action="accept", **extra):
+    e = {"vendor_id": "v1", "sku": sku, "suggested_price": price,
+         "action": action, "timestamp": "2025-01-01T10:00:00Z"}
+    e.update(extra)
+    return e
+
+def test_batch_resolves_ids_and_writes_in_bulk(monkeypatch):
+    index = RecentSuggestionIndex(max_size=10)
+    index.record("s2", "v1", 20.004, 22)
+    monkeypatch.setattr(fh, "recent_suggestions", index)
+
+    lookups = []
+
+    def fake_fetch_all(sql, params=()):
+        lookups.append(params)
+        return [
+            {"matched_by": "key", "sku": "s3", "vendor_id": "v1", "suggested_price": 30.0, "id": 33},
+            {"matched_by": "id", "sku": "s1", "vendor_id": "v1", "suggested_price": 10.0, "id": 11},
+        ]
+
+    inserts, updates = [], []
+    monkeypatch.setattr(fh, "fetch_all", fake_fetch_all)
+    monkeypatch.setattr(fh, "execute_many", lambda sql, rows: inserts.extend(rows))
+    monkeypatch.setattr(fh, "execute_query", lambda sql, params: updates.append((sql, params)))
+    monkeypatch.setattr(fh, "increment_feedback_counters", lambda payloads: None)
+
+    counts = fh.save_feedback_batch(
+        [
+            _event("s1", 10.0, suggestion_id=11),
+            _event("s2", 20.0, action="reject"),
+            _event("s3", 30.0, action="custom_price", custom_price=29.0),
+            _event("s4", 40.0),
+        ]
+    )
+
+    assert counts == {"saved": 4, "resolved": 3}
+    assert lookups == [("s3", "v1", 30.0, "s4", "v1", 40.0, 11)]
+    assert [row[-1] for row in inserts] == [11, 22, 33, None]
+    assert len(updates) == 1
+    assert updates[0][1] == (11, "ACCEPTED", 22, "REJECTED", 33, "CUSTOM", 11, 22, 33)
+
+def test_validate_feedback():
+    assert fh.validate_feedback(_event("s1", 10.0)) is None
+    assert fh.validate_feedback(_event("s1", 10.0, action="maybe")) == "Invalid action"
+    assert "suggestion_id" in fh.validate_feedback(_event("s1", 10.0, suggestion_id="x"))
+    assert fh.validate_feedback(_event("s1", 10.0, timestamp="2025-01-01 10:00:00")) is None
+    # Would otherwise be counted under whatever day the counters were updated
+    for bad in ("yesterday", 1735725600, None):
+        assert "timestamp" in fh.validate_feedback(_event("s1", 10.0, timestamp=bad))
+
+def test_index_evicts_oldest():
+    index = RecentSuggestionIndex(max_size=2)
+    index.record("a", "v", 1.0, 1)
+    index.record("b", "v", 2.0, 2)
+    index.record("c", "v", 3.0, 3)
+    assert index.lookup("a", "v", 1.0) is None
+    assert index.lookup("c", "v", 3.0) == 3
+
+def test_counters_aggregate_batch_into_one_upsert(monkeypatch):
+    batches = []
+    monkeypatch.setattr(counters, "execute_many", lambda sql, rows: batches.append(rows))
+    counters.increment_feedback_counters(
+        [
+            _event("s1", 10.0),
+            _event("s2", 20.0, action="reject"),
+            _event("s3", 30.0, timestamp="2025-01-02T08:00:00Z"),
+        ]
+    )
+    rows = {(r[0], r[1]): r[2:] for r in batches[0]}
+    assert rows[("global", "_global_")] == (2, 1, 0)
+    assert rows[("vendor", "v1")] == (2, 1, 0)
+    assert rows[("day", "2025-01-01")] == (1, 1, 0)
+    assert rows[("day", "2025-01-02")] == (1, 0, 0)
+
+def test_feedback_summary_reads_counter_row(monkeypatch):
+    seen = []
+
+    def fake_fetch_one(sql, params):
+        seen.append(params)
+        return {"accept_cnt": 3, "reject_cnt": 1, "custom_cnt": 0}
+
+    monkeypatch.setattr(counters, "fetch_one", fake_fetch_one)
+    summary = fh.get_feedback_summary(vendor_id="v1")
+    assert seen == [("vendor", "v1")]
+    assert summary["acceptance_rate"] == 0.75
+    assert summary["custom_price"] == 0
+
+def test_explicit_suggestion_id_of_another_sku_is_not_trusted(monkeypatch):
+    monkeypatch.setattr(fh, "recent_suggestions", RecentSuggestionIndex(max_size=10))
+    # Suggestion 11 belongs to s1/v1, 12 to s2/v2
+    owners = {11: ("s1", "v1"), 12: ("s2", "v2")}
+    monkeypatch.setattr(
+        fh,
+        "fetch_all",
+        lambda sql, params=(): [
+            {"matched_by": "id", "sku": owners[i][0], "vendor_id": owners[i][1], "suggested_price": 1.0, "id": i}
+            for i in params if i in owners
+        ],
+    )
+    inserts, updates = [], []
+    monkeypatch.setattr(fh, "execute_many", lambda sql, rows: inserts.extend(rows))
+    monkeypatch.setattr(fh, "execute_query", lambda sql, params: updates.append(params))
+    monkeypatch.setattr(fh, "increment_feedback_counters", lambda payloads: None)
+
+    counts = fh.save_feedback_batch(
+        [
+            _event("s1", 10.0, suggestion_id=11),
+            _event("s1", 10.0, action="reject", suggestion_id=12),  # another vendor's suggestion
+            _event("s1", 10.0, suggestion_id=99),  # no such suggestion
+        ]
+    )
+
+    assert counts == {"saved": 3, "resolved": 1}
+    assert [row[-1] for row in inserts] == [11, None, None]
+    assert updates == [(11, "ACCEPTED", 11)]
@@ -0,0 +1,126 @@
+import json
+from datetime import date, datetime
+
+import pytest
+
+from app import db
+from app.monitoring import retention, rollups
+from app.monitoring.retention import PartitionedTable, plan_expired_partitions, plan_new_partitions
+from benchmarks.sqlite_backend import create_schema, sqlite_connection_factory
+
+def test_plan_new_partitions_by_day_and_month():
+    assert plan_new_partitions({"p_future": None}, date(2025, 1, 30), 2, "day") == [
+        ("p20250130", date(2025, 1, 31)),
+        ("p20250131", date(2025, 2, 1)),
+        ("p20250201", date(2025, 2, 2)),
+    ]
+    # Continues from the last existing bound; nothing to do when far enough ahead
+    existing = {"p20250130": date(2025, 1, 31), "p_future": None}
+    assert [n for n, _ in plan_new_partitions(existing, date(2025, 1, 30), 1, "day")] == ["p20250131"]
+    assert plan_new_partitions(existing, date(2025, 1, 29), 1, "day") == []
+
+    assert plan_new_partitions({"p_future": None}, date(2024, 12, 15), 1, "month") == [
+        ("p202412", date(2025, 1, 1)),
+        ("p202501", date(2025, 2, 1)),
+    ]
+
+def test_plan_expired_partitions_keeps_anything_overlapping_the_window():
+    existing = {
+        "p20250101": date(2025, 1, 2),
+        "p20250102": date(2025, 1, 3),
+        "p20250103": date(2025, 1, 4),
+        "p_future": None,
+    }
+    assert plan_expired_partitions(existing, date(2025, 1, 3)) == ["p20250101", "p20250102"]
+
+LOG_SQL = """
+    INSERT INTO prediction_logs (sku, vendor_id, suggestion_id, model_type, input_features_json, output_json, created_at)
+    VALUES (%s, 'v1', 1, 'optimizer', '{}', %s, %s)
+"""
+
+@pytest.fixture
+def log_db(tmp_path):
+    path = str(tmp_path / "logs.sqlite")
+    create_schema(path)
+    db.set_connection_factory(sqlite_connection_factory(path))
+    yield
+    db.set_connection_factory(db.mysql_connection)
+
+def test_maintenance_drops_expired_partitions_only_once_every_day_is_rolled_up(log_db, monkeypatch):
+    existing = {
+        "p20250101": date(2025, 1, 2),  # the first partition also holds older rows
+        "p20250102": date(2025, 1, 3),
+        "p20250103": date(2025, 1, 4),
+        "p_future": None,
+    }
+    statements = []
+    monkeypatch.setattr(retention, "existing_partitions", lambda table: dict(existing))
+    monkeypatch.setattr(retention, "execute_query", lambda sql, params=None: statements.append(sql))
+    monkeypatch.setattr(retention.Config, "LOG_PARTITIONS_AHEAD", 1)
+    table = PartitionedTable("prediction_logs", retention_days=1)
+    for day in (date(2024, 12, 30), date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)):
+        db.execute_query(LOG_SQL, ("a", json.dumps({"expected_revenue": 1.0}), datetime.combine(day, datetime.min.time())))
+
+    # No rollups at all: every expired partition still has un-rolled days
+    assert retention.maintain_table(table, date(2025, 1, 10))["dropped"] == []
+    assert statements[0].startswith("ALTER TABLE prediction_logs REORGANIZE PARTITION p_future INTO (")
+    assert "PARTITION p20250110 VALUES LESS THAN ('2025-01-11')" in statements[0]
+    assert statements[0].endswith("PARTITION p_future VALUES LESS THAN (MAXVALUE))")
+    assert not any("DROP" in s for s in statements)
+
+    # 2025-01-02 is missing (a failed monitoring run), though later days are rolled up
+    for day in (date(2024, 12, 30), date(2025, 1, 1), date(2025, 1, 3)):
+        rollups.refresh_daily_rollups(day)
+    statements.clear()
+    result = retention.maintain_table(table, date(2025, 1, 10))
+    assert result["dropped"] == ["p20250101", "p20250103"]
+    assert statements[-1] == "ALTER TABLE prediction_logs DROP PARTITION p20250101, p20250103"
+
+    rollups.refresh_daily_rollups(date(2025, 1, 2))
+    assert "p20250102" in retention.maintain_table(table, date(2025, 1, 10))["dropped"]
+
+def test_missing_rollup_days_ignores_days_without_raw_rows(log_db):
+    for day in (date(2025, 1, 1), date(2025, 1, 3)):
+        db.execute_query(LOG_SQL, ("a", "{}", datetime.combine(day, datetime.min.time())))
+    rollups.refresh_daily_rollups(date(2025, 1, 3))
+    assert rollups.missing_rollup_days("prediction_logs", date(2025, 1, 1), date(2025, 1, 5)) == [date(2025, 1, 1)]
+    assert rollups.earliest_raw_day("prediction_logs", date(2025, 1, 5)) == date(2025, 1, 1)
+    assert rollups.missing_rollup_days("monitoring_metrics", date(2025, 1, 1), date(2025, 1, 5)) == []
+
+def test_daily_rollups_on_sqlite(tmp_path):
+    path = str(tmp_path / "rollups.sqlite")
+    create_schema(path)
+    db.set_connection_factory(sqlite_connection_factory(path))
+    try:
+        log_sql = """
+            INSERT INTO prediction_logs (sku, vendor_id, suggestion_id, model_type, input_features_json, output_json, created_at)
+            VALUES (%s, 'v1', 1, 'optimizer', '{}', %s, %s)
+        """
+        for sku, revenue, ts in [
+            ("a", 10.0, datetime(2025, 1, 1, 9)),
+            ("a", 12.0, datetime(2025, 1, 1, 18)),
+            ("b", 5.0, datetime(2025, 1, 1, 23, 59)),
+            ("b", 7.0, datetime(2025, 1, 2, 0, 1)),
+        ]:
+            db.execute_query(log_sql, (sku, json.dumps({"expected_revenue": revenue, "expected_profit": 1.0}), ts))
+        metric_sql = """
+            INSERT INTO monitoring_metrics (date, sku, vendor_id, model_type, metric_name, metric_value, created_at)
+            VALUES (%s, '_global_', %s, 'demand', 'MAPE', %s, NOW())
+        """
+        for vendor, value in [("v1", 0.2), ("v2", 0.4)]:
+            db.execute_query(metric_sql, (date(2025, 1, 1), vendor, value))
+
+        rollups.refresh_daily_rollups(date(2025, 1, 1))
+        rollups.refresh_daily_rollups(date(2025, 1, 1))  # idempotent
+
+        volume = rollups.daily_prediction_volume(date(2025, 1, 1), date(2025, 1, 31))
+        assert len(volume) == 1
+        assert volume[0]["predictions"] == 3 and volume[0]["vendor_skus"] == 2
+        assert volume[0]["expected_revenue"] == 27.0
+
+        history = rollups.metric_history("demand", "MAPE", date(2025, 1, 1), date(2025, 1, 1))
+        assert history[0]["points"] == 2
+        assert abs(history[0]["value_avg"] - 0.3) < 1e-9 and history[0]["value_max"] == 0.4
+        assert rollups.rolled_up_through("prediction_logs") == date(2025, 1, 1)
+    finally:
+        db.set_connection_factory(db.mysql_connection)
@@ -0,0 +1,77 @@
+import io
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+
+from app.utils import logging_utils
+from app.utils.logging_utils import JsonFormatter, RateLimitFilter, build_output_handler, get_logger
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _record(msg, *args, level=logging.WARNING, name="app.test"):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+def test_rate_limit_per_template_and_summary():
+    clock = FakeClock()
+    summaries = []
+    f = RateLimitFilter(limit=2, window=60, emit_summary=summaries.append, clock=clock)
+
+    passed = [f.filter(_record("No features for sku=%s", f"S{i}")) for i in range(5)]
+    assert passed == [True, True, False, False, False]
+    # A different template has its own budget
+    assert f.filter(_record("Zero stock for sku=%s", "S1"))
+    assert summaries == []
+
+    clock.now = 61
+    assert f.filter(_record("No features for sku=%s", "S9"))
+    assert len(summaries) == 1
+    assert summaries[0].suppressed == 3
+    assert "Suppressed 3 WARNING messages" in summaries[0].getMessage()
+
+def test_rate_limit_exempts_errors_and_flush_reports_pending():
+    summaries = []
+    f = RateLimitFilter(limit=1, window=60, emit_summary=summaries.append, clock=FakeClock())
+    assert all(f.filter(_record("boom %s", i, level=logging.ERROR)) for i in range(5))
+
+    f.filter(_record("per sku %s", 1))
+    f.filter(_record("per sku %s", 2))
+    f.flush()
+    assert [s.suppressed for s in summaries] == [1]
+
+def test_json_formatter_includes_extra_fields():
+    rec = _record("Suggested price %s for sku=%s", 9.5, "S1", level=logging.INFO)
+    rec.app = "pricing_engine"
+    out = json.loads(JsonFormatter().format(rec))
+    assert out["message"] == "Suggested price 9.5 for sku=S1"
+    assert out["level"] == "INFO"
+    assert out["app"] == "pricing_engine"
+
+def test_records_are_formatted_on_the_listener(monkeypatch):
+    stream = io.StringIO()
+    q = queue.SimpleQueue()
+    handler = logging_utils._DeferredQueueHandler(q)
+    listener = QueueListener(q, build_output_handler(stream, fmt="json"))
+    pipeline = logging_utils._Pipeline.__new__(logging_utils._Pipeline)
+    pipeline.handler = handler
+    monkeypatch.setattr(logging_utils, "_get_pipeline", lambda: pipeline)
+
+    log = get_logger("app.test_queue")
+    log.info("sku=%s price=%s", "S1", 12.0)
+    queued = q.get_nowait()
+    # Queued with the template and raw args, rendered later by the listener
+    assert queued.msg == "sku=%s price=%s"
+    assert queued.args == ("S1", 12.0)
+
+    q.put(queued)
+    listener.start()
+    listener.stop()
+    line = json.loads(stream.getvalue())
+    assert line["message"] == "sku=S1 price=12.0"
+    assert line["app"] == "pricing_engine"
+    logging.getLogger("app.test_queue").removeHandler(handler)
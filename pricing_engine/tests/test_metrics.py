@@ -0,0 +1,19 @@
+from app.utils.metrics import MetricsRegistry, sql_fingerprint
+
+def test_histogram_renders_cumulative_buckets():
+    reg = MetricsRegistry()
+    h = reg.histogram("t_seconds", "test", labelnames=("stage",), buckets=(0.1, 1.0))
+    h.labels("a").observe(0.05)
+    h.labels("a").observe(0.5)
+    h.labels("a").observe(5.0)
+    text = reg.render()
+    assert 't_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="a",le="1.0"} 2' in text
+    assert 't_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 't_seconds_count{stage="a"} 3' in text
+
+def test_sql_fingerprint_collapses_batches():
+    one = sql_fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)")
+    many = sql_fingerprint("INSERT INTO t (a, b)\n VALUES (%s, %s), (%s, %s), (%s, %s)")
+    assert one == many
+    assert sql_fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s)") == "SELECT * FROM t WHERE id IN (?+)"
@@ -0,0 +1,77 @@
+from datetime import date
+
+import pytest
+
+from app.monitoring import metrics_sink as ms
+from app.monitoring.metrics_sink import MetricsSink
+
+def test_sink_flushes_multi_row_inserts_on_size_and_exit(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ms, "execute_query", lambda sql, params: calls.append((sql, params)))
+
+    with MetricsSink(flush_size=2, flush_interval=3600, spool_path="") as sink:
+        sink.add_global(date(2025, 1, 1), "demand", "MAPE", 0.1)
+        sink.add_global(date(2025, 1, 1), "demand", "RMSE", 2.0)
+        assert len(calls) == 1  # size-triggered flush
+        sink.add(date(2025, 1, 1), "s1", "v1", "elasticity", "elasticity_drift", 0.3)
+
+    assert len(calls) == 2
+    sql, params = calls[0]
+    assert sql.count("NOW()") == 2
+    assert params[:6] == (date(2025, 1, 1), "_global_", "_global_", "demand", "MAPE", 0.1)
+    assert calls[1][1][1:3] == ("s1", "v1")
+
+def test_sink_spools_when_db_unavailable_and_replays(monkeypatch, tmp_path):
+    spool = tmp_path / "metrics.jsonl"
+
+    def failing(sql, params):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(ms, "execute_query", failing)
+    with MetricsSink(spool_path=str(spool)) as sink:
+        sink.add_global(date(2025, 1, 2), "coverage", "total_skus", 10)
+    assert spool.exists()
+
+    calls = []
+    monkeypatch.setattr(ms, "execute_query", lambda sql, params: calls.append(params))
+    assert MetricsSink(spool_path=str(spool)).replay_spool() == 1
+    assert calls[0][0] == date(2025, 1, 2)
+    assert not spool.exists()
+
+def test_sink_without_spool_raises(monkeypatch):
+    def failing(sql, params):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(ms, "execute_query", failing)
+    sink = MetricsSink(spool_path="")
+    sink.add_global(date(2025, 1, 2), "coverage", "total_skus", 10)
+    with pytest.raises(RuntimeError):
+        sink.flush()
+
+def test_partial_failure_spools_and_keeps_only_unwritten_chunks(monkeypatch, tmp_path):
+    spool = tmp_path / "metrics.jsonl"
+    written = []
+    fail_after = [1]
+
+    def flaky(sql, params):
+        if len(written) >= fail_after[0]:
+            raise RuntimeError("db down")
+        written.append(params[4])
+
+    monkeypatch.setattr(ms, "execute_query", flaky)
+    with MetricsSink(flush_size=2, flush_interval=3600, spool_path=str(spool)) as sink:
+        sink._buffer = [ms.MetricPoint(date(2025, 1, 3), "s", "v", "demand", f"m{i}", i) for i in range(5)]
+    # The first chunk was committed; only the other three points are spooled
+    assert written == ["m0"]
+    assert len(spool.read_text().splitlines()) == 3
+
+    fail_after[0] = 2  # replay writes one chunk, then fails again
+    with pytest.raises(RuntimeError):
+        MetricsSink(flush_size=2, spool_path=str(spool)).replay_spool()
+    assert written == ["m0", "m2"]
+    assert len(spool.read_text().splitlines()) == 1
+
+    fail_after[0] = 10
+    assert MetricsSink(flush_size=2, spool_path=str(spool)).replay_spool() == 1
+    assert written == ["m0", "m2", "m4"]
+    assert not spool.exists()
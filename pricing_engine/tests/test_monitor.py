@@ -0,0 +1,78 @@
+from datetime import date
+
+import numpy as np
+
+from app.monitoring import monitor
+
+class _CaptureSink:
+    def __init__(self):
+        self.points = []
+
+    def add(self, d, sku, vendor_id, model_type, name, value):
+        self.points.append((sku, vendor_id, model_type, name, value))
+
+    def add_global(self, d, model_type, name, value):
+        self.add(d, "_global_", "_global_", model_type, name, value)
+
+def test_demand_errors_global_and_segments(monkeypatch):
+    rows = [
+        {"sku": "a", "vendor_id": "v1", "expected_revenue": 100.0, "suggested_price": 10.0,
+         "confidence": 0.95, "actual_units": 12, "actual_revenue": 120.0},
+        {"sku": "b", "vendor_id": "v1", "expected_revenue": 300.0, "suggested_price": 30.0,
+         "confidence": 0.42, "actual_units": 8, "actual_revenue": 240.0},
+        {"sku": "c", "vendor_id": "v2", "expected_revenue": 40.0, "suggested_price": 20.0,
+         "confidence": 0.4, "actual_units": None, "actual_revenue": None},
+    ]
+    monkeypatch.setattr(monitor, "fetch_all", lambda sql, params: rows)
+    sink = _CaptureSink()
+
+    metrics = monitor._compute_demand_errors(date(2025, 1, 1), sink)
+
+    y_true = np.array([12.0, 8.0, 0.0])
+    y_pred = np.array([10.0, 10.0, 2.0])
+    eps = 1e-6
+    assert np.isclose(metrics["MAPE"], np.mean(np.abs((y_true - y_pred) / (y_true + eps))))
+    assert np.isclose(metrics["RMSE"], np.sqrt(np.mean((y_true - y_pred) ** 2)))
+
+    names = {(p[1], p[3]) for p in sink.points}
+    assert ("v2", "RMSE") in names
+    assert ("_global_", "RMSE:price_band=25-50") in names
+    assert ("_global_", "MAPE:confidence_decile=d4") in names
+    v2_rmse = [p[4] for p in sink.points if p[1] == "v2" and p[3] == "RMSE"][0]
+    assert np.isclose(v2_rmse, 2.0)
+
+def test_demand_errors_query_uses_order_ts_range(monkeypatch):
+    captured = {}
+
+    def fake_fetch_all(sql, params):
+        captured["sql"], captured["params"] = sql, params
+        return []
+
+    monkeypatch.setattr(monitor, "fetch_all", fake_fetch_all)
+    assert monitor._compute_demand_errors(date(2025, 1, 1), _CaptureSink()) == {}
+    assert "DATE(o.order_ts)" not in captured["sql"]
+    assert captured["params"][:2] == (date(2025, 1, 1), date(2025, 1, 2))
+
+def test_failed_spool_replay_does_not_abort_monitoring(monkeypatch):
+    ran = []
+
+    class _Sink(_CaptureSink):
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def replay_spool(self):
+            raise RuntimeError("db down")
+
+    monkeypatch.setattr(monitor, "MetricsSink", _Sink)
+    monkeypatch.setattr(monitor, "refresh_prediction_logs_rollup", lambda d: None)
+    monkeypatch.setattr(monitor, "refresh_monitoring_metrics_rollup", lambda d: ran.append("rollup"))
+    monkeypatch.setattr(monitor, "_compute_demand_errors", lambda d, sink: ran.append("demand") or {})
+    monkeypatch.setattr(monitor, "check_and_alert", lambda metrics: None)
+    monkeypatch.setattr(monitor, "_compute_elasticity_drift", lambda d, sink: ran.append("drift"))
+    monkeypatch.setattr(monitor, "_compute_coverage", lambda d, sink: ran.append("coverage"))
+
+    monitor.run_daily_monitoring(date(2025, 1, 1))
+    assert ran == ["demand", "drift", "coverage", "rollup"]
@@ -0,0 +1,126 @@
+import dataclasses
+import threading
+from datetime import date
+
+import pytest
+
+from app import db
+from app.pipeline.ledger import RunLedger
+from app.pipeline.nightly import nightly_stages
+from app.pipeline.partitions import Partition, partition_filter, partitions
+from app.pipeline.runner import DONE, FAILED, SKIPPED, PipelineRunner, Stage
+from benchmarks.datagen import CatalogSpec, generate
+from benchmarks.sqlite_backend import SQLiteConnection, create_schema, sqlite_connection_factory
+
+class _Recorder:
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+
+    def stage(self, name, fail=None):
+        def fn(ctx, partition):
+            with self.lock:
+                self.events.append((name, partition.index if partition else None))
+            if fail and fail(partition):
+                raise RuntimeError(f"{name} failed")
+            return 1
+
+        return fn
+
+def test_downstream_partitions_start_before_upstream_finishes():
+    rec = _Recorder()
+    stages = [
+        Stage("etl", rec.stage("etl")),
+        Stage("price", rec.stage("price"), deps=("etl",)),
+        Stage("report", rec.stage("report"), deps=("price",), partitioned=False),
+    ]
+    result = PipelineRunner(stages, partition_count=4, workers=1).run(date(2025, 1, 1))
+
+    assert result.ok
+    # One worker: price for partition 0 runs as soon as etl 0 is done
+    assert rec.events.index(("price", 0)) < rec.events.index(("etl", 1))
+    assert rec.events[-1] == ("report", None)
+    assert result.summary()["price"]["rows"] == 4
+
+def test_failed_partition_is_retried_then_skips_only_its_dependents():
+    rec = _Recorder()
+    sleeps = []
+    teardowns = []
+    stages = [
+        Stage("etl", rec.stage("etl", fail=lambda p: p.index == 1)),
+        Stage(
+            "price",
+            rec.stage("price"),
+            deps=("etl",),
+            teardown=lambda ctx, ok: teardowns.append(ok),
+        ),
+        Stage("report", rec.stage("report"), deps=("price",), partitioned=False),
+    ]
+    runner = PipelineRunner(stages, partition_count=3, workers=2, retries=2, retry_backoff=1, sleep=sleeps.append)
+    result = runner.run(date(2025, 1, 1))
+
+    by_key = {(t.stage, t.partition_no): t for t in result.tasks}
+    assert by_key[("etl", 1)].status == FAILED and by_key[("etl", 1)].attempts == 3
+    assert sleeps == [1, 2]
+    assert by_key[("price", 1)].status == SKIPPED
+    assert by_key[("price", 0)].status == DONE and by_key[("price", 2)].status == DONE
+    assert by_key[("report", -1)].status == SKIPPED
+    assert teardowns == [False]
+    assert not result.ok
+
+@pytest.mark.parametrize("overlap_demand", [False, True])
+def test_nightly_monitoring_waits_for_the_whole_batch(overlap_demand):
+    rec = _Recorder()
+    stages = [
+        dataclasses.replace(s, fn=rec.stage(s.name), setup=None, teardown=None)
+        for s in nightly_stages(overlap_demand)
+    ]
+    result = PipelineRunner(stages, partition_count=4, workers=4).run(date(2025, 1, 1))
+
+    assert result.ok
+    order = [name for name, _ in rec.events]
+    # Drift refits rewrite elasticity_coeffs; no price partition may read them
+    last_price = max(i for i, name in enumerate(order) if name == "price")
+    assert order.index("monitoring") > last_price
+    assert order.index("storage") > order.index("monitoring")
+
+def test_partitions_cover_the_hash_space_once():
+    parts = partitions(5)
+    assert parts[0].lo == 0 and parts[-1].hi == 1 << 32
+    assert all(a.hi == b.lo for a, b in zip(parts, parts[1:]))
+    skus = [f"SKU{i}" for i in range(200)]
+    assert sorted(s for p in parts for s in skus if p.contains(s)) == sorted(skus)
+    assert partition_filter(None) == ("", ())
+    assert partition_filter(Partition(0, 1)) == ("", ())
+
+def test_partition_filter_and_ledger_on_sqlite(tmp_path):
+    path = str(tmp_path / "bench.sqlite")
+    create_schema(path)
+    raw = SQLiteConnection(path)
+    generate(raw.raw, CatalogSpec(n_skus=30, n_vendors=2, days=3), date(2025, 1, 10))
+    raw.close()
+
+    db.set_connection_factory(sqlite_connection_factory(path))
+    try:
+        all_skus = {r["sku"] for r in db.fetch_all("SELECT DISTINCT sku FROM orders")}
+        seen = set()
+        for p in partitions(4):
+            in_partition, params = partition_filter(p)
+            skus = {r["sku"] for r in db.fetch_all(f"SELECT DISTINCT sku FROM orders WHERE 1 = 1{in_partition}", params)}
+            assert all(p.contains(s) for s in skus)
+            seen |= skus
+        assert seen == all_skus
+
+        stages = [Stage("etl", lambda ctx, p: 10), Stage("report", lambda ctx, p: None, deps=("etl",), partitioned=False)]
+        result = PipelineRunner(stages, partition_count=2, workers=2, ledger=RunLedger()).run(date(2025, 1, 10))
+        run = db.fetch_one("SELECT status FROM pipeline_runs WHERE id = %s", (result.run_id,))
+        assert run["status"] == DONE
+        tasks = db.fetch_all(
+            "SELECT stage, partition_no, status, row_count FROM pipeline_tasks WHERE run_id = %s ORDER BY stage, partition_no",
+            (result.run_id,),
+        )
+        assert [(t["stage"], t["partition_no"], t["row_count"]) for t in tasks] == [
+            ("etl", 0, 10), ("etl", 1, 10), ("report", -1, None)
+        ]
+    finally:
+        db.set_connection_factory(db.mysql_connection)
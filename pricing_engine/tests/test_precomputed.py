@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.optimizer import precomputed as pc
+from app.optimizer.inputs import PricingInputs
+
+def _fake_db(run, rows):
+    def fake_fetch_all(sql, params=()):
+        if "FROM batch_runs" in sql:
+            return [run] if run else []
+        assert params == (run["id"],)
+        return rows
+    return fake_fetch_all
+
+ROW = {"id": 11, "sku": "s1", "vendor_id": "v1", "current_price": 10, "suggested_price": 12,
+       "expected_revenue": 60, "expected_profit": 20, "elasticity": -1.3, "confidence": 0.4,
+       "reason": "r", "input_fingerprint": "abc", "content_fingerprint": "c1"}
+
+@pytest.fixture(autouse=True)
+def current_inputs(monkeypatch):
+    """The SKU's current inputs, as far as their content fingerprint goes."""
+    current = {"content": "c1"}
+    monkeypatch.setattr(pc, "get_pricing_inputs", lambda sku, vendor_id: PricingInputs({"sku": sku}))
+    monkeypatch.setattr(pc, "content_fingerprint", lambda inputs: current["content"])
+    return current
+
+def test_refresh_loads_latest_run_and_detects_staleness(monkeypatch):
+    run = {"id": 3, "model_version": "m1", "finished_at": datetime.now() - timedelta(hours=1)}
+    monkeypatch.setattr(pc, "fetch_all", _fake_db(run, [ROW]))
+    monkeypatch.setattr(pc, "get_demand_model_version", lambda: "m1")
+    index = pc.PrecomputedIndex(max_age_sec=7200)
+
+    assert index.refresh() is True
+    assert index.refresh() is False  # same run, nothing reloaded
+    hit = index.lookup("s1", "v1")
+    assert hit.fingerprint == "abc" and hit.response()["suggestion_id"] == 11
+    assert index.lookup("s2", "v1") is None
+
+    index.max_age_sec = 60
+    assert index.lookup("s1", "v1") is None
+
+def test_index_built_with_other_model_is_not_served(monkeypatch):
+    run = {"id": 4, "model_version": "old", "finished_at": datetime.now()}
+    monkeypatch.setattr(pc, "fetch_all", _fake_db(run, [ROW]))
+    monkeypatch.setattr(pc, "get_demand_model_version", lambda: "new")
+    index = pc.PrecomputedIndex(max_age_sec=7200)
+    index.refresh()
+    assert len(index) == 1
+    assert index.lookup("s1", "v1") is None
+
+def test_api_serves_precomputed_suggestion(monkeypatch):
+    from app import api
+    from app.api import create_app
+
+    run = {"id": 5, "model_version": "m1", "finished_at": datetime.now()}
+    monkeypatch.setattr(pc, "fetch_all", _fake_db(run, [ROW]))
+    monkeypatch.setattr(pc, "get_demand_model_version", lambda: "m1")
+    index = pc.PrecomputedIndex(max_age_sec=7200)
+    index.refresh()
+    monkeypatch.setattr(api, "precomputed_index", index)
+    monkeypatch.setattr(api, "live_suggestion", lambda *a: pytest.fail("live path used"))
+
+    client = create_app().test_client()
+    resp = client.get("/price-suggestions?sku=s1&vendor_id=v1")
+    assert resp.status_code == 200
+    assert resp.get_json()["source"] == "precomputed"
+    assert resp.headers["ETag"] == '"abc"'
+
+def test_entry_whose_inputs_changed_falls_back_to_live(monkeypatch, current_inputs):
+    run = {"id": 6, "model_version": "m1", "finished_at": datetime.now()}
+    legacy = {**ROW, "sku": "s2", "content_fingerprint": None}
+    monkeypatch.setattr(pc, "fetch_all", _fake_db(run, [ROW, legacy]))
+    monkeypatch.setattr(pc, "get_demand_model_version", lambda: "m1")
+    monkeypatch.setattr(pc, "fingerprint_for_inputs", lambda sku, vendor_id, inputs: "abc")
+    index = pc.PrecomputedIndex(max_age_sec=7200)
+    index.refresh()
+    assert index.lookup("s1", "v1").suggestion_id == 11
+
+    # e.g. the vendor tightened its min/max rules after the batch ran
+    current_inputs["content"] = "c2"
+    assert index.lookup("s1", "v1") is None
+
+    # Without a content fingerprint, a new feature row or model still invalidates it
+    assert index.lookup("s2", "v1") is not None
+    monkeypatch.setattr(pc, "fingerprint_for_inputs", lambda sku, vendor_id, inputs: "newer")
+    assert index.lookup("s2", "v1") is None
@@ -1,5 +1,6 @@
 import types
 
+from app.optimizer.inputs import PricingInputs
 from app.optimizer.price_optimizer import optimize_price_for_sku
 
 def test_dummy_price_optimizer_constraints(monkeypatch):
@@ -28,8 +29,6 @@ def test_dummy_price_optimizer_constraints(monkeypatch):
             "base_price": 100.0,
         }
 
-    monkeypatch.setattr(po, "get_latest_features_for_sku", fake_get_latest_features_for_sku)
-
     # monkeypatch demand_model.predict_demand
     def fake_predict_demand(df):
         # demand decreases with price
@@ -46,7 +45,13 @@ def test_dummy_price_optimizer_constraints(monkeypatch):
             "max_daily_price_move_pct": 20.0,
         }
 
-    monkeypatch.setattr(po, "_get_vendor_rules", fake_vendor_rules)
+    # features and vendor rules arrive together from the joined inputs read
+    def fake_pricing_inputs(sku, vendor_id):
+        return PricingInputs(
+            fake_get_latest_features_for_sku(sku, vendor_id), fake_vendor_rules(sku, vendor_id)
+        )
+
+    monkeypatch.setattr(po, "get_pricing_inputs", fake_pricing_inputs)
 
     res = optimize_price_for_sku("sku1", "v1")
     assert res is not None
@@ -0,0 +1,71 @@
+from app.optimizer import inputs as pi
+from app.utils.cache import MISSING, TTLCache
+
+def _joined_row(sku, rules=True, elasticity=True):
+    return {
+        "sku": sku,
+        "vendor_id": "v1",
+        "current_price": 10.0,
+        "inventory": 5,
+        "vr_sku": sku if rules else None,
+        "vr_min_margin_pct": 10.0,
+        "vr_max_discount_pct": 50.0,
+        "vr_max_daily_price_move_pct": 20.0,
+        "ec_sku": sku if elasticity else None,
+        "ec_elasticity": -1.1,
+        "ec_r2": 0.4,
+        "ec_p_value_price": 0.02,
+        "ec_n_obs": 30,
+    }
+
+def test_ttl_cache_expires_and_caches_none():
+    now = [0.0]
+    cache = TTLCache("test_ttl", max_size=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", None)
+    cache.set("b", 1)
+    cache.set("c", 2)  # evicts "a"
+    assert cache.get("a") is MISSING
+    assert cache.get("b") == 1
+    now[0] = 11
+    assert cache.get("b") is MISSING
+
+def test_joined_row_split_and_cache_miss_fallback(monkeypatch):
+    pi.clear_input_caches()
+    calls = []
+
+    def fake_fetch_all(sql, params=()):
+        calls.append(sql)
+        return [_joined_row("s1", rules=False)]
+
+    monkeypatch.setattr(pi, "fetch_all", fake_fetch_all)
+    first = pi.get_pricing_inputs("s1", "v1")
+    second = pi.get_pricing_inputs("s1", "v1")
+
+    assert len(calls) == 1
+    assert "LEFT JOIN vendor_rules" in calls[0]
+    assert first.vendor_rules is None
+    assert first.elasticity_rows == [{"elasticity": -1.1, "r2": 0.4, "p_value_price": 0.02, "n_obs": 30}]
+    assert "vr_sku" not in first.features
+    assert second == first
+
+    pi.elasticity_cache.invalidate(("s1", "v1"))
+    pi.get_pricing_inputs("s1", "v1")
+    assert len(calls) == 2
+    pi.clear_input_caches()
+
+def test_prefetch_fetches_only_misses_in_one_query(monkeypatch):
+    pi.clear_input_caches()
+    pi.cache_pricing_inputs(("s0", "v1"), pi.split_joined_row(_joined_row("s0")))
+    calls = []
+
+    def fake_fetch_all(sql, params=()):
+        calls.append(params)
+        return [_joined_row("s1")]
+
+    monkeypatch.setattr(pi, "fetch_all", fake_fetch_all)
+    pi.prefetch_pricing_inputs([("s0", "v1"), ("s1", "v1"), ("s2", "v1")])
+
+    assert calls == [("s1", "v1", "s2", "v1")]
+    assert pi.cached_pricing_inputs(("s1", "v1")).vendor_rules["min_margin_pct"] == 10.0
+    assert pi.cached_pricing_inputs(("s2", "v1")).features is None
+    pi.clear_input_caches()
@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+
+from app.config import Config
+from app.utils.profiling import SamplingProfiler, cprofile_to_file
+
+def test_cprofile_writes_dump(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "PROFILE_DIR", str(tmp_path))
+    with cprofile_to_file("unit") as result:
+        sum(range(1000))
+    assert result["path"] and os.path.exists(result["path"])
+
+def test_sampling_profiler_collects_collapsed_stacks():
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            sum(range(100))
+
+    t = threading.Thread(target=busy_worker)
+    t.start()
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    time.sleep(0.05)
+    profiler.stop()
+    stop.set()
+    t.join()
+
+    folded = profiler.collapsed()
+    assert "busy_worker" in folded
+    stack, count = folded.splitlines()[0].rsplit(" ", 1)
+    assert int(count) >= 1 and ";" in stack
+
+def test_request_profile_header(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(Config, "PROFILE_DIR", str(tmp_path))
+    from app.api import create_app
+
+    app = create_app()
+    with app.test_client() as c:
+        resp = c.get("/health", headers={"X-Profile": "1"})
+    assert os.path.exists(resp.headers["X-Profile-Path"])
+
+def test_sampling_endpoint_validates_seconds_and_samples_in_background(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(Config, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(Config, "PROFILE_MAX_SAMPLE_SECONDS", 5.0)
+    from app.api import create_app
+
+    app = create_app()
+    with app.test_client() as c:
+        for bad in ("-1", "0", "nan", "inf", "6", "soon"):
+            assert c.get(f"/debug/sampling-profile?seconds={bad}").status_code == 400
+
+        start = time.monotonic()
+        resp = c.get("/debug/sampling-profile?seconds=0.2")
+        assert resp.status_code == 202 and time.monotonic() - start < 0.2
+        assert c.get("/debug/sampling-profile?seconds=0.2").status_code == 409
+    path = resp.get_json()["path"]
+
+    deadline = time.monotonic() + 5
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert os.path.exists(path)
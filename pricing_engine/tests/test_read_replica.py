@@ -0,0 +1,129 @@
+import pymysql
+import pytest
+
+from app import db
+from app.feedback import counters
+
+class _Server:
+    """Stand-in MySQL server: answers every query with its own name."""
+
+    def __init__(self, name, lag=0.0):
+        self.name = name
+        self.lag = lag
+        self.down = False
+        self.queries = []
+
+    def connect(self):
+        return _Conn(self)
+
+class _Cursor:
+    def __init__(self, server):
+        self.server = server
+        self.row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        if self.server.down:
+            raise pymysql.err.OperationalError(2003, "Can't connect")
+        self.server.queries.append(sql.strip())
+        if sql == db.REPLICA_LAG_SQL:
+            self.row = {"Seconds_Behind_Source": self.server.lag}
+        else:
+            accepts = 1 if self.server.name == "primary" else 0
+            self.row = {"server": self.server.name, "accept_cnt": accepts, "reject_cnt": 0, "custom_cnt": 0}
+
+    def executemany(self, sql, seq):
+        self.server.queries.append(sql.strip())
+        return len(seq)
+
+    def fetchone(self):
+        return self.row
+
+    def fetchall(self):
+        return [self.row]
+
+class _Conn:
+    def __init__(self, server):
+        self.server = server
+
+    def cursor(self):
+        return _Cursor(self.server)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def servers(monkeypatch):
+    primary, replica = _Server("primary"), _Server("replica")
+    now = [0.0]
+    original = db.pool.connection_factory
+    db.set_connection_factory(primary.connect)
+    db.set_read_connection_factory(replica.connect)
+    monkeypatch.setattr(db.replica_guard, "_clock", lambda: now[0])
+    monkeypatch.setattr(db.replica_guard, "max_lag", 5)
+    monkeypatch.setattr(db.replica_guard, "check_interval", 10)
+    yield primary, replica, now
+    db.set_read_connection_factory(None)
+    db.set_connection_factory(original)
+
+def test_reads_use_replica_and_writes_use_primary(servers):
+    primary, replica, now = servers
+    assert db.fetch_all("SELECT 1")[0]["server"] == "replica"
+    assert db.fetch_one("SELECT 1", ())["server"] == "replica"
+    db.execute_query("UPDATE t SET x = 1")
+    assert primary.queries == ["UPDATE t SET x = 1"]
+    # One lag check for both reads
+    assert replica.queries.count(db.REPLICA_LAG_SQL) == 1
+
+def test_lagging_or_unknown_replica_sends_reads_to_primary(servers):
+    primary, replica, now = servers
+    replica.lag = 30
+    assert db.fetch_all("SELECT 1")[0]["server"] == "primary"
+
+    replica.lag = None  # replication stopped
+    now[0] = 10
+    assert db.fetch_all("SELECT 1")[0]["server"] == "primary"
+
+    replica.lag = 1
+    now[0] = 20
+    assert db.fetch_all("SELECT 1")[0]["server"] == "replica"
+
+def test_replica_failure_falls_back_to_primary_until_next_check(servers):
+    primary, replica, now = servers
+    db.fetch_all("SELECT 1")
+    replica.down = True
+    assert db.fetch_all("SELECT 1")[0]["server"] == "primary"
+    replica.down = False
+    assert db.fetch_all("SELECT 1")[0]["server"] == "primary"
+    now[0] = 10
+    assert db.fetch_all("SELECT 1")[0]["server"] == "replica"
+
+def test_primary_reads_pins_and_read_your_writes_expires(servers):
+    primary, replica, now = servers
+    with db.primary_reads():
+        assert db.fetch_all("SELECT 1")[0]["server"] == "primary"
+
+    db.note_write("vendor:v1")
+    with db.primary_reads("vendor:v1"):
+        assert db.fetch_all("SELECT 1")[0]["server"] == "primary"
+    with db.primary_reads("vendor:v2"):
+        assert db.fetch_all("SELECT 1")[0]["server"] == "replica"
+
+    now[0] = 5  # older than max lag: the replica has it
+    with db.primary_reads("vendor:v1"):
+        assert db.fetch_all("SELECT 1")[0]["server"] == "replica"
+
+def test_feedback_summary_reads_own_writes(servers):
+    primary, replica, now = servers
+    assert counters.get_feedback_counts("vendor", "v1")["accept"] == 0  # replica
+
+    counters.increment_feedback_counters(
+        [{"vendor_id": "v1", "action": "accept", "timestamp": "2025-01-01T10:00:00Z"}]
+    )
+    assert counters.get_feedback_counts("vendor", "v1")["accept"] == 1  # primary
+    assert counters.get_feedback_counts("vendor", "v2")["accept"] == 0  # untouched scope
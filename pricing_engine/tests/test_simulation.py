@@ -0,0 +1,86 @@
+import json
+
+from app.config import Config
+from app.optimizer import simulation
+from app.optimizer.inputs import PricingInputs
+from app.optimizer.simulation import Scenario, parse_scenario, simulate, validate_simulation_request
+
+def _features(sku, vendor_id, inventory=50):
+    return {
+        "sku": sku,
+        "vendor_id": vendor_id,
+        "inventory": inventory,
+        "current_price": 100.0,
+        "last_price": 100.0,
+        "avg_daily_sales_30d": 5.0,
+        "promo_flag": 0,
+        "cost_price": 60.0,
+        "base_price": 100.0,
+    }
+
+def _patch_inputs(monkeypatch, inventory_by_sku):
+    predict_calls = []
+
+    def fake_inputs(sku, vendor_id):
+        if sku not in inventory_by_sku:
+            return PricingInputs(None)
+        return PricingInputs(_features(sku, vendor_id, inventory_by_sku[sku]))
+
+    def fake_predict(df):
+        predict_calls.append(len(df))
+        return 200 - df["current_price"].values
+
+    monkeypatch.setattr(simulation, "prefetch_pricing_inputs", lambda keys: None)
+    monkeypatch.setattr(simulation, "get_pricing_inputs", fake_inputs)
+    monkeypatch.setattr(simulation, "predict_demand", fake_predict)
+    return predict_calls
+
+def test_parse_scenario_adds_baseline_and_checks_limits():
+    scenario, error = parse_scenario({"moves_pct": [-10]})
+    assert error is None and scenario.moves_pct == [-10.0, 0.0]
+    scenario, _ = parse_scenario({"range_pct": {"from": -20, "to": 20, "steps": 5}})
+    assert scenario.moves_pct == [-20.0, -10.0, 0.0, 10.0, 20.0]
+    assert parse_scenario({"moves_pct": [-100]})[1]
+    assert parse_scenario({"range_pct": {"from": -50, "to": 50, "steps": 1000}})[1]
+    _, _, error = validate_simulation_request({"moves_pct": [5]})
+    assert error == {"error": "targets or vendor_id is required"}
+
+def test_simulate_curves_in_one_model_call_per_chunk(monkeypatch):
+    monkeypatch.setattr(Config, "SIMULATION_CHUNK", 10)
+    calls = _patch_inputs(monkeypatch, {"S1": 50, "S2": 0, "S3": 50})
+    targets = [{"sku": s, "vendor_id": "V1"} for s in ("S1", "S2", "S3", "S4")]
+
+    out = list(simulate(targets, Scenario([-10.0, 0.0, 60.0])))
+
+    assert calls == [6]  # two priced SKUs x three moves, one predict call
+    by_sku = {r["sku"]: r for r in out if "sku" in r}
+    assert by_sku["S2"]["skipped"] == "no_stock"
+    assert by_sku["S4"]["skipped"] == "no_features"
+    curve = by_sku["S1"]["curve"]
+    assert [p["price"] for p in curve] == [90.0, 100.0, 160.0]
+    assert curve[0]["demand"] == 110.0
+    assert curve[0]["profit"] == (90.0 - 60.0) * 110.0
+    # +60% is outside the optimizer's search range (20% daily move x 1.3)
+    assert [p["feasible"] for p in curve] == [True, True, False]
+
+    summary = out[-1]["summary"]
+    assert summary["simulated"] == 2 and summary["skipped"] == 2
+    assert summary["totals"][1]["revenue"] == 2 * 100.0 * 100.0
+
+def test_price_simulations_endpoint_streams_ndjson(monkeypatch):
+    from app.api import create_app
+
+    _patch_inputs(monkeypatch, {"S1": 50})
+    client = create_app().test_client()
+    resp = client.post(
+        "/price-simulations",
+        json={"targets": [{"sku": "S1", "vendor_id": "V1"}], "moves_pct": [-10]},
+    )
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert lines[0]["sku"] == "S1" and len(lines[0]["curve"]) == 2
+    assert lines[-1]["summary"]["simulated"] == 1
+
+    resp = client.post("/price-simulations", json={"targets": [{"sku": "S1"}], "moves_pct": [5]})
+    assert resp.status_code == 400
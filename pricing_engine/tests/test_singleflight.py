@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.utils.singleflight import (
+    SINGLEFLIGHT_CALLS,
+    AsyncSingleFlight,
+    SingleFlight,
+    SingleFlightTimeout,
+)
+
+def _run_concurrently(flight, key, fn, n):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test_share", timeout=5)
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {"price": 9.99}
+
+    threads, results, errors = _run_concurrently(flight, ("s1", "v1"), work, 8)
+    while SINGLEFLIGHT_CALLS.labels("test_share", "coalesced").value < 7:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == [1]
+    assert results == [{"price": 9.99}] * 8 and not errors
+    assert len(flight) == 0
+    # The key is free again once the leader is done
+    assert flight.do(("s1", "v1"), lambda: "fresh") == "fresh"
+
+def test_leader_error_reaches_every_waiter():
+    flight = SingleFlight("test_error", timeout=5)
+    release = threading.Event()
+
+    def work():
+        release.wait(5)
+        raise ValueError("db down")
+
+    threads, results, errors = _run_concurrently(flight, "k", work, 4)
+    while SINGLEFLIGHT_CALLS.labels("test_error", "coalesced").value < 3:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+    assert not results
+    assert len(errors) == 4 and all(isinstance(e, ValueError) for e in errors)
+
+def test_waiter_times_out_but_leader_finishes():
+    flight = SingleFlight("test_timeout", timeout=0.05)
+    release = threading.Event()
+    threads, results, errors = _run_concurrently(flight, "k", lambda: release.wait(5) and "done", 1)
+    while len(flight) == 0:
+        time.sleep(0.01)
+    with pytest.raises(SingleFlightTimeout):
+        flight.do("k", lambda: pytest.fail("ran twice"))
+    release.set()
+    threads[0].join()
+    assert results == ["done"]
+
+def test_async_single_flight_coalesces_and_propagates():
+    flight = AsyncSingleFlight("test_async", timeout=5)
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        if value == "bad":
+            raise RuntimeError("boom")
+        return value
+
+    async def main():
+        ok = await asyncio.gather(*(flight.do("a", work, "good") for _ in range(5)))
+        bad = await asyncio.gather(*(flight.do("b", work, "bad") for _ in range(3)), return_exceptions=True)
+        return ok, bad
+
+    ok, bad = asyncio.run(main())
+    assert ok == ["good"] * 5
+    assert all(isinstance(e, RuntimeError) for e in bad)
+    assert calls == ["good", "bad"]
+
+def test_async_waiter_timeout_does_not_cancel_leader():
+    flight = AsyncSingleFlight("test_async_timeout", timeout=0.01)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        with pytest.raises(SingleFlightTimeout):
+            await flight.do("k", slow)
+        return await leader
+
+    assert asyncio.run(main()) == "done"
+
+def test_async_follower_survives_leader_cancellation():
+    flight = AsyncSingleFlight("test_async_cancel", timeout=5)
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.02)
+        return value
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("k", work, "leader"))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flight.do("k", work, f"f{i}")) for i in range(3)]
+        await asyncio.sleep(0.005)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    results = asyncio.run(main())
+    # One follower took over; the others waited on it rather than failing
+    assert calls[0] == "leader" and len(calls) == 2
+    assert results == [calls[1]] * 3
+    assert len(flight) == 0
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from app.config import Config
+from app.models import demand_model
+from app.models.tree_arrays import TreeArrayModel, export_tree_arrays
+from app.utils.memory_utils import memory_breakdown
+
+def _training_data(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.uniform(0, 100, (n, 4)), columns=["a", "b", "current_price", "inventory"])
+    X.loc[X.index[::5], "inventory"] = 0
+    y = 50 - 0.3 * X["current_price"] + 0.1 * X["a"] + rng.normal(0, 1, n)
+    return X, y
+
+def test_tree_arrays_match_lightgbm_predictions(tmp_path):
+    from lightgbm import LGBMRegressor
+
+    X, y = _training_data()
+    model = LGBMRegressor(n_estimators=30, num_leaves=15, verbose=-1).fit(X, y)
+    export_tree_arrays(model, str(tmp_path / "arrays"), source_version="v1")
+
+    flat = TreeArrayModel.load(str(tmp_path / "arrays"))
+    assert isinstance(flat.threshold, np.memmap)
+    X_test, _ = _training_data(200, seed=1)
+    X_test.loc[X_test.index[::7], "a"] = np.nan
+    np.testing.assert_allclose(flat.predict(X_test), model.predict(X_test), rtol=1e-9, atol=1e-9)
+    # Columns are matched by name, not position
+    np.testing.assert_allclose(flat.predict(X_test[X_test.columns[::-1]]), model.predict(X_test))
+
+def test_reexport_leaves_mapped_arrays_intact(tmp_path):
+    from lightgbm import LGBMRegressor
+
+    X, y = _training_data()
+    path = tmp_path / "arrays"
+    path.mkdir()
+    (path / "meta.json").write_text("{}")  # a pre-versioning export directory
+    first = LGBMRegressor(n_estimators=10, verbose=-1).fit(X, y)
+    export_tree_arrays(first, str(path), source_version="v1")
+    mapped = TreeArrayModel.load(str(path))
+    expected = first.predict(X)
+
+    for i in range(3):
+        second = LGBMRegressor(n_estimators=20 + i, num_leaves=7, verbose=-1).fit(X, y * 2)
+        export_tree_arrays(second, str(path), source_version=f"v{i + 2}")
+
+    # The files mapped before are untouched; new loads see the latest export
+    np.testing.assert_allclose(mapped.predict(X), expected)
+    assert path.is_symlink()
+    latest = TreeArrayModel.load(str(path))
+    assert latest.source_version == "v4"
+    np.testing.assert_allclose(latest.predict(X), second.predict(X), rtol=1e-9, atol=1e-9)
+    versions = [p for p in tmp_path.iterdir() if p.name.startswith("arrays.") and not p.is_symlink()]
+    assert len(versions) == 2
+
+def test_load_demand_model_maps_arrays_with_pickle_version(tmp_path, monkeypatch):
+    from lightgbm import LGBMRegressor
+
+    X, y = _training_data()
+    model = LGBMRegressor(n_estimators=5, verbose=-1).fit(X, y)
+    monkeypatch.setattr(Config, "DEMAND_MODEL_PATH", str(tmp_path / "demand.pkl"))
+    monkeypatch.setattr(Config, "DEMAND_MODEL_ARRAYS_DIR", str(tmp_path / "arrays"))
+    demand_model.save_demand_model(model)
+
+    monkeypatch.setattr(Config, "DEMAND_MODEL_USE_ARRAYS", True)
+    monkeypatch.setattr(demand_model, "_global_model", None)
+    monkeypatch.setattr(demand_model, "_global_model_version", None)
+    assert isinstance(demand_model.load_demand_model(), TreeArrayModel)
+    assert demand_model.get_demand_model_version() == demand_model._artifact_version(Config.DEMAND_MODEL_PATH)
+    assert (demand_model.predict_demand(X.head(3)) >= 0).all()
+
+def test_memory_breakdown_reports_shared_and_private():
+    mem = memory_breakdown()
+    if not mem:  # not Linux
+        return
+    assert mem["rss"] > 0
+    assert mem["shared"] + mem["private"] == mem["rss"]